@@ -1,18 +1,36 @@
-import React, { useEffect, useState } from 'react';
+import React, { useCallback, useEffect, useState } from 'react';
+import { Button } from '@material-ui/core';
 import Layout from '../layout';
 import { TableComponent } from '@/common/table';
-import { ApiService, Transaction } from '@/api';
+import {
+  ApiService,
+  PaginatedTransactionListItemList,
+  TransactionListItem,
+} from '@/api';
+
+const PAGE_SIZE = 1000;
+
+const getCursor = (next?: string | null): string | null =>
+  next ? new URL(next).searchParams.get('cursor') : null;
 
 export const TransactionsPage: React.FC = () => {
-  const [data, setData] = useState<Transaction[]>([]);
-  useEffect(() => {
-    ApiService.apiBackofficeV1TransactionList().then(
-      (response: Transaction[]) => {
-        setData(response);
-      },
-    );
+  const [data, setData] = useState<TransactionListItem[]>([]);
+  const [cursor, setCursor] = useState<string | null>(null);
+
+  const loadPage = useCallback((pageCursor?: string) => {
+    ApiService.apiBackofficeV1TransactionList({
+      cursor: pageCursor,
+      pageSize: PAGE_SIZE,
+    }).then((response: PaginatedTransactionListItemList) => {
+      setData((loaded) => [...loaded, ...response.results]);
+      setCursor(getCursor(response.next));
+    });
   }, []);
 
+  useEffect(() => {
+    loadPage();
+  }, [loadPage]);
+
   return (
     <Layout>
       <div>
@@ -29,7 +47,7 @@ export const TransactionsPage: React.FC = () => {
             { key: 'decline_code', label: 'Decline Code' },
             { key: 'decline_reason', label: 'Decline Reason' },
           ]}
-          rowStyler={(row: Transaction) => {
+          rowStyler={(row: TransactionListItem) => {
             if (row.status === 'success') {
               return { backgroundColor: 'lightgreen' };
             }
@@ -40,6 +58,9 @@ export const TransactionsPage: React.FC = () => {
           }}
           data={data}
         />
+        {cursor && (
+          <Button onClick={() => loadPage(cursor)}>Load more</Button>
+        )}
       </div>
     </Layout>
   );
@@ -51,13 +51,13 @@ def acl_queryset_limiter(
             )
         case (AclQueryset.TRANSACTION, SessionRole.MERCHANT):
             return queryset.filter(
-                wallet__wallet__merchant__login_users=user,
-                wallet__wallet__merchant_id=session_role.merchant_id,
+                merchant__login_users=user,
+                merchant_id=session_role.merchant_id,
             )
         case (AclQueryset.TRANSACTION, SessionRole.MERCHANT_GROUP):
             return queryset.filter(
-                wallet__wallet__merchant__merchant_group__user=user,
-                wallet__wallet__merchant__merchant_group_id=session_role.merchant_group_id,
+                merchant__merchant_group__user=user,
+                merchant__merchant_group_id=session_role.merchant_group_id,
             )
         case (AclQueryset.DEPOSIT_ACCOUNT, SessionRole.MERCHANT):
             return queryset.filter(
@@ -71,13 +71,13 @@ def acl_queryset_limiter(
             )
         case (AclQueryset.CALLBACK, SessionRole.MERCHANT):
             return queryset.filter(
-                transaction__wallet__wallet__merchant__login_users=user,
-                transaction__wallet__wallet__merchant_id=session_role.merchant_id,
+                transaction__merchant__login_users=user,
+                transaction__merchant_id=session_role.merchant_id,
             )
         case (AclQueryset.CALLBACK, SessionRole.MERCHANT_GROUP):
             return queryset.filter(
-                transaction__wallet__wallet__merchant__merchant_group__user=user,
-                transaction__wallet__wallet__merchant__merchant_group_id=session_role.merchant_group_id,
+                transaction__merchant__merchant_group__user=user,
+                transaction__merchant__merchant_group_id=session_role.merchant_group_id,
             )
 
     raise RuntimeError(f"Unknown queryset-role type: {queryset_type, session_role}")
@@ -3,7 +3,6 @@ from typing import Any
 
 from bm.datatypes import Money
 from django.core.management.base import BaseCommand, CommandParser
-from django.db import transaction
 from django.db.models import Q
 from rozert_pay.balances.const import BalanceTransactionType as BalanceEventType
 from rozert_pay.balances.const import InitiatorType
@@ -70,6 +69,40 @@ class Command(BaseCommand):
             description=f"Backfill ({trx.type}) for transaction {trx.id}",
         )
 
+    def _apply_chunk(
+        self, chunk_dtos: list[tuple[PaymentTransaction, list[BalanceUpdateDTO]]]
+    ) -> int:
+        """
+        Applies events of the whole chunk at once. If that fails, applies them
+        one transaction at a time to skip and report the failed ones.
+        """
+        if not chunk_dtos:
+            return 0
+        try:
+            BalanceUpdateService.apply_many(
+                [dto for _, dtos in chunk_dtos for dto in dtos]
+            )
+            return len(chunk_dtos)
+        except Exception as e:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Failed to process chunk, processing one by one: {e}"
+                )
+            )
+
+        processed_count = 0
+        for trx, dtos in chunk_dtos:
+            try:
+                BalanceUpdateService.apply_many(dtos)
+                processed_count += 1
+            except Exception as e:
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Failed to process PaymentTransaction {trx.id}: {e}"
+                    )
+                )
+        return processed_count
+
     def handle(self, *args: Any, **options: Any) -> None:
         dry_run = options["dry_run"]
         chunk_size = options["chunk_size"]
@@ -127,6 +160,7 @@ class Command(BaseCommand):
             if not current_batch:
                 break
 
+            chunk_dtos: list[tuple[PaymentTransaction, list[BalanceUpdateDTO]]] = []
             for trx in current_batch:
                 last_processed_id = trx.id
 
@@ -254,11 +288,7 @@ class Command(BaseCommand):
                         processed_count += 1
                         continue
 
-                    with transaction.atomic():
-                        for dto in dtos_to_process:
-                            BalanceUpdateService.update_balance(dto)
-
-                    processed_count += 1
+                    chunk_dtos.append((trx, dtos_to_process))
 
                 except Exception as e:
                     self.stdout.write(
@@ -267,6 +297,7 @@ class Command(BaseCommand):
                         )
                     )
 
+            processed_count += self._apply_chunk(chunk_dtos)
             self.stdout.write(f"Processed {processed_count}/{total_transactions}...")
 
         final_msg = (
@@ -0,0 +1,25 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from rozert_pay.balances.services import BalanceUpdateService
+
+
+class Command(BaseCommand):
+    help = (
+        "Enables sharded balance for a CurrencyWallet with many concurrent "
+        "deposits. Shards count can only be increased."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("currency_wallet_id", type=int)
+        parser.add_argument("shards_count", type=int)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        wallet = BalanceUpdateService.set_balance_shards_count(
+            options["currency_wallet_id"], options["shards_count"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wallet #{wallet.id} has {wallet.balance_shards_count} balance shards."
+            )
+        )
@@ -0,0 +1,69 @@
+# Generated by Django 5.1.3 on 2026-10-16 21:00
+
+import django.db.models.deletion
+import rozert_pay.common.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("balances", "0002_money_fields"),
+        ("payment", "0047_currencywallet_balance_shards_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="balancetransaction",
+            name="balance_shard_index",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                help_text="Balance shard the operation was applied to. Balance snapshots are of this shard, not of the whole wallet.",
+                null=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="BalanceShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("index", models.PositiveSmallIntegerField()),
+                (
+                    "operational_balance",
+                    rozert_pay.common.fields.MoneyField(
+                        decimal_places=20, default=0, max_digits=40
+                    ),
+                ),
+                (
+                    "frozen_balance",
+                    rozert_pay.common.fields.MoneyField(
+                        decimal_places=20, default=0, max_digits=40
+                    ),
+                ),
+                (
+                    "pending_balance",
+                    rozert_pay.common.fields.MoneyField(
+                        decimal_places=20, default=0, max_digits=40
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "currency_wallet",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="balance_shards",
+                        to="payment.currencywallet",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("currency_wallet", "index")},
+            },
+        ),
+    ]
@@ -125,10 +125,31 @@ class BalanceTransaction(models.Model):
     initiator = models.CharField(
         max_length=50, choices=InitiatorType.choices, db_index=True
     )
+    balance_shard_index = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        help_text=_(
+            "Balance shard the operation was applied to. "
+            "Balance snapshots are of this shard, not of the whole wallet."
+        ),
+    )
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def save(self, *args: Any, **kwargs: Any) -> None:
         update_fields = kwargs.get("update_fields")
+        updated_fields = self.fill_money_fields()
+
+        if update_fields is not None and updated_fields:
+            kwargs["update_fields"] = set(update_fields) | updated_fields
+
+        super().save(*args, **kwargs)
+
+    def fill_money_fields(self) -> set[str]:
+        """
+        Copies amounts to not yet filled money fields, returns their names.
+
+        Called on save(), must be called explicitly before bulk_create().
+        """
         updated_fields: set[str] = set()
 
         if self.amount2 is None:
@@ -152,11 +173,7 @@ class BalanceTransaction(models.Model):
         if self.pending_after2 is None:
             self.pending_after2 = self.pending_after
             updated_fields.add("pending_after2")
-
-        if update_fields is not None and updated_fields:
-            kwargs["update_fields"] = set(update_fields) | updated_fields
-
-        super().save(*args, **kwargs)
+        return updated_fields
 
     def __str__(self) -> str:
         return f"{self.type} {self.amount} for Wallet #{self.currency_wallet_id}"
@@ -165,6 +182,33 @@ class BalanceTransaction(models.Model):
         ordering = ["-created_at"]
 
 
+class BalanceShard(models.Model):
+    """
+    Part of a CurrencyWallet balance for wallets with sharded balance.
+
+    Credits are spread over shards by payment transaction id, so concurrent
+    deposits don't wait for a lock on the single wallet row. Wallet balances
+    are the sum of the wallet row balances and balances of all its shards.
+    """
+
+    currency_wallet = models.ForeignKey(
+        "payment.CurrencyWallet",
+        on_delete=models.CASCADE,
+        related_name="balance_shards",
+    )
+    index = models.PositiveSmallIntegerField()
+    operational_balance = fields.MoneyField(default=0)
+    frozen_balance = fields.MoneyField(default=0)
+    pending_balance = fields.MoneyField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Balance shard #{self.index} for Wallet #{self.currency_wallet_id}"
+
+    class Meta:
+        unique_together = ("currency_wallet", "index")
+
+
 class RollingReserveHold(models.Model):
     """
     Tracks a single, specific hold of funds for the Rolling Reserve risk policy.
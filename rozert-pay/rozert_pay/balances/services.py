@@ -1,18 +1,146 @@
 import logging
-from typing import Final
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Final, Sequence
 
 from bm.datatypes import Money
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import QuerySet, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from pydantic import BaseModel, ConfigDict
+from rozert_pay.common.fields import MoneyField
 from rozert_pay.payment.models import CurrencyWallet, PaymentTransaction
 
 from ..common.metrics import track_duration
 from .const import InitiatorType
-from .models import BalanceTransaction, BalanceTransactionType, InitiatorType
+from .models import (
+    BalanceShard,
+    BalanceTransaction,
+    BalanceTransactionType,
+    InitiatorType,
+)
 
 _BalanceUpdateService: Final = "BalanceUpdateService"
 logger = logging.getLogger(__name__)
 
+# Credits which can't make any balance negative, applied to a single
+# balance shard of sharded wallets. Other events lock the whole wallet.
+_SHARDED_EVENT_TYPES: Final = frozenset(
+    {
+        BalanceTransactionType.OPERATION_CONFIRMED,
+        BalanceTransactionType.MANUAL_ADJUSTMENT,
+        BalanceTransactionType.SETTLEMENT_REVERSAL,
+    }
+)
+
+
+@dataclass(frozen=True)
+class WalletBalances:
+    """Balances of the whole wallet, including balance shards."""
+
+    currency: str
+    operational_balance: Decimal
+    frozen_balance: Decimal
+    pending_balance: Decimal
+
+    @property
+    def available_balance(self) -> Decimal:
+        return self.operational_balance - self.frozen_balance - self.pending_balance
+
+
+def _shards_sum(field_name: str) -> Coalesce:
+    return Coalesce(
+        Sum(f"balance_shards__{field_name}"),
+        Value(0),
+        output_field=MoneyField(),
+    )
+
+
+def get_wallet_balances(wallets: QuerySet[CurrencyWallet]) -> list[WalletBalances]:
+    """
+    Reads balances of wallets together with their shards in one query,
+    so the sum is consistent even while shards are being updated.
+    """
+    result = wallets.annotate(
+        shards_operational=_shards_sum("operational_balance"),
+        shards_frozen=_shards_sum("frozen_balance"),
+        shards_pending=_shards_sum("pending_balance"),
+    )
+    return [
+        WalletBalances(
+            currency=w.currency,
+            operational_balance=w.operational_balance + w.shards_operational,
+            frozen_balance=w.frozen_balance + w.shards_frozen,
+            pending_balance=w.pending_balance + w.shards_pending,
+        )
+        for w in result
+    ]
+
+
+def get_currency_wallet_balances(wallet: CurrencyWallet) -> WalletBalances:
+    """
+    Balances of the wallet for display. Sharded wallets are read with
+    their shards in one query, other wallets from the loaded row.
+    """
+    if not wallet.balance_shards_count:
+        return get_locked_wallet_balances(wallet)
+    [balances] = get_wallet_balances(CurrencyWallet.objects.filter(pk=wallet.pk))
+    return balances
+
+
+def get_locked_wallet_balances(wallet: CurrencyWallet) -> WalletBalances:
+    """
+    Exact balances of the wallet locked with select_for_update().
+
+    The lock keeps shard updates out, so shards are summed without locking them.
+    """
+    if not wallet.balance_shards_count:
+        return WalletBalances(
+            currency=wallet.currency,
+            operational_balance=wallet.operational_balance,
+            frozen_balance=wallet.frozen_balance,
+            pending_balance=wallet.pending_balance,
+        )
+    shards = BalanceShard.objects.filter(currency_wallet=wallet).aggregate(
+        operational=Sum("operational_balance"),
+        frozen=Sum("frozen_balance"),
+        pending=Sum("pending_balance"),
+    )
+    return WalletBalances(
+        currency=wallet.currency,
+        operational_balance=wallet.operational_balance + (shards["operational"] or 0),
+        frozen_balance=wallet.frozen_balance + (shards["frozen"] or 0),
+        pending_balance=wallet.pending_balance + (shards["pending"] or 0),
+    )
+
+
+def _get_balances_state(
+    holder: CurrencyWallet | BalanceShard,
+) -> dict[str, Decimal]:
+    return {
+        "operational": holder.operational_balance,
+        "frozen": holder.frozen_balance,
+        "pending": holder.pending_balance,
+    }
+
+
+def _apply_balance_transaction(
+    holder: CurrencyWallet | BalanceShard, tx_record: BalanceTransaction
+) -> None:
+    """
+    Applies the change recorded in tx_record to the holder balances.
+
+    Shards of the wallet are not counted in the wallet row balances, so
+    the difference is applied instead of after state.
+    """
+    holder.operational_balance += (
+        tx_record.operational_after - tx_record.operational_before
+    )
+    holder.frozen_balance += tx_record.frozen_after - tx_record.frozen_before
+    holder.pending_balance += tx_record.pending_after - tx_record.pending_before
+
 
 class BalanceUpdateDTO(BaseModel):
     """
@@ -48,6 +176,8 @@ class BalanceUpdateService:
 
         This method is atomic. It performs the following actions:
         1. Locks the CurrencyWallet row to prevent race conditions.
+           For wallets with sharded balance, credits lock only one balance
+           shard chosen by payment transaction id.
         2. Delegates the balance change logic to the private _apply_event method.
         3. If settlement simulation is enabled, it orchestrates a second call
            to _apply_event for the settlement transaction.
@@ -63,36 +193,235 @@ class BalanceUpdateService:
             ValueError: If currencies mismatch or a negative balance would occur.
             NotImplementedError: If the event_type is unknown.
         """
-        # Lock the wallet once for the entire sequence of operations.
-        wallet = CurrencyWallet.objects.select_for_update().get(
-            pk=dto.currency_wallet.pk
-        )
+        shard = BalanceUpdateService._lock_balance_shard(dto)
+        if shard is not None:
+            wallet = dto.currency_wallet
+        else:
+            # Lock the wallet once for the entire sequence of operations.
+            wallet = CurrencyWallet.objects.select_for_update().get(
+                pk=dto.currency_wallet.pk
+            )
 
-        main_tx_record = BalanceUpdateService._apply_event(wallet, dto)
-        wallet.refresh_from_db()  # Refresh state
+        main_tx_record = BalanceUpdateService._apply_event(wallet, dto, shard)
+        if shard is None:
+            wallet.refresh_from_db()  # Refresh state
 
         # internal settlement simulation.
-        if dto.event_type == BalanceTransactionType.OPERATION_CONFIRMED:
-            settlement_dto = BalanceUpdateDTO(
-                currency_wallet=wallet,
-                event_type=BalanceTransactionType.SETTLEMENT_FROM_PROVIDER,
-                amount=dto.amount,
-                initiator=InitiatorType.SYSTEM,
-                description="Automatic settlement simulation for non-prod environment.",
-                payment_transaction=dto.payment_transaction,
-            )
-            _ = BalanceUpdateService._apply_event(wallet, settlement_dto)
+        if settlement_dto := BalanceUpdateService._get_settlement_simulation(
+            wallet, dto
+        ):
+            _ = BalanceUpdateService._apply_event(wallet, settlement_dto, shard)
 
         return main_tx_record
 
+    @staticmethod
+    @transaction.atomic
+    @track_duration("BalanceUpdateService.apply_many")
+    def apply_many(dtos: Sequence[BalanceUpdateDTO]) -> list[BalanceTransaction]:
+        """
+        Applies many events at once, with the same audit trail as
+        update_balance() called for each DTO in order.
+
+        Each wallet is locked once, in id order to avoid deadlocks. Balances
+        are computed in memory, then all audit records are written with one
+        bulk_create and balances with one UPDATE per wallet.
+
+        Returns:
+            Main BalanceTransaction records, in the order of DTOs.
+        """
+        if not dtos:
+            return []
+
+        wallets = {
+            wallet.pk: wallet
+            for wallet in CurrencyWallet.objects.select_for_update()
+            .filter(pk__in={dto.currency_wallet.pk for dto in dtos})
+            .order_by("pk")
+        }
+        # Wallet locks keep shard updates out, shards are not locked
+        wallet_shards: dict[int, list[BalanceShard]] = defaultdict(list)
+        for shard in BalanceShard.objects.filter(
+            currency_wallet_id__in=[
+                pk for pk, wallet in wallets.items() if wallet.balance_shards_count
+            ]
+        ).order_by("index"):
+            wallet_shards[shard.currency_wallet_id].append(shard)
+
+        tx_records: list[BalanceTransaction] = []
+        main_tx_records: list[BalanceTransaction] = []
+        changed_wallets: dict[int, CurrencyWallet] = {}
+        changed_shards: dict[int, BalanceShard] = {}
+        for dto in dtos:
+            wallet = wallets[dto.currency_wallet.pk]
+            shard: BalanceShard | None = None
+            if (
+                wallet.balance_shards_count
+                and dto.payment_transaction is not None
+                and dto.event_type in _SHARDED_EVENT_TYPES
+            ):
+                shard = wallet_shards[wallet.pk][
+                    dto.payment_transaction.id % wallet.balance_shards_count
+                ]
+                changed_shards[shard.pk] = shard
+            else:
+                changed_wallets[wallet.pk] = wallet
+
+            events = [dto]
+            if settlement_dto := BalanceUpdateService._get_settlement_simulation(
+                wallet, dto
+            ):
+                events.append(settlement_dto)
+            for event_dto in events:
+                holder: CurrencyWallet | BalanceShard = shard or wallet
+                before_state = _get_balances_state(holder)
+                if shard is None:
+                    for wallet_shard in wallet_shards[wallet.pk]:
+                        for key, value in _get_balances_state(wallet_shard).items():
+                            before_state[key] += value
+
+                tx_record = BalanceUpdateService._build_balance_transaction(
+                    wallet, event_dto, before_state, shard
+                )
+                tx_record.fill_money_fields()
+                _apply_balance_transaction(holder, tx_record)
+                tx_records.append(tx_record)
+            main_tx_records.append(tx_records[-len(events)])
+
+        BalanceTransaction.objects.bulk_create(tx_records)
+        now = timezone.now()
+        for wallet in changed_wallets.values():
+            CurrencyWallet.objects.filter(pk=wallet.pk).update(
+                operational_balance=wallet.operational_balance,
+                frozen_balance=wallet.frozen_balance,
+                pending_balance=wallet.pending_balance,
+                updated_at=now,
+            )
+        for shard in changed_shards.values():
+            shard.updated_at = now
+        BalanceShard.objects.bulk_update(
+            changed_shards.values(),
+            ["operational_balance", "frozen_balance", "pending_balance", "updated_at"],
+        )
+        return main_tx_records
+
+    @staticmethod
+    @transaction.atomic
+    @track_duration("BalanceUpdateService.set_balance_shards_count")
+    def set_balance_shards_count(wallet_id: int, shards_count: int) -> CurrencyWallet:
+        """
+        Enables sharded balance for a wallet with many concurrent deposits.
+
+        Shards keep their part of the balance, so the count can't be decreased.
+        """
+        wallet = CurrencyWallet.objects.select_for_update().get(pk=wallet_id)
+        if shards_count < wallet.balance_shards_count:
+            raise ValueError("Balance shards count can't be decreased.")
+
+        BalanceShard.objects.bulk_create(
+            BalanceShard(currency_wallet=wallet, index=index)
+            for index in range(wallet.balance_shards_count, shards_count)
+        )
+        wallet.balance_shards_count = shards_count
+        wallet.save(update_fields=["balance_shards_count", "updated_at"])
+        return wallet
+
+    @staticmethod
+    def _get_settlement_simulation(
+        wallet: CurrencyWallet, dto: BalanceUpdateDTO
+    ) -> BalanceUpdateDTO | None:
+        if dto.event_type != BalanceTransactionType.OPERATION_CONFIRMED:
+            return None
+        return BalanceUpdateDTO(
+            currency_wallet=wallet,
+            event_type=BalanceTransactionType.SETTLEMENT_FROM_PROVIDER,
+            amount=dto.amount,
+            initiator=InitiatorType.SYSTEM,
+            description="Automatic settlement simulation for non-prod environment.",
+            payment_transaction=dto.payment_transaction,
+        )
+
+    @staticmethod
+    def _lock_balance_shard(dto: BalanceUpdateDTO) -> BalanceShard | None:
+        """
+        Returns locked shard to apply the event to, None if the whole
+        wallet must be locked instead.
+
+        The wallet row is locked FOR SHARE, so shard updates run concurrently
+        while select_for_update() on the wallet waits for all of them.
+        """
+        wallet = dto.currency_wallet
+        if (
+            not wallet.balance_shards_count
+            or dto.payment_transaction is None
+            or dto.event_type not in _SHARDED_EVENT_TYPES
+        ):
+            return None
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT 1 FROM {CurrencyWallet._meta.db_table} WHERE id = %s FOR SHARE",
+                [wallet.pk],
+            )
+        # Shards are never deleted, so a stale shards count is still valid
+        return BalanceShard.objects.select_for_update().get(
+            currency_wallet_id=wallet.pk,
+            index=dto.payment_transaction.id % wallet.balance_shards_count,
+        )
+
     @staticmethod
     @track_duration("BalanceUpdateService._apply_event")
     def _apply_event(
-        wallet: CurrencyWallet, dto: BalanceUpdateDTO
+        wallet: CurrencyWallet,
+        dto: BalanceUpdateDTO,
+        shard: BalanceShard | None = None,
     ) -> BalanceTransaction:
         """
         Private worker method to apply a single balance-changing event.
-        This method assumes the wallet is already locked.
+        This method assumes the wallet or the shard is already locked.
+
+        Balances of the locked shard are changed if it's passed. Otherwise
+        the wallet row balances are changed, while snapshots and the negative
+        balance check are for the whole wallet, including its shards.
+        """
+        holder: CurrencyWallet | BalanceShard = shard or wallet
+        if shard is None and wallet.balance_shards_count:
+            totals = get_locked_wallet_balances(wallet)
+            before_state = {
+                "operational": totals.operational_balance,
+                "frozen": totals.frozen_balance,
+                "pending": totals.pending_balance,
+            }
+        else:
+            before_state = _get_balances_state(holder)
+
+        tx_record = BalanceUpdateService._build_balance_transaction(
+            wallet, dto, before_state, shard
+        )
+        tx_record.save()
+
+        _apply_balance_transaction(holder, tx_record)
+        holder.save(
+            update_fields=[
+                "operational_balance",
+                "frozen_balance",
+                "pending_balance",
+                "updated_at",
+            ]
+        )
+        return tx_record
+
+    @staticmethod
+    def _build_balance_transaction(
+        wallet: CurrencyWallet,
+        dto: BalanceUpdateDTO,
+        before_state: dict[str, Decimal],
+        shard: BalanceShard | None,
+    ) -> BalanceTransaction:
+        """
+        Computes balances after the event, returns unsaved audit record.
+
+        before_state is for the shard if it's passed, for the whole
+        wallet otherwise.
         """
         if wallet.currency != dto.amount.currency:
             raise ValueError("Transaction currency does not match wallet currency.")
@@ -101,12 +430,6 @@ class BalanceUpdateService:
             dto.amount.value > 0
         ), "Balance-changing transactions cannot have a zero or negative amount."
 
-        before_state = {
-            "operational": wallet.operational_balance,
-            "frozen": wallet.frozen_balance,
-            "pending": wallet.pending_balance,
-        }
-
         new_op, new_fr, new_pe = (
             before_state["operational"],
             before_state["frozen"],
@@ -155,6 +478,7 @@ class BalanceUpdateService:
                 "CRITICAL: Negative balance.",
                 extra={
                     "wallet_id": wallet.id,
+                    "balance_shard_index": shard.index if shard else None,
                     "event_id": dto.payment_transaction.id
                     if dto.payment_transaction
                     else "",
@@ -168,7 +492,7 @@ class BalanceUpdateService:
                 },
             )
 
-        tx_record = BalanceTransaction.objects.create(
+        return BalanceTransaction(
             currency_wallet=wallet,
             type=dto.event_type,
             amount=transaction_amount,
@@ -181,17 +505,5 @@ class BalanceUpdateService:
             payment_transaction=dto.payment_transaction,
             description=dto.description,
             initiator=dto.initiator,
+            balance_shard_index=shard.index if shard else None,
         )
-
-        wallet.operational_balance = new_op
-        wallet.frozen_balance = new_fr
-        wallet.pending_balance = new_pe
-        wallet.save(
-            update_fields=[
-                "operational_balance",
-                "frozen_balance",
-                "pending_balance",
-                "updated_at",
-            ]
-        )
-        return tx_record
@@ -2,6 +2,8 @@ import logging
 import os
 import threading
 import time
+import typing as ty
+from datetime import timedelta
 from uuid import uuid4
 
 from bm.django_utils.middleware import get_request_id, set_request_id
@@ -13,6 +15,7 @@ from celery.signals import (
     before_task_publish,
     setup_logging,
     task_failure,
+    task_postrun,
     task_prerun,
     task_success,
 )
@@ -37,6 +40,14 @@ app.conf.beat_schedule = {
         "task": "rozert_pay.payment.tasks.check_pending_transaction_status",
         "schedule": crontab(minute="*/1"),
     },
+    "dispatch_outcoming_callbacks": {
+        "task": "rozert_pay.payment.tasks.dispatch_outcoming_callbacks",
+        "schedule": timedelta(seconds=10),
+    },
+    "dispatch_queued_callbacks": {
+        "task": "rozert_pay.payment.tasks.dispatch_queued_callbacks",
+        "schedule": timedelta(seconds=10),
+    },
     "check_bitso_spei_bank_codes": {
         "task": "rozert_pay.payment.tasks.check_bitso_spei_bank_codes",
         "schedule": crontab(hour="7", minute="55", day_of_week="1"),
@@ -45,6 +56,14 @@ app.conf.beat_schedule = {
         "task": "rozert_pay.payment.systems.muwe_spei.tasks.sync_muwe_spei_bank_list",
         "schedule": crontab(hour="3", minute="0"),  # Daily at 3:00 AM
     },
+    "reconcile_limit_counters": {
+        "task": "rozert_pay.limits.tasks.reconcile_limit_counters",
+        "schedule": crontab(minute="7"),  # Hourly
+    },
+    "rebuild_risk_lists_prefilter": {
+        "task": "rozert_pay.risk_lists.tasks.rebuild_risk_lists_prefilter",
+        "schedule": crontab(minute="*/30"),
+    },
     "collect_rabbit_queues_metrics": {
         "task": "common.collect_rabbit_queues_metrics",
         "schedule": crontab(minute="*/1"),
@@ -60,6 +79,24 @@ app.conf.beat_schedule = {
 
 logger = logging.getLogger(__name__)
 
+# Стек (контекст, статистика) SQL запросов выполняемых задач. Хранится в
+# thread-local, т.к. объект задачи общий для потоков воркера, а eager задачи
+# могут быть вложенными.
+_task_sql_queries = threading.local()
+
+
+def _get_task_sql_queries_stack() -> (
+    list[tuple[ty.ContextManager[metrics.SqlQueriesStats], metrics.SqlQueriesStats]]
+):
+    if not hasattr(_task_sql_queries, "stack"):
+        _task_sql_queries.stack = []
+    return _task_sql_queries.stack
+
+
+def _get_task_sql_queries() -> metrics.SqlQueriesStats:
+    stack = _get_task_sql_queries_stack()
+    return stack[-1][1] if stack else metrics.SqlQueriesStats()
+
 
 @setup_logging.connect
 def disable_celery_logging(**kwargs):  # type: ignore[no-untyped-def] # pragma: no cover
@@ -100,9 +137,11 @@ def before_task_run(task, kwargs, **kw):  # type: ignore[no-untyped-def] # pragm
     task = kw.get("sender")
     task._started_at = time.time()
 
-    # Инициализируем контекстный менеджер для отслеживания SQL запросов
-    task._sql_queries_context = metrics.track_sql_queries()
-    task._sql_queries_context.__enter__()
+    # Контекст отслеживания SQL запросов закрывается в after_task_run
+    sql_queries_context = metrics.track_sql_queries()
+    _get_task_sql_queries_stack().append(
+        (sql_queries_context, sql_queries_context.__enter__())
+    )
 
     request_id = kwargs.pop("request_id", None) or get_request_id()
     if not request_id:
@@ -156,14 +195,7 @@ def on_task_success(sender, **kw):  # type: ignore[no-untyped-def] # pragma: no
     queue = sender.request.delivery_info.get("routing_key")
     duration = time.time() - sender._started_at
 
-    # Завершаем контекстный менеджер для SQL запросов
-    sql_queries_count = 0
-    if hasattr(sender, "_sql_queries_context"):
-        try:
-            sender._sql_queries_context.__exit__(None, None, None)
-            sql_queries_count = metrics.get_sql_queries_count()
-        except Exception:
-            logger.exception("Error closing SQL queries context")
+    sql_queries = _get_task_sql_queries()
 
     metrics.TASKS_COUNT.labels(
         task_name=sender.name,
@@ -182,7 +214,13 @@ def on_task_success(sender, **kw):  # type: ignore[no-untyped-def] # pragma: no
         status="success",
         queue=queue,
         exception=None,
-    ).observe(sql_queries_count)
+    ).observe(sql_queries.count)
+    metrics.TASK_SQL_DURATION.labels(
+        task_name=sender.name,
+        status="success",
+        queue=queue,
+        exception=None,
+    ).observe(sql_queries.duration)
 
 
 @task_failure.connect
@@ -199,14 +237,7 @@ def log_task_failure(  # type: ignore[no-untyped-def] # pragma: no cover
     queue = sender.request.delivery_info.get("routing_key")
     duration = time.time() - sender._started_at
 
-    # Завершаем контекстный менеджер для SQL запросов
-    sql_queries_count = 0
-    if hasattr(sender, "_sql_queries_context"):
-        try:
-            sender._sql_queries_context.__exit__(None, None, None)
-            sql_queries_count = metrics.get_sql_queries_count()
-        except Exception:
-            logger.exception("Error closing SQL queries context")
+    sql_queries = _get_task_sql_queries()
 
     logger.exception(
         f"error in task {sender}",
@@ -241,7 +272,27 @@ def log_task_failure(  # type: ignore[no-untyped-def] # pragma: no cover
         status="failed",
         queue=queue,
         exception=exception_class,
-    ).observe(sql_queries_count)
+    ).observe(sql_queries.count)
+    metrics.TASK_SQL_DURATION.labels(
+        task_name=sender.name,
+        status="failed",
+        queue=queue,
+        exception=exception_class,
+    ).observe(sql_queries.duration)
+
+
+@task_postrun.connect
+def after_task_run(**kw):  # type: ignore[no-untyped-def] # pragma: no cover
+    # Вызывается и для retry, когда task_success/task_failure не отправляются
+    stack = _get_task_sql_queries_stack()
+    if not stack:
+        return
+
+    sql_queries_context, _ = stack.pop()
+    try:
+        sql_queries_context.__exit__(None, None, None)
+    except Exception:
+        logger.exception("Error closing SQL queries context")
 
 
 # Expose metrics via HTTP to be collected via prometheus
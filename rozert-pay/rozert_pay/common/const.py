@@ -173,10 +173,6 @@ class TransactionExtraFields:
 
     BYPASS_AMOUNT_VALIDATION_FOR = "bypass_amount_validation_for"
 
-    # Periodic status check fields
-    COUNT_STATUS_CHECKS_SCHEDULED = "count_status_checks_scheduled"
-    LAST_STATUS_CHECK_SCHEDULE = "last_status_check_schedule"
-
     # Data received in redirect request. I.e. PaRes for 3DS
     REDIRECT_RECEIVED_DATA = "redirect_received_data"
 
@@ -0,0 +1,36 @@
+"""
+PostgreSQL backend with connection metrics.
+
+Connections are persistent (CONN_MAX_AGE) and checked with
+CONN_HEALTH_CHECKS, so the backend reports how often processes have to
+open new connections and how long requests/tasks wait for it.
+"""
+import time
+
+from django.db.backends.postgresql import base
+from rozert_pay.common import metrics
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def connect(self) -> None:
+        start = time.perf_counter()
+        super().connect()
+        metrics.DB_CONNECTION_SETUP_DURATION.labels(alias=self.alias).observe(
+            time.perf_counter() - start
+        )
+        metrics.DB_CONNECTIONS_OPENED.labels(alias=self.alias).inc()
+        metrics.DB_CONNECTIONS_OPEN.labels(alias=self.alias).inc()
+
+    def close(self) -> None:
+        was_open = self.connection is not None
+        try:
+            super().close()
+        finally:
+            if was_open and self.connection is None:
+                metrics.DB_CONNECTIONS_OPEN.labels(alias=self.alias).dec()
+
+    def close_if_health_check_failed(self) -> None:
+        was_open = self.connection is not None
+        super().close_if_health_check_failed()
+        if was_open and self.connection is None:
+            metrics.DB_CONNECTION_HEALTH_CHECK_FAILURES.labels(alias=self.alias).inc()
@@ -1,13 +1,23 @@
 import contextlib
+import json
 import logging
+import os
+import sys
 import threading
 import time
+import types
 import typing as ty
+import uuid
+import weakref
+from collections import OrderedDict, defaultdict
 from datetime import timedelta
 
+from django.conf import settings
 from django.core.cache import caches
 from django_redis.cache import RedisCache  # type: ignore[import-untyped]
 from django_redis.client import DefaultClient  # type: ignore[import-untyped]
+from redis.exceptions import LockError
+from rozert_pay.common import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -24,12 +34,175 @@ V = ty.TypedDict(
         "val": ty.Any,
         "expires": float,
         "created": float,
+        "checked": float,
     },
 )
-_cache: dict[CacheKey, V] = {}
+
+
+def approximate_size(obj: ty.Any, max_objects: int = 100_000) -> int:
+    """
+    Approximate size of obj in bytes: sum of sys.getsizeof() of all objects
+    reachable through containers and instance attributes. Shared objects
+    are counted once, classes, modules and functions are not counted.
+
+    Walk stops after max_objects objects to keep the cost bounded.
+    """
+    seen: set[int] = set()
+    stack = [obj]
+    size = 0
+    while stack and len(seen) < max_objects:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _NOT_SIZED_TYPES):
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+
+        if hasattr(o, "__dict__"):
+            stack.append(o.__dict__)
+        for cls in type(o).__mro__:
+            slots = getattr(cls, "__slots__", ())
+            for slot in (slots,) if isinstance(slots, str) else slots:
+                if hasattr(o, slot):
+                    stack.append(getattr(o, slot))
+    return size
+
+
+_NOT_SIZED_TYPES = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+)
+
+
+class _LRUCache:
+    """
+    Memory cache values, evicted in least recently used order when total
+    size exceeds settings.MEMORY_CACHE_MAX_BYTES or size of the key
+    namespace exceeds its settings.MEMORY_CACHE_NAMESPACE_QUOTAS quota.
+    """
+
+    def __init__(self) -> None:
+        self._values: OrderedDict[CacheKey, V] = OrderedDict()
+        self._sizes: dict[CacheKey, int] = {}
+        self._namespace_sizes: dict[str, int] = defaultdict(int)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @property
+    def total_size(self) -> int:
+        return sum(self._namespace_sizes.values())
+
+    def namespace_size(self, namespace: str) -> int:
+        return self._namespace_sizes.get(namespace, 0)
+
+    def get(self, key: CacheKey) -> V | None:
+        with self._lock:
+            val = self._values.get(key)
+            if val is not None:
+                self._values.move_to_end(key)
+            return val
+
+    def set(self, key: CacheKey, val: V) -> None:
+        size = approximate_size(val["val"])
+        namespace = _namespace(key)
+        max_bytes = settings.MEMORY_CACHE_MAX_BYTES
+        quota = min(
+            settings.MEMORY_CACHE_NAMESPACE_QUOTAS.get(namespace, max_bytes),
+            max_bytes,
+        )
+
+        with self._lock:
+            self.pop(key)
+            if size > quota:
+                logger.warning(
+                    "Value is too big for memory cache",
+                    extra={"key": key, "size": size, "quota": quota},
+                )
+                return
+
+            self._values[key] = val
+            self._sizes[key] = size
+            self._namespace_sizes[namespace] += size
+            self._evict(lambda: self._namespace_sizes[namespace] > quota, namespace)
+            self._evict(lambda: self.total_size > max_bytes)
+            self._update_size_metric(namespace)
+
+    def pop(self, key: CacheKey) -> V | None:
+        with self._lock:
+            val = self._values.pop(key, None)
+            if val is not None:
+                namespace = _namespace(key)
+                self._namespace_sizes[namespace] -= self._sizes.pop(key)
+                self._update_size_metric(namespace)
+            return val
+
+    def pop_expired(self) -> None:
+        with self._lock:
+            now = time.time()
+            for key, val in list(self._values.items()):
+                if val["expires"] < now:
+                    self.pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._values):
+                self.pop(key)
+
+    def _evict(
+        self, is_over: ty.Callable[[], bool], namespace: str | None = None
+    ) -> None:
+        for key in list(self._values):
+            if not is_over():
+                return
+            if namespace is None or _namespace(key) == namespace:
+                self.pop(key)
+                metrics.MEMORY_CACHE_EVENTS.labels(
+                    namespace=_namespace(key), event="eviction"
+                ).inc()
+
+    def _update_size_metric(self, namespace: str) -> None:
+        metrics.MEMORY_CACHE_SIZE_BYTES.labels(namespace=namespace).set(
+            self._namespace_sizes[namespace]
+        )
+
+
+_cache = _LRUCache()
+
+
+class _Miss:
+    """on_miss of the key in progress."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # Incremented on each invalidation of the key. Values computed before
+        # the invalidation have older generation and are not cached.
+        self.generation = 0
+
+
+# Only one thread per process runs on_miss for the key. Entries live while
+# some thread computes or waits for the value, so only keys being computed
+# are kept.
+_misses: "weakref.WeakValueDictionary[CacheKey, _Miss]" = weakref.WeakValueDictionary()
+# Guards _misses, and makes invalidation and caching of computed value atomic
+_misses_lock = threading.Lock()
 
 _locals = threading.local()
 
+# If invalidations listener didn't receive anything from Redis for longer
+# than this, cached values are checked against Redis on each hit, as if
+# there were no listener.
+MAX_INVALIDATION_STALENESS = timedelta(seconds=5)
+
 
 @contextlib.contextmanager
 def disable_cache_for_thread() -> ty.Generator[None, None, None]:
@@ -38,6 +211,29 @@ def disable_cache_for_thread() -> ty.Generator[None, None, None]:
     _locals.disable = False
 
 
+def _namespace(key: CacheKey) -> str:
+    return key.split(":", 1)[0]
+
+
+def _is_valid(key: CacheKey, val: V) -> bool:
+    if val["expires"] <= time.time():
+        return False
+
+    if _listener.is_healthy() and val["checked"] > _listener.subscribed_at:
+        # Later invalidations of this value are delivered by the listener
+        return True
+
+    checked = time.time()
+    b = _redis_client.get(f"cache:last_invalidation_request:{key}")
+
+    # If no last_invalidation_request in redis it means we can use cached value
+    last_invalidation_request = float(b) if b else 0
+    if val["created"] > last_invalidation_request:
+        val["checked"] = checked
+        return True
+    return False
+
+
 def _memory_caching(
     key: CacheKey,
     tp: type[T],
@@ -50,26 +246,32 @@ def _memory_caching(
     if on_miss:
         assert ttl
 
-    if val := _cache.get(key):
-        if val["expires"] > time.time():
-            b = _redis_client.get(f"cache:last_invalidation_request:{key}")
+    _listener.ensure_started()
 
-            # If no last_invalidation_request in redis it means we can use cached value
-            last_invalidation_request = float(b) if b else 0
-            if val["created"] > last_invalidation_request:
-                return val["val"]
+    if (val := _cache.get(key)) and _is_valid(key, val):
+        metrics.MEMORY_CACHE_EVENTS.labels(namespace=_namespace(key), event="hit").inc()
+        return val["val"]
 
-        # key invalidated by some reason
-        _cache.pop(key, None)  # pragma: no cover
+    metrics.MEMORY_CACHE_EVENTS.labels(namespace=_namespace(key), event="miss").inc()
+    if not on_miss:
+        return None
 
-    if on_miss:
-        assert ttl
+    assert ttl
+    with _misses_lock:
+        miss = _misses.setdefault(key, _Miss())
+
+    with miss.lock:
+        # Value could be computed by other thread while we were waiting
+        if (val := _cache.get(key)) and _is_valid(key, val):
+            return val["val"]
+
+        generation = miss.generation
         real_val = on_miss()
-        memory_cache_set(key, real_val, ttl)
+        with _misses_lock:
+            if miss.generation == generation:
+                _set(key, real_val, ttl)
         return real_val
 
-    return None
-
 
 def memory_cache_get(key: CacheKey, tp: type[T]) -> T | None:
     return _memory_caching(key, tp)
@@ -90,15 +292,41 @@ def memory_cache_get_set(
     return v
 
 
+def _set(key: CacheKey, val: T, ttl: timedelta) -> None:
+    now = time.time()
+    _cache.set(
+        key,
+        {
+            "val": val,
+            "expires": now + ttl.total_seconds(),
+            "created": now,
+            "checked": now,
+        },
+    )
+
+
 def memory_cache_set(key: CacheKey, val: T, ttl: timedelta) -> None:
-    _cache[key] = {
-        "val": val,
-        "expires": time.time() + ttl.total_seconds(),
-        "created": time.time(),
-    }
+    _set(key, val, ttl)
+
+
+def _invalidate_locally(key: CacheKey) -> None:
+    with _misses_lock:
+        if miss := _misses.get(key):
+            miss.generation += 1
+        _cache.pop(key)
+    metrics.MEMORY_CACHE_EVENTS.labels(
+        namespace=_namespace(key), event="invalidation"
+    ).inc()
 
 
 def memory_cache_invalidate(key: CacheKey) -> None:
+    """
+    Invalidates the key in current process right away, in other processes
+    within MAX_INVALIDATION_STALENESS.
+    """
+    _invalidate_locally(key)
+
+    # Used by processes which don't listen for invalidations at the moment.
     # Redis TTL should be enough for all processes to read this value and invalidate it's local caches.
     # I expect 1 day is enough.
     _redis_client.set(
@@ -106,6 +334,104 @@ def memory_cache_invalidate(key: CacheKey) -> None:
         str(time.time()),
         timeout=timedelta(days=1).total_seconds(),
     )
+    _listener.publish(key)
+
+
+class _InvalidationsListenerThread(threading.Thread):
+    """
+    Receives invalidations published by other processes via Redis pub/sub.
+
+    Pub/sub doesn't keep messages, so values created before the current
+    subscription are still checked against Redis on each hit.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(daemon=True)
+        self.origin = uuid.uuid4().hex
+        self.subscribed_at = float("inf")
+        self.heartbeat = 0.0
+
+    def run(self) -> None:
+        logger.info("Starting cache invalidations listener thread")
+        while True:
+            self._listen()
+
+    def is_healthy(self) -> bool:
+        return time.time() - self.heartbeat < MAX_INVALIDATION_STALENESS.total_seconds()
+
+    def _listen(self) -> None:
+        self.subscribed_at = float("inf")
+        try:
+            pubsub = _redis_cache.client.get_client(write=False).pubsub()
+            pubsub.subscribe(_invalidations_channel())
+            while True:
+                message = pubsub.get_message(timeout=1.0)
+                self.heartbeat = time.time()
+                if not message:
+                    continue
+                if message["type"] == "subscribe":
+                    self.subscribed_at = time.time()
+                elif message["type"] == "message":
+                    self._on_message(message["data"])
+        except Exception:
+            logger.exception("Error in cache invalidations listener thread")
+            self.heartbeat = 0.0
+            time.sleep(1)
+
+    def _on_message(self, data: bytes) -> None:
+        payload = json.loads(data)
+        if payload["origin"] == self.origin:
+            return
+
+        key = CacheKey(payload["key"])
+        _invalidate_locally(key)
+        metrics.MEMORY_CACHE_INVALIDATION_STALENESS.labels(
+            namespace=_namespace(key)
+        ).observe(max(time.time() - payload["ts"], 0))
+
+
+class _InvalidationsListener:
+    """
+    Starts listener thread lazily, once per process, so it's also started
+    in processes forked after import.
+    """
+
+    def __init__(self) -> None:
+        self._pid: int | None = None
+        self._thread: _InvalidationsListenerThread | None = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self) -> _InvalidationsListenerThread:
+        if self._thread is None or self._pid != os.getpid():
+            with self._lock:
+                if self._thread is None or self._pid != os.getpid():
+                    self._thread = _InvalidationsListenerThread()
+                    self._thread.start()
+                    self._pid = os.getpid()
+        return self._thread
+
+    @property
+    def subscribed_at(self) -> float:
+        return self.ensure_started().subscribed_at
+
+    def is_healthy(self) -> bool:
+        return self.ensure_started().is_healthy()
+
+    def publish(self, key: CacheKey) -> None:
+        payload = {
+            "key": key,
+            "origin": self.ensure_started().origin,
+            "ts": time.time(),
+        }
+        client = _redis_cache.client.get_client(write=True)
+        client.publish(_invalidations_channel(), json.dumps(payload))
+
+
+def _invalidations_channel() -> str:
+    return ty.cast(str, _redis_cache.make_key("cache:invalidations"))
+
+
+_listener = _InvalidationsListener()
 
 
 class _CleanupCacheThread(threading.Thread):
@@ -119,17 +445,9 @@ class _CleanupCacheThread(threading.Thread):
 
     def _one_cycle(self, sleep: bool = True) -> None:
         try:
-            for key, value in list(_cache.items()):
-                if value["expires"] < time.time():
-                    _cache.pop(key, None)
-
-            if len(_cache) > 10000:
-                logger.error(
-                    "Too big cache!",
-                    extra={
-                        "keys_sample": list(_cache.keys())[:100],
-                    },
-                )
+            # Expired values are also dropped on access, this frees memory
+            # of values which are not accessed anymore.
+            _cache.pop_expired()
         except Exception:
             logger.exception("Error in cache cleanup thread")  # pragma: no cover
         finally:
@@ -155,18 +473,56 @@ def _redis_caching(
     if on_miss:
         assert ttl
 
-    if val := _redis_cache.get(key):
+    if (val := _redis_cache.get(key)) is not None:
         return val
 
     if on_miss:
         assert ttl
         real_val = on_miss()
-        memory_cache_set(key, real_val, ttl)
+        redis_cache_set(key, real_val, ttl)
         return real_val
 
     return None
 
 
+def redis_set_add(key: CacheKey, members: ty.Iterable[int | str]) -> None:
+    if members := list(members):
+        client = _redis_cache.client.get_client(write=True)
+        client.sadd(_redis_cache.make_key(key), *members)
+
+
+# Temporary set of redis_set_replace expires if writer dies while filling it
+SET_REPLACE_TMP_KEY_TTL = timedelta(hours=1)
+
+
+def redis_set_replace(key: CacheKey, members: ty.Iterable[int | str]) -> None:
+    """Atomically replaces the whole set, readers never see it partially filled."""
+    client = _redis_cache.client.get_client(write=True)
+    redis_key = _redis_cache.make_key(key)
+    tmp_key = f"{redis_key}:tmp:{uuid.uuid4().hex}"
+    members = list(members)
+    chunk_size = 10000
+    for start in range(0, len(members), chunk_size):
+        end = start + chunk_size
+        pipe = client.pipeline(transaction=False)
+        pipe.sadd(tmp_key, *members[start:end])
+        pipe.expire(tmp_key, SET_REPLACE_TMP_KEY_TTL)
+        pipe.execute()
+    if members:
+        # RENAME keeps TTL of the temporary key
+        pipe = client.pipeline(transaction=True)
+        pipe.rename(tmp_key, redis_key)
+        pipe.persist(redis_key)
+        pipe.execute()
+    else:
+        client.delete(redis_key)
+
+
+def redis_set_members(key: CacheKey) -> set[bytes]:
+    client = _redis_cache.client.get_client(write=False)
+    return ty.cast(set[bytes], client.smembers(_redis_cache.make_key(key)))
+
+
 def redis_cache_set(key: CacheKey, val: T, ttl: timedelta) -> None:
     _redis_cache.set(key, val, timeout=ttl.total_seconds())
 
@@ -175,6 +531,53 @@ def redis_cache_get(key: CacheKey, tp: type[T]) -> T | None:
     return _redis_caching(key, tp)
 
 
+def redis_cache_delete(key: CacheKey) -> None:
+    _redis_cache.delete(key)
+
+
+def redis_lock(
+    key: CacheKey, timeout: timedelta, blocking_timeout: timedelta
+) -> ty.ContextManager[ty.Any]:
+    """
+    Lock shared between processes. Raises redis.exceptions.LockError
+    if not acquired in blocking_timeout.
+    """
+    return _redis_cache.lock(
+        key,
+        timeout=timeout.total_seconds(),
+        blocking_timeout=blocking_timeout.total_seconds(),
+    )
+
+
+@contextlib.contextmanager
+def redis_semaphore(key: CacheKey, limit: int, timeout: timedelta) -> ty.Iterator[None]:
+    """
+    Semaphore shared between processes, held by at most limit holders.
+    Raises redis.exceptions.LockError if all slots are taken. Slot of
+    holder died without release is freed after timeout.
+    """
+    client = _redis_cache.client.get_client(write=True)
+    redis_key = _redis_cache.make_key(key)
+    token = uuid.uuid4().hex
+    now = time.time()
+
+    pipe = client.pipeline(transaction=True)
+    pipe.zremrangebyscore(redis_key, "-inf", now - timeout.total_seconds())
+    pipe.zadd(redis_key, {token: now})
+    pipe.zcard(redis_key)
+    pipe.expire(redis_key, timeout)
+    _, _, holders, _ = pipe.execute()
+    # Concurrent acquirers may all fail, but limit is never exceeded
+    if holders > limit:
+        client.zrem(redis_key, token)
+        raise LockError(f"All {limit} slots of {key} are taken")
+
+    try:
+        yield
+    finally:
+        client.zrem(redis_key, token)
+
+
 def redis_cache_get_set(
     *,
     key: CacheKey,
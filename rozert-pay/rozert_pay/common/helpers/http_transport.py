@@ -0,0 +1,60 @@
+"""
+Process-wide pool of HTTP connections to payment systems.
+
+Sessions are still created per transaction (they carry logging hooks and
+cookies), but all of them are mounted with one adapter of the process.
+Its urllib3 pool manager keeps a pool of keep-alive connections per host,
+so TCP/TLS connections are reused between transactions.
+"""
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Number of hosts with pooled connections
+POOL_CONNECTIONS = 50
+# Kept-alive connections per host, should be not less than worker threads
+POOL_MAXSIZE = 32
+# Connect timeout, read timeout is taken from PaymentSystem.client_request_timeout
+CONNECT_TIMEOUT = 5.0
+
+_adapters: dict[int, HTTPAdapter] = {}
+_adapters_lock = threading.Lock()
+
+
+def get_adapter() -> HTTPAdapter:
+    # Connections must not be shared with forked processes
+    pid = os.getpid()
+    with _adapters_lock:
+        if (adapter := _adapters.get(pid)) is None:
+            _adapters.clear()
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS,
+                pool_maxsize=POOL_MAXSIZE,
+            )
+            _adapters[pid] = adapter
+        return adapter
+
+
+def get_timeout(read_timeout: float) -> tuple[float, float]:
+    return min(CONNECT_TIMEOUT, read_timeout), read_timeout
+
+
+class PooledSession(requests.Session):
+    """
+    Session using connections pool of the process.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        adapter = get_adapter()
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def close(self) -> None:
+        # Shared adapter is not closed with session
+        shared_adapter = get_adapter()
+        for adapter in self.adapters.values():
+            if adapter is not shared_adapter:
+                adapter.close()
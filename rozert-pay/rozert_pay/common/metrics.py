@@ -1,9 +1,11 @@
 import logging
 import os
 import pathlib
-import threading
+import re
 import time
+from collections import deque
 from contextlib import contextmanager
+from dataclasses import dataclass
 from functools import wraps
 from typing import Callable, Generator, Iterable, TypeVar
 
@@ -21,8 +23,7 @@ from prometheus_summary import Summary  # type: ignore[import-untyped]
 
 logger = logging.getLogger(__name__)
 
-# Thread-local storage для хранения счетчиков SQL запросов
-_sql_query_counters = threading.local()
+SLOW_SQL_QUERIES_BUFFER_SIZE = 100
 
 
 class EnvLabelRegistry(CollectorRegistry):
@@ -92,6 +93,23 @@ HISTOGRAM_BUCKETS_20 = [
     60.0,
 ]
 
+SQL_DURATION_BUCKETS = [
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+]
+
 REQUESTS = Counter(
     "rozert_http_requests_total",
     "Total HTTP Requests",
@@ -113,6 +131,42 @@ HTTP_SQL_QUERIES = Histogram(
     buckets=[0, 1, 2, 3, 5, 10, 15, 20, 30, 50, 100, 200, 500, 1000],
 )
 
+HTTP_SQL_DURATION = Histogram(
+    "rozert_http_sql_duration_seconds",
+    "Total duration of SQL queries per HTTP request",
+    ["method", "endpoint", "http_status"],
+    registry=prometheus_registry,
+    buckets=SQL_DURATION_BUCKETS,
+)
+
+DB_CONNECTIONS_OPENED = Counter(
+    "rozert_db_connections_opened_total",
+    "Number of opened DB connections. Compare with requests/tasks count "
+    "to see how often persistent connections are reused",
+    ["alias"],
+    registry=prometheus_registry,
+)
+DB_CONNECTIONS_OPEN = Gauge(
+    "rozert_db_connections_open",
+    "Number of open DB connections",
+    ["alias"],
+    registry=prometheus_registry,
+    multiprocess_mode="livesum",
+)
+DB_CONNECTION_SETUP_DURATION = Histogram(
+    "rozert_db_connection_setup_duration_seconds",
+    "Time spent by request/task waiting for new DB connection",
+    ["alias"],
+    registry=prometheus_registry,
+    buckets=SQL_DURATION_BUCKETS,
+)
+DB_CONNECTION_HEALTH_CHECK_FAILURES = Counter(
+    "rozert_db_connection_health_check_failures_total",
+    "Number of persistent DB connections closed by failed health check",
+    ["alias"],
+    registry=prometheus_registry,
+)
+
 TASKS_COUNT = Counter(
     "rozert_tasks_count",
     "Total tasks count",
@@ -149,6 +203,19 @@ TASK_SQL_QUERIES = Histogram(
     buckets=[0, 1, 2, 3, 5, 10, 15, 20, 30, 50, 100, 200, 500, 1000],
 )
 
+TASK_SQL_DURATION = Histogram(
+    "rozert_task_sql_duration_seconds",
+    "Total duration of SQL queries per Celery task",
+    [
+        "task_name",
+        "queue",
+        "status",
+        "exception",
+    ],
+    registry=prometheus_registry,
+    buckets=SQL_DURATION_BUCKETS,
+)
+
 DEPOSIT_COUNT = Counter(
     "rozert_deposit_count",
     "Total deposit count",
@@ -159,6 +226,13 @@ DEPOSIT_COUNT = Counter(
     registry=prometheus_registry,
 )
 
+EXPIRED_DEPOSITS_COUNT = Counter(
+    "rozert_expired_deposits_total",
+    "Deposits failed by deposit_allowed_ttl_seconds",
+    ["system"],
+    registry=prometheus_registry,
+)
+
 INCOMING_CALLBACK_COUNT = Counter(
     "rozert_callback_count",
     "Total callback count",
@@ -247,6 +321,54 @@ EXTERNAL_API_REQUESTS_DURATION = Histogram(
     buckets=HISTOGRAM_BUCKETS_20,
 )
 
+LIMITS_CHECK_SQL_QUERIES = Histogram(
+    "rozert_limits_check_sql_queries_total",
+    "Number of SQL queries per transaction limits check",
+    registry=prometheus_registry,
+    buckets=[0, 1, 2, 3, 5, 10, 15, 20, 30, 50, 100, 200],
+)
+LIMITS_PLAN_QUERIES = Histogram(
+    "rozert_limits_plan_queries_total",
+    "Number of aggregate queries executed by limits check plan",
+    registry=prometheus_registry,
+    buckets=[0, 1, 2, 3, 5, 10],
+)
+LIMITS_PLAN_WINDOWS = Histogram(
+    "rozert_limits_plan_windows_total",
+    "Number of distinct aggregate windows in limits check plan",
+    ["kind"],
+    registry=prometheus_registry,
+    buckets=[0, 1, 2, 3, 5, 10, 15, 20, 30, 50],
+)
+
+MEMORY_CACHE_EVENTS = Counter(
+    "rozert_memory_cache_events_total",
+    "In-memory cache hits, misses, invalidations and evictions",
+    ["namespace", "event"],
+    registry=prometheus_registry,
+)
+MEMORY_CACHE_SIZE_BYTES = Gauge(
+    "rozert_memory_cache_size_bytes",
+    "Approximate size of in-memory cache values",
+    ["namespace"],
+    registry=prometheus_registry,
+)
+MEMORY_CACHE_INVALIDATION_STALENESS = Histogram(
+    "rozert_memory_cache_invalidation_staleness_seconds",
+    "Delay between publishing an invalidation and receiving it by other process",
+    ["namespace"],
+    registry=prometheus_registry,
+    buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
+)
+
+TRANSACTION_CHANGES_HORIZON_LAG = Gauge(
+    "rozert_transaction_changes_horizon_lag_seconds",
+    "How long ago the oldest open DB transaction started. Transactions changes "
+    "feed doesn't return changes made after it",
+    registry=prometheus_registry,
+    multiprocess_mode="livemax",
+)
+
 _FUNCTION_DURATION = Histogram(
     "rozert_functions_duration",
     "Duration of different functions",
@@ -307,31 +429,84 @@ class track_duration:
         del self._start
 
 
-@contextmanager
-def track_sql_queries() -> Generator[None, None, None]:
+@dataclass(slots=True)
+class SqlQueriesStats:
+    count: int = 0
+    duration: float = 0.0
+    rows: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class SlowSqlQuery:
+    fingerprint: str
+    duration: float
+    rows: int
+    created_at: float
+
+
+# Последние медленные запросы процесса, если задан SLOW_SQL_QUERY_SECONDS
+_slow_sql_queries: deque[SlowSqlQuery] = deque(maxlen=SLOW_SQL_QUERIES_BUFFER_SIZE)
+
+_SQL_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SQL_IN_LIST_RE = re.compile(r"\bIN \((?:\s*(?:%s|\?),?)+\)", re.IGNORECASE)
+_SQL_SPACES_RE = re.compile(r"\s+")
+
+
+def sql_fingerprint(sql: str) -> str:
     """
-    Контекстный менеджер для отслеживания количества SQL запросов.
-    Использует thread-local storage для хранения счетчика.
-    Поддерживает как DEBUG режим (через connection.queries), так и production (через сигналы).
+    Нормализует SQL: литералы заменяются на ?, списки IN (...) схлопываются,
+    так что одинаковые запросы с разными параметрами имеют один отпечаток.
     """
-    # Инициализируем счетчик в thread-local storage
-    _sql_query_counters.count = 0
+    sql = _SQL_STRING_RE.sub("?", sql)
+    sql = _SQL_NUMBER_RE.sub("?", sql.replace("%s", "?"))
+    sql = _SQL_IN_LIST_RE.sub("IN (...)", sql)
+    return _SQL_SPACES_RE.sub(" ", sql).strip()
+
+
+def get_slow_sql_queries() -> list[SlowSqlQuery]:
+    return list(_slow_sql_queries)
+
 
-    # Пробуем использовать connection.queries (работает только в DEBUG режиме)
-    force_debug_cursor_old = connection.force_debug_cursor
-    connection.force_debug_cursor = True
-    initial_queries_count = len(connection.queries)
+class _SqlQueriesCounter:
+    __slots__ = ("stats", "slow_threshold")
 
-    try:
-        yield
-    finally:
-        final_queries_count = len(connection.queries)
-        _sql_query_counters.count = final_queries_count - initial_queries_count
-        connection.force_debug_cursor = force_debug_cursor_old
+    def __init__(self, stats: SqlQueriesStats, slow_threshold: float | None):
+        self.stats = stats
+        self.slow_threshold = slow_threshold
 
+    def __call__(self, execute, sql, params, many, context):  # type: ignore[no-untyped-def]
+        start = time.perf_counter()
+        try:
+            result = execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.stats.count += 1
+            self.stats.duration += duration
+
+        rows = max(context["cursor"].rowcount, 0)
+        self.stats.rows += rows
+        if self.slow_threshold is not None and duration >= self.slow_threshold:
+            _slow_sql_queries.append(
+                SlowSqlQuery(
+                    fingerprint=sql_fingerprint(sql),
+                    duration=duration,
+                    rows=rows,
+                    created_at=time.time(),
+                )
+            )
+        return result
 
-def get_sql_queries_count() -> int:
+
+@contextmanager
+def track_sql_queries() -> Generator[SqlQueriesStats, None, None]:
     """
-    Возвращает количество SQL запросов, выполненных в текущем контексте.
+    Контекстный менеджер для подсчета SQL запросов, их суммарного времени
+    и количества строк. Использует connection.execute_wrapper, поэтому
+    не сохраняет текст запросов в connection.queries. Вложенные контексты
+    считают запросы независимо.
     """
-    return getattr(_sql_query_counters, "count", 0)
+    stats = SqlQueriesStats()
+    counter = _SqlQueriesCounter(stats, settings.SLOW_SQL_QUERY_SECONDS)
+    with connection.execute_wrapper(counter):
+        yield stats
@@ -49,7 +49,7 @@ class PrometheusMetricsMiddleware:
         start_time = time.time()
 
         # Отслеживаем SQL запросы
-        with metrics.track_sql_queries():
+        with metrics.track_sql_queries() as sql_queries:
             response = self.get_response(request)
 
         # skip if static file
@@ -57,7 +57,6 @@ class PrometheusMetricsMiddleware:
             return response
 
         duration = time.time() - start_time
-        sql_queries_count = metrics.get_sql_queries_count()
 
         # use request pattern instead of path
         url = request.path
@@ -80,6 +79,11 @@ class PrometheusMetricsMiddleware:
             method=request.method,
             endpoint=url,
             http_status=response.status_code,
-        ).observe(sql_queries_count)
+        ).observe(sql_queries.count)
+        metrics.HTTP_SQL_DURATION.labels(
+            method=request.method,
+            endpoint=url,
+            http_status=response.status_code,
+        ).observe(sql_queries.duration)
 
         return response
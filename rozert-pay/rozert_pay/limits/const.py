@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 from django.conf import settings
 from django.db.models import TextChoices
 
@@ -68,6 +70,12 @@ else:
     SLACK_PS_STATUS_CHANNEL = "#ps-status-dev"
 
 
+# When active, period limits read aggregates from LimitCounterBucket
+LIMIT_COUNTERS_SWITCH = "limits_use_counter_buckets"
+# Reconciliation rebuilds buckets covering the longest limit period
+LIMIT_COUNTERS_RECONCILIATION_WINDOW = timedelta(hours=25)
+
+
 REGULAR_LIMIT_COLOR = "#b8860b"
 CRITICAL_LIMIT_COLOR = "#dc3545"
 
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.3 on 2026-10-16 20:19
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("limits", "0006_money_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LimitCounterBucket",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "scope",
+                    models.CharField(
+                        choices=[
+                            ("customer", "Customer"),
+                            ("merchant", "Merchant"),
+                            ("wallet", "Merchant Wallet"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("scope_id", models.BigIntegerField()),
+                ("bucket_start", models.DateTimeField()),
+                ("transaction_type", models.CharField(max_length=20)),
+                ("success_count", models.IntegerField(default=0)),
+                ("failed_count", models.IntegerField(default=0)),
+                (
+                    "success_amount",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0"), max_digits=20
+                    ),
+                ),
+                (
+                    "failed_amount",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0"), max_digits=20
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "scope",
+                            "scope_id",
+                            "bucket_start",
+                            "transaction_type",
+                        ),
+                        name="unique_limit_counter_bucket",
+                    )
+                ],
+            },
+        ),
+    ]
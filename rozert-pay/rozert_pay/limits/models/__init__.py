@@ -1,5 +1,6 @@
 from ..const import LimitPeriod  # noqa
 from .common import LimitCategory  # noqa
+from .counters import CounterScope, LimitCounterBucket  # noqa
 from .customer_limits import (  # noqa
     BusinessCustomerLimit,
     CustomerLimit,
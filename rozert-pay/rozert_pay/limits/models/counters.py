@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+from django.db import models
+from rozert_pay.common.models import BaseDjangoModel
+
+
+class CounterScope(models.TextChoices):
+    CUSTOMER = "customer", "Customer"
+    # NOTE: values are the same as in MerchantLimitScope
+    MERCHANT = "merchant", "Merchant"
+    WALLET = "wallet", "Merchant Wallet"
+
+
+class LimitCounterBucket(BaseDjangoModel):
+    """
+    Per-minute aggregate of finalized transactions for one scope.
+
+    Buckets are keyed by transaction creation minute, the same way limits
+    select transactions for the period. Updated incrementally on transaction
+    status changes and rebuilt by the reconciliation task.
+    """
+
+    scope = models.CharField(max_length=20, choices=CounterScope.choices)
+    scope_id = models.BigIntegerField()
+    bucket_start = models.DateTimeField()
+    transaction_type = models.CharField(max_length=20)
+
+    success_count = models.IntegerField(default=0)
+    failed_count = models.IntegerField(default=0)
+    success_amount = models.DecimalField(
+        max_digits=20, decimal_places=2, default=Decimal(0)
+    )
+    failed_amount = models.DecimalField(
+        max_digits=20, decimal_places=2, default=Decimal(0)
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scope", "scope_id", "bucket_start", "transaction_type"],
+                name="unique_limit_counter_bucket",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return (
+            f"LimitCounterBucket({self.scope}={self.scope_id}, "
+            f"{self.bucket_start:%Y-%m-%d %H:%M}, {self.transaction_type})"
+        )
@@ -0,0 +1,472 @@
+import datetime
+import functools
+import logging
+import operator
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, Trunc
+from django.utils import timezone
+from rozert_pay.common import const
+from rozert_pay.common.metrics import track_duration
+from rozert_pay.limits import const as limit_const
+from rozert_pay.limits.models import CounterScope, LimitCounterBucket
+from rozert_pay.payment.models import PaymentTransaction
+from waffle import switch_is_active
+
+logger = logging.getLogger(__name__)
+
+_FINAL_STATUSES = (
+    const.TransactionStatus.SUCCESS,
+    const.TransactionStatus.FAILED,
+)
+
+_SCOPE_TO_TRANSACTION_FIELD: dict[str, str] = {
+    CounterScope.CUSTOMER: "customer_id",
+    CounterScope.MERCHANT: "merchant_id",
+    CounterScope.WALLET: "merchant_wallet_id",
+}
+
+_ONE_MINUTE = datetime.timedelta(minutes=1)
+
+
+@dataclass
+class TransactionTypeStats:
+    success_count: int = 0
+    failed_count: int = 0
+    success_amount: Decimal = Decimal(0)
+    failed_amount: Decimal = Decimal(0)
+
+    @property
+    def count(self) -> int:
+        return self.success_count + self.failed_count
+
+    @property
+    def amount(self) -> Decimal:
+        return self.success_amount + self.failed_amount
+
+    def add(self, other: "TransactionTypeStats") -> None:
+        self.success_count += other.success_count
+        self.failed_count += other.failed_count
+        self.success_amount += other.success_amount
+        self.failed_amount += other.failed_amount
+
+
+@dataclass
+class PeriodStats:
+    """Successful and failed transactions of a scope for a period, by type."""
+
+    by_type: dict[str, TransactionTypeStats] = field(default_factory=dict)
+
+    def for_type(self, transaction_type: str) -> TransactionTypeStats:
+        return self.by_type.get(transaction_type) or TransactionTypeStats()
+
+    @property
+    def total(self) -> TransactionTypeStats:
+        result = TransactionTypeStats()
+        for stats in self.by_type.values():
+            result.add(stats)
+        return result
+
+    def add(self, transaction_type: str, stats: TransactionTypeStats) -> None:
+        self.by_type.setdefault(transaction_type, TransactionTypeStats()).add(stats)
+
+
+def is_counters_enabled() -> bool:
+    return switch_is_active(limit_const.LIMIT_COUNTERS_SWITCH)
+
+
+def _floor_minute(dt: datetime.datetime) -> datetime.datetime:
+    return dt.astimezone(datetime.timezone.utc).replace(second=0, microsecond=0)
+
+
+def _ceil_minute(dt: datetime.datetime) -> datetime.datetime:
+    floored = _floor_minute(dt)
+    return floored if floored == dt else floored + _ONE_MINUTE
+
+
+def _scope_ids(trx: PaymentTransaction) -> list[tuple[str, int]]:
+    # Same columns as _SCOPE_TO_TRANSACTION_FIELD, so tracked counters match
+    # rebuilt ones. They are set on save, before status is tracked.
+    assert trx.merchant_id and trx.merchant_wallet_id
+    # Fixed order of rows keeps concurrent upserts from deadlocking
+    result: list[tuple[str, int]] = []
+    if trx.customer_id:
+        result.append((CounterScope.CUSTOMER, trx.customer_id))
+    result.append((CounterScope.MERCHANT, trx.merchant_id))
+    result.append((CounterScope.WALLET, trx.merchant_wallet_id))
+    return result
+
+
+@track_duration("limits.counters.track_status_change")
+def track_status_change(
+    trx: PaymentTransaction,
+    previous_status: str,
+) -> None:
+    """
+    Moves transaction between counters after its status was changed.
+
+    Must be called inside the same DB transaction as the status change.
+    """
+    track_status_changes([(trx, previous_status)])
+
+
+@track_duration("limits.counters.track_status_changes")
+def track_status_changes(
+    changes: Iterable[tuple[PaymentTransaction, str]],
+) -> None:
+    """
+    Batch version of track_status_change: changes of all transactions
+    are applied with one upsert.
+    """
+    now = timezone.now()
+    deltas: dict[tuple[str, int, datetime.datetime, str], list[Decimal]] = {}
+    for trx, previous_status in changes:
+        if previous_status == trx.status:
+            continue
+
+        success_delta = int(trx.status == const.TransactionStatus.SUCCESS) - int(
+            previous_status == const.TransactionStatus.SUCCESS
+        )
+        failed_delta = int(trx.status == const.TransactionStatus.FAILED) - int(
+            previous_status == const.TransactionStatus.FAILED
+        )
+        if not success_delta and not failed_delta:
+            continue
+
+        bucket_start = _floor_minute(trx.created_at)
+        for scope, scope_id in _scope_ids(trx):
+            row = deltas.setdefault(
+                (scope, scope_id, bucket_start, trx.type),
+                [Decimal(0), Decimal(0), Decimal(0), Decimal(0)],
+            )
+            row[0] += success_delta
+            row[1] += failed_delta
+            row[2] += success_delta * trx.amount
+            row[3] += failed_delta * trx.amount
+
+    if not deltas:
+        return
+
+    # Fixed order of rows keeps concurrent upserts from deadlocking
+    rows = [
+        (
+            scope,
+            scope_id,
+            bucket_start,
+            transaction_type,
+            int(success_count),
+            int(failed_count),
+            success_amount,
+            failed_amount,
+            now,
+            now,
+        )
+        for (scope, scope_id, bucket_start, transaction_type), (
+            success_count,
+            failed_count,
+            success_amount,
+            failed_amount,
+        ) in sorted(deltas.items())
+    ]
+
+    table = LimitCounterBucket._meta.db_table
+    values_sql = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(rows))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (
+                scope, scope_id, bucket_start, transaction_type,
+                success_count, failed_count, success_amount, failed_amount,
+                created_at, updated_at
+            )
+            VALUES {values_sql}
+            ON CONFLICT (scope, scope_id, bucket_start, transaction_type)
+            DO UPDATE SET
+                success_count = {table}.success_count + EXCLUDED.success_count,
+                failed_count = {table}.failed_count + EXCLUDED.failed_count,
+                success_amount = {table}.success_amount + EXCLUDED.success_amount,
+                failed_amount = {table}.failed_amount + EXCLUDED.failed_amount,
+                updated_at = EXCLUDED.updated_at
+            """,
+            [value for row in rows for value in row],
+        )
+
+
+@dataclass(frozen=True)
+class StatsWindow:
+    """Finalized transactions of a scope created in [start, end]."""
+
+    scope: str
+    scope_id: int
+    start: datetime.datetime
+    end: datetime.datetime
+
+
+@dataclass(frozen=True)
+class OperationsWindow:
+    """Transactions of a scope in any status created in (start, end]."""
+
+    scope: str
+    scope_id: int
+    start: datetime.datetime
+    end: datetime.datetime
+
+
+@dataclass
+class BatchStats:
+    periods: dict[StatsWindow, PeriodStats] = field(default_factory=dict)
+    operations: dict[OperationsWindow, int] = field(default_factory=dict)
+    queries_count: int = 0
+
+
+def _scope_q(scope: str, scope_id: int) -> Q:
+    return Q(**{_SCOPE_TO_TRANSACTION_FIELD[scope]: scope_id})
+
+
+def _add_stats_from_transactions(
+    period_filters: dict[StatsWindow, Q],
+    operations_filters: dict[OperationsWindow, Q],
+    result: BatchStats,
+) -> None:
+    aggregates: dict[str, Count | Sum] = {}
+    for i, q in enumerate(period_filters.values()):
+        success_q = q & Q(status=const.TransactionStatus.SUCCESS)
+        failed_q = q & Q(status=const.TransactionStatus.FAILED)
+        aggregates[f"p{i}_success_count"] = Count("id", filter=success_q)
+        aggregates[f"p{i}_failed_count"] = Count("id", filter=failed_q)
+        aggregates[f"p{i}_success_amount"] = Sum("amount", filter=success_q)
+        aggregates[f"p{i}_failed_amount"] = Sum("amount", filter=failed_q)
+    for i, q in enumerate(operations_filters.values()):
+        aggregates[f"o{i}_count"] = Count("id", filter=q)
+
+    rows = (
+        PaymentTransaction.objects.filter(
+            functools.reduce(
+                operator.or_,
+                [*period_filters.values(), *operations_filters.values()],
+            )
+        )
+        .values("type")
+        .annotate(**aggregates)
+        .order_by()
+    )
+    for row in rows:
+        for i, period_window in enumerate(period_filters):
+            result.periods[period_window].add(
+                row["type"],
+                TransactionTypeStats(
+                    success_count=row[f"p{i}_success_count"],
+                    failed_count=row[f"p{i}_failed_count"],
+                    success_amount=row[f"p{i}_success_amount"] or Decimal(0),
+                    failed_amount=row[f"p{i}_failed_amount"] or Decimal(0),
+                ),
+            )
+        for i, operations_window in enumerate(operations_filters):
+            result.operations[operations_window] += row[f"o{i}_count"]
+    result.queries_count += 1
+
+
+def _add_stats_from_buckets(
+    bucket_filters: dict[StatsWindow, Q],
+    result: BatchStats,
+) -> None:
+    aggregates: dict[str, Coalesce | Sum] = {}
+    for i, q in enumerate(bucket_filters.values()):
+        aggregates[f"p{i}_success_count"] = Coalesce(Sum("success_count", filter=q), 0)
+        aggregates[f"p{i}_failed_count"] = Coalesce(Sum("failed_count", filter=q), 0)
+        aggregates[f"p{i}_success_amount"] = Sum("success_amount", filter=q)
+        aggregates[f"p{i}_failed_amount"] = Sum("failed_amount", filter=q)
+
+    rows = (
+        LimitCounterBucket.objects.filter(
+            functools.reduce(operator.or_, bucket_filters.values())
+        )
+        .values("transaction_type")
+        .annotate(**aggregates)
+        .order_by()
+    )
+    for row in rows:
+        for i, window in enumerate(bucket_filters):
+            result.periods[window].add(
+                row["transaction_type"],
+                TransactionTypeStats(
+                    success_count=row[f"p{i}_success_count"],
+                    failed_count=row[f"p{i}_failed_count"],
+                    success_amount=row[f"p{i}_success_amount"] or Decimal(0),
+                    failed_amount=row[f"p{i}_failed_amount"] or Decimal(0),
+                ),
+            )
+    result.queries_count += 1
+
+
+@track_duration("limits.counters.get_batch_stats")
+def get_batch_stats(
+    period_windows: Iterable[StatsWindow] = (),
+    operations_windows: Iterable[OperationsWindow] = (),
+) -> BatchStats:
+    """
+    Returns stats for all windows using at most two queries.
+
+    Every window is an aggregate with its own FILTER clause, so the number
+    of queries does not depend on the number of windows. If counters are
+    enabled, whole minutes of periods are read from buckets and only the
+    partial edge minutes from PaymentTransaction.
+    """
+    result = BatchStats(
+        periods={window: PeriodStats() for window in period_windows},
+        operations={window: 0 for window in operations_windows},
+    )
+    use_counters = bool(result.periods) and is_counters_enabled()
+
+    bucket_filters: dict[StatsWindow, Q] = {}
+    period_filters: dict[StatsWindow, Q] = {}
+    for period_window in result.periods:
+        scope_q = _scope_q(period_window.scope, period_window.scope_id) & Q(
+            status__in=_FINAL_STATUSES
+        )
+        full_minutes_start = _ceil_minute(period_window.start)
+        full_minutes_end = _floor_minute(period_window.end)
+
+        if not use_counters or full_minutes_start >= full_minutes_end:
+            period_filters[period_window] = scope_q & Q(
+                created_at__gte=period_window.start,
+                created_at__lte=period_window.end,
+            )
+            continue
+
+        bucket_filters[period_window] = Q(
+            scope=period_window.scope,
+            scope_id=period_window.scope_id,
+            bucket_start__gte=full_minutes_start,
+            bucket_start__lt=full_minutes_end,
+        )
+        period_filters[period_window] = scope_q & (
+            Q(
+                created_at__gte=period_window.start,
+                created_at__lt=full_minutes_start,
+            )
+            | Q(
+                created_at__gte=full_minutes_end,
+                created_at__lte=period_window.end,
+            )
+        )
+
+    operations_filters: dict[OperationsWindow, Q] = {
+        operations_window: _scope_q(operations_window.scope, operations_window.scope_id)
+        & Q(
+            created_at__gt=operations_window.start,
+            created_at__lte=operations_window.end,
+        )
+        for operations_window in result.operations
+    }
+
+    if bucket_filters:
+        _add_stats_from_buckets(bucket_filters, result)
+    if period_filters or operations_filters:
+        _add_stats_from_transactions(period_filters, operations_filters, result)
+    return result
+
+
+@track_duration("limits.counters.get_period_stats")
+def get_period_stats(
+    *,
+    scope: str,
+    scope_id: int,
+    start: datetime.datetime,
+    end: datetime.datetime,
+) -> PeriodStats:
+    """
+    Returns stats of transactions created in [start, end].
+
+    If counters are disabled, aggregates PaymentTransaction directly.
+    """
+    window = StatsWindow(scope=scope, scope_id=scope_id, start=start, end=end)
+    return get_batch_stats(period_windows=[window]).periods[window]
+
+
+@track_duration("limits.counters.rebuild_counters")
+def rebuild_counters(
+    start: datetime.datetime,
+    end: datetime.datetime,
+) -> int:
+    """
+    Recalculates buckets in [start, end) from PaymentTransaction.
+
+    Returns number of written buckets.
+    """
+    start = _floor_minute(start)
+    end = _ceil_minute(end)
+
+    with transaction.atomic():
+        # Block incremental updates while buckets are replaced
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"LOCK TABLE {LimitCounterBucket._meta.db_table} "
+                "IN SHARE ROW EXCLUSIVE MODE"
+            )
+
+        LimitCounterBucket.objects.filter(
+            bucket_start__gte=start,
+            bucket_start__lt=end,
+        ).delete()
+
+        now = timezone.now()
+        buckets: list[LimitCounterBucket] = []
+        base_qs = PaymentTransaction.objects.filter(
+            status__in=_FINAL_STATUSES,
+            created_at__gte=start,
+            created_at__lt=end,
+        ).annotate(
+            bucket_start=Trunc("created_at", "minute", tzinfo=datetime.timezone.utc)
+        )
+        for scope, transaction_field in _SCOPE_TO_TRANSACTION_FIELD.items():
+            rows = (
+                base_qs.filter(**{f"{transaction_field}__isnull": False})
+                .values(transaction_field, "bucket_start", "type")
+                .annotate(
+                    success_count=Count(
+                        "id", filter=Q(status=const.TransactionStatus.SUCCESS)
+                    ),
+                    failed_count=Count(
+                        "id", filter=Q(status=const.TransactionStatus.FAILED)
+                    ),
+                    success_amount=Sum(
+                        "amount", filter=Q(status=const.TransactionStatus.SUCCESS)
+                    ),
+                    failed_amount=Sum(
+                        "amount", filter=Q(status=const.TransactionStatus.FAILED)
+                    ),
+                )
+                .order_by()
+            )
+            buckets.extend(
+                LimitCounterBucket(
+                    scope=scope,
+                    scope_id=row[transaction_field],
+                    bucket_start=row["bucket_start"],
+                    transaction_type=row["type"],
+                    success_count=row["success_count"],
+                    failed_count=row["failed_count"],
+                    success_amount=row["success_amount"] or Decimal(0),
+                    failed_amount=row["failed_amount"] or Decimal(0),
+                    created_at=now,
+                    updated_at=now,
+                )
+                for row in rows
+            )
+
+        LimitCounterBucket.objects.bulk_create(buckets, batch_size=1000)
+
+    logger.info(
+        "Limit counters rebuilt",
+        extra={
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "buckets_count": len(buckets),
+        },
+    )
+    return len(buckets)
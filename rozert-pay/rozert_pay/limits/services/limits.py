@@ -1,15 +1,15 @@
-import datetime
 import json
 import logging
 import typing as ty
 from collections import defaultdict
-from collections.abc import Sequence
+from collections.abc import Iterable
+from dataclasses import dataclass, field
 from datetime import timedelta
 from decimal import Decimal
-from typing import TYPE_CHECKING, TypedDict, cast
+from typing import TYPE_CHECKING, cast
 
 from django.db import transaction
-from rozert_pay.common import const
+from rozert_pay.common import const, metrics
 from rozert_pay.common.helpers.cache import (
     CacheKey,
     memory_cache_get_set,
@@ -21,9 +21,9 @@ from rozert_pay.limits import models as limit_models
 from rozert_pay.limits.const import (
     SLACK_CHANNEL_NAME_CRITICAL_LIMITS,
     SLACK_CHANNEL_NAME_REGULAR_LIMITS,
-    LimitPeriod,
 )
 from rozert_pay.limits.models import CustomerLimit, LimitCategory, MerchantLimit
+from rozert_pay.limits.services import planner
 from rozert_pay.limits.services.utils import (
     FilteredOutLimit,
     construct_notification_message,
@@ -41,18 +41,6 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
-class CustomerLimitTransactionData(TypedDict):
-    status: str
-    amount: Decimal
-
-
-class MerchantLimitTransactionData(TypedDict):
-    status: str
-    amount: Decimal
-    type: str
-    created_at: datetime.datetime
-
-
 ACTIVE_LIMITS_CACHE_KEY: CacheKey = CacheKey("active_limits")
 CACHE_TIMEOUT = timedelta(minutes=1)  # 1 minute
 
@@ -63,29 +51,105 @@ def invalidate_limits_cache() -> None:
     memory_cache_invalidate(ACTIVE_LIMITS_CACHE_KEY)
 
 
-@track_duration("limits.get_active_limits")
-def get_active_limits() -> (
-    list[limit_models.CustomerLimit | limit_models.MerchantLimit]
-):
-    def _fetch_active_limits() -> (
-        list[limit_models.CustomerLimit | limit_models.MerchantLimit]
-    ):
-        return list(limit_models.CustomerLimit.objects.filter(active=True)) + list(
-            limit_models.MerchantLimit.objects.filter(active=True)
+@dataclass
+class ActiveLimitsIndex:
+    """
+    Active limits keyed by the entity they belong to.
+
+    Risk/global risk conflicts of wallet limits are resolved at build time.
+    """
+
+    customer_limits: dict[int, list[limit_models.CustomerLimit]] = field(
+        default_factory=dict
+    )
+    merchant_limits: dict[int, list[limit_models.MerchantLimit]] = field(
+        default_factory=dict
+    )
+    wallet_limits: dict[int, list[limit_models.MerchantLimit]] = field(
+        default_factory=dict
+    )
+
+    @classmethod
+    def build(
+        cls,
+        limits: Iterable[limit_models.CustomerLimit | limit_models.MerchantLimit],
+    ) -> "ActiveLimitsIndex":
+        index = cls()
+        for limit in limits:
+            if isinstance(limit, limit_models.CustomerLimit):
+                index.customer_limits.setdefault(limit.customer_id, []).append(limit)
+            elif limit.scope == limit_models.MerchantLimitScope.MERCHANT:
+                assert limit.merchant_id is not None
+                index.merchant_limits.setdefault(limit.merchant_id, []).append(limit)
+            elif limit.scope == limit_models.MerchantLimitScope.WALLET:
+                assert limit.wallet_id is not None
+                index.wallet_limits.setdefault(limit.wallet_id, []).append(limit)
+            else:
+                raise ValueError(f"Invalid scope: {limit.scope}")  # pragma: no cover
+
+        for wallet_id, wallet_limits in index.wallet_limits.items():
+            (
+                resolved_limits,
+                risk_global_filtered,
+            ) = _resolve_risk_and_global_risk_limit_for_merchant_conflicts(
+                list(wallet_limits)
+            )
+            index.wallet_limits[wallet_id] = cast(
+                list[limit_models.MerchantLimit], resolved_limits
+            )
+            if risk_global_filtered:  # pragma: no cover
+                logger.info(
+                    "Risk/GlobalRisk conflict resolution filtered out limits",
+                    extra={
+                        "wallet_id": wallet_id,
+                        "filtered_count": len(risk_global_filtered),
+                        "filtered_limits": [
+                            {
+                                "limit_id": limit.id,
+                                "limit_type": limit.limit_type,
+                                "category": limit.category,
+                                "reason": reason,
+                            }
+                            for limit, reason in risk_global_filtered
+                        ],
+                    },
+                )
+        return index
+
+    def get_candidate_limits(
+        self,
+        trx: PaymentTransaction,
+    ) -> list[limit_models.CustomerLimit | limit_models.MerchantLimit]:
+        customer_limits = (
+            self.customer_limits.get(trx.customer_id, []) if trx.customer_id else []
+        )
+        merchant_limits = sorted(
+            [
+                *self.merchant_limits.get(trx.wallet.wallet.merchant_id, []),
+                *self.wallet_limits.get(trx.wallet.wallet_id, []),
+            ],
+            key=lambda limit: limit.id,
         )
+        return [*customer_limits, *merchant_limits]
+
 
-    active_limits = memory_cache_get_set(
+@track_duration("limits.get_active_limits_index")
+def get_active_limits_index() -> ActiveLimitsIndex:
+    def _build_active_limits_index() -> ActiveLimitsIndex:
+        return ActiveLimitsIndex.build(
+            [
+                *limit_models.CustomerLimit.objects.filter(active=True).order_by("id"),
+                *limit_models.MerchantLimit.objects.filter(active=True).order_by("id"),
+            ]
+        )
+
+    index = memory_cache_get_set(
         key=ACTIVE_LIMITS_CACHE_KEY,
-        tp=list,
-        on_miss=_fetch_active_limits,
+        tp=ActiveLimitsIndex,
+        on_miss=_build_active_limits_index,
         ttl=CACHE_TIMEOUT,
     )
-    if active_limits is None:
-        return []
-    return cast(
-        list[limit_models.CustomerLimit | limit_models.MerchantLimit],
-        active_limits,
-    )
+    return index or ActiveLimitsIndex()
 
 
 @track_duration("limits._should_check_customer_limit")
@@ -158,9 +222,7 @@ def _should_check_merchant_limit(
 def _process_transaction_limits(
     trx: PaymentTransaction,
 ) -> tuple[bool, list[limit_models.LimitAlert]]:
-    active_limits: Sequence[
-        limit_models.CustomerLimit | limit_models.MerchantLimit
-    ] = get_active_limits()
+    active_limits = get_active_limits_index().get_candidate_limits(trx)
 
     logger.info(
         "Processing transaction: Found active limits",
@@ -175,7 +237,7 @@ def _process_transaction_limits(
 
     is_customer_in_gray_list: bool | None = (
         (is_customer_in_list(trx.customer, ListType.GRAY) if trx.customer else False)
-        if active_limits
+        if any(isinstance(limit, CustomerLimit) for limit in active_limits)
         else None
     )
 
@@ -285,35 +347,10 @@ def _process_transaction_limits(
         },
     )
 
-    (
-        limits_with_resolved_customer_and_merchant_conflicts,
-        risk_global_filtered,
-    ) = _resolve_risk_and_global_risk_limit_for_merchant_conflicts(limits_to_check)
-
-    if risk_global_filtered:  # pragma: no cover
-        logger.info(
-            "Risk/GlobalRisk conflict resolution filtered out limits",
-            extra={
-                "transaction_id": trx.id,
-                "filtered_count": len(risk_global_filtered),
-                "filtered_limits": [
-                    {
-                        "limit_id": limit.id,
-                        "limit_type": limit.limit_type,
-                        "category": limit.category,
-                        "reason": reason,
-                    }
-                    for limit, reason in risk_global_filtered
-                ],
-            },
-        )
-
     (
         limits_with_resolved_all_type_of_conflicts,
         customer_merchant_filtered,
-    ) = _resolve_customer_and_merchant_limit_conflicts(
-        limits_with_resolved_customer_and_merchant_conflicts
-    )
+    ) = _resolve_customer_and_merchant_limit_conflicts(limits_to_check)
 
     if customer_merchant_filtered:  # pragma: no cover
         logger.info(
@@ -343,15 +380,49 @@ def _process_transaction_limits(
         },
     )
 
+    with metrics.track_sql_queries() as sql_queries:
+        all_triggered_alerts = _evaluate_limits(
+            trx, limits_with_resolved_all_type_of_conflicts
+        )
+    metrics.LIMITS_CHECK_SQL_QUERIES.observe(sql_queries.count)
+
+    if all_triggered_alerts:
+        _notify_about_alerts(all_triggered_alerts)
+
+    is_declined: bool = any(
+        (alert.customer_limit and alert.customer_limit.decline_on_exceed)
+        or (alert.merchant_limit and alert.merchant_limit.decline_on_exceed)
+        for alert in all_triggered_alerts
+    )
+
+    logger.info(
+        "Limit processing complete",
+        extra={
+            "transaction_id": trx.id,
+            "alerts_triggered_count": len(all_triggered_alerts),
+            "transaction_declined": is_declined,
+        },
+    )
+
+    return is_declined, all_triggered_alerts
+
+
+@track_duration("limits._evaluate_limits")
+def _evaluate_limits(
+    trx: PaymentTransaction,
+    limits: list[limit_models.CustomerLimit | limit_models.MerchantLimit],
+) -> list[limit_models.LimitAlert]:
+    plan = planner.LimitsCheckPlan.build(trx, limits)
+
     all_triggered_alerts: list[limit_models.LimitAlert] = []
-    for limit in limits_with_resolved_all_type_of_conflicts:
+    for limit in limits:
         is_limit_triggered: bool
         triggers_data: dict[str, str]
 
         if isinstance(limit, limit_models.CustomerLimit):
-            is_limit_triggered, triggers_data = _check_customer_limit(limit, trx)
+            is_limit_triggered, triggers_data = _check_customer_limit(limit, trx, plan)
         elif isinstance(limit, limit_models.MerchantLimit):
-            is_limit_triggered, triggers_data = _check_merchant_limit(limit, trx)
+            is_limit_triggered, triggers_data = _check_merchant_limit(limit, trx, plan)
         else:
             raise ValueError(f"Invalid limit type: {type(limit)}")
 
@@ -370,34 +441,56 @@ def _process_transaction_limits(
             all_triggered_alerts.append(alert)
 
     if all_triggered_alerts:
-        with transaction.atomic():
-            for alert in all_triggered_alerts:
-                alert.save()
-                limit = cast(
-                    CustomerLimit | MerchantLimit,
-                    alert.customer_limit or alert.merchant_limit,
-                )
-                if limit and limit.notification_groups.exists():
-                    alert.notification_groups.set(limit.notification_groups.all())
-
-        _notify_about_alerts(all_triggered_alerts)
-
-    is_declined: bool = any(
-        (alert.customer_limit and alert.customer_limit.decline_on_exceed)
-        or (alert.merchant_limit and alert.merchant_limit.decline_on_exceed)
-        for alert in all_triggered_alerts
-    )
-
-    logger.info(
-        "Limit processing complete",
-        extra={
-            "transaction_id": trx.id,
-            "alerts_triggered_count": len(all_triggered_alerts),
-            "transaction_declined": is_declined,
-        },
-    )
-
-    return is_declined, all_triggered_alerts
+        _save_alerts(all_triggered_alerts)
+    return all_triggered_alerts
+
+
+def _save_alerts(alerts: list[limit_models.LimitAlert]) -> None:
+    customer_limit_ids = {
+        alert.customer_limit_id for alert in alerts if alert.customer_limit_id
+    }
+    merchant_limit_ids = {
+        alert.merchant_limit_id for alert in alerts if alert.merchant_limit_id
+    }
+    customer_limit_groups: dict[int, list[int]] = defaultdict(list)
+    merchant_limit_groups: dict[int, list[int]] = defaultdict(list)
+    if customer_limit_ids:
+        for (
+            limit_id,
+            group_id,
+        ) in CustomerLimit.notification_groups.through.objects.filter(
+            customerlimit_id__in=customer_limit_ids
+        ).values_list(
+            "customerlimit_id", "group_id"
+        ):
+            customer_limit_groups[limit_id].append(group_id)
+    if merchant_limit_ids:
+        for (
+            limit_id,
+            group_id,
+        ) in MerchantLimit.notification_groups.through.objects.filter(
+            merchantlimit_id__in=merchant_limit_ids
+        ).values_list(
+            "merchantlimit_id", "group_id"
+        ):
+            merchant_limit_groups[limit_id].append(group_id)
+
+    AlertGroup = limit_models.LimitAlert.notification_groups.through
+    alert_groups: list[ty.Any] = []
+    with transaction.atomic():
+        for alert in alerts:
+            alert.save()
+            if alert.customer_limit_id:
+                group_ids = customer_limit_groups[alert.customer_limit_id]
+            else:
+                assert alert.merchant_limit_id
+                group_ids = merchant_limit_groups[alert.merchant_limit_id]
+            alert_groups.extend(
+                AlertGroup(limitalert_id=alert.id, group_id=group_id)
+                for group_id in group_ids
+            )
+        if alert_groups:
+            AlertGroup.objects.bulk_create(alert_groups)
 
 
 @track_duration("limits.check_limits_and_maybe_decline_transaction")
@@ -457,6 +550,7 @@ def check_limits_and_maybe_decline_transaction(
 def _check_customer_limit(
     limit: limit_models.CustomerLimit,
     trx: PaymentTransaction,
+    plan: planner.LimitsCheckPlan | None = None,
 ) -> tuple[bool, dict[str, str]]:
     logger.info(
         "Checking customer limit",
@@ -503,32 +597,11 @@ def _check_customer_limit(
             )
         return is_limit_triggered, triggers_data
 
-    start_date: datetime.datetime = _get_start_date_of_limit(
-        trx.created_at,
-        limit.period,
-    )
-    end_date: datetime.datetime = trx.created_at
-
-    transactions_for_period: list[CustomerLimitTransactionData] = list(
-        PaymentTransaction.objects.filter(
-            customer=limit.customer,
-            status__in=(
-                const.TransactionStatus.SUCCESS,
-                const.TransactionStatus.FAILED,
-            ),
-            created_at__gte=start_date,
-            created_at__lte=end_date,
-        ).values("status", "amount")
-    )
+    plan = plan or planner.LimitsCheckPlan.build(trx, [limit])
+    period_stats = plan.period_stats(limit).total
 
     if limit.max_successful_operations:
-        successful_transactions_count = len(
-            [
-                transaction
-                for transaction in transactions_for_period
-                if transaction["status"] == const.TransactionStatus.SUCCESS
-            ]
-        )
+        successful_transactions_count = period_stats.success_count
         if successful_transactions_count >= limit.max_successful_operations:
             is_limit_triggered = True
             triggers_data["max_successful_operations"] = (
@@ -537,13 +610,7 @@ def _check_customer_limit(
             )
 
     if limit.max_failed_operations:
-        current_failed_transactions_count = len(
-            [
-                transaction
-                for transaction in transactions_for_period
-                if transaction["status"] == const.TransactionStatus.FAILED
-            ]
-        )
+        current_failed_transactions_count = period_stats.failed_count
         if current_failed_transactions_count >= limit.max_failed_operations:
             is_limit_triggered = True
             triggers_data["max_failed_operations"] = (
@@ -552,11 +619,7 @@ def _check_customer_limit(
             )
 
     if limit.total_successful_amount:
-        current_successful_transactions_amount = sum(
-            transaction["amount"]
-            for transaction in transactions_for_period
-            if transaction["status"] == const.TransactionStatus.SUCCESS
-        )
+        current_successful_transactions_amount = period_stats.success_amount
         if (
             current_successful_transactions_amount + trx.amount
             > limit.total_successful_amount
@@ -594,6 +657,7 @@ def _check_customer_limit(
 def _check_merchant_limit(
     limit: limit_models.MerchantLimit,
     trx: PaymentTransaction,
+    plan: planner.LimitsCheckPlan | None = None,
 ) -> tuple[bool, dict[str, str]]:
     logger.info(
         "Checking merchant limit",
@@ -608,6 +672,7 @@ def _check_merchant_limit(
     )
     is_limit_triggered = False
     triggers_data: dict[str, str] = {}
+    plan = plan or planner.LimitsCheckPlan.build(trx, [limit])
 
     if limit.limit_type == limit_models.LimitType.MIN_AMOUNT_SINGLE_OPERATION and (
         (
@@ -653,20 +718,7 @@ def _check_merchant_limit(
         assert limit.burst_minutes is not None
         assert limit.max_operations is not None
 
-        window_start = trx.created_at - datetime.timedelta(minutes=limit.burst_minutes)
-        burst_qs = PaymentTransaction.objects.filter(
-            created_at__gt=window_start,
-            created_at__lte=trx.created_at,
-        )
-        if limit.scope == limit_models.MerchantLimitScope.MERCHANT:
-            assert limit.merchant_id is not None
-            burst_qs = burst_qs.filter(wallet__wallet__merchant_id=limit.merchant_id)
-        elif limit.scope == limit_models.MerchantLimitScope.WALLET:
-            assert limit.wallet_id is not None
-            burst_qs = burst_qs.filter(wallet__wallet_id=limit.wallet_id)
-        else:
-            raise ValueError(f"Invalid scope: {limit.scope}")  # pragma: no cover
-        operations_count = burst_qs.count()
+        operations_count = plan.operations_count(limit)
 
         if operations_count > limit.max_operations:
             is_limit_triggered = True
@@ -700,48 +752,14 @@ def _check_merchant_limit(
             )
         return is_limit_triggered, triggers_data
 
-    start_date: datetime.datetime = _get_start_date_of_limit(
-        trx.created_at, limit.period
-    )
-    end_date: datetime.datetime = trx.created_at
-
-    transactions_for_period_query = PaymentTransaction.objects.filter(
-        status__in=(
-            const.TransactionStatus.SUCCESS,
-            const.TransactionStatus.FAILED,
-        ),
-        created_at__gte=start_date,
-        created_at__lte=end_date,
-    )
-
-    if limit.scope == limit_models.MerchantLimitScope.MERCHANT:
-        assert limit.merchant_id is not None
-        transactions_for_period_query = transactions_for_period_query.select_related(
-            "wallet__wallet",
-        ).filter(wallet__wallet__merchant_id=limit.merchant_id)
-    elif limit.scope == limit_models.MerchantLimitScope.WALLET:
-        assert limit.wallet_id is not None
-        transactions_for_period_query = transactions_for_period_query.select_related(
-            "wallet",
-        ).filter(wallet__wallet_id=limit.wallet_id)
-    else:
-        raise ValueError(f"Invalid scope: {limit.scope}")  # pragma: no cover
-
-    transactions_for_period: list[MerchantLimitTransactionData] = list(
-        transactions_for_period_query.values("status", "amount", "type", "created_at")
-    )
+    period_stats = plan.period_stats(limit)
+    deposits_stats = period_stats.for_type(const.TransactionType.DEPOSIT)
+    withdrawals_stats = period_stats.for_type(const.TransactionType.WITHDRAWAL)
 
     if limit.limit_type == limit_models.LimitType.MAX_SUCCESSFUL_DEPOSITS:
         assert limit.max_operations is not None
 
-        successful_deposits_count = len(
-            [
-                transaction
-                for transaction in transactions_for_period
-                if transaction["status"] == const.TransactionStatus.SUCCESS
-                and transaction["type"] == const.TransactionType.DEPOSIT
-            ]
-        )
+        successful_deposits_count = deposits_stats.success_count
         if successful_deposits_count >= limit.max_operations:
             is_limit_triggered = True
             triggers_data[limit_models.LimitType.MAX_SUCCESSFUL_DEPOSITS.label] = (
@@ -752,21 +770,9 @@ def _check_merchant_limit(
     if limit.limit_type == limit_models.LimitType.MAX_OVERALL_DECLINE_PERCENT:
         assert limit.max_overall_decline_percent is not None
 
-        total_transactions_count: int = len(
-            [
-                transaction
-                for transaction in transactions_for_period
-                if transaction["status"]
-                in {const.TransactionStatus.SUCCESS, const.TransactionStatus.FAILED}
-            ]
-        )
-        failed_transactions_count: int = len(
-            [
-                transaction
-                for transaction in transactions_for_period
-                if transaction["status"] == const.TransactionStatus.FAILED
-            ]
-        )
+        total_stats = period_stats.total
+        total_transactions_count: int = total_stats.count
+        failed_transactions_count: int = total_stats.failed_count
         failed_withdrawals_percent: Decimal = round(
             Decimal(failed_transactions_count) / Decimal(total_transactions_count) * 100
             if total_transactions_count
@@ -783,23 +789,8 @@ def _check_merchant_limit(
     if limit.limit_type == limit_models.LimitType.MAX_WITHDRAWAL_DECLINE_PERCENT:
         assert limit.max_withdrawal_decline_percent is not None
 
-        total_withdrawals_count: int = len(
-            [
-                transaction
-                for transaction in transactions_for_period
-                if transaction["type"] == const.TransactionType.WITHDRAWAL
-                and transaction["status"]
-                in {const.TransactionStatus.SUCCESS, const.TransactionStatus.FAILED}
-            ]
-        )
-        failed_withdrawals_count: int = len(
-            [
-                transaction
-                for transaction in transactions_for_period
-                if transaction["status"] == const.TransactionStatus.FAILED
-                and transaction["type"] == const.TransactionType.WITHDRAWAL
-            ]
-        )
+        total_withdrawals_count: int = withdrawals_stats.count
+        failed_withdrawals_count: int = withdrawals_stats.failed_count
         failed_withdrawals_percent = round(
             Decimal(failed_withdrawals_count) / Decimal(total_withdrawals_count) * 100
             if total_withdrawals_count
@@ -818,23 +809,8 @@ def _check_merchant_limit(
     if limit.limit_type == limit_models.LimitType.MAX_DEPOSIT_DECLINE_PERCENT:
         assert limit.max_deposit_decline_percent is not None
 
-        total_deposits_count: int = len(
-            [
-                transaction
-                for transaction in transactions_for_period
-                if transaction["type"] == const.TransactionType.DEPOSIT
-                and transaction["status"]
-                in {const.TransactionStatus.SUCCESS, const.TransactionStatus.FAILED}
-            ]
-        )
-        failed_deposits_count: int = len(
-            [
-                transaction
-                for transaction in transactions_for_period
-                if transaction["status"] == const.TransactionStatus.FAILED
-                and transaction["type"] == const.TransactionType.DEPOSIT
-            ]
-        )
+        total_deposits_count: int = deposits_stats.count
+        failed_deposits_count: int = deposits_stats.failed_count
         failed_deposits_percent: Decimal = round(
             Decimal(failed_deposits_count) / Decimal(total_deposits_count) * 100
             if total_deposits_count
@@ -854,11 +830,7 @@ def _check_merchant_limit(
     ):
         assert limit.total_amount is not None
 
-        successful_deposits_amount = sum(
-            transaction["amount"]
-            for transaction in transactions_for_period
-            if transaction["type"] == const.TransactionType.DEPOSIT
-        )
+        successful_deposits_amount = deposits_stats.amount
         if successful_deposits_amount + trx.amount > limit.total_amount:
             is_limit_triggered = True
             triggers_data[limit_models.LimitType.TOTAL_AMOUNT_DEPOSITS_PERIOD.label] = (
@@ -873,11 +845,7 @@ def _check_merchant_limit(
     ):
         assert limit.total_amount is not None
 
-        successful_withdrawals_amount = sum(
-            transaction["amount"]
-            for transaction in transactions_for_period
-            if transaction["type"] == const.TransactionType.WITHDRAWAL
-        )
+        successful_withdrawals_amount = withdrawals_stats.amount
         if successful_withdrawals_amount + trx.amount > limit.total_amount:
             is_limit_triggered = True
             triggers_data[
@@ -895,16 +863,8 @@ def _check_merchant_limit(
     if limit.limit_type == limit_models.LimitType.MAX_WITHDRAWAL_TO_DEPOSIT_RATIO:
         assert limit.max_ratio is not None
 
-        withdrawals_transactions_amount = sum(
-            transaction["amount"]
-            for transaction in transactions_for_period
-            if transaction["type"] == const.TransactionType.WITHDRAWAL
-        )
-        deposits_transactions_amount = sum(
-            transaction["amount"]
-            for transaction in transactions_for_period
-            if transaction["type"] == const.TransactionType.DEPOSIT
-        )
+        withdrawals_transactions_amount = withdrawals_stats.amount
+        deposits_transactions_amount = deposits_stats.amount
         if withdrawals_transactions_amount == 0:
             current_ratio: Decimal = Decimal(0)
         elif deposits_transactions_amount == 0:
@@ -950,25 +910,6 @@ def _check_merchant_limit(
     return is_limit_triggered, triggers_data
 
 
-@track_duration("limits._get_start_date_of_limit")
-def _get_start_date_of_limit(
-    trx_created_at: datetime.datetime,
-    period: LimitPeriod | str,
-) -> datetime.datetime:
-    if period == LimitPeriod.ONE_HOUR:
-        return trx_created_at - datetime.timedelta(hours=1)
-    elif period == LimitPeriod.TWENTY_FOUR_HOURS:
-        return trx_created_at - datetime.timedelta(hours=24)
-    elif period == LimitPeriod.BEGINNING_OF_HOUR:
-        # start of the current hour (e.g., 21:47:00 -> 21:00:00)
-        return trx_created_at.replace(minute=0, second=0, microsecond=0)
-    elif period == LimitPeriod.BEGINNING_OF_DAY:
-        # start of the current day (e.g., 21:47:00 -> 00:00:00)
-        return trx_created_at.replace(hour=0, minute=0, second=0, microsecond=0)
-    else:
-        raise ValueError(f"Invalid period: {period}")  # pragma: no cover
-
-
 @track_duration("limits._resolve_customer_and_merchant_limit_conflicts")
 def _resolve_customer_and_merchant_limit_conflicts(
     limits: list[limit_models.CustomerLimit | limit_models.MerchantLimit],
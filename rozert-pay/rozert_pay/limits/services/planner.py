@@ -0,0 +1,142 @@
+import datetime
+from collections.abc import Iterable
+
+from rozert_pay.common import metrics
+from rozert_pay.common.metrics import track_duration
+from rozert_pay.limits import models as limit_models
+from rozert_pay.limits.const import LimitPeriod
+from rozert_pay.limits.models import CounterScope
+from rozert_pay.limits.services import counters
+from rozert_pay.payment.models import PaymentTransaction
+
+
+@track_duration("limits.planner.get_start_date_of_limit")
+def get_start_date_of_limit(
+    trx_created_at: datetime.datetime,
+    period: LimitPeriod | str,
+) -> datetime.datetime:
+    if period == LimitPeriod.ONE_HOUR:
+        return trx_created_at - datetime.timedelta(hours=1)
+    elif period == LimitPeriod.TWENTY_FOUR_HOURS:
+        return trx_created_at - datetime.timedelta(hours=24)
+    elif period == LimitPeriod.BEGINNING_OF_HOUR:
+        # start of the current hour (e.g., 21:47:00 -> 21:00:00)
+        return trx_created_at.replace(minute=0, second=0, microsecond=0)
+    elif period == LimitPeriod.BEGINNING_OF_DAY:
+        # start of the current day (e.g., 21:47:00 -> 00:00:00)
+        return trx_created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        raise ValueError(f"Invalid period: {period}")  # pragma: no cover
+
+
+def _get_limit_scope(
+    limit: limit_models.CustomerLimit | limit_models.MerchantLimit,
+) -> tuple[str, int]:
+    if isinstance(limit, limit_models.CustomerLimit):
+        return CounterScope.CUSTOMER, limit.customer_id
+
+    if limit.scope == limit_models.MerchantLimitScope.MERCHANT:
+        assert limit.merchant_id is not None
+        return CounterScope.MERCHANT, limit.merchant_id
+    elif limit.scope == limit_models.MerchantLimitScope.WALLET:
+        assert limit.wallet_id is not None
+        return CounterScope.WALLET, limit.wallet_id
+    raise ValueError(f"Invalid scope: {limit.scope}")  # pragma: no cover
+
+
+class LimitsCheckPlan:
+    """
+    Aggregates required to check limits against one transaction.
+
+    Limits sharing scope and window share an aggregate, and all aggregates
+    are fetched at once by ``execute`` instead of a query per limit.
+    """
+
+    def __init__(self, trx: PaymentTransaction) -> None:
+        self.trx = trx
+        self._period_windows: set[counters.StatsWindow] = set()
+        self._operations_windows: set[counters.OperationsWindow] = set()
+        self._stats: counters.BatchStats | None = None
+
+    @classmethod
+    def build(
+        cls,
+        trx: PaymentTransaction,
+        limits: Iterable[limit_models.CustomerLimit | limit_models.MerchantLimit],
+    ) -> "LimitsCheckPlan":
+        plan = cls(trx)
+        for limit in limits:
+            plan.add_limit(limit)
+        plan.execute()
+        return plan
+
+    def period_window(
+        self,
+        limit: limit_models.CustomerLimit | limit_models.MerchantLimit,
+    ) -> counters.StatsWindow | None:
+        if not limit.period:
+            return None
+        scope, scope_id = _get_limit_scope(limit)
+        return counters.StatsWindow(
+            scope=scope,
+            scope_id=scope_id,
+            start=get_start_date_of_limit(self.trx.created_at, limit.period),
+            end=self.trx.created_at,
+        )
+
+    def operations_window(
+        self,
+        limit: limit_models.CustomerLimit | limit_models.MerchantLimit,
+    ) -> counters.OperationsWindow | None:
+        if not (
+            isinstance(limit, limit_models.MerchantLimit)
+            and limit.limit_type == limit_models.LimitType.MAX_OPERATIONS_BURST
+        ):
+            return None
+        assert limit.burst_minutes is not None
+        scope, scope_id = _get_limit_scope(limit)
+        return counters.OperationsWindow(
+            scope=scope,
+            scope_id=scope_id,
+            start=self.trx.created_at - datetime.timedelta(minutes=limit.burst_minutes),
+            end=self.trx.created_at,
+        )
+
+    def add_limit(
+        self,
+        limit: limit_models.CustomerLimit | limit_models.MerchantLimit,
+    ) -> None:
+        assert self._stats is None, "Plan is already executed"
+        if period_window := self.period_window(limit):
+            self._period_windows.add(period_window)
+        if operations_window := self.operations_window(limit):
+            self._operations_windows.add(operations_window)
+
+    @track_duration("limits.planner.execute")
+    def execute(self) -> None:
+        self._stats = counters.get_batch_stats(
+            period_windows=self._period_windows,
+            operations_windows=self._operations_windows,
+        )
+        metrics.LIMITS_PLAN_WINDOWS.labels(kind="period").observe(
+            len(self._period_windows)
+        )
+        metrics.LIMITS_PLAN_WINDOWS.labels(kind="operations").observe(
+            len(self._operations_windows)
+        )
+        metrics.LIMITS_PLAN_QUERIES.observe(self._stats.queries_count)
+
+    def period_stats(
+        self,
+        limit: limit_models.CustomerLimit | limit_models.MerchantLimit,
+    ) -> counters.PeriodStats:
+        assert self._stats is not None, "Plan is not executed"
+        window = self.period_window(limit)
+        assert window is not None
+        return self._stats.periods[window]
+
+    def operations_count(self, limit: limit_models.MerchantLimit) -> int:
+        assert self._stats is not None, "Plan is not executed"
+        window = self.operations_window(limit)
+        assert window is not None
+        return self._stats.operations[window]
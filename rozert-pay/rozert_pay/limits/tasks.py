@@ -1,10 +1,14 @@
 import logging
+from datetime import timedelta
 
 from celery import Task
+from django.utils import timezone
 from rozert_pay.celery_app import app
 from rozert_pay.common import slack
 from rozert_pay.common.const import CeleryQueue, EventType
+from rozert_pay.limits import const as limit_const
 from rozert_pay.limits.models import LimitAlert
+from rozert_pay.limits.services import counters
 from rozert_pay.payment.services.event_logs import create_transaction_log
 from slack_sdk.errors import SlackClientError
 
@@ -60,3 +64,21 @@ def notify_in_slack(
                 "message": message,
             },
         )
+
+
+@app.task(queue=CeleryQueue.LOW_PRIORITY)
+def reconcile_limit_counters(hours: int | None = None) -> None:
+    window = (
+        timedelta(hours=hours)
+        if hours
+        else limit_const.LIMIT_COUNTERS_RECONCILIATION_WINDOW
+    )
+    end = timezone.now()
+    start = (end - window).replace(second=0, microsecond=0)
+
+    # Rebuild hour by hour to keep the buckets table lock short
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + timedelta(hours=1), end)
+        counters.rebuild_counters(chunk_start, chunk_end)
+        chunk_start = chunk_end
@@ -238,3 +238,17 @@ class WalletAdmin(BaseRozertAdmin, RiskControlActionsMixin):
 @admin.register(models.CurrencyWallet)
 class CurrencyWalletAdmin(BaseRozertAdmin):
     autocomplete_fields = ["wallet"]
+    # Shards are created by set_balance_shards management command
+    readonly_fields = ["balance_shards_count", "total_balances"]
+
+    @admin.display(description=_("Total balances (including balance shards)"))
+    def total_balances(self, obj: models.CurrencyWallet) -> str:
+        if not obj.pk:
+            return "-"
+        balances = obj.balances
+        return (
+            f"Operational: {balances.operational_balance:.2f}, "
+            f"Frozen: {balances.frozen_balance:.2f}, "
+            f"Pending: {balances.pending_balance:.2f}, "
+            f"Available: {balances.available_balance:.2f}"
+        )
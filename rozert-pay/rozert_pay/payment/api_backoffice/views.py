@@ -23,6 +23,7 @@ from rozert_pay.payment.api_v1.serializers import (
     TransactionResponseSerializer,
     WalletSerializer,
 )
+from rozert_pay.payment.api_v1.transaction_listing import TransactionListMixin
 from rozert_pay.payment.models import (
     DepositAccount,
     OutcomingCallback,
@@ -44,7 +45,9 @@ class CabinetWalletViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
         )
 
 
-class CabinetTransactionViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
+class CabinetTransactionViewSet(
+    TransactionListMixin, viewsets.GenericViewSet, mixins.ListModelMixin
+):
     authentication_classes = (CSRFExemptSessionAuthentication,)
     serializer_class = TransactionResponseSerializer
     permission_classes = [IsAuthenticated]
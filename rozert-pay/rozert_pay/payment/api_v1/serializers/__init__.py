@@ -7,6 +7,10 @@ from ._serializers import (  # noqa
     DepositTransactionRequestSerializer,
     InstructionSerializer,
     RequestInstructionSerializer,
+    TransactionChangesRequestSerializer,
+    TransactionChangesResponseSerializer,
+    TransactionListFilterSerializer,
+    TransactionListItemSerializer,
     TransactionResponseSerializer,
     WalletSerializer,
     WithdrawalTransactionRequestSerializer,
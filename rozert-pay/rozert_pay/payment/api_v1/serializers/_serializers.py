@@ -5,11 +5,17 @@ from typing import Any, cast
 
 from bm.datatypes import Money
 from django.db import transaction
+from django.db.models import QuerySet
 from django.utils.translation import gettext as _
 from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from rozert_pay.balances.const import BalanceTransactionType, InitiatorType
-from rozert_pay.balances.services import BalanceUpdateDTO, BalanceUpdateService
+from rozert_pay.balances.services import (
+    BalanceUpdateDTO,
+    BalanceUpdateService,
+    get_locked_wallet_balances,
+    get_wallet_balances,
+)
 from rozert_pay.common import const
 from rozert_pay.common.const import TransactionType
 from rozert_pay.payment.api_v1.serializers.user_data_serializers import (
@@ -47,7 +53,9 @@ class WalletSerializer(serializers.Serializer):
 
     @extend_schema_field(field=BalanceSerializer(many=True))
     def get_balances(self, obj: Wallet) -> dict[str, ty.Any]:
-        return BalanceSerializer(obj.currencywallet_set.all(), many=True).data
+        return BalanceSerializer(
+            get_wallet_balances(obj.currencywallet_set.all()), many=True
+        ).data
 
 
 class RequestInstructionSerializer(serializers.Serializer):
@@ -275,7 +283,8 @@ class WithdrawalTransactionRequestSerializer(  # type: ignore[misc]
 
             if (
                 not currency_wallet
-                or currency_wallet.available_balance < attrs["amount"]
+                or get_locked_wallet_balances(currency_wallet).available_balance
+                < attrs["amount"]
             ):
                 raise serializers.ValidationError({"amount": _("Insufficient funds.")})
 
@@ -422,6 +431,107 @@ class TransactionResponseSerializer(serializers.Serializer):
         return ret
 
 
+class TransactionListItemSerializer(TransactionResponseSerializer):
+    """
+    Transaction in lists and changes feed.
+    """
+
+    # Columns read by to_representation, related rows are joined so
+    # serialization makes no queries. Customer user_data is decrypted
+    # from the joined columns.
+    QUERYSET_FIELDS = (
+        "uuid",
+        "status",
+        "decline_code",
+        "decline_reason",
+        "created_at",
+        "updated_at",
+        "instruction",
+        "callback_url",
+        "type",
+        "currency",
+        "amount",
+        "external_account_id",
+        "extra",
+        "wallet__wallet__uuid",
+        "customer__uuid",
+        "customer__external_id",
+        "customer__language",
+        "customer__email_encrypted",
+        "customer__phone_encrypted",
+        "customer__extra_encrypted",
+        "customer_card__uuid",
+        "customer_external_account__unique_account_number",
+    )
+
+    @classmethod
+    def setup_queryset(
+        cls, queryset: QuerySet[PaymentTransaction]
+    ) -> QuerySet[PaymentTransaction]:
+        return queryset.select_related(
+            "wallet__wallet",
+            "customer",
+            "customer_card",
+            "customer_external_account",
+        ).only(*cls.QUERYSET_FIELDS)
+
+
+class TransactionListFilterSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(
+        choices=const.TransactionStatus.choices, required=False
+    )
+    type = serializers.ChoiceField(
+        choices=const.TransactionType.choices, required=False
+    )
+    wallet_id = serializers.UUIDField(required=False)
+    created_from = serializers.DateTimeField(
+        required=False, help_text="Transactions created at or after this time"
+    )
+    created_to = serializers.DateTimeField(
+        required=False, help_text="Transactions created before this time"
+    )
+
+    def filter_queryset(
+        self, queryset: QuerySet[PaymentTransaction]
+    ) -> QuerySet[PaymentTransaction]:
+        data = self.validated_data
+        if "status" in data:
+            queryset = queryset.filter(status=data["status"])
+        if "type" in data:
+            queryset = queryset.filter(type=data["type"])
+        if "wallet_id" in data:
+            queryset = queryset.filter(merchant_wallet__uuid=data["wallet_id"])
+        if "created_from" in data:
+            queryset = queryset.filter(created_at__gte=data["created_from"])
+        if "created_to" in data:
+            queryset = queryset.filter(created_at__lt=data["created_to"])
+        return queryset
+
+
+class TransactionChangesRequestSerializer(serializers.Serializer):
+    since = serializers.CharField(
+        required=False,
+        help_text="Watermark from previous response. "
+        "If not set, feed starts from the oldest transaction.",
+    )
+    limit = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        help_text="Maximum number of transactions to return",
+    )
+
+
+class TransactionChangesResponseSerializer(serializers.Serializer):
+    results = TransactionListItemSerializer(many=True)
+    watermark = serializers.CharField(
+        allow_null=True,
+        help_text="Pass as `since` to get transactions changed after this page",
+    )
+    has_more = serializers.BooleanField(
+        help_text="More changes are available, request next page immediately"
+    )
+
+
 class BaseAccountSerializer(serializers.ModelSerializer):
     deposit_account = serializers.SerializerMethodField(
         help_text="Deposit account for customer. "
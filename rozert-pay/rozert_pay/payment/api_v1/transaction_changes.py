@@ -0,0 +1,147 @@
+"""
+Feed of merchant transactions changed after a watermark.
+
+Transactions are read in (updated_at, id) order by keyset, so merchants can
+sync incrementally instead of re-reading the list or every transaction.
+Each change moves the transaction to the end of the feed, delivery is
+at-least-once: merchant should upsert transactions by id. Changes are
+returned once all DB transactions started before them are finished.
+"""
+import base64
+import json
+import logging
+import typing as ty
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+from rozert_pay.common import metrics
+from rozert_pay.payment.api_v1.serializers import TransactionListItemSerializer
+from rozert_pay.payment.models import PaymentTransaction
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_LIMIT = 10_000
+MAX_STREAM_LIMIT = 100_000
+
+
+@dataclass(frozen=True)
+class Watermark:
+    updated_at: datetime
+    id: int
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(
+            f"{self.updated_at.isoformat()}|{self.id}".encode()
+        ).decode()
+
+    @classmethod
+    def decode(cls, token: str) -> "Watermark":
+        try:
+            updated_at, id = base64.urlsafe_b64decode(token).decode().split("|")
+            return cls(updated_at=datetime.fromisoformat(updated_at), id=int(id))
+        except ValueError:
+            raise ValidationError({"since": ["Invalid watermark"]})
+
+
+def get_visibility_horizon() -> datetime:
+    """
+    Rows with updated_at before returned time are committed or rolled back.
+
+    updated_at is set before commit, so rows of DB transactions in progress
+    may become visible later with updated_at below the watermark. Such
+    transactions started before they set updated_at, so the feed stops at
+    start of the oldest open DB transaction. Margin covers clocks difference
+    between application and DB servers. How far the horizon is behind is
+    exported as metric, see TRANSACTION_CHANGES_HORIZON_LAG_WARNING_SECONDS.
+    """
+    with connection.cursor() as cursor:
+        # Sessions of the same role are always visible in pg_stat_activity
+        cursor.execute(
+            """
+            SELECT least(min(xact_start), clock_timestamp()), clock_timestamp()
+            FROM pg_stat_activity
+            WHERE datname = current_database()
+                AND backend_type = 'client backend'
+                AND pid <> pg_backend_pid()
+            """
+        )
+        horizon, now = cursor.fetchone()
+
+    lag = (now - horizon).total_seconds()
+    metrics.TRANSACTION_CHANGES_HORIZON_LAG.set(lag)
+    if lag > settings.TRANSACTION_CHANGES_HORIZON_LAG_WARNING_SECONDS:
+        logger.warning(
+            "Transactions changes feed is held back by long DB transaction",
+            extra={"lag_seconds": lag, "horizon": horizon},
+        )
+    return horizon - timedelta(seconds=settings.TRANSACTION_CHANGES_CLOCK_SKEW_SECONDS)
+
+
+@dataclass
+class ChangesPage:
+    transactions: list[PaymentTransaction]
+    watermark: Watermark | None
+    has_more: bool
+
+
+def get_changes_page(
+    queryset: QuerySet[PaymentTransaction],
+    since: Watermark | None,
+    limit: int,
+) -> ChangesPage:
+    # Watermark must not pass rows which are not committed yet
+    queryset = queryset.filter(updated_at__lt=get_visibility_horizon())
+    if since:
+        # First condition lets postgres use (updated_at, id) index range
+        queryset = queryset.filter(
+            Q(updated_at__gte=since.updated_at)
+            & (Q(updated_at__gt=since.updated_at) | Q(id__gt=since.id))
+        )
+
+    rows = list(
+        TransactionListItemSerializer.setup_queryset(queryset).order_by(
+            "updated_at", "id"
+        )[: limit + 1]
+    )
+    transactions = rows[:limit]
+    if transactions:
+        since = Watermark(
+            updated_at=transactions[-1].updated_at, id=transactions[-1].id
+        )
+    return ChangesPage(
+        transactions=transactions,
+        watermark=since,
+        has_more=len(rows) > limit,
+    )
+
+
+def iter_changes_ndjson(
+    queryset: QuerySet[PaymentTransaction],
+    since: Watermark | None,
+    limit: int,
+) -> ty.Iterator[str]:
+    """
+    Yields changed transactions as JSON lines, reading them by pages.
+    Last line is {"watermark": ..., "has_more": ...}.
+    """
+    encoder = JSONEncoder()
+    has_more = True
+    while has_more and limit > 0:
+        page = get_changes_page(queryset, since, min(limit, MAX_PAGE_SIZE))
+        for trx in page.transactions:
+            yield encoder.encode(TransactionListItemSerializer(trx).data) + "\n"
+
+        since = page.watermark
+        has_more = page.has_more
+        limit -= len(page.transactions)
+
+    yield json.dumps(
+        {"watermark": since and since.encode(), "has_more": has_more}
+    ) + "\n"
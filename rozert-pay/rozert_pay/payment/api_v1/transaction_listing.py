@@ -0,0 +1,108 @@
+"""
+Listing of merchant transactions.
+
+Pages are selected by keyset on (created_at, id) instead of OFFSET, and
+rows are loaded with exactly the columns TransactionListItemSerializer
+needs, so the number of queries per page doesn't depend on page size.
+"""
+import typing as ty
+from datetime import datetime
+
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.request import Request
+from rest_framework.serializers import BaseSerializer
+from rozert_pay.payment.api_v1.serializers import (
+    TransactionListFilterSerializer,
+    TransactionListItemSerializer,
+)
+from rozert_pay.payment.models import PaymentTransaction
+
+
+class TransactionCursorPagination(CursorPagination):
+    """
+    Newest first. Cursor holds (created_at, id) of the last row of the page,
+    so only "next" links are returned.
+    """
+
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = ("-created_at", "-id")
+
+    def paginate_queryset(  # type: ignore[override]
+        self,
+        queryset: QuerySet[PaymentTransaction],
+        request: Request,
+        view: ty.Any = None,
+    ) -> list[PaymentTransaction]:
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+
+        if self.cursor and self.cursor.position:
+            created_at, id = self._parse_position(self.cursor.position)
+            # First condition lets postgres use (created_at, id) index range
+            queryset = queryset.filter(
+                Q(created_at__lte=created_at)
+                & (Q(created_at__lt=created_at) | Q(id__lt=id))
+            )
+
+        results = list(queryset.order_by(*self.ordering)[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        self.has_next = len(results) > self.page_size
+        self.has_previous = False
+        return self.page
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        return self.encode_cursor(
+            Cursor(
+                offset=0,
+                reverse=False,
+                position=f"{last.created_at.isoformat()}|{last.id}",
+            )
+        )
+
+    def get_previous_link(self) -> str | None:
+        return None
+
+    def _parse_position(self, position: str) -> tuple[datetime, int]:
+        try:
+            created_at, id = position.split("|")
+            return datetime.fromisoformat(created_at), int(id)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+
+class TransactionListMixin:
+    """
+    Pagination, filters, serializer and queryset projection
+    for list action of transaction viewsets.
+    """
+
+    pagination_class = TransactionCursorPagination
+    action: str | None
+    request: Request
+
+    def get_serializer_class(self) -> type[BaseSerializer]:
+        if self.action == "list":
+            return TransactionListItemSerializer
+        return super().get_serializer_class()  # type: ignore[misc]
+
+    def filter_queryset(
+        self, queryset: QuerySet[PaymentTransaction]
+    ) -> QuerySet[PaymentTransaction]:
+        queryset = super().filter_queryset(queryset)  # type: ignore[misc]
+        if self.action != "list":
+            return queryset
+
+        filters = TransactionListFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        return TransactionListItemSerializer.setup_queryset(
+            filters.filter_queryset(queryset)
+        )
@@ -2,8 +2,11 @@ import logging
 from typing import Any
 
 from django.db.models import QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema
 from rest_framework import mixins, viewsets  # type: ignore
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
@@ -18,13 +21,14 @@ from rozert_pay.common.authorization import (
     HMACAuthentication,
 )
 from rozert_pay.common.const import PaymentSystemType
-from rozert_pay.payment import factories, tasks
+from rozert_pay.payment import factories
 from rozert_pay.payment import types as payment_types
-from rozert_pay.payment.api_v1 import serializers
+from rozert_pay.payment.api_v1 import serializers, transaction_changes
 from rozert_pay.payment.api_v1.serializers import (
     CardBinDataSerializer,
     TransactionResponseSerializer,
 )
+from rozert_pay.payment.api_v1.transaction_listing import TransactionListMixin
 from rozert_pay.payment.models import (
     IncomingCallback,
     PaymentCardBank,
@@ -32,7 +36,12 @@ from rozert_pay.payment.models import (
     PaymentTransaction,
     Wallet,
 )
-from rozert_pay.payment.services import base_classes, deposit_instructions, errors
+from rozert_pay.payment.services import (
+    base_classes,
+    deposit_instructions,
+    errors,
+    incoming_callback_queue,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -179,6 +188,7 @@ class GenericPaymentSystemApiV1Mixin:
     tags=["Transactions"],
 )
 class TransactionViewSet(
+    TransactionListMixin,
     GenericPaymentSystemApiV1Mixin,
     viewsets.GenericViewSet,
     mixins.ListModelMixin,
@@ -195,9 +205,7 @@ class TransactionViewSet(
         if getattr(self, "swagger_fake_view", False):
             return PaymentTransaction.objects.none()
 
-        return PaymentTransaction.objects.filter(
-            wallet__wallet__merchant=self.request.auth.merchant
-        )
+        return PaymentTransaction.objects.filter(merchant=self.request.auth.merchant)
 
     @extend_schema(
         exclude=True,
@@ -207,6 +215,7 @@ class TransactionViewSet(
 
     @extend_schema(
         summary="List transactions",
+        parameters=[serializers.TransactionListFilterSerializer],
     )
     def list(self, request: Request) -> Response:
         return super().list(request)
@@ -217,6 +226,62 @@ class TransactionViewSet(
     def retrieve(self, request: Request, **kwargs) -> Response:  # type: ignore[no-untyped-def]
         return super().retrieve(request, **kwargs)
 
+    @extend_schema(
+        summary="Transactions changed since watermark",
+        description="Returns transactions in order of their last change. "
+        "Store `watermark` and pass it as `since` in next request. "
+        "Transaction is returned again after each change. Changes appear "
+        "in the feed once all database transactions started before them are "
+        "finished, usually in a few seconds.",
+        parameters=[serializers.TransactionChangesRequestSerializer],
+        responses=serializers.TransactionChangesResponseSerializer,
+    )
+    @action(detail=False, methods=["get"])
+    def changes(self, request: Request) -> Response:
+        since, limit = self._get_changes_params(
+            transaction_changes.PAGE_SIZE, transaction_changes.MAX_PAGE_SIZE
+        )
+        page = transaction_changes.get_changes_page(self.get_queryset(), since, limit)
+        return Response(
+            {
+                "results": serializers.TransactionListItemSerializer(
+                    page.transactions, many=True
+                ).data,
+                "watermark": page.watermark and page.watermark.encode(),
+                "has_more": page.has_more,
+            }
+        )
+
+    @extend_schema(
+        summary="Stream transactions changed since watermark",
+        description="Same as changes, for large catch-ups. Response is NDJSON: "
+        'a transaction per line, last line is `{"watermark": ..., "has_more": ...}`.',
+        parameters=[serializers.TransactionChangesRequestSerializer],
+        responses={(200, "application/x-ndjson"): OpenApiTypes.STR},
+    )
+    @action(detail=False, methods=["get"], url_path="changes/stream")
+    def changes_stream(self, request: Request) -> StreamingHttpResponse:
+        since, limit = self._get_changes_params(
+            transaction_changes.STREAM_LIMIT, transaction_changes.MAX_STREAM_LIMIT
+        )
+        return StreamingHttpResponse(
+            transaction_changes.iter_changes_ndjson(self.get_queryset(), since, limit),
+            content_type="application/x-ndjson",
+        )
+
+    def _get_changes_params(
+        self, default_limit: int, max_limit: int
+    ) -> tuple[transaction_changes.Watermark | None, int]:
+        params = serializers.TransactionChangesRequestSerializer(
+            data=self.request.query_params
+        )
+        params.is_valid(raise_exception=True)
+        since = params.validated_data.get("since")
+        return (
+            transaction_changes.Watermark.decode(since) if since else None,
+            min(params.validated_data.get("limit", default_limit), max_limit),
+        )
+
 
 class CallbackThrottle(SimpleRateThrottle):
     scope = "callback"
@@ -237,9 +302,9 @@ class CallbackView(APIView):
     throttle_classes = [CallbackThrottle]
     authentication_classes = []
 
-    def post(self, request: Request, system: str) -> Response:
+    def post(self, request: Request, system: str) -> HttpResponse:
         db_system: PaymentSystem = PaymentSystem.objects.get(slug=system)
-        cb = IncomingCallback.objects.create(
+        cb = IncomingCallback(
             system=db_system,
             body=request.body.decode(),
             get_params=request.query_params,
@@ -247,8 +312,9 @@ class CallbackView(APIView):
             or request.META.get("REMOTE_ADDR", ""),
             headers={key.lower(): value for key, value in request.headers.items()},
         )
-        result = tasks.handle_incoming_callback(cb.id)
-        return result
+
+        controller = factories.get_payment_system_controller(db_system)
+        return incoming_callback_queue.accept_callback(cb, controller)
 
 
 @extend_schema(
@@ -14,7 +14,14 @@ class PaymentConfig(AppConfig):
 
     def ready(self) -> None:
         import rozert_pay.common.tasks  # noqa
-        import rozert_pay.payment.controller_registry  # noqa
+
+        # Tasks of payment systems are not autodiscovered and must be
+        # registered without importing controllers.
+        import rozert_pay.payment.systems.bitso_spei.tasks  # noqa
+        import rozert_pay.payment.systems.muwe_spei.tasks  # noqa
+        from rozert_pay.payment.controller_registry import PAYMENT_SYSTEMS
+
+        PAYMENT_SYSTEMS.preload(settings.PAYMENT_SYSTEMS_PRELOAD)
 
         if settings.SENTRY_DSN:
             sentry_sdk.init(
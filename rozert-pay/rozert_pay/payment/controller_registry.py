@@ -1,99 +1,130 @@
-from typing import Any, TypedDict
+"""
+Registry of payment system controllers.
 
+Controllers are imported on first lookup, so a process pays import time and
+memory only for payment systems it works with. Systems which should be
+imported on startup (e.g. before gunicorn/celery forks workers) are set per
+process with PAYMENT_SYSTEMS_PRELOAD setting.
+"""
+import logging
+from collections.abc import Collection, Iterator, Mapping
+from typing import TYPE_CHECKING, Any, TypedDict
+
+from django.utils.module_loading import import_string
 from rozert_pay.common import const
-from rozert_pay.payment.systems.appex.appex_controller import appex_controller
-from rozert_pay.payment.systems.base_controller import PaymentSystemController
-from rozert_pay.payment.systems.bitso_spei.bitso_spei_controller import (
-    bitso_spei_controller,
-)
-from rozert_pay.payment.systems.cardpay_systems.cardpay_applepay.controller import (
-    cardpay_applepay_controller,
-)
-from rozert_pay.payment.systems.cardpay_systems.cardpay_cards.controller import (
-    cardpay_cards_controller,
-)
-from rozert_pay.payment.systems.conekta.conekta_oxxo import conekta_oxxo_controller
-from rozert_pay.payment.systems.d24_mercadopago.controller import (
-    d24_mercadopago_controller,
-)
-from rozert_pay.payment.systems.ilixium.ilixium_controller import ilixium_controller
-from rozert_pay.payment.systems.mpesa_mz.controller import mpesa_mz_controller
-from rozert_pay.payment.systems.muwe_spei.controller import muwe_spei_controller
-from rozert_pay.payment.systems.nuvei.nuvei_controller import nuvei_controller
-from rozert_pay.payment.systems.paycash import paycash_controller
-from rozert_pay.payment.systems.paypal import paypal_controller
-from rozert_pay.payment.systems.spei_stp.controller import spei_controller
-from rozert_pay.payment.systems.stp_codi.controller import stp_codi_controller
-from rozert_pay.payment.systems.worldpay.worldpay_controller import worldpay_controller
+
+if TYPE_CHECKING:  # pragma: no cover
+    from rozert_pay.payment.systems.base_controller import PaymentSystemController
+
+logger = logging.getLogger(__name__)
+
+PRELOAD_ALL = "all"
 
 _V = TypedDict(
     "_V",
     {
         "name": str,
-        "controller": PaymentSystemController[Any, Any],
+        "controller": "PaymentSystemController[Any, Any]",
     },
 )
 
 
-PAYMENT_SYSTEMS: dict[const.PaymentSystemType, _V] = {
-    const.PaymentSystemType.PAYCASH: {
-        "name": "PayCash",
-        "controller": paycash_controller,
-    },
-    const.PaymentSystemType.STP_SPEI: {
-        "name": "STP SPEI",
-        "controller": spei_controller,
-    },
-    const.PaymentSystemType.STP_CODI: {
-        "name": "STP CODI",
-        "controller": stp_codi_controller,
-    },
-    const.PaymentSystemType.PAYPAL: {
-        "name": "PayPal",
-        "controller": paypal_controller,
-    },
-    const.PaymentSystemType.APPEX: {
-        "name": "Appex",
-        "controller": appex_controller,
-    },
-    const.PaymentSystemType.D24_MERCADOPAGO: {
-        "name": "D24 MercadoPago",
-        "controller": d24_mercadopago_controller,
-    },
-    const.PaymentSystemType.CONEKTA_OXXO: {
-        "name": "Conekta Oxxo",
-        "controller": conekta_oxxo_controller,
-    },
-    const.PaymentSystemType.BITSO_SPEI: {
-        "name": "Bitso SPEI",
-        "controller": bitso_spei_controller,
-    },
-    const.PaymentSystemType.MUWE_SPEI: {
-        "name": "Rozert MUWE SPEI",
-        "controller": muwe_spei_controller,
-    },
-    const.PaymentSystemType.CARDPAY_CARDS: {
-        "name": "Cardpay Cards",
-        "controller": cardpay_cards_controller,
-    },
-    const.PaymentSystemType.CARDPAY_APPLEPAY: {
-        "name": "Cardpay Applepay",
-        "controller": cardpay_applepay_controller,
-    },
-    const.PaymentSystemType.ILIXIUM: {
-        "name": "Ilixium",
-        "controller": ilixium_controller,
-    },
-    const.PaymentSystemType.WORLDPAY: {
-        "name": "Worldpay",
-        "controller": worldpay_controller,
-    },
-    const.PaymentSystemType.NUVEI: {
-        "name": "Nuvei",
-        "controller": nuvei_controller,
-    },
-    const.PaymentSystemType.MPESA_MZ: {
-        "name": "M-Pesa MZ",
-        "controller": mpesa_mz_controller,
-    },
-}
+class _LazyPaymentSystems(Mapping[const.PaymentSystemType, _V]):
+    def __init__(self, paths: dict[const.PaymentSystemType, tuple[str, str]]):
+        self._paths = paths
+        self._loaded: dict[const.PaymentSystemType, _V] = {}
+
+    def __getitem__(self, type: const.PaymentSystemType) -> _V:
+        if cfg := self._loaded.get(type):
+            return cfg
+
+        name, path = self._paths[type]
+        cfg: _V = {"name": name, "controller": import_string(path)}
+        self._loaded[type] = cfg
+        return cfg
+
+    def __iter__(self) -> Iterator[const.PaymentSystemType]:
+        return iter(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def is_loaded(self, type: const.PaymentSystemType) -> bool:
+        return type in self._loaded
+
+    def preload(self, types: Collection[str]) -> None:
+        to_load = [const.PaymentSystemType(t) for t in types if t != PRELOAD_ALL]
+        if PRELOAD_ALL in types:
+            to_load = list(self._paths)
+
+        for type in to_load:
+            self[type]
+
+        if to_load:
+            logger.info("Preloaded payment systems", extra={"types": to_load})
+
+
+PAYMENT_SYSTEMS = _LazyPaymentSystems(
+    {
+        const.PaymentSystemType.PAYCASH: (
+            "PayCash",
+            "rozert_pay.payment.systems.paycash.paycash_controller",
+        ),
+        const.PaymentSystemType.STP_SPEI: (
+            "STP SPEI",
+            "rozert_pay.payment.systems.spei_stp.controller.spei_controller",
+        ),
+        const.PaymentSystemType.STP_CODI: (
+            "STP CODI",
+            "rozert_pay.payment.systems.stp_codi.controller.stp_codi_controller",
+        ),
+        const.PaymentSystemType.PAYPAL: (
+            "PayPal",
+            "rozert_pay.payment.systems.paypal.paypal_controller",
+        ),
+        const.PaymentSystemType.APPEX: (
+            "Appex",
+            "rozert_pay.payment.systems.appex.appex_controller.appex_controller",
+        ),
+        const.PaymentSystemType.D24_MERCADOPAGO: (
+            "D24 MercadoPago",
+            "rozert_pay.payment.systems.d24_mercadopago.controller.d24_mercadopago_controller",
+        ),
+        const.PaymentSystemType.CONEKTA_OXXO: (
+            "Conekta Oxxo",
+            "rozert_pay.payment.systems.conekta.conekta_oxxo.conekta_oxxo_controller",
+        ),
+        const.PaymentSystemType.BITSO_SPEI: (
+            "Bitso SPEI",
+            "rozert_pay.payment.systems.bitso_spei.bitso_spei_controller.bitso_spei_controller",
+        ),
+        const.PaymentSystemType.MUWE_SPEI: (
+            "Rozert MUWE SPEI",
+            "rozert_pay.payment.systems.muwe_spei.controller.muwe_spei_controller",
+        ),
+        const.PaymentSystemType.CARDPAY_CARDS: (
+            "Cardpay Cards",
+            "rozert_pay.payment.systems.cardpay_systems.cardpay_cards.controller.cardpay_cards_controller",
+        ),
+        const.PaymentSystemType.CARDPAY_APPLEPAY: (
+            "Cardpay Applepay",
+            "rozert_pay.payment.systems.cardpay_systems.cardpay_applepay.controller.cardpay_applepay_controller",
+        ),
+        const.PaymentSystemType.ILIXIUM: (
+            "Ilixium",
+            "rozert_pay.payment.systems.ilixium.ilixium_controller.ilixium_controller",
+        ),
+        const.PaymentSystemType.WORLDPAY: (
+            "Worldpay",
+            "rozert_pay.payment.systems.worldpay.worldpay_controller.worldpay_controller",
+        ),
+        const.PaymentSystemType.NUVEI: (
+            "Nuvei",
+            "rozert_pay.payment.systems.nuvei.nuvei_controller.nuvei_controller",
+        ),
+        const.PaymentSystemType.MPESA_MZ: (
+            "M-Pesa MZ",
+            "rozert_pay.payment.systems.mpesa_mz.controller.mpesa_mz_controller",
+        ),
+    }
+)
@@ -0,0 +1,22 @@
+import argparse
+from typing import Any
+
+from django.core.management import BaseCommand
+from rozert_pay.payment.services.transaction_merchant_keys import (
+    backfill_transaction_merchant_keys,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Sets merchant / merchant_wallet of transactions created without them "
+        "(e.g. by previous release during deploy). Existing transactions are "
+        "filled by payment migration 0054."
+    )
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        updated = backfill_transaction_merchant_keys(chunk_size=options["chunk_size"])
+        self.stdout.write(f"Updated {updated} transactions")
@@ -0,0 +1,113 @@
+import io
+import statistics
+import threading
+import time
+from typing import Any
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection, connections
+from rozert_pay.common import metrics
+from rozert_pay.payment.api_v1.views import CallbackView
+from rozert_pay.payment.models import IncomingCallback, PaymentSystem
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures p50/p99 latency and throughput of the callback endpoint "
+        "served by WSGI handler in worker threads (like gunicorn sync workers): "
+        "new DB connection per request vs persistent connections. "
+        "Runs against the configured (local) Postgres, created callbacks are deleted."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--system", required=True, help="Payment system slug")
+        parser.add_argument("--body", default="{}")
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--conn-max-age", type=int, default=60)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if not PaymentSystem.objects.filter(slug=options["system"]).exists():
+            raise CommandError(f"Payment system {options['system']} not found")
+
+        started_at_id = (
+            IncomingCallback.objects.order_by("-id")
+            .values_list("id", flat=True)
+            .first()
+            or 0
+        )
+        settings_dict = connections.settings[connection.alias]
+        conn_max_age = settings_dict["CONN_MAX_AGE"]
+        throttle_classes = CallbackView.throttle_classes
+        CallbackView.throttle_classes = []
+        try:
+            for name, max_age in [
+                ("new connection per request", 0),
+                ("persistent connections", options["conn_max_age"]),
+            ]:
+                settings_dict["CONN_MAX_AGE"] = max_age
+                opened_before = self._connections_opened()
+                durations, total = self._run(options)
+                p50, p99 = self._percentiles(durations)
+                self.stdout.write(
+                    f"{name}: p50={p50:.2f}ms p99={p99:.2f}ms "
+                    f"rps={len(durations) / total:.0f} "
+                    f"connections={self._connections_opened() - opened_before:.0f}"
+                )
+        finally:
+            CallbackView.throttle_classes = throttle_classes
+            settings_dict["CONN_MAX_AGE"] = conn_max_age
+            IncomingCallback.objects.filter(
+                id__gt=started_at_id, system__slug=options["system"]
+            ).delete()
+
+    def _run(self, options: dict[str, Any]) -> tuple[list[float], float]:
+        handler = WSGIHandler()
+        path = f"/api/payment/v1/callback/{options['system']}/"
+        body = options["body"].encode()
+        durations: list[float] = []
+        per_worker = options["requests"] // options["workers"]
+
+        def worker() -> None:
+            try:
+                for _ in range(per_worker):
+                    start = time.perf_counter()
+                    self._request(handler, path, body)
+                    durations.append((time.perf_counter() - start) * 1000)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(options["workers"])]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return durations, time.perf_counter() - start
+
+    def _request(self, handler: WSGIHandler, path: str, body: bytes) -> None:
+        environ: dict[str, Any] = {
+            "REQUEST_METHOD": "POST",
+            "PATH_INFO": path,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+        }
+        setup_testing_defaults(environ)
+        response = handler(environ, lambda status, headers: None)
+        # request_finished closes or keeps DB connection, as in WSGI server
+        response.close()
+
+    def _connections_opened(self) -> float:
+        return sum(
+            sample.value
+            for metric in metrics.DB_CONNECTIONS_OPENED.collect()
+            for sample in metric.samples
+            if sample.name.endswith("_total")
+        )
+
+    def _percentiles(self, durations: list[float]) -> tuple[float, float]:
+        quantiles = statistics.quantiles(durations, n=100)
+        return quantiles[49], quantiles[98]
@@ -0,0 +1,106 @@
+import statistics
+import time
+import uuid
+from typing import Any, Callable, Iterable
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+from rozert_pay.payment.models import Customer, CustomerCard
+
+ENCRYPTED_CUSTOMER_FIELDS = ["email_encrypted", "phone_encrypted", "extra_encrypted"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures loading of customers list and cards with select_related customer: "
+        "lazy decryption vs decryption of every encrypted field on load. "
+        "Test data is created in a transaction which is rolled back."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--rows", type=int, default=500)
+        parser.add_argument("--repeats", type=int, default=20)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        rows, repeats = options["rows"], options["repeats"]
+
+        with transaction.atomic():
+            self._create_data(rows)
+
+            def load_customers() -> list[Customer]:
+                return list(Customer.objects.order_by("-id")[:rows])
+
+            def load_cards() -> list[CustomerCard]:
+                return list(
+                    CustomerCard.objects.select_related("customer").order_by("-id")[
+                        :rows
+                    ]
+                )
+
+            self._compare(
+                "customers list",
+                load_customers,
+                lambda customers: customers,
+                repeats,
+            )
+            self._compare(
+                "cards select_related(customer)",
+                load_cards,
+                lambda cards: [card.customer for card in cards],
+                repeats,
+            )
+
+            transaction.set_rollback(True)
+
+    def _create_data(self, rows: int) -> None:
+        customers = Customer.objects.bulk_create(
+            [
+                Customer(
+                    external_id=f"benchmark-{uuid.uuid4()}",
+                    email_encrypted=f"customer{i}@example.com",
+                    phone_encrypted=f"+52155{i:08d}",
+                    extra_encrypted={"user_data_history": [{"first_name": "Name"}]},
+                )
+                for i in range(rows)
+            ]
+        )
+        CustomerCard.objects.bulk_create(
+            [
+                CustomerCard(
+                    unique_identity=str(uuid.uuid4()),
+                    card_data={"card_num": "4111111111111111"},
+                    customer=customer,
+                )
+                for customer in customers
+            ]
+        )
+
+    def _compare(
+        self,
+        name: str,
+        load: Callable[[], list[Any]],
+        get_customers: Callable[[list[Any]], Iterable[Customer]],
+        repeats: int,
+    ) -> None:
+        def load_lazy() -> None:
+            load()
+
+        def load_eager() -> None:
+            # Decryption on load, as it was before lazy values
+            for customer in get_customers(load()):
+                for field in ENCRYPTED_CUSTOMER_FIELDS:
+                    value = getattr(customer, field)
+                    if value is not None:
+                        value.get_secret_value()
+
+        for mode, func in [("eager", load_eager), ("lazy", load_lazy)]:
+            p50 = self._measure(func, repeats)
+            self.stdout.write(f"{name}, {mode} decryption: p50={p50:.2f}ms")
+
+    def _measure(self, func: Callable[[], None], repeats: int) -> float:
+        durations = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func()
+            durations.append((time.perf_counter() - start) * 1000)
+        return statistics.median(durations)
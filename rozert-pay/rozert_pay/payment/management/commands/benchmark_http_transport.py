@@ -0,0 +1,80 @@
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+import requests
+from django.core.management.base import BaseCommand, CommandParser
+from rozert_pay.common.helpers import http_transport
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+    # Keep-alive requires HTTP/1.1
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        body = json.dumps({"status": "PENDING"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures p50/p99 latency of repeated status checks against a local "
+        "stub server: new session per check vs process connections pool."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--latency-ms", type=float, default=0)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        latency = options["latency_ms"] / 1000
+
+        class Handler(_StatusHandler):
+            def setup(self) -> None:
+                # Emulates network round trip on connection establishing
+                time.sleep(latency)
+                super().setup()
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/status"
+
+        try:
+            for name, new_session in [
+                ("new session per check", requests.Session),
+                ("pooled session per check", http_transport.PooledSession),
+            ]:
+                durations = self._run(url, new_session, options["requests"])
+                p50, p99 = self._percentiles(durations)
+                self.stdout.write(f"{name}: p50={p50:.2f}ms p99={p99:.2f}ms")
+        finally:
+            server.shutdown()
+
+    def _run(
+        self,
+        url: str,
+        new_session: Callable[[], requests.Session],
+        count: int,
+    ) -> list[float]:
+        durations = []
+        for _ in range(count):
+            start = time.perf_counter()
+            session = new_session()
+            session.get(url, timeout=5).raise_for_status()
+            session.close()
+            durations.append((time.perf_counter() - start) * 1000)
+        return durations
+
+    def _percentiles(self, durations: list[float]) -> tuple[float, float]:
+        quantiles = statistics.quantiles(durations, n=100)
+        return quantiles[49], quantiles[98]
@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from rozert_pay.payment import controller_registry
+
+# Starts django in a clean process and reports setup time, max RSS and
+# imported payment system modules.
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+
+start = time.perf_counter()
+import django
+
+django.setup()
+duration = time.perf_counter() - start
+
+sys.stdout.write(json.dumps({
+    "duration": duration,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": [m for m in sys.modules if m.startswith("rozert_pay.payment.systems.")],
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures django startup time and memory with lazily imported payment "
+        "system controllers vs all controllers preloaded."
+    )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        for name, preload in [
+            ("lazy", ""),
+            ("preload all", controller_registry.PRELOAD_ALL),
+        ]:
+            result = self._startup(preload)
+            self.stdout.write(
+                f"{name}: {result['duration']:.2f}s "
+                f"max_rss={result['max_rss_kb'] // 1024}MB "
+                f"payment_system_modules={len(result['modules'])}"
+            )
+
+    def _startup(self, preload: str) -> dict[str, Any]:
+        result = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT],
+            # manage.py sets DJANGO_SETTINGS_MODULE
+            env={**os.environ, "PAYMENT_SYSTEMS_PRELOAD": preload},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.3 on 2026-10-16 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0046_alter_paymenttransaction_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="currencywallet",
+            name="balance_shards_count",
+            field=models.PositiveSmallIntegerField(
+                default=0,
+                help_text="Number of balance shards, 0 disables sharding. When enabled, balance fields hold only a part of the balance, the rest is in balance shards. Change via BalanceUpdateService.set_balance_shards_count() only.",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-16 22:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0047_currencywallet_balance_shards_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outcomingcallback",
+            name="next_attempt_at",
+            field=models.DateTimeField(
+                blank=True,
+                default=django.utils.timezone.now,
+                help_text="When pending callback is due for sending. While callback is being sent, it's moved forward, so other workers skip it.",
+                null=True,
+            ),
+        ),
+    ]
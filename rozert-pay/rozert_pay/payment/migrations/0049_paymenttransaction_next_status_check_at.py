@@ -0,0 +1,64 @@
+# Generated by Django 5.1.3 on 2026-10-16 23:00
+
+import django.utils.timezone
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0048_outcomingcallback_next_attempt_at"),
+    ]
+
+    atomic = False
+
+    operations = [
+        migrations.AddField(
+            model_name="paymenttransaction",
+            name="next_status_check_at",
+            field=models.DateTimeField(
+                blank=True,
+                default=django.utils.timezone.now,
+                help_text="When the next periodic status check is due, while check_status_until is set",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="paymenttransaction",
+            name="status_checks_count",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Number of periodic status checks scheduled"
+            ),
+        ),
+        # Schedule was kept in extra before
+        migrations.RunSQL(
+            """
+UPDATE "payment_paymenttransaction"
+SET
+    "status_checks_count" = COALESCE(("extra"->>'count_status_checks_scheduled')::integer, 0),
+    "next_status_check_at" = CASE
+        WHEN "extra" ? 'last_status_check_schedule' THEN
+            to_timestamp(("extra"->>'last_status_check_schedule')::double precision)
+            + CASE
+                WHEN COALESCE(("extra"->>'count_status_checks_scheduled')::integer, 0) <= 5 THEN interval '1 minute'
+                WHEN COALESCE(("extra"->>'count_status_checks_scheduled')::integer, 0) <= 11 THEN interval '5 minutes'
+                WHEN COALESCE(("extra"->>'count_status_checks_scheduled')::integer, 0) <= 15 THEN interval '15 minutes'
+                ELSE interval '1 hour'
+            END
+        ELSE now()
+    END
+WHERE "status" = 'pending' AND "check_status_until" IS NOT NULL;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        AddIndexConcurrently(
+            model_name="paymenttransaction",
+            index=models.Index(
+                condition=models.Q(
+                    ("check_status_until__isnull", False), ("status", "pending")
+                ),
+                fields=["next_status_check_at"],
+                name="payment_trx_next_status_check_idx",
+            ),
+        ),
+    ]
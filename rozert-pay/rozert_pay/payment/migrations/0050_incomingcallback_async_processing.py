@@ -0,0 +1,72 @@
+# Generated by Django 5.1.3 on 2026-10-16 23:30
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0049_paymenttransaction_next_status_check_at"),
+    ]
+
+    atomic = False
+
+    operations = [
+        migrations.AddField(
+            model_name="paymentsystem",
+            name="async_callbacks_enabled",
+            field=models.BooleanField(
+                default=False,
+                help_text="Acknowledge callbacks right after signature check and process them in background, in order of receiving. Ignored if payment system response depends on callback processing result.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="incomingcallback",
+            name="event_id",
+            field=models.CharField(
+                blank=True,
+                help_text="Id of the event in payment system, for asynchronously processed callbacks",
+                max_length=255,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="incomingcallback",
+            name="queued_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Set while callback is waiting for asynchronous processing",
+                null=True,
+            ),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name="incomingcallback",
+                    constraint=models.UniqueConstraint(
+                        condition=models.Q(("event_id__isnull", False)),
+                        fields=("system", "event_id"),
+                        name="incomingcallback_event_id_uniq",
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    """
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "incomingcallback_event_id_uniq"
+ON "payment_incomingcallback" ("system_id", "event_id")
+WHERE "event_id" IS NOT NULL;
+                    """,
+                    reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS "incomingcallback_event_id_uniq";',
+                ),
+            ],
+        ),
+        AddIndexConcurrently(
+            model_name="incomingcallback",
+            index=models.Index(
+                condition=models.Q(("queued_at__isnull", False)),
+                fields=["system", "id"],
+                name="incomingcallback_queued_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.3 on 2026-10-17 00:30
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0050_incomingcallback_async_processing"),
+    ]
+
+    atomic = False
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="paymenttransaction",
+            index=models.Index(
+                fields=["created_at", "id"], name="paymenttransaction_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.3 on 2026-10-17 02:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0052_paymenttransaction_updated_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="paymenttransaction",
+            name="merchant_wallet",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="payment.wallet",
+            ),
+        ),
+        migrations.AddField(
+            model_name="paymenttransaction",
+            name="merchant",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="payment.merchant",
+            ),
+        ),
+    ]
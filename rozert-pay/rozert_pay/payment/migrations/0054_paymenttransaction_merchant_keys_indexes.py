@@ -0,0 +1,54 @@
+# Generated by Django 5.1.3 on 2026-10-17 02:00
+
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    RemoveIndexConcurrently,
+)
+from django.db import migrations, models
+from rozert_pay.payment.services.transaction_merchant_keys import (
+    backfill_transaction_merchant_keys,
+)
+
+
+def backfill_merchant_keys(apps, schema_editor) -> None:
+    backfill_transaction_merchant_keys(apps=apps)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0053_paymenttransaction_merchant_keys"),
+    ]
+
+    # Not atomic: backfill commits chunk by chunk and indexes are built
+    # concurrently. Merchant-scoped queries rely on filled columns, so
+    # backfill runs before the indexes they use are created.
+    atomic = False
+
+    operations = [
+        migrations.RunPython(backfill_merchant_keys, migrations.RunPython.noop),
+        RemoveIndexConcurrently(
+            model_name="paymenttransaction",
+            name="paymenttransaction_updated_idx",
+        ),
+        AddIndexConcurrently(
+            model_name="paymenttransaction",
+            index=models.Index(
+                fields=["merchant", "updated_at", "id"],
+                name="paymenttransaction_m_upd_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="paymenttransaction",
+            index=models.Index(
+                fields=["merchant", "created_at", "id"],
+                name="paymenttransaction_m_crt_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="paymenttransaction",
+            index=models.Index(
+                fields=["merchant_wallet", "status", "created_at"],
+                name="paymenttransaction_w_st_idx",
+            ),
+        ),
+    ]
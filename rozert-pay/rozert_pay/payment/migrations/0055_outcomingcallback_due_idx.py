@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-17 03:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0054_paymenttransaction_merchant_keys_indexes"),
+    ]
+
+    atomic = False
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="outcomingcallback",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["next_attempt_at"],
+                name="outcomingcallback_due_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.3 on 2026-10-17 03:30
+
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    RemoveIndexConcurrently,
+)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0055_outcomingcallback_due_idx"),
+    ]
+
+    atomic = False
+
+    operations = [
+        migrations.AddField(
+            model_name="incomingcallback",
+            name="queue_key",
+            field=models.CharField(
+                blank=True,
+                help_text="Asynchronously processed callbacks with the same key are processed in order of receiving",
+                max_length=255,
+                null=True,
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="incomingcallback",
+            name="incomingcallback_queued_idx",
+        ),
+        AddIndexConcurrently(
+            model_name="incomingcallback",
+            index=models.Index(
+                condition=models.Q(("queued_at__isnull", False)),
+                fields=["system", "queue_key", "id"],
+                name="incomingcallback_queue_idx",
+            ),
+        ),
+    ]
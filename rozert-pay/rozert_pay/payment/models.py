@@ -17,6 +17,7 @@ from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models import QuerySet, Value
 from django.db.models.functions import Upper
+from django.utils import timezone
 from django.utils.functional import cached_property
 from rozert_pay.common import const, fields
 from rozert_pay.common.encryption import (
@@ -28,12 +29,17 @@ from rozert_pay.common.encryption import (
 from rozert_pay.common.models import BaseDjangoModel
 from rozert_pay.payment import entities, types
 from rozert_pay.payment.factories import get_payment_system_controller
+from rozert_pay.payment.services import credentials_cache
 
 from .entities import UserData
 from .permissions import CommonUserPermissions, PaymentPermissions
 from .systems.bitso_spei.bitso_spei_const import BITSO_CLAVE_RASTREO_FIELD
 
+if ty.TYPE_CHECKING:  # pragma: no cover
+    from rozert_pay.balances.services import WalletBalances
+
 BITSO_SPEI_PAYOUT_LOOKUP_INDEX_NAME = "payment_trx_bitso_spei_lookup_idx"
+PERIODIC_STATUS_CHECK_INDEX_NAME = "payment_trx_next_status_check_idx"
 
 
 class MerchantGroup(BaseDjangoModel):
@@ -128,6 +134,12 @@ class PaymentSystem(BaseDjangoModel):
         blank=True,
         help_text="Secret key for callbacks from payment system",
     )
+    async_callbacks_enabled = models.BooleanField(
+        default=False,
+        help_text="Acknowledge callbacks right after signature check and process them "
+        "in background, in order of receiving. Ignored if payment system response "
+        "depends on callback processing result.",
+    )
 
     def clean(self) -> None:
         super().clean()
@@ -199,6 +211,19 @@ class Wallet(BaseDjangoModel):
         if not self.merchant.sandbox:
             controller.client_cls.parse_and_validate_credentials(self.credentials)
 
+    def save(
+        self,
+        *args: ty.Any,
+        **kwargs: ty.Any,
+    ) -> None:
+        # updated_at is the version of cached credentials
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "credentials" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "updated_at"}
+
+        super().save(*args, **kwargs)
+        credentials_cache.invalidate(self.id)
+
     def __str__(self) -> str:
         if self.merchant.sandbox:
             sandbox = "[SANDBOX] "
@@ -232,18 +257,43 @@ class CurrencyWallet(BaseDjangoModel):
         default=0,
         help_text="Part of operational_balance that is awaiting settlement from a provider.",
     )
+    balance_shards_count = models.PositiveSmallIntegerField(
+        default=0,
+        help_text=(
+            "Number of balance shards, 0 disables sharding. When enabled, balance fields "
+            "hold only a part of the balance, the rest is in balance shards. "
+            "Change via BalanceUpdateService.set_balance_shards_count() only."
+        ),
+    )
+
+    @property
+    def balances(self) -> "WalletBalances":
+        """
+        Balances of the whole wallet: balance fields of sharded wallets
+        hold only a part of it.
+        """
+        from rozert_pay.balances.services import get_currency_wallet_balances
+
+        return get_currency_wallet_balances(self)
 
     @property
     def available_balance(self) -> Decimal:
-        return self.operational_balance - self.frozen_balance - self.pending_balance
+        return self.balances.available_balance
 
     def __str__(self) -> str:
+        # Row fields only, no queries: totals of sharded wallets are shown
+        # in admin explicitly
+        if self.balance_shards_count:
+            return f"{self.currency} Wallet #{self.id} | Sharded"
+        available = (
+            self.operational_balance - self.frozen_balance - self.pending_balance
+        )
         return (
             f"{self.currency} Wallet #{self.id} | "
             f"Op: {self.operational_balance:.2f}, "
             f"Fr: {self.frozen_balance:.2f}, "
             f"Pen: {self.pending_balance:.2f}, "
-            f"Av: {self.available_balance:.2f}"
+            f"Av: {available:.2f}"
         )
 
     class Meta:
@@ -251,14 +301,14 @@ class CurrencyWallet(BaseDjangoModel):
 
 
 class PaymentTransactionManager(models.Manager["PaymentTransaction"]):
-    def transactions_for_periodic_status_check(self) -> "QuerySet[PaymentTransaction]":
-        return (
-            self.filter(
-                status=const.TransactionStatus.PENDING,
-                check_status_until__isnull=False,
-            )
-            .select_related("wallet")
-            .order_by("created_at")
+    def due_for_periodic_status_check(
+        self, now: datetime.datetime
+    ) -> "QuerySet[PaymentTransaction]":
+        # Matches PERIODIC_STATUS_CHECK_INDEX_NAME condition
+        return self.filter(
+            status=const.TransactionStatus.PENDING,
+            check_status_until__isnull=False,
+            next_status_check_at__lte=now,
         )
 
     def for_system(
@@ -466,6 +516,8 @@ class CustomerCard(BaseDjangoModel):
 class PaymentTransaction(BaseDjangoModel):
     id: types.TransactionId  # type: ignore[assignment]
     wallet_id: types.CurrencyWalletId
+    merchant_wallet_id: types.WalletId | None
+    merchant_id: types.MerchantID | None
     customer_id: types.CustomerId
 
     class Meta:
@@ -483,6 +535,34 @@ class PaymentTransaction(BaseDjangoModel):
             ),
         ]
         indexes = [
+            # Keyset pagination of transactions list
+            models.Index(
+                fields=["created_at", "id"],
+                name="paymenttransaction_created_idx",
+            ),
+            # Transactions changes feed
+            models.Index(
+                fields=["merchant", "updated_at", "id"],
+                name="paymenttransaction_m_upd_idx",
+            ),
+            # Merchant transactions list / ACL
+            models.Index(
+                fields=["merchant", "created_at", "id"],
+                name="paymenttransaction_m_crt_idx",
+            ),
+            # Wallet limits and reports
+            models.Index(
+                fields=["merchant_wallet", "status", "created_at"],
+                name="paymenttransaction_w_st_idx",
+            ),
+            models.Index(
+                fields=["next_status_check_at"],
+                name=PERIODIC_STATUS_CHECK_INDEX_NAME,
+                condition=models.Q(
+                    status=const.TransactionStatus.PENDING,
+                    check_status_until__isnull=False,
+                ),
+            ),
             models.Index(
                 Upper(
                     models.Func(
@@ -509,6 +589,25 @@ class PaymentTransaction(BaseDjangoModel):
     uuid = models.UUIDField(unique=True, default=uuid.uuid4)
 
     wallet = models.ForeignKey(CurrencyWallet, on_delete=models.CASCADE)
+    # Denormalized wallet.wallet and wallet.wallet.merchant, so ACL, API and
+    # limits queries filter transactions without joins. Set on save, indexed
+    # by composite indexes in Meta.
+    merchant_wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        db_index=False,
+    )
+    merchant = models.ForeignKey(
+        Merchant,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        db_index=False,
+    )
     system_type: const.PaymentSystemType = models.CharField(
         max_length=200, choices=const.PaymentSystemType.choices
     )  # type: ignore[assignment]
@@ -566,6 +665,15 @@ class PaymentTransaction(BaseDjangoModel):
     extra = models.JSONField(blank=True, default=dict)
 
     check_status_until = models.DateTimeField(null=True, blank=True)
+    next_status_check_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        default=timezone.now,
+        help_text="When the next periodic status check is due, while check_status_until is set",
+    )
+    status_checks_count = models.PositiveIntegerField(
+        default=0, help_text="Number of periodic status checks scheduled"
+    )
 
     # Account of the user in the payment system
     external_account_id = models.CharField(max_length=200, null=True, blank=True)
@@ -642,8 +750,14 @@ class PaymentTransaction(BaseDjangoModel):
         if self.currency2 is None:
             self.currency2 = self.currency
             updated_fields.add("currency2")
-
-        if update_fields is not None and updated_fields:
+        if self.merchant_wallet_id is None or self.merchant_id is None:
+            self.merchant_wallet_id = self.wallet.wallet_id
+            self.merchant_id = self.wallet.wallet.merchant_id
+            updated_fields |= {"merchant_wallet", "merchant"}
+
+        if update_fields is not None:
+            # Changes feed relies on updated_at of every saved change
+            updated_fields.add("updated_at")
             kwargs["update_fields"] = set(update_fields) | updated_fields
 
         super().save(*args, **kwargs)
@@ -699,6 +813,15 @@ class EventLog(BaseDjangoModel):
 
 
 class OutcomingCallback(BaseDjangoModel):
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at"],
+                name="outcomingcallback_due_idx",
+                condition=models.Q(status=const.CallbackStatus.PENDING),
+            ),
+        ]
+
     def get_transaction_id(self) -> types.TransactionId:
         return ty.cast(types.TransactionId, self.transaction_id)
 
@@ -720,6 +843,12 @@ class OutcomingCallback(BaseDjangoModel):
     last_attempt_at = models.DateTimeField(null=True, blank=True)
     max_attempts = models.PositiveIntegerField(default=10)
     current_attempt = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        default=timezone.now,
+        help_text="When pending callback is due for sending. While callback is being sent, it's moved forward, so other workers skip it.",
+    )
 
 
 class CustomJsonEncoder(json.JSONEncoder):
@@ -730,6 +859,22 @@ class CustomJsonEncoder(json.JSONEncoder):
 
 
 class IncomingCallback(BaseDjangoModel):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["system", "event_id"],
+                name="incomingcallback_event_id_uniq",
+                condition=models.Q(event_id__isnull=False),
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["system", "queue_key", "id"],
+                name="incomingcallback_queue_idx",
+                condition=models.Q(queued_at__isnull=False),
+            ),
+        ]
+
     def get_transaction_id(self) -> types.TransactionId:
         return ty.cast(types.TransactionId, self.transaction_id)
 
@@ -760,6 +905,23 @@ class IncomingCallback(BaseDjangoModel):
     remote_transaction_status = models.JSONField(
         default=dict, encoder=CustomJsonEncoder
     )
+    event_id = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        help_text="Id of the event in payment system, for asynchronously processed callbacks",
+    )
+    queued_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Set while callback is waiting for asynchronous processing",
+    )
+    queue_key = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        help_text="Asynchronously processed callbacks with the same key are processed in order of receiving",
+    )
 
 
 class DepositAccount(BaseDjangoModel):
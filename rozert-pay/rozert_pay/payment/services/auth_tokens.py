@@ -0,0 +1,180 @@
+"""
+Process-wide cache of OAuth/session tokens of payment system clients.
+
+Tokens are kept in process memory and in Redis, keyed by provider name and
+hash of wallet credentials. Token is refreshed REFRESH_BEFORE_EXPIRY before
+it expires, one refresh per key at a time: threads of the process wait on
+a local lock, other processes wait on a Redis lock and take refreshed token
+from Redis.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+import typing as ty
+from collections import defaultdict
+from datetime import timedelta
+
+import requests
+from pydantic import BaseModel, SecretStr
+from redis.exceptions import LockError
+from rozert_pay.common.helpers import cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "auth_token:"
+REFRESH_BEFORE_EXPIRY = timedelta(seconds=60)
+REFRESH_LOCK_TIMEOUT = timedelta(seconds=30)
+
+
+class AuthToken(BaseModel):
+    value: str
+    expires_at: float
+    refresh_at: float
+
+    @classmethod
+    def from_expires_in(cls, value: str, expires_in: float) -> "AuthToken":
+        now = time.time()
+        refresh_before = min(REFRESH_BEFORE_EXPIRY.total_seconds(), expires_in / 2)
+        return cls(
+            value=value,
+            expires_at=now + expires_in,
+            refresh_at=now + expires_in - refresh_before,
+        )
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.refresh_at
+
+    def is_expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+
+_tokens: dict[cache.CacheKey, AuthToken] = {}
+_locks: defaultdict[cache.CacheKey, threading.Lock] = defaultdict(threading.Lock)
+_locks_lock = threading.Lock()
+
+
+def _get_lock(key: cache.CacheKey) -> threading.Lock:
+    with _locks_lock:
+        return _locks[key]
+
+
+def _unwrap_secrets(value: ty.Any) -> ty.Any:
+    if isinstance(value, SecretStr):
+        return value.get_secret_value()
+    if isinstance(value, BaseModel):
+        return {k: _unwrap_secrets(v) for k, v in value}
+    if isinstance(value, dict):
+        return {k: _unwrap_secrets(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_unwrap_secrets(v) for v in value]
+    return value
+
+
+def _token_key(provider: str, credentials: BaseModel) -> cache.CacheKey:
+    credentials_hash = hashlib.sha256(
+        json.dumps(_unwrap_secrets(credentials), sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return cache.CacheKey(f"{KEY_PREFIX}{provider}:{credentials_hash}")
+
+
+def _get_redis_token(key: cache.CacheKey) -> AuthToken | None:
+    if data := cache.redis_cache_get(key, dict):
+        return AuthToken(**data)
+    return None
+
+
+def _refresh(key: cache.CacheKey, fetch: ty.Callable[[], AuthToken]) -> AuthToken:
+    # Other process could refresh token while we were waiting for lock
+    if (token := _get_redis_token(key)) and token.is_fresh():
+        return token
+
+    token = fetch()
+    if not token.is_expired():
+        cache.redis_cache_set(
+            key,
+            token.model_dump(),
+            ttl=timedelta(seconds=token.expires_at - time.time()),
+        )
+    return token
+
+
+def get_token(
+    *,
+    provider: str,
+    credentials: BaseModel,
+    fetch: ty.Callable[[], AuthToken],
+) -> str:
+    """
+    Returns cached token of the credentials, fetch is called to get a new one.
+    """
+    key = _token_key(provider, credentials)
+    if (token := _tokens.get(key)) and token.is_fresh():
+        return token.value
+
+    with _get_lock(key):
+        if (token := _tokens.get(key)) and token.is_fresh():
+            return token.value
+
+        if (redis_token := _get_redis_token(key)) and redis_token.is_fresh():
+            _tokens[key] = redis_token
+            return redis_token.value
+
+        current = token or redis_token
+        try:
+            with cache.redis_lock(
+                cache.CacheKey(f"{key}:lock"),
+                timeout=REFRESH_LOCK_TIMEOUT,
+                blocking_timeout=REFRESH_LOCK_TIMEOUT,
+            ):
+                new_token = _refresh(key, fetch)
+        except LockError:
+            logger.warning("Unable to acquire token refresh lock", extra={"key": key})
+            new_token = fetch()
+        except Exception:
+            # Token is refreshed in advance, so current one can still be used
+            if current and not current.is_expired():
+                logger.warning(
+                    "Unable to refresh auth token", extra={"key": key}, exc_info=True
+                )
+                return current.value
+            raise
+
+        _tokens[key] = new_token
+        return new_token.value
+
+
+def invalidate_token(*, provider: str, credentials: BaseModel, value: str) -> None:
+    """
+    Drops token rejected by payment system. Token refreshed by others
+    in the meantime is kept.
+    """
+    key = _token_key(provider, credentials)
+    with _get_lock(key):
+        if (token := _tokens.get(key)) and token.value == value:
+            del _tokens[key]
+        if (redis_token := _get_redis_token(key)) and redis_token.value == value:
+            cache.redis_cache_delete(key)
+
+
+def request_with_token(
+    *,
+    provider: str,
+    credentials: BaseModel,
+    fetch: ty.Callable[[], AuthToken],
+    send: ty.Callable[[str], requests.Response],
+) -> requests.Response:
+    """
+    Sends request with cached token. If payment system responds with 401,
+    token is invalidated and request is sent once more with a new token.
+    """
+    token = get_token(provider=provider, credentials=credentials, fetch=fetch)
+    response = send(token)
+    if response.status_code != 401:
+        return response
+
+    logger.info("Auth token rejected, refreshing", extra={"provider": provider})
+    invalidate_token(provider=provider, credentials=credentials, value=token)
+    token = get_token(provider=provider, credentials=credentials, fetch=fetch)
+    return send(token)
@@ -13,10 +13,14 @@ from rozert_pay.common.helpers.log_utils import LogWriter
 from rozert_pay.payment import entities, models
 from rozert_pay.payment.entities import RemoteTransactionStatus
 from rozert_pay.payment.models import PaymentSystem, PaymentTransaction, Wallet
-from rozert_pay.payment.services import db_services, errors, incoming_callbacks
+from rozert_pay.payment.services import (
+    credentials_cache,
+    db_services,
+    errors,
+    incoming_callbacks,
+)
 from rozert_pay.payment.services.external_api_services import (
     ExternalApiSession,
-    PaymentTransactionEventLogOnRequest,
     PaymentTransactionEventLogOnResponse,
 )
 from rozert_pay.payment.tasks import sandbox_approve_transaction
@@ -39,7 +43,13 @@ class BasePaymentClient(ty.Generic[T_Credentials]):
 
     @classmethod
     def get_credentials(cls, trx: PaymentTransaction) -> T_Credentials:
-        return cls.get_credentials_from_dict(trx.wallet.wallet.credentials)
+        return cls.get_wallet_credentials(trx.wallet.wallet)
+
+    @classmethod
+    def get_wallet_credentials(cls, wallet: Wallet) -> T_Credentials:
+        return credentials_cache.get_credentials(
+            wallet, cls.credentials_cls, cls.parse_and_validate_credentials
+        )
 
     @classmethod
     def get_credentials_from_dict(cls, data: dict[str, Any]) -> T_Credentials:
@@ -51,12 +61,11 @@ class BasePaymentClient(ty.Generic[T_Credentials]):
 
     @cached_property
     def creds(self) -> T_Credentials:
-        return self.parse_and_validate_credentials(self.trx.wallet.wallet.credentials)
+        return self.get_wallet_credentials(self.trx.wallet.wallet)
 
     def __init__(self, trx_id: int, timeout: float = 10) -> None:
         self.trx_id = trx_id
         self.session = ExternalApiSession(
-            on_request=PaymentTransactionEventLogOnRequest(trx_id),
             on_response=PaymentTransactionEventLogOnResponse(trx_id),
             timeout=timeout,
         )
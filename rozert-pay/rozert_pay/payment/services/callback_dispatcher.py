@@ -0,0 +1,422 @@
+"""
+Sending of outcoming callbacks to merchants.
+
+Callbacks due for sending are claimed in batches with SKIP LOCKED. Claim
+moves next_attempt_at forward by the lease and commits, so row locks are
+not held during HTTP requests, and other dispatchers skip claimed callbacks.
+Result of the attempt is saved only while the claim is still held.
+Retries are scheduled by next_attempt_at, not by Celery countdowns.
+
+Requests to one merchant are limited by a Redis semaphore shared by all
+workers, callbacks of busy merchant are postponed.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import math
+import threading
+import typing as ty
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import cycle
+from urllib.parse import urlsplit
+
+import requests
+from django.db import connections, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from redis.exceptions import LockError
+from requests.adapters import HTTPAdapter
+from rozert_pay.common import const, metrics
+from rozert_pay.common.const import EventType
+from rozert_pay.common.helpers import cache
+from rozert_pay.common.helpers.log_utils import LogWriter
+from rozert_pay.common.metrics import track_duration
+from rozert_pay.payment.factories import get_payment_system_controller
+from rozert_pay.payment.models import OutcomingCallback
+from rozert_pay.payment.services import event_logs
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 30
+CLAIM_LEASE_MARGIN = timedelta(seconds=REQUEST_TIMEOUT)
+
+BATCH_SIZE = 200
+# Callbacks of one merchant claimed in one batch
+MAX_BATCH_SIZE_PER_MERCHANT = 20
+WORKERS_COUNT = 32
+# Concurrent requests to one merchant from all workers, so slow merchant
+# endpoint takes at most this number of workers.
+MAX_CONCURRENCY_PER_MERCHANT = 4
+# Callback of merchant having MAX_CONCURRENCY_PER_MERCHANT requests in
+# progress is sent by one of next dispatcher runs
+BUSY_MERCHANT_DELAY = timedelta(seconds=10)
+MAX_LANE_LENGTH = math.ceil(MAX_BATCH_SIZE_PER_MERCHANT / MAX_CONCURRENCY_PER_MERCHANT)
+
+
+def get_claim_lease(callbacks_count: int) -> timedelta:
+    """
+    Lease of callbacks sent one by one. Must be longer than sending takes,
+    otherwise callback can be claimed and sent again.
+    """
+    return timedelta(seconds=REQUEST_TIMEOUT * callbacks_count) + CLAIM_LEASE_MARGIN
+
+
+CLAIM_LEASE = get_claim_lease(1)
+
+_CALLBACK_RELATED = (
+    "transaction__wallet__wallet__merchant",
+    "transaction__wallet__wallet__system",
+)
+
+_sessions: dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def _get_session(url: str) -> requests.Session:
+    """
+    Returns session of the merchant host, to reuse keep-alive connections.
+    """
+    host = urlsplit(url).netloc
+    with _sessions_lock:
+        if (session := _sessions.get(host)) is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1, pool_maxsize=MAX_CONCURRENCY_PER_MERCHANT
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[host] = session
+        return session
+
+
+@transaction.atomic
+def claim_callback(callback_id: str | int) -> OutcomingCallback | None:
+    """
+    Claims one callback, if it's pending and due for sending.
+    """
+    now = timezone.now()
+    cb: OutcomingCallback | None = (
+        OutcomingCallback.objects.select_related(*_CALLBACK_RELATED)
+        .select_for_update(of=("self",))
+        .filter(id=callback_id)
+        .last()
+    )
+    if not cb:
+        logger.info(
+            "No callback found for sending, maybe was cancelled",
+            extra={
+                "callback_id": callback_id,
+            },
+        )
+        return None
+
+    if cb.status != const.CallbackStatus.PENDING:  # pragma: no cover
+        logger.warning(
+            "Trying to send callback with final status",
+            extra={
+                "callback_id": cb.id,
+                "status": cb.status,
+            },
+        )
+        return None
+
+    if cb.next_attempt_at and cb.next_attempt_at > now:
+        logger.info(
+            "Callback is being sent or retry is scheduled later",
+            extra={
+                "callback_id": cb.id,
+                "next_attempt_at": cb.next_attempt_at,
+            },
+        )
+        return None
+
+    cb.next_attempt_at = now + CLAIM_LEASE
+    cb.save(update_fields=["next_attempt_at", "updated_at"])
+    return cb
+
+
+@transaction.atomic
+def claim_due_callbacks(
+    limit: int = BATCH_SIZE,
+    limit_per_merchant: int = MAX_BATCH_SIZE_PER_MERCHANT,
+) -> list[OutcomingCallback]:
+    """
+    Claims due callbacks, at most limit_per_merchant per merchant.
+    Callbacks locked by other dispatchers are skipped.
+    """
+    now = timezone.now()
+    candidate_ids = list(
+        OutcomingCallback.objects.filter(
+            status=const.CallbackStatus.PENDING,
+            next_attempt_at__lte=now,
+        )
+        .annotate(
+            merchant_rank=Window(
+                RowNumber(),
+                partition_by=F("transaction__merchant_id"),
+                order_by=F("next_attempt_at").asc(),
+            )
+        )
+        .filter(merchant_rank__lte=limit_per_merchant)
+        .order_by("next_attempt_at")
+        .values_list("id", flat=True)[:limit]
+    )
+    callbacks = list(
+        OutcomingCallback.objects.select_related(*_CALLBACK_RELATED)
+        .select_for_update(of=("self",), skip_locked=True)
+        .filter(
+            id__in=candidate_ids,
+            status=const.CallbackStatus.PENDING,
+            next_attempt_at__lte=now,
+        )
+        .order_by("next_attempt_at")
+    )
+    # Callback is leased until all callbacks of its lane may be sent
+    for lane in split_into_lanes(callbacks):
+        lease = now + get_claim_lease(len(lane))
+        OutcomingCallback.objects.filter(id__in=[cb.id for cb in lane]).update(
+            next_attempt_at=lease, updated_at=now
+        )
+        for cb in lane:
+            cb.next_attempt_at = lease
+    return callbacks
+
+
+def split_into_lanes(
+    callbacks: list[OutcomingCallback],
+) -> list[list[OutcomingCallback]]:
+    """
+    Splits callbacks of each merchant into at most MAX_CONCURRENCY_PER_MERCHANT
+    lanes, callbacks of one lane are sent one by one.
+    """
+    by_merchant: dict[int, list[OutcomingCallback]] = defaultdict(list)
+    for cb in callbacks:
+        by_merchant[cb.transaction.wallet.wallet.merchant_id].append(cb)
+
+    lanes: list[list[OutcomingCallback]] = []
+    for merchant_callbacks in by_merchant.values():
+        merchant_lanes: list[list[OutcomingCallback]] = [
+            []
+            for _ in range(min(len(merchant_callbacks), MAX_CONCURRENCY_PER_MERCHANT))
+        ]
+        for lane, cb in zip(cycle(merchant_lanes), merchant_callbacks):
+            lane.append(cb)
+        lanes.extend(merchant_lanes)
+    return lanes
+
+
+def send_claimed_callback(cb: OutcomingCallback) -> None:
+    """
+    Sends claimed callback and records the attempt result. Callback is
+    postponed if merchant already gets MAX_CONCURRENCY_PER_MERCHANT requests.
+    """
+    merchant_id = cb.transaction.wallet.wallet.merchant_id
+    try:
+        with cache.redis_semaphore(
+            cache.CacheKey(f"outcoming_callbacks_sending:{merchant_id}"),
+            limit=MAX_CONCURRENCY_PER_MERCHANT,
+            timeout=CLAIM_LEASE,
+        ):
+            _send_claimed_callback(cb)
+    except LockError:
+        now = timezone.now()
+        OutcomingCallback.objects.filter(
+            id=cb.id, next_attempt_at=cb.next_attempt_at
+        ).update(next_attempt_at=now + BUSY_MERCHANT_DELAY, updated_at=now)
+        logger.info(
+            "Callback postponed, merchant is busy",
+            extra={"callback_id": cb.id, "merchant_id": merchant_id},
+        )
+
+
+def _send_claimed_callback(cb: OutcomingCallback) -> None:
+    log_writer = LogWriter()
+
+    log_writer.write("---")
+    log_writer.write(f"Send callback - attempt {cb.current_attempt}/{cb.max_attempts}")
+
+    body = json.dumps(cb.body).encode()
+    trx = cb.transaction
+    merchant = trx.wallet.wallet.merchant
+    secret_key = merchant.secret_key.encode()
+    expected_signature = base64.b64encode(
+        hmac.new(secret_key, body, hashlib.sha256).digest()
+    ).decode()
+
+    system = get_payment_system_controller(trx.system)
+    if not system:  # pragma: no cover
+        log_writer.write("Unsupported payment system")
+        logger.error("Unsupported payment system", extra={"system": trx.system})
+        cb.logs = (cb.logs or "") + "\n" + log_writer.to_string()
+        cb.save(update_fields=["logs", "updated_at"])
+        return
+
+    event_log: dict[str, ty.Any] = {
+        "body": body.decode(),
+        "signature": expected_signature,
+    }
+    error = None
+
+    try:
+        resp = _get_session(cb.target).post(
+            url=cb.target,
+            data=body,
+            headers={
+                "Content-Type": "application/json",
+                "X-Signature": expected_signature,
+            },
+            timeout=REQUEST_TIMEOUT,
+        )
+    except Exception as e:
+        event_log["error"] = str(e)
+        error = str(e)
+        log_writer.write(f"Error during callback sending: {e}")
+        logger.warning(
+            "Error during callback sending",
+            extra={
+                "callback_id": cb.id,
+                "error": str(e),
+            },
+            exc_info=True,
+        )
+    else:
+        event_log["response"] = {
+            "status_code": resp.status_code,
+            "text": resp.text,
+        }
+        log_writer.write(f"Response: {resp.status_code} {resp.text[:100]}")
+        if not resp.ok:
+            log_writer.write(
+                "Bad response during callback sending, retrying...",
+            )
+            logger.warning(
+                "bad response during sending callback",
+                extra={
+                    "callback_id": cb.id,
+                    "status_code": resp.status_code,
+                    "text": resp.text[:100],
+                },
+            )
+            error = f"Bad response: {resp.status_code} {resp.text[:100]}"
+        else:
+            log_writer.write("Callback sent")
+            logger.info(
+                "callback sent",
+                extra={
+                    "callback_id": cb.id,
+                    "status_code": resp.status_code,
+                    "text": resp.text[:100],
+                },
+            )
+
+    _record_attempt(cb, log_writer, event_log, error)
+
+
+def _record_attempt(
+    cb: OutcomingCallback,
+    log_writer: LogWriter,
+    event_log: dict[str, ty.Any],
+    error: str | None,
+) -> None:
+    now = timezone.now()
+    claimed_until = cb.next_attempt_at
+    cb.error = error
+    cb.last_attempt_at = now
+    cb.current_attempt = cb.current_attempt + 1
+    cb.next_attempt_at = None
+
+    if error is None:
+        cb.status = const.CallbackStatus.SUCCESS
+    elif cb.current_attempt <= cb.max_attempts:
+        countdown = 2**cb.current_attempt
+        logger.info(
+            "retrying callback",
+            extra={
+                "callback_id": cb.id,
+                "current_attempt": cb.current_attempt,
+                "max_attempts": cb.max_attempts,
+                "countdown": countdown,
+            },
+        )
+        cb.next_attempt_at = now + timedelta(seconds=countdown)
+        log_writer.write("Callback retry scheduled")
+    else:
+        log_writer.write("Callback retries limit exceeded")
+        cb.status = const.CallbackStatus.FAILED
+
+    cb.logs = (cb.logs or "") + "\n" + log_writer.to_string()
+    with transaction.atomic():
+        # Claim could expire while callback was sent, then callback is
+        # claimed by other worker and the result is recorded by it.
+        if not OutcomingCallback.objects.filter(
+            id=cb.id,
+            status=const.CallbackStatus.PENDING,
+            next_attempt_at=claimed_until,
+        ).update(
+            error=cb.error,
+            last_attempt_at=cb.last_attempt_at,
+            current_attempt=cb.current_attempt,
+            next_attempt_at=cb.next_attempt_at,
+            status=cb.status,
+            logs=cb.logs,
+            updated_at=now,
+        ):
+            logger.warning(
+                "Callback claim expired, attempt result is not saved",
+                extra={"callback_id": cb.id, "claimed_until": claimed_until},
+            )
+            return
+
+        event_logs.create_transaction_log(
+            trx_id=cb.get_transaction_id(),
+            event_type=EventType.CALLBACK_SENDING_ATTEMPT,
+            extra=event_log,
+            description=f"Attempt to send callback: {cb.current_attempt} / {cb.max_attempts}",
+        )
+
+    if cb.status != const.CallbackStatus.PENDING:
+        status = "success" if cb.status == const.CallbackStatus.SUCCESS else "failed"
+        metrics.OUTCOMING_CALLBACK_COUNT.labels(
+            status=status,
+            system=cb.transaction.system.type,
+        ).inc()
+        metrics.OUTCOMING_CALLBACKS_DURATION.labels(
+            status=status,
+            system=cb.transaction.system.type,
+        ).observe((now - cb.created_at).total_seconds())
+
+
+def _send_lane(callbacks: list[OutcomingCallback]) -> None:
+    try:
+        for cb in callbacks:
+            try:
+                send_claimed_callback(cb)
+            except Exception:
+                # Callback will be claimed again after the lease
+                logger.exception(
+                    "Error during callback dispatching", extra={"callback_id": cb.id}
+                )
+    finally:
+        connections.close_all()
+
+
+@track_duration("callback_dispatcher.dispatch_due_callbacks")
+def dispatch_due_callbacks(limit: int = BATCH_SIZE) -> int:
+    """
+    Claims a batch of due callbacks and sends them concurrently, by lanes.
+    Returns number of claimed callbacks.
+    """
+    callbacks = claim_due_callbacks(limit=limit)
+    if not callbacks:
+        return 0
+
+    lanes = split_into_lanes(callbacks)
+    with ThreadPoolExecutor(max_workers=WORKERS_COUNT) as executor:
+        for _ in executor.map(_send_lane, lanes):
+            pass
+    return len(callbacks)
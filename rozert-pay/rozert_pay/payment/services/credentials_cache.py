@@ -0,0 +1,65 @@
+"""
+In-process cache of parsed wallet credentials.
+
+Credentials are validated with pydantic once per wallet version: entries
+are keyed by credentials class, wallet id and wallet updated_at, so
+credentials saved by other processes are picked up with the next load of
+the wallet. Entries live at most TTL and are dropped on wallet save.
+"""
+import threading
+import time
+import typing as ty
+from datetime import timedelta
+
+from pydantic import BaseModel
+
+if ty.TYPE_CHECKING:
+    from rozert_pay.payment.models import Wallet
+
+T = ty.TypeVar("T", bound=BaseModel)
+
+TTL = timedelta(minutes=10)
+MAX_SIZE = 1000
+
+_cache: dict[tuple[type[BaseModel], int, ty.Any], tuple[float, BaseModel]] = {}
+_lock = threading.Lock()
+
+
+def get_credentials(
+    wallet: "Wallet",
+    credentials_cls: type[T],
+    parse: ty.Callable[[dict[str, ty.Any]], T] | None = None,
+) -> T:
+    """
+    Returns parsed credentials of the wallet. If wallet is loaded with
+    deferred credentials, they are loaded and decrypted only on cache miss.
+    """
+    parse = parse or (lambda data: credentials_cls(**data))
+    if not wallet.pk:
+        return parse(wallet.credentials)
+
+    key = (credentials_cls, wallet.pk, wallet.updated_at)
+    now = time.monotonic()
+    if (entry := _cache.get(key)) and entry[0] > now:
+        return ty.cast(T, entry[1])
+
+    credentials = parse(wallet.credentials)
+    with _lock:
+        if len(_cache) >= MAX_SIZE:
+            for k in [k for k, (expires_at, _) in _cache.items() if expires_at <= now]:
+                del _cache[k]
+            if len(_cache) >= MAX_SIZE:
+                _cache.clear()
+        _cache[key] = (now + TTL.total_seconds(), credentials)
+    return credentials
+
+
+def invalidate(wallet_id: int) -> None:
+    with _lock:
+        for key in [key for key in _cache if key[1] == wallet_id]:
+            del _cache[key]
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
@@ -6,6 +6,7 @@ from uuid import UUID
 
 from bm.django_utils.db_functions import JSONFieldSetValueFunc
 from django.db.models import QuerySet
+from django.utils import timezone
 from rozert_pay.common import const
 from rozert_pay.common.metrics import track_duration
 from rozert_pay.payment import entities, models, types
@@ -230,15 +231,18 @@ def create_transaction(
 
 @track_duration("db_services.save_extra_field")
 def save_extra_field(trx: PaymentTransaction, field: str, value: Any) -> None:
+    now = timezone.now()
     PaymentTransaction.objects.filter(id=trx.id).update(
         extra=JSONFieldSetValueFunc(
             "extra",
             key=field,
             value=value,
             create_missing=True,
-        )
+        ),
+        updated_at=now,
     )
     trx.extra[field] = value
+    trx.updated_at = now
 
 
 @track_duration("db_services.create_card")
@@ -283,11 +287,6 @@ def get_wallet(
     )
 
 
-@track_duration("db_services.lock_currency_wallet")
-def lock_currency_wallet(wallet_id: types.CurrencyWalletId) -> CurrencyWallet:
-    return CurrencyWallet.objects.select_for_update().get(id=wallet_id)
-
-
 @track_duration("db_services.create_customer_external_payment_system_account")
 def create_customer_external_payment_system_account(
     *,
@@ -47,3 +47,26 @@ def create_transaction_log(
         description=description,
         request_id=get_request_id(),
     )
+
+
+@track_duration("event_logs.create_transaction_logs")
+def create_transaction_logs(
+    *,
+    trx_ids: ty.Iterable[types.TransactionId],
+    event_type: const.EventType,
+    description: str,
+    extra: dict[str, ty.Any],
+) -> list[models.PaymentTransactionEventLog]:
+    request_id = get_request_id()
+    return models.PaymentTransactionEventLog.objects.bulk_create(
+        [
+            models.PaymentTransactionEventLog(
+                transaction_id=trx_id,
+                event_type=event_type,
+                extra=extra,
+                description=description,
+                request_id=request_id,
+            )
+            for trx_id in trx_ids
+        ]
+    )
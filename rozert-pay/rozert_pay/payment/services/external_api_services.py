@@ -1,12 +1,14 @@
 import logging
+import threading
 import time
 import typing as ty
+from contextlib import contextmanager
 from typing import Any
 
 import requests
 from bm.django_utils.middleware import get_request_id
-from django.db import transaction
 from rozert_pay.common import const
+from rozert_pay.common.helpers import http_transport
 from rozert_pay.common.metrics import (
     EXTERNAL_API_REQUESTS,
     EXTERNAL_API_REQUESTS_DURATION,
@@ -17,43 +19,58 @@ from rozert_pay.payment.services.context import current_context
 logger = logging.getLogger(__name__)
 
 
-class _OnRequest:
-    def __call__(self, request: dict[str, ty.Any]) -> str:
-        raise NotImplementedError
+BUFFER_SIZE = 100
+
+
+class _Buffer(threading.local):
+    logs: list[PaymentTransactionEventLog] | None = None
+    max_size: int = BUFFER_SIZE
+
+
+_buffer = _Buffer()
+
+
+def _flush_buffer() -> None:
+    assert _buffer.logs is not None
+    logs, _buffer.logs = _buffer.logs, []
+    if logs:
+        PaymentTransactionEventLog.objects.bulk_create(logs)
+
+
+@contextmanager
+def buffered_event_logs(max_size: int = BUFFER_SIZE) -> ty.Generator[None, None, None]:
+    """
+    Event logs of external API requests made inside the context are written
+    with one bulk insert per max_size requests and on exit from the context.
+    """
+    if _buffer.logs is not None:
+        # Already buffered by outer context
+        yield
+        return
+
+    _buffer.logs, _buffer.max_size = [], max_size
+    try:
+        yield
+    finally:
+        try:
+            _flush_buffer()
+        finally:
+            _buffer.logs = None
 
 
 class _OnResponse:
     def __call__(
         self,
         *,
-        request_id: str,
+        request: dict[str, ty.Any],
         response: requests.Response | None,
+        response_data: dict[str, ty.Any] | None,
         error: Exception | None,
         duration: float,
-        response_parsers: list[ty.Callable[[str], dict[str, ty.Any]]] | None = None,
     ) -> None:
         raise NotImplementedError
 
 
-class PaymentTransactionEventLogOnRequest(_OnRequest):
-    def __init__(self, trx_id: int) -> None:
-        self.trx_id = trx_id
-
-    def __call__(self, request: dict[str, ty.Any]) -> str:
-        return str(
-            PaymentTransactionEventLog.objects.create(
-                transaction_id=self.trx_id,
-                incoming_callback_id=current_context().get("incoming_callback_id"),
-                request_id=get_request_id(),
-                event_type=const.EventType.EXTERNAL_API_REQUEST,
-                description=f"{request['method']} {request['url']}",
-                extra={
-                    "request": request,
-                },
-            ).id
-        )
-
-
 def _parse_response(
     response: requests.Response | None,
     response_parsers: list[ty.Callable[[str], dict[str, ty.Any]]] | None = None,
@@ -80,29 +97,33 @@ def _parse_response(
 
 
 class PaymentTransactionEventLogOnResponse(_OnResponse):
+    """
+    Writes one event log with request and response when request is finished.
+    """
+
     def __init__(self, trx_id: int) -> None:
         self.trx_id = trx_id
 
     def __call__(
         self,
         *,
-        request_id: str,
+        request: dict[str, ty.Any],
         response: requests.Response | None,
+        response_data: dict[str, ty.Any] | None,
         error: Exception | None,
         duration: float,
-        response_parsers: list[ty.Callable[[str], dict[str, ty.Any]]] | None = None,
     ) -> None:
-        with transaction.atomic():
-            log = PaymentTransactionEventLog.objects.select_for_update().get(
-                id=request_id
-            )
-            json_response = _parse_response(response, response_parsers)
-
-            log.extra = {
-                **log.extra,
+        log = PaymentTransactionEventLog(
+            transaction_id=self.trx_id,
+            incoming_callback_id=current_context().get("incoming_callback_id"),
+            request_id=get_request_id(),
+            event_type=const.EventType.EXTERNAL_API_REQUEST,
+            description=f"{request['method']} {request['url']}",
+            extra={
+                "request": request,
                 "response": {
                     "status_code": response.status_code,
-                    "text": json_response,
+                    "text": response_data,
                 }
                 if response is not None
                 else None,
@@ -114,23 +135,29 @@ class PaymentTransactionEventLogOnResponse(_OnResponse):
                 if error
                 else None,
                 "duration": duration,
-            }
-            log.save(update_fields=["extra", "updated_at"])
+            },
+        )
 
+        if _buffer.logs is None:
+            log.save()
+            return
 
-class ExternalApiSession(requests.Session):
+        _buffer.logs.append(log)
+        if len(_buffer.logs) >= _buffer.max_size:
+            _flush_buffer()
+
+
+class ExternalApiSession(http_transport.PooledSession):
     response_parsers: list[ty.Callable[[str], dict[str, ty.Any]]]
     on_request_parser: ty.Callable[[str], dict[str, ty.Any]] | None
 
     def __init__(
         self,
-        on_request: _OnRequest,
         on_response: _OnResponse,
         timeout: float = 10,
     ):
         super().__init__()
         self.timeout = timeout
-        self.on_request = on_request
         self.on_response = on_response
 
         self.response_parsers = []
@@ -139,7 +166,7 @@ class ExternalApiSession(requests.Session):
     if not ty.TYPE_CHECKING:
 
         def request(self, *args, **kwargs):
-            kwargs.setdefault("timeout", self.timeout)
+            kwargs.setdefault("timeout", http_transport.get_timeout(self.timeout))
 
             if method := kwargs.get("method"):
                 pass
@@ -171,13 +198,11 @@ class ExternalApiSession(requests.Session):
                         pass
                 request_data = r
 
-            request_id = self.on_request(
-                dict(
-                    method=method,
-                    url=url,
-                    headers=kwargs.get("headers"),
-                    data=request_data,
-                )
+            request = dict(
+                method=method,
+                url=url,
+                headers=kwargs.get("headers"),
+                data=request_data,
             )
 
             resp = error = None
@@ -188,12 +213,15 @@ class ExternalApiSession(requests.Session):
                 raise
             finally:
                 duration = time.time() - start
+                json_response = _parse_response(
+                    resp, response_parsers=self.response_parsers
+                )
                 self.on_response(
-                    request_id=request_id,
+                    request=request,
                     response=resp,
+                    response_data=json_response,
                     error=error,
                     duration=duration,
-                    response_parsers=self.response_parsers,
                 )
 
                 # Записываем метрики
@@ -209,10 +237,6 @@ class ExternalApiSession(requests.Session):
                     status_code=status_code,
                 ).observe(duration)
 
-            json_response = _parse_response(
-                resp, response_parsers=self.response_parsers
-            )
-
             if not resp.ok:
                 f = logger.warning
                 msg = f"external API response is not ok: {resp.request.url} {resp.status_code}"
@@ -243,7 +267,6 @@ def get_external_api_session(
     timeout: float = 10,
 ) -> ExternalApiSession:
     return ExternalApiSession(
-        on_request=PaymentTransactionEventLogOnRequest(trx_id),
         on_response=PaymentTransactionEventLogOnResponse(trx_id),
         timeout=timeout,
     )
@@ -0,0 +1,131 @@
+"""
+Asynchronous processing of incoming callbacks, see
+PaymentSystem.async_callbacks_enabled.
+
+Callback is acknowledged right after its origin is checked and is saved
+with queued_at set. Queued callbacks with the same queue key (usually
+transaction in payment system) are processed in order of receiving by one
+worker at a time (Redis lock), so callbacks of one transaction are never
+applied out of order, while callbacks of different transactions are
+processed in parallel. Callbacks with the same event id in payment system
+are saved once, duplicates are only acknowledged.
+"""
+import logging
+import typing as ty
+import uuid
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rozert_pay.common.helpers import cache
+from rozert_pay.common.helpers.celery_utils import execute_on_commit
+from rozert_pay.payment.models import IncomingCallback, PaymentSystem
+
+if ty.TYPE_CHECKING:
+    from rozert_pay.payment.systems.base_controller import PaymentSystemController
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+# Must be longer than processing of queued callbacks by one task takes
+LOCK_TIMEOUT = timedelta(minutes=5)
+
+
+def is_enabled(
+    system: PaymentSystem, controller: "PaymentSystemController[ty.Any, ty.Any]"
+) -> bool:
+    return system.async_callbacks_enabled and controller.async_callbacks_supported
+
+
+def accept_callback(
+    cb: IncomingCallback, controller: "PaymentSystemController[ty.Any, ty.Any]"
+) -> HttpResponse:
+    """
+    Saves received callback and responds to payment system. Callback is queued
+    if asynchronous processing is enabled and callback passed origin check,
+    otherwise it's handled right away.
+    """
+    from rozert_pay.payment import tasks
+
+    # Callbacks failed origin check are handled synchronously too,
+    # so payment system gets the same error response
+    if not is_enabled(cb.system, controller) or controller.check_callback_origin(cb):
+        cb.save()
+        return tasks.handle_incoming_callback(cb.id)
+
+    cb.event_id = controller.get_callback_event_id(cb)
+    # Callback not bound to others is processed in its own lane
+    cb.queue_key = controller.get_callback_queue_key(cb) or uuid.uuid4().hex
+    if save_queued_callback(cb):
+        execute_on_commit(
+            lambda: tasks.process_queued_callbacks.delay(
+                system_id=cb.system_id, queue_key=cb.queue_key
+            )
+        )
+    return controller.build_callback_response(cb)
+
+
+def save_queued_callback(cb: IncomingCallback) -> bool:
+    """
+    Saves callback queued for processing. Returns False if callback
+    with the same event id is already received.
+    """
+    cb.queued_at = timezone.now()
+    try:
+        with transaction.atomic():
+            cb.save()
+    except IntegrityError:
+        if not (
+            cb.event_id
+            and IncomingCallback.objects.filter(
+                system=cb.system, event_id=cb.event_id
+            ).exists()
+        ):
+            raise
+
+        logger.info(
+            "Duplicate callback skipped",
+            extra={"system": cb.system.type, "event_id": cb.event_id},
+        )
+        return False
+    return True
+
+
+def processing_lock(system_id: int, queue_key: str) -> ty.ContextManager[ty.Any]:
+    """
+    Raises redis.exceptions.LockError if callbacks with the queue key
+    are processed by other worker.
+    """
+    return cache.redis_lock(
+        cache.CacheKey(f"incoming_callbacks_processing:{system_id}:{queue_key}"),
+        timeout=LOCK_TIMEOUT,
+        blocking_timeout=timedelta(0),
+    )
+
+
+def get_queued_callback_ids(
+    system_id: int, queue_key: str, limit: int = BATCH_SIZE
+) -> list[int]:
+    return list(
+        IncomingCallback.objects.filter(
+            system_id=system_id, queue_key=queue_key, queued_at__isnull=False
+        )
+        .order_by("id")
+        .values_list("id", flat=True)[:limit]
+    )
+
+
+def get_queues_with_callbacks() -> list[tuple[int, str]]:
+    """
+    Returns (system_id, queue_key) of queues with callbacks waiting for processing.
+    """
+    return list(
+        IncomingCallback.objects.filter(queued_at__isnull=False)
+        .values_list("system_id", "queue_key")
+        .distinct()
+    )
+
+
+def mark_processed(cb_id: int) -> None:
+    IncomingCallback.objects.filter(id=cb_id).update(queued_at=None)
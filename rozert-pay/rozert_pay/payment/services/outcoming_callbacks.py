@@ -2,6 +2,7 @@ import typing as ty
 
 from django.db import transaction
 from django.db.models import QuerySet
+from django.utils import timezone
 from rozert_pay.account.models import User
 from rozert_pay.common import const
 from rozert_pay.common.metrics import track_duration
@@ -39,6 +40,7 @@ def retry_outcoming_callback(
             cb.logs += f"\n\n---\nRetry scheduled by user {action_user}\n"
             cb.error = ""
             cb.status = const.CallbackStatus.PENDING
+            cb.next_attempt_at = timezone.now()
             cb.save()
             event_logs.create_transaction_log(
                 trx_id=cb.get_transaction_id(),
@@ -0,0 +1,112 @@
+"""
+Failing of deposits which stay PENDING longer than deposit_allowed_ttl_seconds
+of their payment system.
+
+Expired deposits are claimed in chunks with SKIP LOCKED, and each chunk is
+failed in its own DB transaction, so interrupted run is continued by the
+next one. Every deposit is failed by sync_remote_status_with_transaction.
+Their callbacks are sent by dispatch_outcoming_callbacks, not by a task
+per deposit.
+"""
+import logging
+import typing as ty
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from rozert_pay.common import const, metrics
+from rozert_pay.common.const import EventType, TransactionDeclineCodes
+from rozert_pay.common.metrics import track_duration
+from rozert_pay.payment.entities import RemoteTransactionStatus
+from rozert_pay.payment.factories import get_payment_system_controller
+from rozert_pay.payment.models import PaymentSystem, PaymentTransaction
+from rozert_pay.payment.services import event_logs, transaction_status_validation
+
+if ty.TYPE_CHECKING:  # pragma: no cover
+    from rozert_pay.payment.services.db_services import LockedTransaction
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+@track_duration("transaction_expiry.fail_expired_deposits_batch")
+def fail_expired_deposits_batch(system: PaymentSystem, limit: int = BATCH_SIZE) -> int:
+    """
+    Fails one chunk of expired deposits of the payment system.
+    Returns number of failed deposits.
+    """
+    controller = get_payment_system_controller(system)
+    if not controller:  # pragma: no cover
+        logger.error("Unsupported payment system", extra={"system": system})
+        return 0
+
+    ttl_sec = system.deposit_allowed_ttl_seconds
+    with transaction.atomic():
+        transactions = ty.cast(
+            list["LockedTransaction"],
+            list(
+                PaymentTransaction.objects.select_related(
+                    "wallet__wallet__system", "customer"
+                )
+                .select_for_update(of=("self",), skip_locked=True)
+                .filter(
+                    wallet__wallet__system=system,
+                    status=const.TransactionStatus.PENDING,
+                    type=const.TransactionType.DEPOSIT,
+                    created_at__lt=timezone.now() - timedelta(seconds=ttl_sec),
+                )
+                .order_by("created_at")[:limit]
+            ),
+        )
+        if not transactions:
+            return 0
+
+        event_logs.create_transaction_logs(
+            trx_ids=[trx.id for trx in transactions],
+            event_type=EventType.INFO,
+            description=f"Fail transaction by ttl ({ttl_sec=})",
+            extra={},
+        )
+        remote_status = transaction_status_validation.bypass_validation(
+            RemoteTransactionStatus(
+                operation_status=const.TransactionStatus.FAILED,
+                raw_data={
+                    "message": "declined_by_timeout",
+                },
+                decline_code=TransactionDeclineCodes.USER_HAS_NOT_FINISHED_FLOW,
+                decline_reason="Too long execution for transaction",
+            )
+        )
+        for trx in transactions:
+            controller.sync_remote_status_with_transaction(
+                trx=trx,
+                remote_status=remote_status,
+                send_callback_now=False,
+            )
+
+    metrics.EXPIRED_DEPOSITS_COUNT.labels(system=system.type).inc(len(transactions))
+    return len(transactions)
+
+
+def fail_expired_deposits(system: PaymentSystem, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Fails expired deposits of the payment system chunk by chunk.
+    Returns number of failed deposits.
+    """
+    count = 0
+    while True:
+        failed = fail_expired_deposits_batch(system, limit=batch_size)
+        count += failed
+        if failed < batch_size:
+            break
+
+    if count:
+        logger.info(
+            "Expired deposits failed",
+            extra={
+                "system": system.type,
+                "count": count,
+            },
+        )
+    return count
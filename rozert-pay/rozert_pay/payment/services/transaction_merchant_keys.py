@@ -0,0 +1,30 @@
+from django.apps import apps as django_apps
+from django.apps.registry import Apps
+from django.db.models import OuterRef, Q, Subquery
+from rozert_pay.common.helpers.big_table_operations import BigTableServices
+
+
+def backfill_transaction_merchant_keys(
+    chunk_size: int = 1000, apps: Apps = django_apps
+) -> int:
+    """
+    Sets PaymentTransaction.merchant_wallet / merchant where they are not set,
+    one UPDATE per chunk of ids. Returns number of updated transactions.
+
+    Models are taken from `apps`, so migrations can pass historical ones.
+    """
+    PaymentTransaction = apps.get_model("payment", "PaymentTransaction")
+    CurrencyWallet = apps.get_model("payment", "CurrencyWallet")
+    currency_wallets = CurrencyWallet.objects.filter(id=OuterRef("wallet_id"))
+
+    updated = 0
+    for ids in BigTableServices.get_ids_ranges_for_big_table(
+        model=PaymentTransaction,
+        chunk_size=chunk_size,
+        additional_q=Q(merchant_wallet__isnull=True) | Q(merchant__isnull=True),
+    ):
+        updated += PaymentTransaction.objects.filter(id__in=ids).update(
+            merchant_wallet_id=Subquery(currency_wallets.values("wallet_id")[:1]),
+            merchant_id=Subquery(currency_wallets.values("wallet__merchant_id")[:1]),
+        )
+    return updated
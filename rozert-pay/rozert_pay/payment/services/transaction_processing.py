@@ -1,12 +1,13 @@
 import datetime
 import logging
-import time
 import typing as ty
 from datetime import timedelta
 from decimal import Decimal
 
 from bm.datatypes import Money
 from django.db import connection, transaction
+from django.db.models import Case, F, Value, When, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 from django.utils.crypto import constant_time_compare
 from rozert_pay.balances.const import BalanceTransactionType, InitiatorType
@@ -14,9 +15,10 @@ from rozert_pay.balances.services import BalanceUpdateDTO, BalanceUpdateService
 from rozert_pay.common import const
 from rozert_pay.common.const import EventType, TransactionExtraFields, TransactionStatus
 from rozert_pay.common.metrics import track_duration
+from rozert_pay.limits.services import counters
 from rozert_pay.payment import entities, tasks, types
-from rozert_pay.payment.models import CurrencyWallet, Wallet
-from rozert_pay.payment.services import db_services, event_logs
+from rozert_pay.payment.models import CurrencyWallet, PaymentTransaction, Wallet
+from rozert_pay.payment.services import credentials_cache, db_services, event_logs
 from rozert_pay.risk_lists.const import Reason
 from rozert_pay.risk_lists.services.manager import add_customer_to_blacklist_by_trx
 
@@ -54,6 +56,7 @@ def handle_chargeback(
     trx.status = entities.TransactionStatus.CHARGED_BACK
     trx.extra[TransactionExtraFields.IS_CHARGEBACK_RECEIVED] = True
     trx.save()
+    counters.track_status_change(trx, entities.TransactionStatus.SUCCESS)
 
     balance_tx_record = BalanceUpdateService.update_balance(
         BalanceUpdateDTO(
@@ -104,6 +107,7 @@ def handle_refund(
     assert trx.amount - trx_refund_amount_total >= Decimal(0)
     trx.extra[TransactionExtraFields.REFUNDED_AMOUNT] = str(trx_refund_amount_total)
     trx.save()
+    counters.track_status_change(trx, entities.TransactionStatus.SUCCESS)
 
     balance_tx_record = BalanceUpdateService.update_balance(
         BalanceUpdateDTO(
@@ -142,6 +146,7 @@ def handle_chargeback_reversal(
     trx.status = entities.TransactionStatus.SUCCESS
     trx.extra[TransactionExtraFields.IS_CHARGEBACK_REVERSAL_RECEIVED] = True
     trx.save()
+    counters.track_status_change(trx, entities.TransactionStatus.CHARGED_BACK)
 
     # A chargeback reversal is a credit to the merchant. MANUAL_ADJUSTMENT is used for this.
     balance_tx_record = BalanceUpdateService.update_balance(
@@ -180,16 +185,17 @@ def validate_signature_for_callback(
         },
     )
 
+    # Credentials are loaded only for wallets missing in credentials cache
     wallets: list[Wallet] = list(
         Wallet.objects.filter(
             system__type=payment_system,
-        )
+        ).defer("credentials")
     )
     all_creds = []
 
     for w in wallets:
         try:
-            all_creds.append(creds_cls(**w.credentials))
+            all_creds.append(credentials_cache.get_credentials(w, creds_cls))
         except Exception:
             logger.exception(
                 "Failed to parse credentials",
@@ -254,8 +260,10 @@ def revert_to_pending(
             )
         )
 
+    previous_status = trx.status
     trx.status = TransactionStatus.PENDING
     trx.save(update_fields=["status", "updated_at"])
+    counters.track_status_change(trx, previous_status)
 
     extra_log = {}
     if balance_tx_record:
@@ -300,64 +308,65 @@ def stop_periodic_status_checks(trx: "db_services.LockedTransaction") -> None:
 
 
 class TransactionPeriodicCheckService:
-    @classmethod
-    @track_duration("TransactionPeriodicCheckService._get_next_check_datetime")
-    def _get_next_check_datetime(
-        cls, trx_extra: dict[str, ty.Any]
-    ) -> datetime.datetime:
-        count_checks: int = trx_extra.get(
-            const.TransactionExtraFields.COUNT_STATUS_CHECKS_SCHEDULED, 0
-        )
-        last_status_check_ts: float | None = trx_extra.get(
-            const.TransactionExtraFields.LAST_STATUS_CHECK_SCHEDULE
-        )
-        last_status_check: datetime.datetime | None = (
-            timezone.make_aware(datetime.datetime.fromtimestamp(last_status_check_ts))
-            if last_status_check_ts
-            else None
-        )
-
-        if not last_status_check:
-            return timezone.now()
-
-        CHECKS_EACH_MINUTE = 5
-        CHECKS_EACH_5_MINUTES = CHECKS_EACH_MINUTE + 6
-        CHECKS_EACH_15_MINUTES = CHECKS_EACH_5_MINUTES + 4
-
-        if count_checks <= CHECKS_EACH_MINUTE:
-            return last_status_check + timedelta(minutes=1)
-
-        if count_checks <= CHECKS_EACH_5_MINUTES:
-            return last_status_check + timedelta(minutes=5)
-
-        if count_checks <= CHECKS_EACH_15_MINUTES:
-            return last_status_check + timedelta(minutes=15)
-
-        return last_status_check + timedelta(hours=1)
+    # Interval to the next status check by the number of checks done
+    _CHECK_INTERVALS: ty.Final[list[tuple[int, timedelta]]] = [
+        (5, timedelta(minutes=1)),
+        (11, timedelta(minutes=5)),
+        (15, timedelta(minutes=15)),
+    ]
+    _MAX_CHECK_INTERVAL: ty.Final = timedelta(hours=1)
 
     @classmethod
-    @track_duration("TransactionPeriodicCheckService._on_check_scheduled")
-    def _on_check_scheduled(cls, trx: "db_services.LockedTransaction") -> None:
-        count_checks: int = trx.extra.get(
-            const.TransactionExtraFields.COUNT_STATUS_CHECKS_SCHEDULED, 0
-        )
-
-        trx.extra[const.TransactionExtraFields.COUNT_STATUS_CHECKS_SCHEDULED] = (
-            count_checks + 1
+    @track_duration("TransactionPeriodicCheckService.claim_due_transactions")
+    def claim_due_transactions(
+        cls,
+        limit: int,
+        limit_per_system: int,
+        exclude_systems: ty.Iterable[const.PaymentSystemType] = (),
+    ) -> list[tuple[types.TransactionId, const.PaymentSystemType, int]]:
+        """
+        Claims transactions due for status check and moves their next check
+        time by the backoff ladder. Transactions locked by others are skipped.
+
+        Returns ids, system types and wallet ids of claimed transactions.
+        """
+        now = timezone.now()
+        due_transactions = PaymentTransaction.objects.due_for_periodic_status_check(
+            now
+        ).exclude(system_type__in=list(exclude_systems))
+        candidate_ids = list(
+            due_transactions.annotate(
+                system_rank=Window(
+                    RowNumber(),
+                    partition_by=F("system_type"),
+                    order_by=F("next_status_check_at").asc(),
+                )
+            )
+            .filter(system_rank__lte=limit_per_system)
+            .order_by("next_status_check_at")
+            .values_list("id", flat=True)[:limit]
         )
-        trx.extra[const.TransactionExtraFields.LAST_STATUS_CHECK_SCHEDULE] = time.time()
-        trx.save_extra()
 
-    @classmethod
-    @track_duration(
-        "TransactionPeriodicCheckService.should_schedule_check_task_immediately"
-    )
-    def should_schedule_check_task_immediately(
-        cls, trx_id: types.TransactionId, trx_extra: dict[str, ty.Any]
-    ) -> bool:
-        if cls._get_next_check_datetime(trx_extra) <= timezone.now():
-            with transaction.atomic():
-                locked_trx = db_services.get_transaction(for_update=True, trx_id=trx_id)
-                cls._on_check_scheduled(locked_trx)
-            return True
-        return False
+        with transaction.atomic():
+            claimed = list(
+                due_transactions.filter(id__in=candidate_ids)
+                .select_for_update(of=("self",), skip_locked=True)
+                .order_by("next_status_check_at")
+                .values_list("id", "system_type", "wallet__wallet_id")
+            )
+            PaymentTransaction.objects.filter(
+                id__in=[trx_id for trx_id, *_ in claimed]
+            ).update(
+                status_checks_count=F("status_checks_count") + 1,
+                next_status_check_at=Case(
+                    *[
+                        When(
+                            status_checks_count__lt=max_checks_count,
+                            then=Value(now + interval),
+                        )
+                        for max_checks_count, interval in cls._CHECK_INTERVALS
+                    ],
+                    default=Value(now + cls._MAX_CHECK_INTERVAL),
+                ),
+            )
+        return claimed
@@ -35,6 +35,8 @@ class AppexController(
 ):
     client_cls = AppexClient
     sandbox_client_cls = AppexSandboxClient
+    # Callback response depends on transaction
+    async_callbacks_supported = False
 
     def _run_deposit(
         self, trx_id: types.TransactionId, client: AppexSandboxClient | AppexClient
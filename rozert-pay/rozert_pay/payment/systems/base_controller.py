@@ -32,6 +32,7 @@ from rozert_pay.common.const import (
 from rozert_pay.common.helpers import celery_utils
 from rozert_pay.common.helpers.celery_utils import execute_on_commit
 from rozert_pay.common.helpers.log_utils import LogWriter
+from rozert_pay.limits.services import counters
 from rozert_pay.payment import entities, tasks, types
 from rozert_pay.payment.entities import RemoteTransactionStatus
 from rozert_pay.payment.models import (
@@ -43,6 +44,7 @@ from rozert_pay.payment.models import (
 )
 from rozert_pay.payment.services import (
     base_classes,
+    credentials_cache,
     db_services,
     errors,
     event_logs,
@@ -70,6 +72,9 @@ class PaymentSystemController(Generic[T_Client, T_SandboxClient]):
     transaction_actualizer_cls: Type[
         transaction_actualization.BaseTransactionActualizer[ty.Any]
     ]
+    # Callback response does not depend on result of callback processing,
+    # so callback can be processed asynchronously if enabled for payment system.
+    async_callbacks_supported: bool = True
 
     def __init__(
         self,
@@ -132,6 +137,50 @@ class PaymentSystemController(Generic[T_Client, T_SandboxClient]):
             timeout=trx.system.client_request_timeout,
         )
 
+    @property
+    def supports_batch_status_check(self) -> bool:
+        return (
+            type(self)._get_remote_transaction_statuses
+            is not PaymentSystemController._get_remote_transaction_statuses
+        )
+
+    @final
+    def get_remote_transaction_statuses(
+        self,
+        wallet: Wallet,
+        transactions: list[PaymentTransaction],
+    ) -> dict[types.TransactionId, RemoteTransactionStatus | Error]:
+        """
+        Returns remote statuses of wallet transactions.
+
+        Statuses are fetched by list endpoint of payment system if it's
+        supported, rest of transactions are checked one by one.
+        """
+        result: dict[types.TransactionId, RemoteTransactionStatus | Error] = {}
+        not_sandbox = [trx for trx in transactions if not trx.is_sandbox]
+        if not_sandbox:
+            result.update(
+                self._get_remote_transaction_statuses(
+                    wallet=wallet, transactions=not_sandbox
+                )
+            )
+
+        for trx in transactions:
+            if trx.id not in result:
+                result[trx.id] = self.get_client(trx).get_transaction_status()
+        return result
+
+    def _get_remote_transaction_statuses(
+        self,
+        wallet: Wallet,
+        transactions: list[PaymentTransaction],
+    ) -> dict[types.TransactionId, RemoteTransactionStatus | Error]:
+        """
+        Override for payment systems which can list many operations per request.
+        Transactions missing in result are checked one by one.
+        """
+        return {}
+
     @final
     def run_deposit(self, trx_id: types.TransactionId) -> None:
         try:
@@ -284,11 +333,13 @@ class PaymentSystemController(Generic[T_Client, T_SandboxClient]):
         trx: Optional["LockedTransaction"] = None,
         # BE CAREFUL WITH THIS FLAG!
         allow_transition_from_final_statuses: bool = False,
+        send_callback_now: bool = True,
     ) -> None:
         """
         Synchronizes transaction with remote status.
 
-        On commit creates callback.
+        On commit creates callback. With send_callback_now=False callback is
+        left to dispatch_outcoming_callbacks instead of its own task.
         """
         assert trx or trx_id
         if not trx:
@@ -322,6 +373,7 @@ class PaymentSystemController(Generic[T_Client, T_SandboxClient]):
                 lambda: self.create_callback(
                     trx_id=trx_id,
                     callback_type=CallbackType.TRANSACTION_UPDATED,
+                    send_now=send_callback_now,
                 )
             )
             return
@@ -335,6 +387,7 @@ class PaymentSystemController(Generic[T_Client, T_SandboxClient]):
                 lambda: self.create_callback(
                     trx_id=trx_id,
                     callback_type=CallbackType.TRANSACTION_UPDATED,
+                    send_now=send_callback_now,
                 )
             )
             return
@@ -352,6 +405,7 @@ class PaymentSystemController(Generic[T_Client, T_SandboxClient]):
                 lambda: self.create_callback(
                     trx_id=trx_id,
                     callback_type=CallbackType.TRANSACTION_UPDATED,
+                    send_now=send_callback_now,
                 )
             )
             return
@@ -408,13 +462,16 @@ class PaymentSystemController(Generic[T_Client, T_SandboxClient]):
         else:
             trx.decline_code = trx.decline_reason = None
 
+        previous_status = trx.status
         trx.status = remote_status.operation_status
         trx.save()
+        counters.track_status_change(trx, previous_status)
 
         transaction.on_commit(
             lambda: self.create_callback(
                 trx_id=trx_id,
                 callback_type=CallbackType.TRANSACTION_UPDATED,
+                send_now=send_callback_now,
             )
         )
         if trx.status != TransactionStatus.PENDING:
@@ -427,7 +484,8 @@ class PaymentSystemController(Generic[T_Client, T_SandboxClient]):
                 system=trx.system.type,
             ).inc()
 
-        db_services.lock_currency_wallet(cast(types.CurrencyWalletId, trx.wallet_id))
+        # Wallet is locked by BalanceUpdateService: sharded wallets are not
+        # locked exclusively on deposits.
 
         assert trx.status == remote_status.operation_status
 
@@ -568,7 +626,12 @@ class PaymentSystemController(Generic[T_Client, T_SandboxClient]):
         trx_id: types.TransactionId,
         callback_type: CallbackType,
         stop_previous_callbacks: bool = True,
+        send_now: bool = True,
     ) -> None:
+        """
+        Creates outcoming callback for the transaction. Unless send_now,
+        callback is sent by dispatch_outcoming_callbacks when it's due.
+        """
         if stop_previous_callbacks:
             OutcomingCallback.objects.filter(
                 transaction_id=trx_id,
@@ -599,6 +662,8 @@ class PaymentSystemController(Generic[T_Client, T_SandboxClient]):
             target=target_url,
             body=data,
         )
+        if not send_now:
+            return
 
         execute_on_commit(
             lambda: tasks.send_callback.apply_async(
@@ -611,7 +676,10 @@ class PaymentSystemController(Generic[T_Client, T_SandboxClient]):
 
     @final
     def parse_callback(
-        self, _cb: IncomingCallback, is_sandbox: bool = False
+        self,
+        _cb: IncomingCallback,
+        is_sandbox: bool = False,
+        origin_checked: bool = False,
     ) -> Response | None:
         with transaction.atomic():
             cb: IncomingCallback = IncomingCallback.objects.select_for_update(
@@ -619,45 +687,11 @@ class PaymentSystemController(Generic[T_Client, T_SandboxClient]):
             ).get(id=_cb.id)
 
             try:
-                if (
-                    settings.IS_PRODUCTION
-                    and self.db_system.ip_whitelist_enabled
-                    and cb.ip not in self.ip_whitelist
+                if not origin_checked and (
+                    origin_error := self.check_callback_origin(cb)
                 ):
-                    self._fail_callback(
-                        cb,
-                        error=f"IP not in whitelist: {cb.ip}",
-                        error_type=const.IncomingCallbackError.IP_NOT_WHITELISTED,
-                    )
-                    return None
-
-                if secret := _cb.system.callback_secret_key:
-                    secret_key = _cb.headers.get("x-secret-key") or ""
-                    if not secret_key:
-                        if s := re.search(
-                            "Bearer (.+)",
-                            _cb.headers.get("authorization", ""),
-                            re.IGNORECASE,
-                        ):
-                            secret_key = s.group(1)
-
-                    if not constant_time_compare(
-                        secret_key,
-                        secret,
-                    ):
-                        self._fail_callback(
-                            cb,
-                            error="Invalid secret key",
-                            error_type=const.IncomingCallbackError.AUTHORIZATION_ERROR,
-                        )
-                        return None
-
-                if not self._is_callback_signature_valid(cb):
-                    self._fail_callback(
-                        cb,
-                        error="Signature is invalid",
-                        error_type=const.IncomingCallbackError.INVALID_SIGNATURE,
-                    )
+                    error, error_type = origin_error
+                    self._fail_callback(cb, error=error, error_type=error_type)
                     return None
 
                 remote_transaction_status = self._parse_callback(cb)
@@ -761,9 +795,70 @@ class PaymentSystemController(Generic[T_Client, T_SandboxClient]):
 
             return None
 
+    @final
+    def check_callback_origin(
+        self, cb: IncomingCallback
+    ) -> tuple[str, const.IncomingCallbackError] | None:
+        """
+        Checks IP whitelist, secret key and signature of the callback.
+        Returns error and its type if callback is not from payment system.
+        """
+        if (
+            settings.IS_PRODUCTION
+            and self.db_system.ip_whitelist_enabled
+            and cb.ip not in self.ip_whitelist
+        ):
+            return (
+                f"IP not in whitelist: {cb.ip}",
+                const.IncomingCallbackError.IP_NOT_WHITELISTED,
+            )
+
+        if secret := cb.system.callback_secret_key:
+            secret_key = cb.headers.get("x-secret-key") or ""
+            if not secret_key:
+                if s := re.search(
+                    "Bearer (.+)",
+                    cb.headers.get("authorization", ""),
+                    re.IGNORECASE,
+                ):
+                    secret_key = s.group(1)
+
+            if not constant_time_compare(
+                secret_key,
+                secret,
+            ):
+                return (
+                    "Invalid secret key",
+                    const.IncomingCallbackError.AUTHORIZATION_ERROR,
+                )
+
+        if not self._is_callback_signature_valid(cb):
+            return (
+                "Signature is invalid",
+                const.IncomingCallbackError.INVALID_SIGNATURE,
+            )
+
+        return None
+
     def build_callback_response(self, cb: IncomingCallback) -> HttpResponse:
         return Response()
 
+    def get_callback_event_id(self, cb: IncomingCallback) -> str | None:
+        """
+        Id of the event in payment system. Asynchronously processed
+        callbacks with the same event id are skipped as duplicates.
+        """
+        return None
+
+    def get_callback_queue_key(self, cb: IncomingCallback) -> str | None:
+        """
+        Key of callbacks to be processed in order of receiving, usually id of
+        transaction in payment system. Asynchronously processed callbacks with
+        different keys are processed in parallel. None if callback doesn't
+        depend on order of others.
+        """
+        return None
+
     @abc.abstractmethod
     def _parse_callback(
         self, cb: IncomingCallback
@@ -940,9 +1035,24 @@ class PaymentSystemController(Generic[T_Client, T_SandboxClient]):
         To implement, you should override _get_action_on_credentials_change method
         """
 
-        # Handle all exceptions to errors
         action = self._get_action_on_credentials_change()
-        return action and errors.wrap_errors(action)
+        if not action:
+            return None
+
+        def action_with_invalidation(
+            wallet: Wallet,
+            old_creds: dict[str, Any],
+            new_creds: dict[str, Any],
+            log_writer: LogWriter,
+        ) -> None | Error:
+            try:
+                return action(wallet, old_creds, new_creds, log_writer)
+            finally:
+                # Action can update credentials, e.g. with registered webhooks
+                credentials_cache.invalidate(wallet.id)
+
+        # Handle all exceptions to errors
+        return errors.wrap_errors(action_with_invalidation)
 
     def _get_action_on_credentials_change(
         self,
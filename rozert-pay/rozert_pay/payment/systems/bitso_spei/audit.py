@@ -2,11 +2,11 @@ import logging
 from datetime import datetime, timedelta
 from typing import Any, Generator, Iterable, cast
 
-import requests
 from django.db import transaction
 from django.utils import timezone
 from pydantic import ValidationError
 from rozert_pay.common.const import PaymentSystemType, TransactionStatus
+from rozert_pay.common.helpers import http_transport
 from rozert_pay.payment.models import PaymentTransaction, Wallet
 from rozert_pay.payment.services import db_services
 from rozert_pay.payment.services.transaction_status_validation import (
@@ -212,7 +212,7 @@ class BitsoSpeiAudit:
                 end_date=self.end_date,
                 max_pages=100,
                 creds=BitsoSpeiCreds(**wallet.credentials),
-                session=requests.Session(),
+                session=http_transport.PooledSession(),
             )
 
     @staticmethod
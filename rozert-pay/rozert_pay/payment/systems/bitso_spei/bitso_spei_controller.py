@@ -1,5 +1,6 @@
 import base64
 import binascii
+import hashlib
 import json
 import logging
 import re
@@ -79,6 +80,54 @@ class BitsoSpeiCallbackData(BaseModel):
         return self.payload.details
 
 
+# Wallets versions (id, updated_at) and PEM public keys by key id
+_public_keys_index: tuple[tuple[tuple[int, Any], ...], dict[str, str]] | None = None
+
+
+def _get_public_keys_index() -> dict[str, str]:
+    """
+    Returns PEM public keys of Bitso wallets by key id.
+    Index is rebuilt only when Bitso wallets are changed.
+    """
+    global _public_keys_index
+
+    wallets = Wallet.objects.filter(system__type=PaymentSystemType.BITSO_SPEI)
+    version = tuple(wallets.order_by("id").values_list("id", "updated_at"))
+    if _public_keys_index and _public_keys_index[0] == version:
+        return _public_keys_index[1]
+
+    index: dict[str, str] = {}
+    for wallet in wallets.order_by("id"):
+        for key_data in wallet.credentials.get("public_keys") or []:
+            pem_value = (
+                key_data.get("public_key")
+                or key_data.get("pem")
+                or key_data.get("key")
+                or key_data.get("value")
+            )
+            if pem_value:
+                index.setdefault(str(key_data.get("key_id")), pem_value)
+
+    _public_keys_index = (version, index)
+    return index
+
+
+def _load_callback_body(cb: IncomingCallback) -> dict[str, Any] | None:
+    try:
+        body = json.loads(cb.body)
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+@lru_cache(maxsize=32)
+def _load_public_key(pem_value: str) -> RSAPublicKey | Error:
+    public_key = load_pem_public_key(pem_value.encode("utf-8"))
+    if not isinstance(public_key, RSAPublicKey):
+        return Error("Bitso public key is not RSA")
+    return public_key
+
+
 class BitsoSpeiController(
     base_controller.PaymentSystemController[BitsoSpeiClient, BitsoSpeiClientSandbox]
 ):
@@ -213,34 +262,12 @@ class BitsoSpeiController(
         )
 
     @classmethod
-    @lru_cache
     @errors.wrap_errors
     def _get_public_key(cls, key_id: str) -> RSAPublicKey | Error:
-        wallets = Wallet.objects.filter(system__type=PaymentSystemType.BITSO_SPEI)
-        for wallet in wallets:
-            credentials = wallet.credentials
-            public_keys = credentials.get("public_keys") or []
-
-            for key_data in public_keys:
-                if str(key_data.get("key_id")) != str(key_id):
-                    continue
-
-                pem_value = (
-                    key_data.get("public_key")
-                    or key_data.get("pem")
-                    or key_data.get("key")
-                    or key_data.get("value")
-                )
-                if not pem_value:
-                    continue
-
-                pem_bytes = pem_value.encode("utf-8")
-                public_key = load_pem_public_key(pem_bytes)
-                if not isinstance(public_key, RSAPublicKey):
-                    return Error("Bitso public key is not RSA")
-                return public_key
-
-        return Error(f"Bitso public key with id {key_id!r} not found")
+        pem_value = _get_public_keys_index().get(str(key_id))
+        if not pem_value:
+            return Error(f"Bitso public key with id {key_id!r} not found")
+        return _load_public_key(pem_value)
 
     def _is_callback_signature_valid(self, cb: IncomingCallback) -> bool:
         signature_header = cb.headers.get("x-bitso-webhook-event-signature")
@@ -265,7 +292,10 @@ class BitsoSpeiController(
             cb.error = f"Invalid Bitso signature encoding: {exc}"
             return False
 
-        body_json = json.loads(cb.body)
+        body_json = _load_callback_body(cb)
+        if body_json is None:
+            cb.error = "Callback body is not a JSON object"
+            return False
 
         payload = body_json.get("payload")
         if payload is None:
@@ -285,6 +315,24 @@ class BitsoSpeiController(
 
         return True
 
+    def get_callback_event_id(self, cb: IncomingCallback) -> str | None:
+        # Bitso redelivers the same signed payload, while status updates
+        # of one funding differ in payload.
+        body = _load_callback_body(cb)
+        if body is None:
+            return None
+        payload = json.dumps(body.get("payload"), separators=(",", ":"))
+        return hashlib.sha256(f"{body.get('event')}:{payload}".encode()).hexdigest()
+
+    def get_callback_queue_key(self, cb: IncomingCallback) -> str | None:
+        # Status updates of one funding / withdrawal are applied in order
+        body = _load_callback_body(cb)
+        if body is None or not isinstance(payload := body.get("payload"), dict):
+            return None
+        if foreign_id := payload.get("fid") or payload.get("wid"):
+            return f"{body.get('event')}:{foreign_id}"
+        return None
+
     def _get_action_on_credentials_change(
         self,
     ) -> (
@@ -16,6 +16,7 @@ from django.utils import timezone
 from pydantic import BaseModel, SecretStr
 from requests import Response
 from rozert_pay.common import const
+from rozert_pay.common.helpers import http_transport
 from rozert_pay.payment import entities, models, types
 from rozert_pay.payment.services import base_classes, errors, event_logs
 from rozert_pay.payment.systems.bitso_spei.bitso_spei_const import (
@@ -64,7 +65,7 @@ class BitsoSpeiClient(base_classes.BasePaymentClient[BitsoSpeiCreds]):
             method="post",
             url_path="/spei/v1/clabes",
             creds=bitso_creds,
-            session=requests.Session(),
+            session=http_transport.PooledSession(),
         )
         assert isinstance(resp, dict)
         if not resp["success"]:
@@ -270,7 +271,7 @@ class BitsoSpeiClient(base_classes.BasePaymentClient[BitsoSpeiCreds]):
             method="delete",
             url_path=f"/v4/webhooks/{webhook_id}",
             creds=bitso_creds,
-            session=requests.Session(),
+            session=http_transport.PooledSession(),
         )
 
     @classmethod
@@ -283,7 +284,7 @@ class BitsoSpeiClient(base_classes.BasePaymentClient[BitsoSpeiCreds]):
             method="post",
             url_path="/v4/webhooks/",
             creds=creds,
-            session=requests.Session(),
+            session=http_transport.PooledSession(),
             json_payload={
                 "callback_url": url,
                 "events": [
@@ -305,7 +306,7 @@ class BitsoSpeiClient(base_classes.BasePaymentClient[BitsoSpeiCreds]):
             method="get",
             url_path="/v4/webhooks/",
             creds=bitso_creds,
-            session=requests.Session(),
+            session=http_transport.PooledSession(),
         )
         result = cast(list[dict[str, Any]], r)
         """
@@ -327,7 +328,7 @@ class BitsoSpeiClient(base_classes.BasePaymentClient[BitsoSpeiCreds]):
                 method="get",
                 url_path="/v4/webhooks/public-key",
                 creds=creds,
-                session=requests.Session(),
+                session=http_transport.PooledSession(),
             ),
         )
 
@@ -7,7 +7,6 @@ from typing import Sequence
 from django.utils import timezone
 from rozert_pay.celery_app import app
 from rozert_pay.common.const import CeleryQueue
-from rozert_pay.payment.systems.bitso_spei.audit import BitsoSpeiAudit
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +29,8 @@ def run_bitso_spei_audit(
     wallet_ids: Sequence[int] | None = None,
     initiated_by: int | None = None,
 ) -> None:
+    from rozert_pay.payment.systems.bitso_spei.audit import BitsoSpeiAudit
+
     start_dt = _parse_datetime(start_date)
     end_dt = _parse_datetime(end_date)
 
@@ -11,10 +11,9 @@ from django.conf import settings
 from django.utils import timezone
 from pydantic import BaseModel, SecretStr
 from rozert_pay.common import const
-from rozert_pay.common.helpers import cache
 from rozert_pay.payment import entities, models
 from rozert_pay.payment.entities import RemoteTransactionStatus
-from rozert_pay.payment.services import base_classes, errors
+from rozert_pay.payment.services import auth_tokens, base_classes, errors
 
 logger = logging.getLogger(__name__)
 
@@ -281,42 +280,33 @@ class _BaseCardpayClient(base_classes.BasePaymentClient[CardpayCreds]):
         method: str,
         data: dict[str, ty.Any] | None,
     ) -> dict[str, ty.Any]:
-        headers = self._get_common_headers()
-
-        response = self.session.request(
-            method=method,
-            url=self.host + url,
-            json=data,
-            headers=headers,
+        response = auth_tokens.request_with_token(
+            provider="cardpay",
+            credentials=self.creds,
+            fetch=self._fetch_access_token,
+            send=lambda access_token: self.session.request(
+                method=method,
+                url=self.host + url,
+                json=data,
+                headers=self._get_common_headers(access_token),
+            ),
         )
         return {
             **response.json(),
             "http_status_code": response.status_code,
         }
 
-    def _get_common_headers(self) -> dict[str, str]:
-        access_token_from_redis = self._get_access_token()
+    def _get_common_headers(self, access_token: str) -> dict[str, str]:
         return {
-            "Authorization": f"Bearer {access_token_from_redis}",
+            "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json",
         }
 
-    def _get_access_token(self) -> str:
-        redis_credentials_key = cache.CacheKey(
-            f"credentials2:cardpay_api_v3:{self.creds.terminal_code}"
-        )
-
-        access_token_cached = cache.redis_cache_get(redis_credentials_key, str)
-        if access_token_cached:
-            return access_token_cached
-
+    def _fetch_access_token(self) -> auth_tokens.AuthToken:
         access_token_data = self._oauth_get_new_tokens()
-        ttl = access_token_data["expires_in"]
-        access_token = access_token_data["access_token"]
-        cache.redis_cache_set(
-            redis_credentials_key, access_token, ttl=timedelta(seconds=ttl - 30)
+        return auth_tokens.AuthToken.from_expires_in(
+            access_token_data["access_token"], access_token_data["expires_in"]
         )
-        return access_token
 
     def _oauth_get_new_tokens(self) -> dict[str, ty.Any]:
         response = None
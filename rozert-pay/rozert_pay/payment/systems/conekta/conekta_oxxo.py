@@ -27,6 +27,7 @@ from rest_framework.decorators import action
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rozert_pay.common import const
+from rozert_pay.common.helpers import http_transport
 from rozert_pay.common.helpers.log_utils import LogWriter
 from rozert_pay.payment import entities, tasks
 from rozert_pay.payment.api_v1 import serializers
@@ -98,7 +99,7 @@ class ConektaOxxoClient(base_classes.BasePaymentClient[ConektaOxxoCredentials]):
         cls, wallet: Wallet, creds: ConektaOxxoCredentials
     ) -> None:
         response_with_public_key = cls.make_request_cls(
-            session=requests.Session(),
+            session=http_transport.PooledSession(),
             creds=creds,
             path="/webhook_keys/",
             method="get",
@@ -226,7 +227,7 @@ class ConektaOxxoClient(base_classes.BasePaymentClient[ConektaOxxoCredentials]):
     @classmethod
     def _remove_webhook(cls, webhook_id: str, creds: ConektaOxxoCredentials) -> None:
         cls.make_request_cls(
-            session=requests.Session(),
+            session=http_transport.PooledSession(),
             creds=creds,
             path=f"/webhooks/{webhook_id}",
             method="delete",
@@ -245,7 +246,7 @@ class ConektaOxxoClient(base_classes.BasePaymentClient[ConektaOxxoCredentials]):
                 "url": url,
                 "synchronous": "false",
             },
-            session=requests.Session(),
+            session=http_transport.PooledSession(),
             creds=creds,
         )
         return entities.Webhook(
@@ -259,7 +260,7 @@ class ConektaOxxoClient(base_classes.BasePaymentClient[ConektaOxxoCredentials]):
         result = cls.make_request_cls(
             path="/webhooks/",
             method="get",
-            session=requests.Session(),
+            session=http_transport.PooledSession(),
             creds=creds,
             payload=None,
         )
@@ -22,6 +22,7 @@ from rozert_pay.common.const import (
     TransactionExtraFields,
     TransactionStatus,
 )
+from rozert_pay.common.helpers import http_transport
 from rozert_pay.payment import entities, types
 from rozert_pay.payment.api_v1.serializers.card_serializers import (
     CardBrowserDataSerializer,
@@ -517,7 +518,7 @@ class IlixiumClient(
         creds: IlixiumCreds,
     ) -> list[AuditItem]:
         data = cls.send_request(
-            session=requests.Session(),
+            session=http_transport.PooledSession(),
             url=f"{ILIXIUM_URL_PREFIX}/history/operations",
             xml_dict={
                 "historyRequest": {
@@ -5,13 +5,14 @@ from rest_framework.response import Response
 from rozert_pay.common import const
 from rozert_pay.payment import types
 from rozert_pay.payment.entities import RemoteTransactionStatus
-from rozert_pay.payment.models import IncomingCallback, PaymentTransaction
-from rozert_pay.payment.services import deposit_services, withdraw_services
+from rozert_pay.payment.models import IncomingCallback, PaymentTransaction, Wallet
+from rozert_pay.payment.services import deposit_services, errors, withdraw_services
 from rozert_pay.payment.systems import base_controller
 from rozert_pay.payment.systems.ilixium.ilixium_client import (
     IlixiumClient,
     IlixiumSandboxClient,
 )
+from rozert_pay.payment_audit import services as payment_audit_services
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +43,24 @@ class IlixiumController(
         ):
             pass
 
+    def _get_remote_transaction_statuses(
+        self,
+        wallet: Wallet,
+        transactions: list[PaymentTransaction],
+    ) -> dict[types.TransactionId, RemoteTransactionStatus | errors.Error]:
+        # Deposit statuses are taken from operations history,
+        # withdrawals are checked one by one.
+        deposits = [
+            trx for trx in transactions if trx.type == const.TransactionType.DEPOSIT
+        ]
+        if not deposits:
+            return {}
+        return dict(
+            payment_audit_services.get_transactions_statuses(
+                wallet=wallet, transactions=deposits
+            )
+        )
+
     def handle_redirect(
         self,
         request: Request,
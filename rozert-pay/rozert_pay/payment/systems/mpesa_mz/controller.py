@@ -67,6 +67,7 @@ class MpesaMzController(PaymentSystemController[MpesaMzClient, MpesaMzSandboxCli
         trx_id: int | None = None,
         trx: Optional["LockedTransaction"] = None,
         allow_transition_from_final_statuses: bool = False,
+        send_callback_now: bool = True,
     ) -> None:
         # Call parent method first to handle balance updates
         super().sync_remote_status_with_transaction(
@@ -74,6 +75,7 @@ class MpesaMzController(PaymentSystemController[MpesaMzClient, MpesaMzSandboxCli
             trx_id=trx_id,
             trx=trx,
             allow_transition_from_final_statuses=allow_transition_from_final_statuses,
+            send_callback_now=send_callback_now,
         )
 
         # After successful deposit, create/update CustomerExternalPaymentSystemAccount
@@ -4,10 +4,10 @@ import logging
 import typing as ty
 from uuid import UUID
 
-import requests
 from currency.utils import to_minor_units
 from pydantic import BaseModel, SecretStr
 from rozert_pay.common import const
+from rozert_pay.common.helpers import http_transport
 from rozert_pay.common.helpers.validation_mexico import validate_clabe
 from rozert_pay.payment import entities, models, types
 from rozert_pay.payment.services import base_classes, errors
@@ -306,7 +306,7 @@ class MuweSpeiClient(base_classes.BasePaymentClient[MuweSpeiCreds]):
         if headers:
             request_headers.update(headers)
 
-        response = requests.request(
+        response = http_transport.PooledSession().request(
             method=method,
             url=url,
             json=json_data,
@@ -265,7 +265,7 @@ class MuweSpeiController(
                 return False
 
             wallet = customer_instruction.wallet
-            creds = self.client_cls.parse_and_validate_credentials(wallet.credentials)
+            creds = self.client_cls.get_wallet_credentials(wallet)
         else:
             order_id = payload.get("orderId")
             if not order_id:
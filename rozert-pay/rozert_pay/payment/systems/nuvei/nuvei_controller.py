@@ -51,6 +51,8 @@ class NuveiController(
 ):
     client_cls = NuveiClient
     sandbox_client_cls = NuveiSandboxClient
+    # Withdrawal callback response depends on transaction status
+    async_callbacks_supported = False
 
     def _run_deposit(
         self, trx_id: types.TransactionId, client: NuveiSandboxClient | NuveiClient
@@ -11,7 +11,6 @@ from typing import Any
 import pydantic
 from bm.datatypes import Money
 from django import forms
-from django.core.cache import cache
 from django.db import transaction
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema
@@ -28,6 +27,7 @@ from rozert_pay.payment.api_v1.views import GenericPaymentSystemApiV1Mixin
 from rozert_pay.payment.entities import RemoteTransactionStatus
 from rozert_pay.payment.models import IncomingCallback, PaymentTransaction
 from rozert_pay.payment.services import (
+    auth_tokens,
     base_classes,
     db_services,
     deposit_services,
@@ -49,23 +49,29 @@ class PaycashCredentials(BaseModel):
 
 
 FETCHA_OPERATION = "fetchaOperation"
+# Token expiration returned by Paycash is ignored, token is refreshed more often
+AUTH_TOKEN_TTL = timedelta(minutes=10)
 
 
 class PaycashClient(base_classes.BasePaymentClient[PaycashCredentials]):
     credentials_cls = PaycashCredentials
 
     def get_auth_token(self) -> str:
-        # # TODO: add redis cache
-        # if t := cache.get("paycash_auth_token"):
-        #     return t
+        return auth_tokens.get_token(
+            provider="paycash",
+            credentials=self.creds,
+            fetch=self._fetch_auth_token,
+        )
+
+    def _fetch_auth_token(self) -> auth_tokens.AuthToken:
         resp = self.session.get(
             f"{self.creds.host}/v1/authre?key={self.creds.key.get_secret_value()}",
         )
         resp.raise_for_status()
 
-        token = resp.json()["Authorization"]
-        cache.set("paycash_auth_token", token, timeout=600)
-        return token
+        return auth_tokens.AuthToken.from_expires_in(
+            resp.json()["Authorization"], AUTH_TOKEN_TTL.total_seconds()
+        )
 
     def generate_reference(
         self,
@@ -170,6 +176,8 @@ class SandboxPaycashClient(
 class PayCashController(PaymentSystemController[PaycashClient, SandboxPaycashClient]):
     client_cls = PaycashClient
     sandbox_client_cls = SandboxPaycashClient
+    # Callback response depends on callback processing result
+    async_callbacks_supported = False
 
     def _run_deposit(
         self, trx_id: types.TransactionId, client: PaycashClient | SandboxPaycashClient
@@ -7,7 +7,6 @@ from decimal import Decimal
 from typing import TYPE_CHECKING, Any, Callable, Literal, Optional
 from uuid import uuid4
 
-import requests
 from bm.datatypes import Money
 from django.core.exceptions import ValidationError
 from django.db import transaction
@@ -23,6 +22,7 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rozert_pay.common import const
 from rozert_pay.common.const import TransactionExtraFields
+from rozert_pay.common.helpers import http_transport
 from rozert_pay.common.helpers.log_utils import LogWriter
 from rozert_pay.payment import entities, tasks, types
 from rozert_pay.payment.api_v1 import serializers
@@ -33,6 +33,7 @@ from rozert_pay.payment.entities import (
 )
 from rozert_pay.payment.models import IncomingCallback, PaymentTransaction, Wallet
 from rozert_pay.payment.services import (
+    auth_tokens,
     base_classes,
     db_services,
     deposit_services,
@@ -74,13 +75,26 @@ class PaypalClient(base_classes.BasePaymentClient[PaypalCredentials]):
 
     @classmethod
     def get_auth_token_cls(self, session: Session, creds: PaypalCredentials) -> str:
+        return auth_tokens.get_token(
+            provider="paypal",
+            credentials=creds,
+            fetch=lambda: self._fetch_auth_token(session, creds),
+        )
+
+    @classmethod
+    def _fetch_auth_token(
+        cls, session: Session, creds: PaypalCredentials
+    ) -> auth_tokens.AuthToken:
         response = session.post(
             f"{creds.base_url}/v1/oauth2/token",
             auth=HTTPBasicAuth(creds.client_id, creds.client_secret.get_secret_value()),
             data={"grant_type": "client_credentials"},
         )
         response.raise_for_status()
-        return response.json()["access_token"]
+        data = response.json()
+        return auth_tokens.AuthToken.from_expires_in(
+            data["access_token"], data["expires_in"]
+        )
 
     def get_auth_token(self) -> str:
         return self.get_auth_token_cls(self.session, self.creds)
@@ -110,12 +124,21 @@ class PaypalClient(base_classes.BasePaymentClient[PaypalCredentials]):
         payload: Optional[dict[str, Any]] = None,
     ) -> dict[str, Any]:
         url = f"{creds.base_url}{path}"
-        headers = {
-            "Authorization": f"Bearer {cls.get_auth_token_cls(session, creds)}",
-            "PayPal-Request-Id": str(uuid4()),
-        }
-
-        response = getattr(session, method)(url=url, headers=headers, json=payload)
+        request_id = str(uuid4())
+
+        response = auth_tokens.request_with_token(
+            provider="paypal",
+            credentials=creds,
+            fetch=lambda: cls._fetch_auth_token(session, creds),
+            send=lambda token: getattr(session, method)(
+                url=url,
+                headers={
+                    "Authorization": f"Bearer {token}",
+                    "PayPal-Request-Id": request_id,
+                },
+                json=payload,
+            ),
+        )
         response.raise_for_status()
 
         if not response.text:
@@ -358,7 +381,7 @@ class PaypalClient(base_classes.BasePaymentClient[PaypalCredentials]):
         cls._make_request_cls(
             path=f"/v1/notifications/webhooks/{webhook_id}",
             method="delete",
-            session=requests.Session(),
+            session=http_transport.PooledSession(),
             creds=creds,
         )
 
@@ -371,7 +394,7 @@ class PaypalClient(base_classes.BasePaymentClient[PaypalCredentials]):
                 path="/v1/notifications/webhooks",
                 method="post",
                 payload={"url": url, "event_types": [{"name": "*"}]},
-                session=requests.Session(),
+                session=http_transport.PooledSession(),
                 creds=creds,
             )
         except HTTPError as e:
@@ -389,7 +412,7 @@ class PaypalClient(base_classes.BasePaymentClient[PaypalCredentials]):
         result = cls._make_request_cls(
             path="/v1/notifications/webhooks",
             method="get",
-            session=requests.Session(),
+            session=http_transport.PooledSession(),
             creds=creds,
         )
 
@@ -32,6 +32,8 @@ class SpeiPaymentSystemController(
 ):
     client_cls = SpeiStpClient
     sandbox_client_cls = SpeiStpSandboxClient
+    # Deposit callbacks are rejected with response to payment system
+    async_callbacks_supported = False
 
     def on_db_transaction_created_via_api(self, trx: PaymentTransaction) -> None:
         """
@@ -1,20 +1,18 @@
-import base64
-import hashlib
-import hmac
 import json
 import logging
+from collections import Counter, defaultdict
 from datetime import timedelta
 from itertools import groupby
-from typing import Any, Literal, TypedDict, cast, overload
+from typing import Literal, TypedDict, cast, overload
 
 import requests
 from celery import Task
-from celery.exceptions import MaxRetriesExceededError
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.db import transaction
 from django.http import HttpResponse
 from django.utils import timezone
+from redis.exceptions import LockError
 from rest_framework.response import Response
 from rozert_pay.account.models import User
 from rozert_pay.celery_app import app
@@ -26,25 +24,30 @@ from rozert_pay.common.const import (
     TransactionStatus,
     TransactionType,
 )
-from rozert_pay.common.helpers.log_utils import LogWriter
 from rozert_pay.limits.services import limits
 from rozert_pay.payment import entities
 from rozert_pay.payment import types
 from rozert_pay.payment import types as payment_types
 from rozert_pay.payment.entities import RemoteTransactionStatus
-from rozert_pay.payment.factories import get_payment_system_controller
+from rozert_pay.payment.factories import (
+    get_payment_system_controller,
+    get_payment_system_controller_by_type,
+)
 from rozert_pay.payment.models import (
     IncomingCallback,
-    OutcomingCallback,
     PaymentCardBank,
     PaymentSystem,
     PaymentTransaction,
     PaymentTransactionEventLog,
 )
 from rozert_pay.payment.services import (
+    callback_dispatcher,
     db_services,
     errors,
     event_logs,
+    external_api_services,
+    incoming_callback_queue,
+    transaction_expiry,
     transaction_processing,
     transaction_status_validation,
 )
@@ -57,6 +60,18 @@ from rozert_pay.risk_lists.services import checker
 
 logger = logging.getLogger(__name__)
 
+STATUS_CHECKS_PER_RUN = 5000
+STATUS_CHECKS_PER_SYSTEM_PER_RUN = 1000
+STATUS_CHECKS_BATCH_SIZE = 500
+STATUS_CHECKS_BATCH_SIZE_PER_SYSTEM = 100
+# Transactions of one wallet checked by one batch status check task
+STATUS_CHECKS_PER_BATCH_TASK = 100
+
+# Dispatcher task runs until no callbacks are due, but not longer than this
+DISPATCH_CALLBACKS_DURATION = timedelta(seconds=50)
+# Task runs until no callbacks are queued, but not longer than this
+PROCESS_QUEUED_CALLBACKS_DURATION = timedelta(seconds=50)
+
 
 @app.task
 def process_transaction(transaction_id: str) -> None:
@@ -137,207 +152,81 @@ def task_fail_by_timeout(transaction_id: int, ttl_seconds: int) -> None:
 @app.task(queue=CeleryQueue.LOW_PRIORITY)
 def task_periodic_fail_old_transactions() -> None:
     for system in PaymentSystem.objects.all():
-        # Process deposits
-        ttl_sec = system.deposit_allowed_ttl_seconds
-
-        for trx in PaymentTransaction.objects.filter(
-            status=const.TransactionStatus.PENDING,
-            type=const.TransactionType.DEPOSIT,
-            created_at__lt=timezone.now() - timedelta(seconds=ttl_sec),
-        ).select_related("wallet__wallet"):
-            assert trx.type == const.TransactionType.DEPOSIT
-            assert trx.created_at < timezone.now() - timedelta(seconds=ttl_sec)
-
-            event_logs.create_transaction_log(
-                event_type=EventType.INFO,
-                trx_id=trx.id,
-                description=f"Fail transaction by ttl ({ttl_sec=})",
-                extra={},
-            )
-
-            task_fail_by_timeout.delay(
-                transaction_id=trx.id,
-                ttl_seconds=ttl_sec,
-            )
+        transaction_expiry.fail_expired_deposits(system)
 
 
 @app.task(
     bind=True,
     acks_late=True,
-    soft_time_limit=30,
-    time_limit=30,
+    soft_time_limit=callback_dispatcher.REQUEST_TIMEOUT + 5,
+    time_limit=callback_dispatcher.REQUEST_TIMEOUT + 10,
 )
-@transaction.atomic
 def send_callback(self: Task, callback_id: str) -> None:  # type: ignore[type-arg]
-    cb: OutcomingCallback | None = (
-        OutcomingCallback.objects.select_related(
-            "transaction__wallet__wallet__merchant",
-        )
-        .select_for_update(of=("self",))
-        .filter(id=callback_id)
-        .last()
-    )
-    if not cb:
-        logger.info(
-            "No callback found for sending, maybe was cancelled",
-            extra={
-                "callback_id": callback_id,
-            },
-        )
-        return
+    """
+    Sends callback right away. Retries are sent by dispatch_outcoming_callbacks.
+    """
+    if cb := callback_dispatcher.claim_callback(callback_id):
+        callback_dispatcher.send_claimed_callback(cb)
 
-    log_writer = LogWriter()
 
-    log_writer.write("---")
-    log_writer.write(f"Send callback - attempt {cb.current_attempt}/{cb.max_attempts}")
+@app.task(
+    queue=CeleryQueue.NORMAL_PRIORITY,
+    soft_time_limit=(
+        DISPATCH_CALLBACKS_DURATION
+        + callback_dispatcher.get_claim_lease(callback_dispatcher.MAX_LANE_LENGTH)
+    ).total_seconds(),
+)
+def dispatch_outcoming_callbacks() -> None:
+    started_at = timezone.now()
+    while timezone.now() - started_at < DISPATCH_CALLBACKS_DURATION:
+        if (
+            callback_dispatcher.dispatch_due_callbacks()
+            < callback_dispatcher.BATCH_SIZE
+        ):
+            return
 
-    def _on_exit() -> None:
-        cb.logs = (cb.logs or "") + "\n" + log_writer.to_string()
-        cb.save()
-        return None
-
-    if cb.status != const.CallbackStatus.PENDING:  # pragma: no cover
-        log_writer.write("Trying to send callback with final status")
-        logger.warning(
-            "Trying to send callback with final status",
-            extra={
-                "callback_id": cb.id,
-                "status": cb.status,
-            },
-        )
-        return _on_exit()
-
-    body = json.dumps(cb.body).encode()
-    transaction = cb.transaction
-    merchant = transaction.wallet.wallet.merchant
-    secret_key = merchant.secret_key.encode()
-    expected_signature = base64.b64encode(
-        hmac.new(secret_key, body, hashlib.sha256).digest()
-    ).decode()
-
-    system = get_payment_system_controller(transaction.system)
-    if not system:  # pragma: no cover
-        log_writer.write("Unsupported payment system")
-        logger.error("Unsupported payment system", extra={"system": transaction.system})
-        return _on_exit()
-
-    event_log: dict[str, Any] = {
-        "body": body.decode(),
-        "signature": expected_signature,
-    }
-    error = None
 
+@app.task(queue=CeleryQueue.HIGH_PRIORITY)
+def process_queued_callbacks(system_id: int, queue_key: str) -> None:
+    """
+    Processes queued incoming callbacks with the queue key in order of
+    receiving. If callbacks are processed by other worker, it takes new ones too.
+    """
     try:
-        resp = requests.post(
-            url=cb.target,
-            data=body,
-            headers={
-                "Content-Type": "application/json",
-                "X-Signature": expected_signature,
-            },
-            timeout=30,
-        )
-    except Exception as e:
-        event_log["error"] = str(e)
-        error = str(e)
-        log_writer.write(f"Error during callback sending: {e}")
-        logger.warning(
-            "Error during callback sending",
-            extra={
-                "callback_id": cb.id,
-                "error": str(e),
-            },
-            exc_info=True,
+        with incoming_callback_queue.processing_lock(system_id, queue_key):
+            started_at = timezone.now()
+            while timezone.now() - started_at < PROCESS_QUEUED_CALLBACKS_DURATION:
+                cb_ids = incoming_callback_queue.get_queued_callback_ids(
+                    system_id, queue_key
+                )
+                if not cb_ids:
+                    return
+
+                for cb_id in cb_ids:
+                    try:
+                        # Origin is checked before callback is queued
+                        handle_incoming_callback(cb_id, origin_checked=True)
+                    except Exception:
+                        logger.exception(
+                            "Error processing queued callback",
+                            extra={"callback_id": cb_id},
+                        )
+                    finally:
+                        incoming_callback_queue.mark_processed(cb_id)
+    except LockError:
+        logger.info(
+            "Queued callbacks are processed by other worker",
+            extra={"system_id": system_id, "queue_key": queue_key},
         )
-    else:
-        event_log["response"] = {
-            "status_code": resp.status_code,
-            "text": resp.text,
-        }
-        log_writer.write(f"Response: {resp.status_code} {resp.text[:100]}")
-        if not resp.ok:
-            log_writer.write(
-                "Bad response during callback sending, retrying...",
-            )
-            logger.warning(
-                "bad response during sending callback",
-                extra={
-                    "callback_id": cb.id,
-                    "status_code": resp.status_code,
-                    "text": resp.text[:100],
-                },
-            )
-            error = f"Bad response: {resp.status_code} {resp.text[:100]}"
-        else:
-            log_writer.write("Callback sent")
-            logger.info(
-                "callback sent",
-                extra={
-                    "callback_id": cb.id,
-                    "status_code": resp.status_code,
-                    "text": resp.text[:100],
-                },
-            )
 
-    cb.error = error
-    cb.last_attempt_at = timezone.now()
-    cb.current_attempt = cb.current_attempt + 1
 
-    event_logs.create_transaction_log(
-        trx_id=transaction.id,
-        event_type=EventType.CALLBACK_SENDING_ATTEMPT,
-        extra=event_log,
-        description=f"Attempt to send callback: {cb.current_attempt} / {cb.max_attempts}",
-    )
-    if error is None:
-        cb.status = const.CallbackStatus.SUCCESS
-        cb.save()
-        metrics.OUTCOMING_CALLBACK_COUNT.labels(
-            status="success",
-            system=cb.transaction.system.type,
-        ).inc()
-        metrics.OUTCOMING_CALLBACKS_DURATION.labels(
-            status="success",
-            system=cb.transaction.system.type,
-        ).observe((cb.last_attempt_at - cb.created_at).total_seconds())
-        return _on_exit()
-
-    if cb.current_attempt <= cb.max_attempts:
-        logger.info(
-            "retrying callback",
-            extra={
-                "callback_id": cb.id,
-                "current_attempt": cb.current_attempt,
-                "max_attempts": cb.max_attempts,
-                "countdown": 2**cb.current_attempt,
-            },
-        )
-        try:
-            self.retry(
-                countdown=2**cb.current_attempt,
-                max_retries=cb.max_attempts,
-                throw=False,
-            )
-            log_writer.write("Callback retry scheduled")
-        except MaxRetriesExceededError:
-            logger.exception("")
-            cb.status = const.CallbackStatus.FAILED
-            cb.save()
-            log_writer.write("Callback retries limit exceeded")
-        return _on_exit()
-
-    log_writer.write("Callback retries limit exceeded")
-    cb.status = const.CallbackStatus.FAILED
-    cb.save()
-    metrics.OUTCOMING_CALLBACK_COUNT.labels(
-        status="failed",
-        system=cb.transaction.system.type,
-    ).inc()
-    metrics.OUTCOMING_CALLBACKS_DURATION.labels(
-        status="failed",
-        system=cb.transaction.system.type,
-    ).observe((cb.last_attempt_at - cb.created_at).total_seconds())
-    return _on_exit()
+@app.task(queue=CeleryQueue.HIGH_PRIORITY)
+def dispatch_queued_callbacks() -> None:
+    """
+    Picks up queued callbacks left by failed or concurrently finished tasks.
+    """
+    for system_id, queue_key in incoming_callback_queue.get_queues_with_callbacks():
+        process_queued_callbacks.delay(system_id=system_id, queue_key=queue_key)
 
 
 @overload
@@ -347,6 +236,7 @@ def handle_incoming_callback(
     retry_user: User | AnonymousUser,
     *,
     is_sandbox: bool = False,
+    origin_checked: bool = False,
 ) -> Response:
     ...
 
@@ -358,6 +248,7 @@ def handle_incoming_callback(
     retry_user: None = None,
     *,
     is_sandbox: bool = False,
+    origin_checked: bool = False,
 ) -> Response:
     ...
 
@@ -368,6 +259,7 @@ def handle_incoming_callback(
     retry_user: User | AnonymousUser | None = None,
     *,
     is_sandbox: bool = False,
+    origin_checked: bool = False,
 ) -> HttpResponse:
     with global_context(
         incoming_callback_id=cb_id,
@@ -400,7 +292,9 @@ def handle_incoming_callback(
             return Response()
 
         try:
-            r = controller.parse_callback(cb, is_sandbox=is_sandbox)
+            r = controller.parse_callback(
+                cb, is_sandbox=is_sandbox, origin_checked=origin_checked
+            )
             if isinstance(r, Response):
                 return r
             assert isinstance(r, type(None))
@@ -419,21 +313,99 @@ def handle_incoming_callback(
 
 @app.task(queue=CeleryQueue.LOW_PRIORITY)
 def check_pending_transaction_status() -> None:
-    for (
-        trx_id,
-        trx_extra,
-    ) in PaymentTransaction.objects.transactions_for_periodic_status_check().values_list(
-        "id", "extra"
-    ):
-        if TransactionPeriodicCheckService.should_schedule_check_task_immediately(
-            types.TransactionId(trx_id), trx_extra
-        ):
-            check_status.delay(trx_id)
+    """
+    Schedules status checks of due transactions, at most
+    STATUS_CHECKS_PER_RUN per run and about STATUS_CHECKS_PER_SYSTEM_PER_RUN
+    per payment system.
+
+    Transactions of payment systems supporting batch status check are
+    checked by wallet, up to STATUS_CHECKS_PER_BATCH_TASK per task.
+    """
+    checks_by_system: Counter[const.PaymentSystemType] = Counter()
+    checks_count = 0
+    while checks_count < STATUS_CHECKS_PER_RUN:
+        claimed = TransactionPeriodicCheckService.claim_due_transactions(
+            limit=min(STATUS_CHECKS_BATCH_SIZE, STATUS_CHECKS_PER_RUN - checks_count),
+            limit_per_system=STATUS_CHECKS_BATCH_SIZE_PER_SYSTEM,
+            exclude_systems=[
+                system
+                for system, count in checks_by_system.items()
+                if count >= STATUS_CHECKS_PER_SYSTEM_PER_RUN
+            ],
+        )
+        by_wallet: dict[int, list[payment_types.TransactionId]] = defaultdict(list)
+        for trx_id, system_type, wallet_id in claimed:
+            checks_by_system[system_type] += 1
+            controller = get_payment_system_controller_by_type(system_type)
+            if controller and controller.supports_batch_status_check:
+                by_wallet[wallet_id].append(trx_id)
+            else:
+                check_status.delay(trx_id)
+
+        for trx_ids in by_wallet.values():
+            for i in range(0, len(trx_ids), STATUS_CHECKS_PER_BATCH_TASK):
+                check_statuses.delay(trx_ids[i : i + STATUS_CHECKS_PER_BATCH_TASK])
+
+        checks_count += len(claimed)
+        if not claimed:
+            return
 
 
 # TODO: naming
 @app.task(queue=CeleryQueue.LOW_PRIORITY)
 def check_status(transaction_id: int) -> None:
+    if not (trx := _prepare_status_check(transaction_id)):
+        return
+
+    controller = get_payment_system_controller(trx.system)
+    assert controller
+
+    # Check transaction status with remote.
+    remote_status = controller.get_client(trx).get_transaction_status()
+    _sync_checked_status(trx, remote_status)
+
+
+@app.task(queue=CeleryQueue.LOW_PRIORITY)
+def check_statuses(transaction_ids: list[int]) -> None:
+    """
+    Checks statuses of transactions of one wallet with batch requests
+    to payment system, see PaymentSystemController.get_remote_transaction_statuses.
+    """
+    transactions = [
+        trx
+        for transaction_id in transaction_ids
+        if (trx := _prepare_status_check(transaction_id))
+    ]
+    if not transactions:
+        return
+
+    wallet = transactions[0].wallet.wallet
+    assert all(trx.wallet.wallet_id == wallet.id for trx in transactions)
+
+    controller = get_payment_system_controller(wallet.system)
+    assert controller
+
+    with external_api_services.buffered_event_logs():
+        remote_statuses = controller.get_remote_transaction_statuses(
+            wallet=wallet,
+            transactions=transactions,
+        )
+    for trx in transactions:
+        try:
+            _sync_checked_status(trx, remote_statuses[trx.id])
+        except Exception:
+            # Transaction will be checked again on next schedule
+            logger.exception(
+                "Error during transaction status sync",
+                extra={"transaction_id": trx.id},
+            )
+
+
+def _prepare_status_check(transaction_id: int) -> PaymentTransaction | None:
+    """
+    Returns transaction if its status should be checked with payment system.
+    Expired transactions are handled here.
+    """
     with transaction.atomic():
         locked_trx = db_services.get_transaction(trx_id=transaction_id, for_update=True)
 
@@ -452,14 +424,14 @@ def check_status(transaction_id: int) -> None:
                     "status": locked_trx.status,
                 },
             )
-            return
+            return None
 
         controller = get_payment_system_controller(locked_trx.system)
         if not controller:  # pragma: no cover
             logger.error(
                 "Unsupported payment system", extra={"system": locked_trx.system}
             )
-            return
+            return None
 
         # Case when transaction is stuck in processing state for too long
         if (
@@ -487,17 +459,21 @@ def check_status(transaction_id: int) -> None:
 
             locked_trx.check_status_until = None
             locked_trx.save(update_fields=["check_status_until", "updated_at"])
-            return
+            return None
 
-    trx = cast(PaymentTransaction, locked_trx)
-    del locked_trx
+    return cast(PaymentTransaction, locked_trx)
 
-    # Check transaction status with remote.
-    remote_status = controller.get_client(trx).get_transaction_status()
 
+def _sync_checked_status(
+    trx: PaymentTransaction,
+    remote_status: RemoteTransactionStatus | errors.Error,
+) -> None:
     if isinstance(remote_status, errors.Error):
         return
 
+    controller = get_payment_system_controller(trx.system)
+    assert controller
+
     status_or_err = transaction_status_validation.validate_remote_transaction_status(
         transaction=trx,
         remote_status=remote_status,
@@ -505,7 +481,7 @@ def check_status(transaction_id: int) -> None:
 
     # TODO: check case when final status mismatches
     with transaction.atomic():
-        locked_trx = db_services.get_transaction(trx_id=transaction_id, for_update=True)
+        locked_trx = db_services.get_transaction(trx_id=trx.id, for_update=True)
 
         if isinstance(status_or_err, errors.Error):  # pragma: no cover
             # In this case we can't do much, so stop checking
@@ -1,2 +1,5 @@
 from .audit_db_services import DbAuditItemManager  # noqa
-from .audit_items_synchronization import get_transaction_status  # noqa
+from .audit_items_synchronization import (  # noqa
+    get_transaction_status,
+    get_transactions_statuses,
+)
@@ -115,6 +115,73 @@ def get_transaction_status(
     if i := DbAuditItemManager.get_current_audit_item(trx):
         return i
 
+    return _not_found_status()
+
+
+@track_duration("payment_audit.get_transactions_statuses")
+def get_transactions_statuses(
+    wallet: "payment_models.Wallet",
+    transactions: list[PaymentTransaction],
+) -> dict[types.TransactionId, RemoteTransactionStatus]:
+    """
+    Batch version of get_transaction_status for transactions of one wallet.
+
+    Audit items are synchronized once per 24h page of transactions creation
+    time instead of once per transaction.
+    """
+    controller = get_payment_system_controller_by_type(wallet.system.type)
+    assert controller
+
+    assert issubclass(controller.client_cls, AuditItemsSynchronizationClientMixin)
+
+    result: dict[types.TransactionId, RemoteTransactionStatus] = {}
+    not_synced = []
+    for trx in transactions:
+        i = DbAuditItemManager.get_current_audit_item(trx)
+        if i and trx.status == i.operation_status:
+            result[trx.id] = i
+        else:
+            not_synced.append(trx)
+
+    for start, end in _get_sync_pages(not_synced):
+        synchronize_audit_items_for_wallet(
+            client_cls=controller.client_cls,
+            wallet=wallet,
+            start=start,
+            end=end,
+        )
+
+    for trx in not_synced:
+        result[trx.id] = (
+            DbAuditItemManager.get_current_audit_item(trx) or _not_found_status()
+        )
+    return result
+
+
+def _get_sync_pages(
+    transactions: list[PaymentTransaction],
+    page_size: timedelta = timedelta(hours=24),
+) -> list[tuple[datetime.datetime, datetime.datetime]]:
+    """
+    Merges 24h windows after transactions creation and splits them to pages.
+    """
+    periods: list[tuple[datetime.datetime, datetime.datetime]] = []
+    for trx in sorted(transactions, key=lambda t: t.created_at):
+        start, end = trx.created_at, trx.created_at + page_size
+        if periods and start <= periods[-1][1]:
+            periods[-1] = (periods[-1][0], max(end, periods[-1][1]))
+        else:
+            periods.append((start, end))
+
+    pages = []
+    for start, end in periods:
+        while start < end:
+            pages.append((start, min(start + page_size, end)))
+            start += page_size
+    return pages
+
+
+def _not_found_status() -> RemoteTransactionStatus:
     return RemoteTransactionStatus(
         operation_status=TransactionStatus.PENDING,
         raw_data={
@@ -168,6 +168,7 @@ class RiskListEntry(models.Model):
 
         self.set_expiration()
         super().save(*args, **kwargs)
+        self._on_change()
 
     def soft_delete(self, *, reason: str) -> None:
         if not reason:
@@ -175,6 +176,13 @@ class RiskListEntry(models.Model):
         self.is_deleted = True
         self.delete_reason = reason
         super().save(update_fields=["is_deleted", "delete_reason", "updated_at"])
+        self._on_change()
+
+    def _on_change(self) -> None:
+        from rozert_pay.risk_lists.services import matcher, prefilter
+
+        prefilter.add_entry(self)
+        matcher.invalidate_matcher()
 
     def delete(
         self,
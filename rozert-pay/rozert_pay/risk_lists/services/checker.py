@@ -2,14 +2,11 @@ from __future__ import annotations
 
 import logging
 import typing as ty
-from time import perf_counter
-from typing import Mapping
 
 from django.db import transaction
-from django.db.models import Q
 from django.utils import timezone
 from rozert_pay.common import const
-from rozert_pay.common.metrics import RISK_REPO_QUERY_DURATION, track_duration
+from rozert_pay.common.metrics import track_duration
 from rozert_pay.payment import models as payment_models
 from rozert_pay.payment import types as payment_types
 from rozert_pay.payment.services import db_services, event_logs
@@ -17,6 +14,7 @@ from rozert_pay.risk_lists import models as risk_models
 from rozert_pay.risk_lists.const import ListType, OperationType, Scope
 from rozert_pay.risk_lists.types import RiskCheckResult, RiskDecision
 
+from . import matcher, prefilter
 from .match_data import MatchData
 
 logger = logging.getLogger(__name__)
@@ -25,19 +23,6 @@ if ty.TYPE_CHECKING:
     from rozert_pay.payment.systems.base_controller import PaymentSystemController
 
 
-_LIST_TYPE_PRIORITY: Mapping[ListType, int] = {
-    ListType.MERCHANT_BLACK: 0,
-    ListType.WHITE: 1,
-    ListType.BLACK: 2,
-    ListType.GRAY: 3,
-}
-_SCOPE_PRIORITY: Mapping[Scope, int] = {
-    Scope.WALLET: 0,
-    Scope.MERCHANT: 1,
-    Scope.GLOBAL: 2,
-}
-
-
 @track_duration("risk_lists.checker.check_risk_lists_and_maybe_decline_transaction")
 def check_risk_lists_and_maybe_decline_transaction(
     trx: payment_models.PaymentTransaction,
@@ -75,6 +60,8 @@ def check_risk_lists_and_maybe_decline_transaction(
 
 @track_duration("risk_lists.checker.is_customer_in_list")
 def is_customer_in_list(customer: payment_models.Customer, list_type: ListType) -> bool:
+    if not prefilter.may_contain_customer(customer.id, list_type):
+        return False
     return risk_models.RiskListEntry.objects.filter(
         customer=customer,
         list_type=list_type,
@@ -85,24 +72,25 @@ def is_customer_in_list(customer: payment_models.Customer, list_type: ListType)
 def _process_transaction(trx: payment_models.PaymentTransaction) -> RiskCheckResult:
     """
     Single-pass matcher:
-      - fetch scoped active entries for trx.operation_type,
-      - sort by business priority,
-      - for each entry, run MatchData.matches(),
+      - skip transactions which can't match anything by the prefilter,
+      - look up matched active entries for trx.operation_type in the compiled index,
+      - entries come sorted by business priority,
       - on first match: return action/reason; on DECLINE — write event log here.
     """
     data = MatchData.from_transaction(trx)
-    entries = _get_active_entries(
-        currency_wallet=trx.wallet, transaction_type=const.TransactionType(trx.type)
+    if not prefilter.may_match(data):
+        return RiskCheckResult(is_declined=False)
+
+    entries = _get_matched_entries(
+        data=data,
+        currency_wallet=trx.wallet,
+        transaction_type=const.TransactionType(trx.type),
     )
-    entries.sort(key=_sort_key)
 
     for entry in entries:
         list_type = ListType(entry.list_type)
         scope = Scope(entry.scope)
 
-        if not data.matches(entry):
-            continue
-
         if list_type == ListType.MERCHANT_BLACK:
             decision = RiskDecision.MERCHANT_BLACKLIST
             _log_decline(
@@ -166,25 +154,14 @@ def _process_transaction(trx: payment_models.PaymentTransaction) -> RiskCheckRes
     return RiskCheckResult(is_declined=False)
 
 
-@track_duration("risk_lists.checker._sort_key")
-def _sort_key(entry: risk_models.RiskListEntry) -> tuple[int, int, int]:
-    lt = ListType(entry.list_type)
-    sc = Scope(entry.scope)
-    return (
-        _LIST_TYPE_PRIORITY.get(lt, 99),
-        _SCOPE_PRIORITY.get(sc, 99),
-        entry.id or 0,
-    )
-
-
-@track_duration("risk_lists.checker._get_active_entries")
-def _get_active_entries(
+@track_duration("risk_lists.checker._get_matched_entries")
+def _get_matched_entries(
+    data: MatchData,
     currency_wallet: payment_models.CurrencyWallet | None,
     transaction_type: const.TransactionType,
 ) -> list[risk_models.RiskListEntry]:
     """
-    One DB read of 'active' entries for this transaction's operation_type,
-    prefiltered by scope:
+    Active entries matched by transaction data, scoped as
       (GLOBAL) OR (MERCHANT & merchant_id) OR (WALLET & wallet_id)
     """
     try:
@@ -194,34 +171,14 @@ def _get_active_entries(
             f"Unsupported transaction type for risk filtering: {transaction_type!r}"
         ) from exc
 
-    now = timezone.now()
-
     wallet = currency_wallet.wallet if currency_wallet else None
-    merchant_id = wallet.merchant_id if wallet else None
-    wallet_id = currency_wallet.wallet_id if currency_wallet else None
-
-    scope_q = Q(scope=Scope.GLOBAL)
-    if merchant_id is not None:
-        scope_q |= Q(
-            scope=Scope.MERCHANT,
-            merchant_id=merchant_id,
-        )
-    if wallet_id is not None:
-        scope_q |= Q(
-            scope=Scope.WALLET,
-            wallet_id=wallet_id,
-        )
-    t0 = perf_counter()
-    entries = list(
-        risk_models.RiskListEntry.objects.filter(is_deleted=False)
-        .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=now))
-        .filter(Q(operation_type=OperationType.ALL) | Q(operation_type=op))
-        .filter(scope_q)
-    )
-    RISK_REPO_QUERY_DURATION.labels(name="risk.get_active_entries").observe(
-        perf_counter() - t0
+    return matcher.get_matcher().find_matches(
+        data,
+        merchant_id=wallet.merchant_id if wallet else None,
+        wallet_id=currency_wallet.wallet_id if currency_wallet else None,
+        operation_type=op,
+        now=timezone.now(),
     )
-    return entries
 
 
 @track_duration("risk_lists.checker._log_decline")
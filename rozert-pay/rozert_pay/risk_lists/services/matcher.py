@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import datetime
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from time import perf_counter
+from typing import Iterable, Mapping
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rozert_pay.common.helpers.cache import (
+    CacheKey,
+    memory_cache_get_set,
+    memory_cache_invalidate,
+)
+from rozert_pay.common.metrics import RISK_REPO_QUERY_DURATION, track_duration
+from rozert_pay.risk_lists import models as risk_models
+from rozert_pay.risk_lists.const import (
+    ALLOWED_MATCH_FIELDS,
+    ListType,
+    MatchFieldKey,
+    OperationType,
+    Scope,
+)
+
+from .match_data import MatchData
+
+logger = logging.getLogger(__name__)
+
+RISK_LIST_MATCHER_CACHE_KEY: CacheKey = CacheKey("risk_list_matcher")
+# Expired entries are skipped on match, TTL only bounds how long they are kept
+CACHE_TIMEOUT = timedelta(minutes=1)
+
+_LIST_TYPE_PRIORITY: Mapping[ListType, int] = {
+    ListType.MERCHANT_BLACK: 0,
+    ListType.WHITE: 1,
+    ListType.BLACK: 2,
+    ListType.GRAY: 3,
+}
+_SCOPE_PRIORITY: Mapping[Scope, int] = {
+    Scope.WALLET: 0,
+    Scope.MERCHANT: 1,
+    Scope.GLOBAL: 2,
+}
+
+_FieldValue = tuple[MatchFieldKey, str]
+_EMPTY: frozenset[int] = frozenset()
+
+
+def _sort_key(entry: risk_models.RiskListEntry) -> tuple[int, int, int]:
+    lt = ListType(entry.list_type)
+    sc = Scope(entry.scope)
+    return (
+        _LIST_TYPE_PRIORITY.get(lt, 99),
+        _SCOPE_PRIORITY.get(sc, 99),
+        entry.id or 0,
+    )
+
+
+def _entry_field_values(
+    entry: risk_models.RiskListEntry,
+) -> list[_FieldValue] | None:
+    """
+    Normalized values of entry match fields.
+
+    Returns None if some match field has no value, such entry can't match
+    with AND semantics.
+    """
+    result: list[_FieldValue] = []
+    for f in entry.match_fields:
+        value = getattr(entry, MatchFieldKey(f).value, None)
+        if value is None:
+            return None
+        result.append((MatchFieldKey(f), MatchData._norm_str(value)))
+    return result
+
+
+@dataclass
+class _OwnerEntries:
+    """Entries of one merchant or wallet, matched with OR semantics."""
+
+    by_customer_id: dict[int, set[int]] = field(
+        default_factory=lambda: defaultdict(set)
+    )
+    by_field_value: dict[_FieldValue, set[int]] = field(
+        default_factory=lambda: defaultdict(set)
+    )
+
+
+class RiskListMatcher:
+    """
+    Compiled in-process index of active risk list entries.
+
+    Entries are stored sorted by priority and referenced by position, so
+    the first matched position is the entry to act upon.
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[risk_models.RiskListEntry],
+        version: datetime.datetime,
+    ) -> None:
+        self.version = version
+        self.entries: list[risk_models.RiskListEntry] = sorted(entries, key=_sort_key)
+
+        self._global_by_field_value: dict[_FieldValue, set[int]] = defaultdict(set)
+        self._global_by_match_fields: dict[
+            frozenset[MatchFieldKey], set[int]
+        ] = defaultdict(set)
+        self._owners: dict[tuple[str, int], _OwnerEntries] = defaultdict(_OwnerEntries)
+
+        for position, entry in enumerate(self.entries):
+            if entry.scope == Scope.GLOBAL:
+                self._add_global_entry(position, entry)
+            elif entry.scope == Scope.MERCHANT and entry.merchant_id:
+                self._add_owner_entry(position, entry, entry.merchant_id)
+            elif entry.scope == Scope.WALLET and entry.wallet_id:
+                self._add_owner_entry(position, entry, entry.wallet_id)
+
+    def _add_global_entry(
+        self, position: int, entry: risk_models.RiskListEntry
+    ) -> None:
+        field_values = _entry_field_values(entry)
+        if not field_values:
+            return
+        for field_value in field_values:
+            self._global_by_field_value[field_value].add(position)
+        self._global_by_match_fields[frozenset(f for f, _ in field_values)].add(
+            position
+        )
+
+    def _add_owner_entry(
+        self,
+        position: int,
+        entry: risk_models.RiskListEntry,
+        owner_id: int,
+    ) -> None:
+        owner = self._owners[(Scope(entry.scope).value, owner_id)]
+        if entry.customer_id is not None:
+            owner.by_customer_id[entry.customer_id].add(position)
+        for f in entry.match_fields:
+            value = getattr(entry, MatchFieldKey(f).value, None)
+            if value is not None:
+                owner.by_field_value[
+                    (MatchFieldKey(f), MatchData._norm_str(value))
+                ].add(position)
+
+    def find_matches(
+        self,
+        data: MatchData,
+        *,
+        merchant_id: int | None,
+        wallet_id: int | None,
+        operation_type: OperationType,
+        now: datetime.datetime,
+    ) -> list[risk_models.RiskListEntry]:
+        """
+        Returns matched active entries sorted by priority.
+
+        GLOBAL entries match if all their fields match, MERCHANT and WALLET
+        entries match by customer or by any of their fields.
+        """
+        field_values: list[_FieldValue] = []
+        for f in ALLOWED_MATCH_FIELDS:
+            value = getattr(data, f.value, None)
+            if value is not None:
+                field_values.append((f, MatchData._norm_str(value)))
+
+        positions: set[int] = set()
+
+        global_positions_by_field = {
+            f: self._global_by_field_value.get((f, value), _EMPTY)
+            for f, value in field_values
+        }
+        for match_fields, signature_positions in self._global_by_match_fields.items():
+            if not match_fields <= global_positions_by_field.keys():
+                continue
+            positions |= signature_positions.intersection(
+                *(global_positions_by_field[f] for f in match_fields)
+            )
+
+        owner_keys: list[tuple[str, int]] = []
+        if merchant_id is not None:
+            owner_keys.append((Scope.MERCHANT.value, merchant_id))
+        if wallet_id is not None:
+            owner_keys.append((Scope.WALLET.value, wallet_id))
+        for owner_key in owner_keys:
+            owner = self._owners.get(owner_key)
+            if not owner:
+                continue
+            if data.customer_id is not None:
+                positions |= owner.by_customer_id.get(data.customer_id, _EMPTY)
+            for field_value in field_values:
+                positions |= owner.by_field_value.get(field_value, _EMPTY)
+
+        result: list[risk_models.RiskListEntry] = []
+        for position in sorted(positions):
+            entry = self.entries[position]
+            if entry.operation_type not in (OperationType.ALL, operation_type):
+                continue
+            if entry.expires_at is not None and entry.expires_at <= now:
+                continue
+            result.append(entry)
+        return result
+
+
+@track_duration("risk_lists.matcher._build_matcher")
+def _build_matcher() -> RiskListMatcher:
+    now = timezone.now()
+    t0 = perf_counter()
+    entries = list(
+        risk_models.RiskListEntry.objects.filter(is_deleted=False).filter(
+            Q(expires_at__isnull=True) | Q(expires_at__gt=now)
+        )
+    )
+    RISK_REPO_QUERY_DURATION.labels(name="risk.get_active_entries").observe(
+        perf_counter() - t0
+    )
+    logger.info(
+        "Risk list matcher built",
+        extra={"entries_count": len(entries), "version": now.isoformat()},
+    )
+    return RiskListMatcher(entries, version=now)
+
+
+@track_duration("risk_lists.matcher.get_matcher")
+def get_matcher() -> RiskListMatcher:
+    matcher = memory_cache_get_set(
+        key=RISK_LIST_MATCHER_CACHE_KEY,
+        tp=RiskListMatcher,
+        on_miss=_build_matcher,
+        ttl=CACHE_TIMEOUT,
+    )
+    assert matcher is not None
+    return matcher
+
+
+def invalidate_matcher() -> None:
+    memory_cache_invalidate(RISK_LIST_MATCHER_CACHE_KEY)
+    # Processes may rebuild the matcher before the change is committed
+    transaction.on_commit(lambda: memory_cache_invalidate(RISK_LIST_MATCHER_CACHE_KEY))
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rozert_pay.common.helpers.cache import (
+    CacheKey,
+    memory_cache_get_set,
+    memory_cache_invalidate,
+    redis_set_add,
+    redis_set_members,
+    redis_set_replace,
+)
+from rozert_pay.common.metrics import track_duration
+from rozert_pay.risk_lists import models as risk_models
+from rozert_pay.risk_lists.const import ListType, MatchFieldKey
+
+from .match_data import MatchData
+
+logger = logging.getLogger(__name__)
+
+PREFILTER_REDIS_KEY: CacheKey = CacheKey("risk_lists:prefilter")
+PREFILTER_CACHE_KEY: CacheKey = CacheKey("risk_lists_prefilter")
+CACHE_TIMEOUT = timedelta(minutes=5)
+# Entries saved while rebuild is running are added again after it
+_REBUILD_OVERLAP = timedelta(minutes=1)
+
+_CUSTOMER_KEY = "customer_id"
+# Distinguishes built empty prefilter from missing one
+_BUILT_MARKER = 0
+
+
+def _hash(list_type: str, key: str, value: str | int) -> int:
+    digest = hashlib.blake2b(
+        f"{list_type}:{key}:{value}".encode(), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "big") or _BUILT_MARKER + 1
+
+
+def _entry_hashes(entry: risk_models.RiskListEntry) -> set[int]:
+    """
+    Superset of keys the entry can be found by.
+
+    Customer keys are kept for deleted and expired entries as well,
+    because is_customer_in_list() does not filter them out.
+    """
+    result: set[int] = set()
+    if entry.customer_id is not None:
+        result.add(_hash(entry.list_type, _CUSTOMER_KEY, entry.customer_id))
+    for f in entry.match_fields:
+        value = getattr(entry, MatchFieldKey(f).value, None)
+        if value is not None:
+            result.add(
+                _hash(
+                    entry.list_type, MatchFieldKey(f).value, MatchData._norm_str(value)
+                )
+            )
+    return result
+
+
+def _load_hashes() -> frozenset[int]:
+    hashes = frozenset(int(member) for member in redis_set_members(PREFILTER_REDIS_KEY))
+    if _BUILT_MARKER not in hashes:
+        logger.info("Risk lists prefilter is not built yet, building it")
+        return rebuild_prefilter()
+    return hashes
+
+
+def _get_hashes() -> frozenset[int]:
+    hashes = memory_cache_get_set(
+        key=PREFILTER_CACHE_KEY,
+        tp=frozenset,
+        on_miss=_load_hashes,
+        ttl=CACHE_TIMEOUT,
+    )
+    assert hashes is not None
+    return hashes
+
+
+@track_duration("risk_lists.prefilter.may_match")
+def may_match(data: MatchData) -> bool:
+    """
+    False means no risk list entry can match the data.
+
+    True may be a false positive, the caller must do the full check.
+    """
+    hashes = _get_hashes()
+    keys: list[tuple[str, str | int]] = []
+    if data.customer_id is not None:
+        keys.append((_CUSTOMER_KEY, data.customer_id))
+    for f in MatchFieldKey:
+        value = getattr(data, f.value, None)
+        if value is not None:
+            keys.append((f.value, MatchData._norm_str(value)))
+
+    return any(
+        _hash(list_type, key, value) in hashes
+        for list_type in ListType.values
+        for key, value in keys
+    )
+
+
+@track_duration("risk_lists.prefilter.may_contain_customer")
+def may_contain_customer(customer_id: int, list_type: ListType) -> bool:
+    return _hash(list_type, _CUSTOMER_KEY, customer_id) in _get_hashes()
+
+
+def _add_hashes(hashes: set[int]) -> None:
+    redis_set_add(PREFILTER_REDIS_KEY, hashes)
+    memory_cache_invalidate(PREFILTER_CACHE_KEY)
+
+
+def add_entry(entry: risk_models.RiskListEntry) -> None:
+    """
+    Must be called on every entry change.
+
+    Keys are added right away and once more on commit, in case a rebuild
+    has replaced the set in between. A rolled back change leaves only
+    false positives behind.
+    """
+    hashes = _entry_hashes(entry)
+    _add_hashes(hashes)
+    transaction.on_commit(lambda: _add_hashes(hashes))
+
+
+@track_duration("risk_lists.prefilter.rebuild_prefilter")
+def rebuild_prefilter() -> frozenset[int]:
+    """Drops keys of deleted and expired entries."""
+    started_at = timezone.now()
+    hashes: set[int] = {_BUILT_MARKER}
+    active_q = Q(is_deleted=False) & (
+        Q(expires_at__isnull=True) | Q(expires_at__gt=started_at)
+    )
+    for entry in risk_models.RiskListEntry.objects.filter(active_q).iterator():
+        hashes |= _entry_hashes(entry)
+    # Inactive entries are still visible to is_customer_in_list()
+    for list_type, customer_id in (
+        risk_models.RiskListEntry.objects.exclude(active_q)
+        .filter(customer_id__isnull=False)
+        .values_list("list_type", "customer_id")
+        .distinct()
+        .iterator()
+    ):
+        hashes.add(_hash(list_type, _CUSTOMER_KEY, customer_id))
+
+    redis_set_replace(PREFILTER_REDIS_KEY, hashes)
+
+    recent_hashes: set[int] = set()
+    for entry in risk_models.RiskListEntry.objects.filter(
+        updated_at__gte=started_at - _REBUILD_OVERLAP
+    ).iterator():
+        recent_hashes |= _entry_hashes(entry)
+    _add_hashes(recent_hashes)
+
+    logger.info(
+        "Risk lists prefilter rebuilt",
+        extra={"hashes_count": len(hashes) + len(recent_hashes)},
+    )
+    return frozenset(hashes | recent_hashes)
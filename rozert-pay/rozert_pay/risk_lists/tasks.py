@@ -0,0 +1,16 @@
+import logging
+
+from rozert_pay.celery_app import app
+from rozert_pay.common.const import CeleryQueue
+from rozert_pay.risk_lists.services import prefilter
+
+logger = logging.getLogger(__name__)
+
+
+@app.task(queue=CeleryQueue.LOW_PRIORITY)
+def rebuild_risk_lists_prefilter() -> None:
+    hashes = prefilter.rebuild_prefilter()
+    logger.info(
+        "Risk lists prefilter rebuild finished",
+        extra={"hashes_count": len(hashes)},
+    )
@@ -137,14 +137,21 @@ WSGI_APPLICATION = "rozert_pay.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
+# Connections are kept open between requests/tasks for DB_CONN_MAX_AGE seconds
+# and checked before reuse. Set per process role, e.g. lower for workers with
+# many threads; 0 closes connection after each request/task.
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", "60"))
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "rozert_pay.common.db_backend",
         "NAME": os.environ.get("POSTGRES_DATABASE", "rozert_pay"),
         "USER": os.environ.get("POSTGRES_USER", "rozert_pay"),
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD", "rozert_pay"),
         "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
         "PORT": int(os.environ.get("POSTGRES_PORT", "5432")),
+        "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
     },
 }
 
@@ -161,6 +168,13 @@ CACHES = {
     },
 }
 
+# Budget of the process-local cache in common.helpers.cache
+MEMORY_CACHE_MAX_BYTES = int(getenv("MEMORY_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Quotas by the key prefix before the first ":"
+MEMORY_CACHE_NAMESPACE_QUOTAS: dict[str, int] = {
+    "muwe_spei": 16 * 1024 * 1024,
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -311,12 +325,41 @@ EXTERNAL_ROZERT_HOST = "https://ps-stage.rozert.cloud"
 
 IS_UNITTESTS = False
 
+# Payment system controllers are imported on first use. Set per process role
+# the comma separated PaymentSystemType values (or "all") to import on startup,
+# e.g. for web or for workers serving only some payment systems.
+PAYMENT_SYSTEMS_PRELOAD = [
+    t.strip() for t in getenv("PAYMENT_SYSTEMS_PRELOAD", "").split(",") if t.strip()
+]
+
 if IS_PRODUCTION:
     BETMASTER_BASE_URL = "https://main.bmhub.io/"
 else:
     BETMASTER_BASE_URL = "https://admin.preprod.dev.betmaster.co/"
 
 SLACK_TOKEN = os.environ.get("SLACK_TOKEN", None)
+
+# SQL queries slower than this are sampled into in-process ring buffer
+# (see metrics.get_slow_sql_queries). Disabled if not set.
+SLOW_SQL_QUERY_SECONDS = (
+    float(os.environ["SLOW_SQL_QUERY_SECONDS"])
+    if os.environ.get("SLOW_SQL_QUERY_SECONDS")
+    else None
+)
+
+# Maximal difference between application and DB servers clocks. Transactions
+# changes feed stops this much before the oldest open DB transaction started.
+TRANSACTION_CHANGES_CLOCK_SKEW_SECONDS = float(
+    os.environ.get("TRANSACTION_CHANGES_CLOCK_SKEW_SECONDS", "1")
+)
+# Idle in transaction session or long DB transaction holds the feed back
+# until it ends. Its age is exported as
+# rozert_transaction_changes_horizon_lag_seconds and logged as warning
+# above this threshold.
+TRANSACTION_CHANGES_HORIZON_LAG_WARNING_SECONDS = float(
+    os.environ.get("TRANSACTION_CHANGES_HORIZON_LAG_WARNING_SECONDS", "60")
+)
+
 SLACK_UNEXPRECTED_NOTIFY_CHANNEL = "#tm-unexpected"
 
 # TODO: ensure correct keys on prod!
@@ -17,12 +17,14 @@ ENCRYPTION_KEYS = [
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "rozert_pay.common.db_backend",
         "NAME": os.environ.get("POSTGRES_DATABASE", "rozertpay"),
         "USER": os.environ.get("POSTGRES_USER", "rozertpay"),
         "PASSWORD": get_secrets_value("POSTGRES_PASSWORD", base_path=SECRETS_PATH),
         "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
         "PORT": os.environ.get("POSTGRES_PORT", 5432),
+        "CONN_MAX_AGE": DB_CONN_MAX_AGE,  # noqa
+        "CONN_HEALTH_CHECKS": True,
     },
 }
 
@@ -4,7 +4,7 @@ from .settings import *  # NOQA
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "rozert_pay.common.db_backend",
         "NAME": "rozert_pay",
         "USER": "rozert_pay",
         "PASSWORD": "rozert_pay",
@@ -20,6 +20,8 @@ CACHES = {
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
         },
+        # Redis is shared between xdist workers, while databases are not
+        "KEY_PREFIX": os.environ.get("PYTEST_XDIST_WORKER", ""),
     },
 }
 
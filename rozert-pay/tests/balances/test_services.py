@@ -1,12 +1,19 @@
 import logging
+import threading
 from decimal import Decimal
 
 import pytest
 from bm.datatypes import Money
+from django.db import OperationalError, connection, transaction
 from rozert_pay.balances.const import BalanceTransactionType, InitiatorType
-from rozert_pay.balances.models import BalanceTransaction
-from rozert_pay.balances.services import BalanceUpdateDTO, BalanceUpdateService
-from rozert_pay.payment.models import CurrencyWallet
+from rozert_pay.balances.models import BalanceShard, BalanceTransaction
+from rozert_pay.balances.services import (
+    BalanceUpdateDTO,
+    BalanceUpdateService,
+    get_locked_wallet_balances,
+    get_wallet_balances,
+)
+from rozert_pay.payment.models import CurrencyWallet, PaymentTransaction
 from tests.factories import CurrencyWalletFactory, PaymentTransactionFactory
 
 pytestmark = pytest.mark.django_db
@@ -193,3 +200,312 @@ class TestBalanceUpdateService:
         assert "CRITICAL: Negative balance." in record.message
         assert hasattr(record, "wallet_id")
         assert record.wallet_id == wallet.id
+
+
+def _deposit_dto(
+    wallet: CurrencyWallet, trx: PaymentTransaction, amount: str = "10.00"
+) -> BalanceUpdateDTO:
+    return BalanceUpdateDTO(
+        currency_wallet=wallet,
+        event_type=BalanceTransactionType.OPERATION_CONFIRMED,
+        amount=Money(amount, wallet.currency),
+        initiator=InitiatorType.SYSTEM,
+        payment_transaction=trx,
+    )
+
+
+class TestShardedBalance:
+    @pytest.fixture
+    def wallet(self) -> CurrencyWallet:
+        wallet = CurrencyWalletFactory.create(
+            operational_balance=Decimal("1000.00"),
+            frozen_balance=Decimal("100.00"),
+            currency="USD",
+        )
+        return BalanceUpdateService.set_balance_shards_count(wallet.id, 4)
+
+    def test_deposits_are_spread_over_shards(self, wallet):
+        transactions = PaymentTransactionFactory.create_batch(8, wallet=wallet)
+
+        for trx in transactions:
+            tx_record = BalanceUpdateService.update_balance(_deposit_dto(wallet, trx))
+            # Snapshots are of the shard
+            assert tx_record.balance_shard_index == trx.id % 4
+            assert tx_record.operational_after - tx_record.operational_before == 10
+
+        shards = BalanceShard.objects.filter(currency_wallet=wallet).order_by("index")
+        assert [s.operational_balance for s in shards] == [Decimal("20.00")] * 4
+        assert all(s.pending_balance == 0 for s in shards)
+        assert (
+            BalanceTransaction.objects.filter(balance_shard_index__isnull=False).count()
+            == len(transactions) * 2
+        )
+
+        wallet.refresh_from_db()
+        # Wallet row is not updated on deposits
+        assert wallet.operational_balance == Decimal("1000.00")
+        [balances] = get_wallet_balances(CurrencyWallet.objects.filter(id=wallet.id))
+        assert balances.operational_balance == Decimal("1080.00")
+        assert balances.frozen_balance == Decimal("100.00")
+        assert balances.available_balance == Decimal("980.00")
+        # Model shows the whole wallet too
+        assert wallet.balances == balances
+        assert wallet.available_balance == Decimal("980.00")
+        # Partial row balances are not shown
+        assert str(wallet) == f"{wallet.currency} Wallet #{wallet.id} | Sharded"
+
+    def test_debit_locks_whole_wallet_and_checks_total_balance(
+        self, wallet, caplog, disable_error_logs
+    ):
+        for trx in PaymentTransactionFactory.create_batch(4, wallet=wallet):
+            BalanceUpdateService.update_balance(_deposit_dto(wallet, trx, "100.00"))
+
+        tx_record = BalanceUpdateService.update_balance(
+            BalanceUpdateDTO(
+                currency_wallet=wallet,
+                event_type=BalanceTransactionType.FEE,
+                amount=Money("1200.00", "USD"),
+                initiator=InitiatorType.SYSTEM,
+            )
+        )
+
+        # Snapshots and negative balance check are for the whole wallet
+        assert tx_record.balance_shard_index is None
+        assert tx_record.operational_before == Decimal("1400.00")
+        assert tx_record.operational_after == Decimal("200.00")
+        assert not [r for r in caplog.records if r.levelname == "CRITICAL"]
+
+        wallet.refresh_from_db()
+        assert wallet.operational_balance == Decimal("-200.00")
+        balances = get_locked_wallet_balances(wallet)
+        assert balances.operational_balance == Decimal("200.00")
+        assert balances.available_balance == Decimal("100.00")
+
+        BalanceUpdateService.update_balance(
+            BalanceUpdateDTO(
+                currency_wallet=wallet,
+                event_type=BalanceTransactionType.SETTLEMENT_REQUEST,
+                amount=Money("150.00", "USD"),
+                initiator=InitiatorType.USER,
+            )
+        )
+        assert not [r for r in caplog.records if r.levelname == "CRITICAL"]
+        BalanceUpdateService.update_balance(
+            BalanceUpdateDTO(
+                currency_wallet=wallet,
+                event_type=BalanceTransactionType.FEE,
+                amount=Money("201.00", "USD"),
+                initiator=InitiatorType.SYSTEM,
+            )
+        )
+        assert [r.message for r in caplog.records if r.levelname == "CRITICAL"] == [
+            "CRITICAL: Negative balance."
+        ]
+
+    def test_shards_count_cant_be_decreased(self, wallet):
+        BalanceUpdateService.set_balance_shards_count(wallet.id, 6)
+        assert BalanceShard.objects.filter(currency_wallet=wallet).count() == 6
+
+        with pytest.raises(ValueError):
+            BalanceUpdateService.set_balance_shards_count(wallet.id, 2)
+
+
+_AUDIT_FIELDS = [
+    "type",
+    "amount",
+    "amount2",
+    "operational_before",
+    "operational_before2",
+    "operational_after",
+    "operational_after2",
+    "frozen_before",
+    "frozen_before2",
+    "frozen_after",
+    "frozen_after2",
+    "pending_before",
+    "pending_before2",
+    "pending_after",
+    "pending_after2",
+    "payment_transaction_id",
+    "description",
+    "initiator",
+    "balance_shard_index",
+]
+
+
+class TestApplyMany:
+    @pytest.fixture
+    def make_wallets(self):
+        def _make() -> list[CurrencyWallet]:
+            wallets = [
+                CurrencyWalletFactory.create(
+                    operational_balance=Decimal("1000.00"),
+                    frozen_balance=Decimal("100.00"),
+                    currency="USD",
+                )
+                for _ in range(2)
+            ]
+            wallets[1] = BalanceUpdateService.set_balance_shards_count(wallets[1].id, 3)
+            return wallets
+
+        return _make
+
+    def _make_dtos(
+        self, wallets: list[CurrencyWallet], transactions: list[PaymentTransaction]
+    ) -> list[BalanceUpdateDTO]:
+        event_types = [
+            BalanceTransactionType.OPERATION_CONFIRMED,
+            BalanceTransactionType.SETTLEMENT_REQUEST,
+            BalanceTransactionType.MANUAL_ADJUSTMENT,
+            BalanceTransactionType.FEE,
+            BalanceTransactionType.SETTLEMENT_CONFIRMED,
+            BalanceTransactionType.OPERATION_CONFIRMED,
+        ]
+        return [
+            BalanceUpdateDTO(
+                currency_wallet=wallets[i % len(wallets)],
+                event_type=event_types[i % len(event_types)],
+                amount=Money(Decimal("10.00") + i, "USD"),
+                initiator=InitiatorType.SYSTEM,
+                payment_transaction=trx,
+                description=f"Event {i}",
+            )
+            for i, trx in enumerate(transactions)
+        ]
+
+    def _audit_trail(self, wallet: CurrencyWallet) -> list[tuple]:
+        return sorted(
+            BalanceTransaction.objects.filter(currency_wallet=wallet).values_list(
+                *_AUDIT_FIELDS
+            ),
+            key=str,
+        )
+
+    def test_same_audit_trail_as_sequential_calls(
+        self, make_wallets, disable_error_logs
+    ):
+        transactions = PaymentTransactionFactory.create_batch(30)
+        sequential_wallets = make_wallets()
+        bulk_wallets = make_wallets()
+
+        sequential_records = [
+            BalanceUpdateService.update_balance(dto)
+            for dto in self._make_dtos(sequential_wallets, transactions)
+        ]
+        bulk_records = BalanceUpdateService.apply_many(
+            self._make_dtos(bulk_wallets, transactions)
+        )
+
+        assert [(r.type, r.operational_after) for r in bulk_records] == [
+            (r.type, r.operational_after) for r in sequential_records
+        ]
+        for sequential_wallet, bulk_wallet in zip(sequential_wallets, bulk_wallets):
+            assert self._audit_trail(bulk_wallet) == self._audit_trail(
+                sequential_wallet
+            )
+            [sequential_balances, bulk_balances] = get_wallet_balances(
+                CurrencyWallet.objects.filter(
+                    id__in=[sequential_wallet.id, bulk_wallet.id]
+                ).order_by("id")
+            )
+            assert bulk_balances == sequential_balances
+
+        assert [
+            (s.operational_balance, s.pending_balance)
+            for s in BalanceShard.objects.filter(
+                currency_wallet=bulk_wallets[1]
+            ).order_by("index")
+        ] == [
+            (s.operational_balance, s.pending_balance)
+            for s in BalanceShard.objects.filter(
+                currency_wallet=sequential_wallets[1]
+            ).order_by("index")
+        ]
+
+    def test_queries_count_does_not_depend_on_events_count(
+        self, make_wallets, django_assert_num_queries, disable_error_logs
+    ):
+        transactions = PaymentTransactionFactory.create_batch(40)
+        wallets = make_wallets()
+
+        # Lock, shards, bulk_create, UPDATE per wallet, shards bulk_update
+        # and savepoint queries
+        with django_assert_num_queries(8):
+            BalanceUpdateService.apply_many(self._make_dtos(wallets, transactions[:6]))
+        with django_assert_num_queries(8):
+            BalanceUpdateService.apply_many(self._make_dtos(wallets, transactions[6:]))
+
+
+@pytest.mark.django_db(transaction=True)
+class TestShardedBalanceLocks:
+    """
+    A deposit in progress holds its shard and the wallet row FOR SHARE.
+    Updates run with lock_timeout, so blocked ones fail instead of waiting.
+    """
+
+    @pytest.fixture
+    def deposit_in_progress(self):
+        wallet = CurrencyWalletFactory.create(
+            operational_balance=Decimal("1000.00"), currency="USD"
+        )
+        wallet = BalanceUpdateService.set_balance_shards_count(wallet.id, 2)
+        transactions = PaymentTransactionFactory.create_batch(3, wallet=wallet)
+
+        locked = threading.Event()
+        release = threading.Event()
+
+        def _deposit() -> None:
+            try:
+                with transaction.atomic():
+                    BalanceUpdateService.update_balance(
+                        _deposit_dto(wallet, transactions[0])
+                    )
+                    locked.set()
+                    release.wait(timeout=30)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=_deposit)
+        thread.start()
+        assert locked.wait(timeout=30)
+        try:
+            yield wallet, transactions
+        finally:
+            release.set()
+            thread.join()
+
+    def _update_balance(self, dto: BalanceUpdateDTO) -> None:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL lock_timeout = '500ms'")
+            BalanceUpdateService.update_balance(dto)
+
+    def test_deposit_to_other_shard_is_not_blocked(self, deposit_in_progress):
+        wallet, transactions = deposit_in_progress
+        trx = next(t for t in transactions if t.id % 2 != transactions[0].id % 2)
+
+        self._update_balance(_deposit_dto(wallet, trx))
+
+        [balances] = get_wallet_balances(CurrencyWallet.objects.filter(id=wallet.id))
+        # Deposit in progress is not committed yet
+        assert balances.operational_balance == Decimal("1010.00")
+
+    def test_deposit_to_same_shard_waits(self, deposit_in_progress):
+        wallet, transactions = deposit_in_progress
+        trx = next(t for t in transactions[1:] if t.id % 2 == transactions[0].id % 2)
+
+        with pytest.raises(OperationalError, match="lock timeout"):
+            self._update_balance(_deposit_dto(wallet, trx))
+
+    def test_wallet_lock_waits_for_shard_updates(self, deposit_in_progress):
+        wallet, transactions = deposit_in_progress
+
+        with pytest.raises(OperationalError, match="lock timeout"):
+            self._update_balance(
+                BalanceUpdateDTO(
+                    currency_wallet=wallet,
+                    event_type=BalanceTransactionType.FEE,
+                    amount=Money("10.00", "USD"),
+                    initiator=InitiatorType.SYSTEM,
+                )
+            )
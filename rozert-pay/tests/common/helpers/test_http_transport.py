@@ -0,0 +1,18 @@
+from rozert_pay.common.helpers import http_transport
+
+
+def test_sessions_share_connections_pool():
+    first = http_transport.PooledSession()
+    second = http_transport.PooledSession()
+
+    assert first.get_adapter("https://example.com") is http_transport.get_adapter()
+    assert second.get_adapter("http://example.com") is http_transport.get_adapter()
+
+    first.close()
+    assert http_transport.get_adapter().poolmanager is not None
+    assert second.get_adapter("https://example.com") is http_transport.get_adapter()
+
+
+def test_get_timeout():
+    assert http_transport.get_timeout(30) == (5.0, 30)
+    assert http_transport.get_timeout(2) == (2, 2)
@@ -1,7 +1,13 @@
+import json
+import threading
+import time
 from datetime import timedelta
 from functools import partial
+from unittest import mock
 
 import freezegun
+import pytest
+from django.test import override_settings
 from django.utils import timezone
 from rozert_pay.common.helpers import cache
 
@@ -43,7 +49,7 @@ def test_cleanup_cache_thread():
         _state += 1
         return _state
 
-    cache._cache = {}
+    cache._cache.clear()
     key = cache.CacheKey("key")
 
     call1 = partial(
@@ -58,3 +64,217 @@ def test_cleanup_cache_thread():
     cache._CleanupCacheThread()._one_cycle(sleep=False)
 
     assert len(cache._cache) == 0
+
+
+def _wait_for_listener():
+    listener = cache._listener.ensure_started()
+    for _ in range(50):
+        if listener.is_healthy() and listener.subscribed_at < time.time():
+            return listener
+        time.sleep(0.1)
+    raise AssertionError("Listener is not subscribed")
+
+
+def test_hit_is_served_from_memory_when_listener_is_subscribed():
+    _wait_for_listener()
+    key = cache.CacheKey("key")
+    cache.memory_cache_set(key, 1, timedelta(hours=1))
+
+    with mock.patch.object(cache._redis_client, "get") as redis_get:
+        assert cache.memory_cache_get(key, int) == 1
+
+    redis_get.assert_not_called()
+
+
+def test_hit_is_checked_in_redis_when_listener_is_not_healthy():
+    listener = _wait_for_listener()
+    key = cache.CacheKey("key")
+    cache.memory_cache_set(key, 1, timedelta(hours=1))
+
+    with mock.patch.object(listener, "heartbeat", 0.0):
+        with mock.patch.object(
+            cache._redis_client, "get", return_value=str(time.time()).encode()
+        ):
+            assert cache.memory_cache_get(key, int) is None
+
+
+def test_invalidation_from_other_process():
+    listener = _wait_for_listener()
+    key = cache.CacheKey("key")
+    cache.memory_cache_set(key, 1, timedelta(hours=1))
+
+    listener._on_message(
+        json.dumps({"key": key, "origin": "other", "ts": time.time()}).encode()
+    )
+    assert cache.memory_cache_get(key, int) is None
+
+
+def test_own_invalidation_is_delivered_once():
+    _wait_for_listener()
+    key = cache.CacheKey("key")
+    calls = 0
+
+    def on_miss():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    cache.memory_cache_invalidate(key)
+    assert cache.memory_cache_get_set(key, int, on_miss, timedelta(hours=1)) == 1
+    time.sleep(0.5)
+    assert cache.memory_cache_get_set(key, int, on_miss, timedelta(hours=1)) == 1
+
+
+def test_value_computed_before_invalidation_is_not_returned():
+    key = cache.CacheKey("key")
+
+    def on_miss():
+        cache.memory_cache_invalidate(key)
+        return 1
+
+    assert cache.memory_cache_get_set(key, int, on_miss, timedelta(hours=1)) == 1
+    assert cache.memory_cache_get(key, int) is None
+
+
+def test_misses_are_not_kept():
+    keys = [cache.CacheKey(f"key:{i}") for i in range(10)]
+
+    for key in keys:
+        cache.memory_cache_get_set(key, int, lambda: 1, timedelta(hours=1))
+        cache.memory_cache_invalidate(key)
+
+    assert not any(key in cache._misses for key in keys)
+
+
+def test_single_flight():
+    key = cache.CacheKey("key")
+    calls = 0
+    started = threading.Event()
+
+    def on_miss():
+        nonlocal calls
+        calls += 1
+        started.set()
+        time.sleep(0.2)
+        return calls
+
+    results = []
+
+    def get():
+        results.append(
+            cache.memory_cache_get_set(key, int, on_miss, timedelta(hours=1))
+        )
+
+    threads = [threading.Thread(target=get) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == 1
+    assert results == [1] * 5
+
+
+def test_approximate_size():
+    small = cache.approximate_size({"key": "value"})
+    big = cache.approximate_size({"key": ["value" * 100 for _ in range(100)]})
+
+    assert 0 < small < big
+    assert cache.approximate_size([big, big]) < cache.approximate_size([big, big + 1])
+
+
+@override_settings(MEMORY_CACHE_MAX_BYTES=3000, MEMORY_CACHE_NAMESPACE_QUOTAS={})
+def test_lru_eviction_by_size():
+    value = "x" * 900
+    keys = [cache.CacheKey(f"lru:{i}") for i in range(4)]
+    for key in keys[:3]:
+        cache.memory_cache_set(key, value, timedelta(hours=1))
+
+    # Recently used key is kept
+    assert cache.memory_cache_get(keys[0], str) == value
+    cache.memory_cache_set(keys[3], value, timedelta(hours=1))
+
+    assert cache.memory_cache_get(keys[1], str) is None
+    assert cache.memory_cache_get(keys[0], str) == value
+    assert cache.memory_cache_get(keys[3], str) == value
+    assert cache._cache.total_size <= 3000
+
+
+@override_settings(
+    MEMORY_CACHE_MAX_BYTES=10000, MEMORY_CACHE_NAMESPACE_QUOTAS={"small": 2000}
+)
+def test_namespace_quota():
+    value = "x" * 900
+    other_key = cache.CacheKey("other")
+    cache.memory_cache_set(other_key, value, timedelta(hours=1))
+    for i in range(5):
+        cache.memory_cache_set(cache.CacheKey(f"small:{i}"), value, timedelta(hours=1))
+
+    assert cache._cache.namespace_size("small") <= 2000
+    assert cache.memory_cache_get(cache.CacheKey("small:4"), str) == value
+    assert cache.memory_cache_get(cache.CacheKey("small:0"), str) is None
+    assert cache.memory_cache_get(other_key, str) == value
+
+
+@override_settings(MEMORY_CACHE_MAX_BYTES=1000, MEMORY_CACHE_NAMESPACE_QUOTAS={})
+def test_too_big_value_is_not_cached():
+    key = cache.CacheKey("key")
+
+    assert (
+        cache.memory_cache_get_set(key, str, lambda: "x" * 2000, timedelta(hours=1))
+        == "x" * 2000
+    )
+    assert cache.memory_cache_get(key, str) is None
+    assert len(cache._cache) == 0
+
+
+def test_redis_cache_get_set_stores_value_in_redis():
+    key = cache.CacheKey(f"redis_key:{time.time()}")
+    calls = 0
+
+    def on_miss():
+        nonlocal calls
+        calls += 1
+        return "value"
+
+    assert (
+        cache.redis_cache_get_set(
+            key=key, tp=str, on_miss=on_miss, ttl=timedelta(minutes=1)
+        )
+        == "value"
+    )
+    assert cache.redis_cache_get(key, str) == "value"
+    assert calls == 1
+    assert cache.memory_cache_get(key, str) is None
+
+
+def test_redis_set_replace():
+    key = cache.CacheKey(f"redis_set:{time.time()}")
+    client = cache._redis_cache.client.get_client(write=True)
+    redis_key = cache._redis_cache.make_key(key)
+
+    cache.redis_set_replace(key, [1, 2])
+    cache.redis_set_replace(key, ["a"])
+
+    assert cache.redis_set_members(key) == {b"a"}
+    # TTL of temporary set is dropped
+    assert client.ttl(redis_key) == -1
+    assert not client.keys(f"{redis_key}:tmp:*")
+
+    cache.redis_set_replace(key, [])
+    assert cache.redis_set_members(key) == set()
+
+
+def test_redis_set_replace_tmp_key_expires_on_failure():
+    key = cache.CacheKey(f"redis_set:{time.time()}")
+    client = cache._redis_cache.client.get_client(write=True)
+    redis_key = cache._redis_cache.make_key(key)
+
+    with mock.patch(
+        "redis.client.Pipeline.rename", side_effect=RuntimeError
+    ), pytest.raises(RuntimeError):
+        cache.redis_set_replace(key, [1, 2])
+
+    [tmp_key] = client.keys(f"{redis_key}:tmp:*")
+    assert 0 < client.ttl(tmp_key) <= cache.SET_REPLACE_TMP_KEY_TTL.total_seconds()
+    client.delete(tmp_key)
@@ -0,0 +1,44 @@
+from unittest import mock
+
+from django.db import connection
+from prometheus_client.metrics import MetricWrapperBase
+from rozert_pay.common import metrics
+
+
+def _value(metric: MetricWrapperBase) -> float:
+    return next(
+        (
+            sample.value
+            for m in metric.collect()
+            for sample in m.samples
+            if sample.labels["alias"] == "default"
+            and not sample.name.endswith("_created")
+        ),
+        0.0,
+    )
+
+
+def test_connection_metrics(transactional_db):
+    connection.ensure_connection()
+    opened = _value(metrics.DB_CONNECTIONS_OPENED)
+    open_connections = _value(metrics.DB_CONNECTIONS_OPEN)
+
+    connection.close()
+    assert _value(metrics.DB_CONNECTIONS_OPEN) == open_connections - 1
+
+    connection.ensure_connection()
+    assert _value(metrics.DB_CONNECTIONS_OPENED) == opened + 1
+    assert _value(metrics.DB_CONNECTIONS_OPEN) == open_connections
+
+
+def test_failed_health_check(transactional_db):
+    connection.ensure_connection()
+    failures = _value(metrics.DB_CONNECTION_HEALTH_CHECK_FAILURES)
+
+    with mock.patch.object(connection, "health_check_enabled", True), mock.patch.object(
+        connection, "health_check_done", False
+    ), mock.patch.object(connection, "is_usable", return_value=False):
+        connection.close_if_health_check_failed()
+
+    assert connection.connection is None
+    assert _value(metrics.DB_CONNECTION_HEALTH_CHECK_FAILURES) == failures + 1
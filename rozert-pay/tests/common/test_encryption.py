@@ -0,0 +1,32 @@
+import pickle
+from unittest import mock
+
+import pytest
+from bm.django_utils.encryption import LazySecretValue, SecretValue
+from rozert_pay.payment.models import Customer
+from tests.factories import CustomerFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_encrypted_field_decrypted_on_first_read():
+    customer = CustomerFactory.create(email_encrypted="test@example.com")
+    field = Customer._meta.get_field("email_encrypted")
+
+    with mock.patch.object(field, "decrypt", wraps=field.decrypt) as decrypt:
+        loaded = Customer.objects.get(id=customer.id)
+        assert isinstance(loaded.email_encrypted, LazySecretValue)
+        decrypt.assert_not_called()
+
+        assert loaded.email_encrypted.get_secret_value() == "test@example.com"
+        assert loaded.email_encrypted == "test@example.com"
+        decrypt.assert_called_once()
+
+
+def test_lazy_secret_value_pickled_decrypted():
+    value = LazySecretValue(lambda: {"key": "value"})
+
+    restored = pickle.loads(pickle.dumps(value))
+
+    assert type(restored) is SecretValue
+    assert restored.get_secret_value() == {"key": "value"}
@@ -0,0 +1,48 @@
+import pytest
+from django.db import connection
+from rozert_pay.common import metrics
+from rozert_pay.payment.models import Merchant
+from tests.factories import MerchantFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_track_sql_queries():
+    MerchantFactory.create_batch(3)
+    connection.queries_log.clear()
+
+    with metrics.track_sql_queries() as outer:
+        assert len(list(Merchant.objects.all())) == 3
+
+        with metrics.track_sql_queries() as inner:
+            Merchant.objects.count()
+
+    assert (outer.count, outer.rows) == (2, 4)
+    assert (inner.count, inner.rows) == (1, 1)
+    assert outer.duration >= inner.duration > 0
+
+    # SQL text is not collected
+    assert not connection.queries_log
+    assert not connection.execute_wrappers
+
+
+def test_slow_sql_queries_sampled(settings):
+    settings.SLOW_SQL_QUERY_SECONDS = 0
+    MerchantFactory.create()
+
+    with metrics.track_sql_queries():
+        list(Merchant.objects.filter(id__in=[1, 2, 3], name="test"))
+
+    slow_query = metrics.get_slow_sql_queries()[-1]
+    assert "IN (...)" in slow_query.fingerprint
+    assert '"name" = ?' in slow_query.fingerprint
+    assert slow_query.rows == 0
+
+
+def test_sql_fingerprint():
+    assert (
+        metrics.sql_fingerprint(
+            "SELECT  \"id\" FROM t1 WHERE id IN (%s, %s) AND name = 'it''s' LIMIT 21"
+        )
+        == 'SELECT "id" FROM t1 WHERE id IN (...) AND name = ? LIMIT ?'
+    )
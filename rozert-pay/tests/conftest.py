@@ -12,6 +12,7 @@ from rest_framework.test import APIClient
 from rozert_pay.common import const
 from rozert_pay.common.helpers import cache
 from rozert_pay.payment import models
+from rozert_pay.payment.services import auth_tokens, credentials_cache
 from rozert_pay.payment.systems.stp_codi.client import create_key_pair
 from tests.factories import CustomerFactory, MerchantFactory, UserFactory, WalletFactory
 from tests.payment.api_v1.test_views import force_authenticate
@@ -198,3 +199,29 @@ def mock_slack_send_message():
 def disable_cache():
     with cache.disable_cache_for_thread():
         yield
+
+
+@pytest.fixture(autouse=True)
+def clear_memory_cache():
+    # Cached objects may refer to rows rolled back after previous test
+    cache._cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def clear_memory_auth_tokens():
+    auth_tokens._tokens.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def clear_credentials_cache():
+    credentials_cache.clear()
+    yield
+
+
+@pytest.fixture
+def clear_auth_tokens():
+    # For tests checking requests to token endpoints
+    cache._redis_cache.delete_pattern(f"{auth_tokens.KEY_PREFIX}*")
+    yield
@@ -0,0 +1,233 @@
+import typing as ty
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+from freezegun import freeze_time
+from rozert_pay.common import const
+from rozert_pay.limits.const import LimitPeriod
+from rozert_pay.limits.models import CounterScope, LimitCounterBucket
+from rozert_pay.limits.models.limit_alert import LimitAlert
+from rozert_pay.limits.models.merchant_limits import LimitType, MerchantLimit
+from rozert_pay.limits.services import counters, limits
+from rozert_pay.limits.tasks import reconcile_limit_counters
+from rozert_pay.payment.models import PaymentTransaction
+from rozert_pay.payment.services import transaction_processing
+from rozert_pay.payment.systems.paycash import paycash_controller
+from tests.factories import PaymentTransactionFactory, RemoteTransactionStatusFactory
+
+
+def counters_enabled() -> ty.ContextManager[mock.MagicMock]:
+    # Waffle caches switches in shared Redis, so patch the check itself
+    return mock.patch.object(counters, "is_counters_enabled", return_value=True)
+
+
+def _create_trx(
+    limit: MerchantLimit,
+    status: str,
+    amount: str = "10",
+    trx_type: str = const.TransactionType.DEPOSIT,
+    created_at_delta: timedelta = timedelta(),
+) -> PaymentTransaction:
+    assert limit.wallet
+    trx = PaymentTransactionFactory.create(
+        wallet=limit.wallet.currencywallet_set.get(),
+        amount=Decimal(amount),
+        type=trx_type,
+        status=status,
+    )
+    if created_at_delta:
+        trx.created_at = trx.created_at - created_at_delta
+        trx.save()
+    return trx
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("disable_cache")
+class TestLimitCounters:
+    def test_sync_remote_status_updates_all_scopes(self, customer):
+        trx = PaymentTransactionFactory.create(
+            customer=customer,
+            amount=Decimal("15.50"),
+            status=const.TransactionStatus.PENDING,
+        )
+
+        paycash_controller.sync_remote_status_with_transaction(
+            trx=trx,
+            remote_status=RemoteTransactionStatusFactory.build(
+                operation_status=const.TransactionStatus.SUCCESS,
+            ),
+        )
+
+        buckets = {
+            bucket.scope: bucket
+            for bucket in LimitCounterBucket.objects.filter(
+                bucket_start=trx.created_at.replace(second=0, microsecond=0)
+            )
+        }
+        assert set(buckets) == {
+            CounterScope.CUSTOMER,
+            CounterScope.MERCHANT,
+            CounterScope.WALLET,
+        }
+        assert buckets[CounterScope.CUSTOMER].scope_id == customer.id
+        assert buckets[CounterScope.MERCHANT].scope_id == trx.wallet.wallet.merchant_id
+        assert buckets[CounterScope.WALLET].scope_id == trx.wallet.wallet_id
+        for bucket in buckets.values():
+            assert bucket.transaction_type == const.TransactionType.DEPOSIT
+            assert bucket.success_count == 1
+            assert bucket.success_amount == Decimal("15.50")
+            assert bucket.failed_count == 0
+
+    def test_revert_to_pending_removes_transaction_from_counters(self):
+        trx = PaymentTransactionFactory.create(
+            status=const.TransactionStatus.PENDING,
+            type=const.TransactionType.WITHDRAWAL,
+        )
+        trx.status = const.TransactionStatus.FAILED
+        trx.save()
+        counters.track_status_change(trx, const.TransactionStatus.PENDING)
+
+        transaction_processing.revert_to_pending(trx.id)
+
+        bucket = LimitCounterBucket.objects.get(
+            scope=CounterScope.WALLET, scope_id=trx.wallet.wallet_id
+        )
+        assert bucket.failed_count == 0
+        assert bucket.failed_amount == Decimal(0)
+
+    def test_track_status_changes_aggregates_rows(self):
+        with freeze_time("2025-08-14 10:00:30"):
+            trx = PaymentTransactionFactory.create(
+                amount=Decimal("10"),
+                status=const.TransactionStatus.FAILED,
+            )
+            other_trx = PaymentTransactionFactory.create(
+                wallet=trx.wallet,
+                amount=Decimal("5"),
+                status=const.TransactionStatus.FAILED,
+            )
+
+        counters.track_status_changes(
+            [
+                (trx, const.TransactionStatus.PENDING),
+                (other_trx, const.TransactionStatus.PENDING),
+                (other_trx, const.TransactionStatus.FAILED),
+            ]
+        )
+
+        bucket = LimitCounterBucket.objects.get(
+            scope=CounterScope.WALLET, scope_id=trx.wallet.wallet_id
+        )
+        assert bucket.failed_count == 2
+        assert bucket.failed_amount == Decimal("15")
+        assert bucket.success_count == 0
+
+    def test_period_stats_from_buckets_match_transactions(
+        self, merchant_wallet_scope_limit: MerchantLimit
+    ):
+        assert merchant_wallet_scope_limit.wallet_id
+        _create_trx(merchant_wallet_scope_limit, const.TransactionStatus.SUCCESS)
+        _create_trx(
+            merchant_wallet_scope_limit,
+            const.TransactionStatus.FAILED,
+            amount="7.25",
+            created_at_delta=timedelta(minutes=10),
+        )
+        _create_trx(
+            merchant_wallet_scope_limit,
+            const.TransactionStatus.SUCCESS,
+            amount="30",
+            trx_type=const.TransactionType.WITHDRAWAL,
+            created_at_delta=timedelta(minutes=59, seconds=30),
+        )
+        # Out of period
+        _create_trx(
+            merchant_wallet_scope_limit,
+            const.TransactionStatus.SUCCESS,
+            created_at_delta=timedelta(hours=2),
+        )
+        _create_trx(merchant_wallet_scope_limit, const.TransactionStatus.PENDING)
+
+        counters.rebuild_counters(
+            timezone.now() - timedelta(hours=3), timezone.now() + timedelta(minutes=1)
+        )
+
+        end = timezone.now()
+        start = end - timedelta(hours=1)
+        stats_kwargs = dict(
+            scope=CounterScope.WALLET,
+            scope_id=merchant_wallet_scope_limit.wallet_id,
+            start=start,
+            end=end,
+        )
+        from_transactions = counters.get_period_stats(**stats_kwargs)
+        with counters_enabled():
+            from_buckets = counters.get_period_stats(**stats_kwargs)
+
+        assert from_buckets == from_transactions
+        deposits = from_buckets.for_type(const.TransactionType.DEPOSIT)
+        assert deposits.success_count == 1
+        assert deposits.failed_count == 1
+        assert deposits.amount == Decimal("17.25")
+        withdrawals = from_buckets.for_type(const.TransactionType.WITHDRAWAL)
+        assert withdrawals.success_count == 1
+        assert withdrawals.success_amount == Decimal("30")
+
+    def test_reconcile_limit_counters(self, merchant_wallet_scope_limit):
+        trx = _create_trx(merchant_wallet_scope_limit, const.TransactionStatus.SUCCESS)
+        LimitCounterBucket.objects.create(
+            scope=CounterScope.WALLET,
+            scope_id=merchant_wallet_scope_limit.wallet_id,
+            bucket_start=trx.created_at.replace(second=0, microsecond=0),
+            transaction_type=const.TransactionType.DEPOSIT,
+            success_count=100,
+        )
+
+        reconcile_limit_counters.delay()
+
+        bucket = LimitCounterBucket.objects.get(
+            scope=CounterScope.WALLET,
+            scope_id=merchant_wallet_scope_limit.wallet_id,
+        )
+        assert bucket.success_count == 1
+        assert bucket.success_amount == Decimal("10")
+        # Transaction has no customer: merchant and wallet buckets only
+        assert LimitCounterBucket.objects.count() == 2
+
+    @freeze_time("2026-01-15 12:30:15")
+    def test_limit_checked_with_counters(
+        self, merchant_wallet_scope_limit: MerchantLimit
+    ):
+        merchant_wallet_scope_limit.limit_type = LimitType.MAX_SUCCESSFUL_DEPOSITS
+        merchant_wallet_scope_limit.period = LimitPeriod.BEGINNING_OF_DAY
+        merchant_wallet_scope_limit.max_operations = 2
+        merchant_wallet_scope_limit.save()
+
+        for delta in (timedelta(minutes=5), timedelta(minutes=2)):
+            trx = _create_trx(
+                merchant_wallet_scope_limit,
+                const.TransactionStatus.PENDING,
+                created_at_delta=delta,
+            )
+            trx.status = const.TransactionStatus.SUCCESS
+            trx.save()
+            counters.track_status_change(trx, const.TransactionStatus.PENDING)
+
+        # Not tracked in counters, so it must not be counted
+        _create_trx(
+            merchant_wallet_scope_limit,
+            const.TransactionStatus.SUCCESS,
+            created_at_delta=timedelta(minutes=3),
+        )
+        trx = _create_trx(merchant_wallet_scope_limit, const.TransactionStatus.PENDING)
+
+        with counters_enabled():
+            limits._process_transaction_limits(trx)
+
+        alert = LimitAlert.objects.get()
+        assert alert.extra[LimitType.MAX_SUCCESSFUL_DEPOSITS.label] == (
+            "Number of successful deposits 2 has exceeded limit 2"
+        )
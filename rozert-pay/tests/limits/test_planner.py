@@ -0,0 +1,152 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import Group
+from rozert_pay.common import const
+from rozert_pay.limits.const import LimitPeriod
+from rozert_pay.limits.models import (
+    CounterScope,
+    LimitAlert,
+    LimitCategory,
+    MerchantLimitScope,
+)
+from rozert_pay.limits.models.merchant_limits import LimitType
+from rozert_pay.limits.services import counters, limits, planner
+from tests.factories import (
+    CurrencyWalletFactory,
+    CustomerLimitFactory,
+    MerchantLimitFactory,
+    PaymentTransactionFactory,
+    WalletFactory,
+)
+from tests.limits.test_counters import counters_enabled
+
+_MERCHANT_LIMIT_TYPES = [
+    (LimitType.MAX_SUCCESSFUL_DEPOSITS, LimitPeriod.ONE_HOUR),
+    (LimitType.MAX_OVERALL_DECLINE_PERCENT, LimitPeriod.ONE_HOUR),
+    (LimitType.MAX_WITHDRAWAL_DECLINE_PERCENT, LimitPeriod.TWENTY_FOUR_HOURS),
+    (LimitType.MAX_DEPOSIT_DECLINE_PERCENT, LimitPeriod.BEGINNING_OF_DAY),
+    (LimitType.TOTAL_AMOUNT_DEPOSITS_PERIOD, LimitPeriod.BEGINNING_OF_HOUR),
+    (LimitType.MAX_WITHDRAWAL_TO_DEPOSIT_RATIO, LimitPeriod.ONE_HOUR),
+    (LimitType.MAX_OPERATIONS_BURST, None),
+]
+
+
+@pytest.fixture
+def wallet_limits(merchant, customer):
+    wallet = WalletFactory.create(merchant=merchant)
+    currency_wallet = CurrencyWalletFactory.create(wallet=wallet)
+    result = [
+        MerchantLimitFactory.create(
+            scope=scope,
+            merchant=merchant if scope == MerchantLimitScope.MERCHANT else None,
+            wallet=wallet if scope == MerchantLimitScope.WALLET else None,
+            limit_type=limit_type,
+            period=period,
+            burst_minutes=5 if limit_type == LimitType.MAX_OPERATIONS_BURST else None,
+            category=LimitCategory.BUSINESS,
+            decline_on_exceed=False,
+        )
+        for limit_type, period in _MERCHANT_LIMIT_TYPES
+        for scope in (MerchantLimitScope.MERCHANT, MerchantLimitScope.WALLET)
+    ]
+    result.append(
+        CustomerLimitFactory.create(customer=customer, decline_on_exceed=False)
+    )
+    for status, trx_type, amount in [
+        (const.TransactionStatus.SUCCESS, const.TransactionType.DEPOSIT, "100"),
+        (const.TransactionStatus.SUCCESS, const.TransactionType.DEPOSIT, "50"),
+        (const.TransactionStatus.FAILED, const.TransactionType.DEPOSIT, "20"),
+        (const.TransactionStatus.SUCCESS, const.TransactionType.WITHDRAWAL, "70"),
+        (const.TransactionStatus.FAILED, const.TransactionType.WITHDRAWAL, "30"),
+        (const.TransactionStatus.PENDING, const.TransactionType.DEPOSIT, "10"),
+    ]:
+        PaymentTransactionFactory.create(
+            wallet=currency_wallet,
+            customer=customer,
+            status=status,
+            type=trx_type,
+            amount=Decimal(amount),
+        )
+    trx = PaymentTransactionFactory.create(
+        wallet=currency_wallet,
+        customer=customer,
+        status=const.TransactionStatus.PENDING,
+        amount=Decimal("200"),
+    )
+    return trx, result
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("disable_cache")
+class TestLimitsCheckPlan:
+    def test_plan_matches_per_limit_queries(self, wallet_limits):
+        trx, limits_to_check = wallet_limits
+
+        plan = planner.LimitsCheckPlan.build(trx, limits_to_check)
+
+        for limit in limits_to_check:
+            if window := plan.period_window(limit):
+                assert plan.period_stats(limit) == counters.get_period_stats(
+                    scope=window.scope,
+                    scope_id=window.scope_id,
+                    start=window.start,
+                    end=window.end,
+                )
+        burst_limit = limits_to_check[-2]
+        assert burst_limit.limit_type == LimitType.MAX_OPERATIONS_BURST
+        assert plan.operations_count(burst_limit) == 7
+
+        customer_stats = plan.period_stats(limits_to_check[-1]).total
+        assert customer_stats.success_count == 3
+        assert customer_stats.failed_count == 2
+        assert customer_stats.success_amount == Decimal("220")
+
+    @pytest.mark.parametrize("use_counters", [False, True])
+    def test_plan_queries_count_is_constant(
+        self, wallet_limits, use_counters, django_assert_num_queries
+    ):
+        trx, limits_to_check = wallet_limits
+        if use_counters:
+            counters.rebuild_counters(
+                trx.created_at.replace(hour=0, minute=0), trx.created_at
+            )
+
+        with counters_enabled() as is_enabled:
+            is_enabled.return_value = use_counters
+            with django_assert_num_queries(2 if use_counters else 1):
+                plan = planner.LimitsCheckPlan.build(trx, limits_to_check)
+
+        deposits = plan.period_stats(limits_to_check[0]).for_type(
+            const.TransactionType.DEPOSIT
+        )
+        assert deposits.success_count == 2
+
+    def test_period_window_groups_limits_with_same_window(self, wallet_limits):
+        trx, limits_to_check = wallet_limits
+        plan = planner.LimitsCheckPlan(trx)
+
+        windows = {plan.period_window(limit) for limit in limits_to_check} - {None}
+
+        # 4 periods per merchant and wallet scopes + customer ONE_HOUR
+        assert len(windows) == 9
+        assert {window.scope for window in windows if window} == {
+            CounterScope.CUSTOMER,
+            CounterScope.MERCHANT,
+            CounterScope.WALLET,
+        }
+
+    def test_alert_notification_groups_are_set(self, wallet_limits):
+        trx, limits_to_check = wallet_limits
+        group = Group.objects.create(name="Risk Team")
+        for limit in limits_to_check:
+            limit.notification_groups.add(group)
+        trx.amount = Decimal("1")
+        trx.save()
+
+        is_declined, alerts = limits._process_transaction_limits(trx)
+
+        assert not is_declined
+        assert len(alerts) > 1
+        for alert in LimitAlert.objects.all():
+            assert list(alert.notification_groups.all()) == [group]
@@ -2789,3 +2789,61 @@ class TestLimitNotificationAndGroups:
         limits._notify_about_alerts([])
 
         mock_notify_slack_task.apply_async.assert_not_called()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("disable_cache")
+class TestActiveLimitsIndex:
+    def test_candidate_limits_are_looked_up_by_transaction_entities(
+        self, customer, merchant, wallet
+    ):
+        currency_wallet = CurrencyWalletFactory.create(wallet=wallet)
+        customer_limit = CustomerLimitFactory.create(customer=customer)
+        merchant_limit = MerchantLimitFactory.create(
+            merchant=merchant, scope=MerchantLimitScope.MERCHANT
+        )
+        wallet_limit = MerchantLimitFactory.create(
+            merchant=None, wallet=wallet, scope=MerchantLimitScope.WALLET
+        )
+        # Limits of other entities
+        CustomerLimitFactory.create()
+        MerchantLimitFactory.create()
+        MerchantLimitFactory.create(merchant=merchant, active=False)
+
+        trx = PaymentTransactionFactory.create(
+            customer=customer, wallet=currency_wallet
+        )
+
+        candidates = limits.get_active_limits_index().get_candidate_limits(trx)
+
+        assert candidates == [customer_limit, merchant_limit, wallet_limit]
+
+    def test_global_risk_wallet_limits_are_resolved_at_build_time(self, wallet):
+        risk_limit = MerchantLimitFactory.create(
+            merchant=None,
+            wallet=wallet,
+            scope=MerchantLimitScope.WALLET,
+            category=LimitCategory.RISK,
+            limit_type=LimitType.MAX_OPERATIONS_BURST,
+        )
+        MerchantLimitFactory.create(
+            merchant=None,
+            wallet=wallet,
+            scope=MerchantLimitScope.WALLET,
+            category=LimitCategory.GLOBAL_RISK,
+            limit_type=LimitType.MAX_OPERATIONS_BURST,
+        )
+        global_risk_limit_other_type = MerchantLimitFactory.create(
+            merchant=None,
+            wallet=wallet,
+            scope=MerchantLimitScope.WALLET,
+            category=LimitCategory.GLOBAL_RISK,
+            limit_type=LimitType.MAX_AMOUNT_SINGLE_OPERATION,
+        )
+
+        index = limits.get_active_limits_index()
+
+        assert index.wallet_limits[wallet.id] == [
+            risk_limit,
+            global_risk_limit_other_type,
+        ]
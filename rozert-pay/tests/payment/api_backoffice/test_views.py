@@ -98,8 +98,8 @@ class TestAclRoles:
 
         response = api_client.get("/api/backoffice/v1/transaction/")
         assert response.status_code == 200, response.data
-        assert len(response.json()) == 2
-        transaction_uuids = {item["id"] for item in response.json()}
+        assert len(response.json()["results"]) == 2
+        transaction_uuids = {item["id"] for item in response.json()["results"]}
         assert str(transaction_merchant_11_group_1.uuid) in transaction_uuids
         assert str(transaction_merchant_12_group_1.uuid) in transaction_uuids
 
@@ -131,8 +131,10 @@ class TestAclRoles:
 
         response = api_client.get("/api/backoffice/v1/transaction/")
         assert response.status_code == 200, response.data
-        assert len(response.json()) == 1
-        assert response.json()[0]["id"] == str(transaction_merchant_11_group_1.uuid)
+        assert len(response.json()["results"]) == 1
+        assert response.json()["results"][0]["id"] == str(
+            transaction_merchant_11_group_1.uuid
+        )
 
         response = api_client.get("/api/backoffice/v1/deposit-account/")
         assert response.status_code == 200
@@ -158,8 +160,10 @@ class TestAclRoles:
 
         response = api_client.get("/api/backoffice/v1/transaction/")
         assert response.status_code == 200, response.data
-        assert len(response.json()) == 1
-        assert response.json()[0]["id"] == str(transaction_merchant_11_group_1.uuid)
+        assert len(response.json()["results"]) == 1
+        assert response.json()["results"][0]["id"] == str(
+            transaction_merchant_11_group_1.uuid
+        )
 
         login_as(api_client, user2.email, merchant_id=m22.id)
 
@@ -170,8 +174,10 @@ class TestAclRoles:
 
         response = api_client.get("/api/backoffice/v1/transaction/")
         assert response.status_code == 200, response.data
-        assert len(response.json()) == 1
-        assert response.json()[0]["id"] == str(transaction_merchant_22_group_2.uuid)
+        assert len(response.json()["results"]) == 1
+        assert response.json()["results"][0]["id"] == str(
+            transaction_merchant_22_group_2.uuid
+        )
 
 
 @pytest.mark.django_db
@@ -0,0 +1,189 @@
+import json
+import threading
+import time
+import typing as ty
+from contextlib import contextmanager
+
+import pytest
+from django.db import connection, transaction
+from django.urls import reverse
+from rozert_pay.common import metrics
+from rozert_pay.common.const import TransactionStatus
+from rozert_pay.payment.models import Merchant, PaymentTransaction
+from rozert_pay.payment.services import db_services
+from tests.factories import CurrencyWalletFactory, PaymentTransactionFactory
+from tests.payment.api_v1.test_views import force_authenticate
+
+pytestmark = pytest.mark.django_db
+
+URL = reverse("transaction-changes")
+STREAM_URL = reverse("transaction-changes-stream")
+
+
+@pytest.fixture(autouse=True)
+def no_clock_skew(settings):
+    settings.TRANSACTION_CHANGES_CLOCK_SKEW_SECONDS = 0
+
+
+@pytest.fixture
+def merchant(api_client) -> Merchant:
+    currency_wallet = CurrencyWalletFactory.create()
+    PaymentTransactionFactory.create_batch(5, wallet=currency_wallet)
+
+    # Other merchant transaction
+    PaymentTransactionFactory.create()
+
+    force_authenticate(api_client, currency_wallet.wallet.merchant)
+    return currency_wallet.wallet.merchant
+
+
+def _changed_ids(merchant: Merchant) -> list[str]:
+    return [
+        str(uuid)
+        for uuid in PaymentTransaction.objects.filter(wallet__wallet__merchant=merchant)
+        .order_by("updated_at", "id")
+        .values_list("uuid", flat=True)
+    ]
+
+
+def _read_stream(response) -> list[dict]:
+    content = b"".join(response.streaming_content)
+    return [json.loads(line) for line in content.splitlines()]
+
+
+def test_changes_since_watermark(api_client, merchant):
+    expected = _changed_ids(merchant)
+
+    response = api_client.get(URL, {"limit": 3})
+    assert response.status_code == 200, response.data
+    assert [item["id"] for item in response.data["results"]] == expected[:3]
+    assert response.data["has_more"] is True
+
+    response = api_client.get(URL, {"since": response.data["watermark"], "limit": 3})
+    assert [item["id"] for item in response.data["results"]] == expected[3:]
+    assert response.data["has_more"] is False
+    watermark = response.data["watermark"]
+
+    # Nothing changed, watermark stays
+    response = api_client.get(URL, {"since": watermark})
+    assert response.data["results"] == []
+    assert response.data["watermark"] == watermark
+
+    trx = PaymentTransaction.objects.filter(wallet__wallet__merchant=merchant).earliest(
+        "updated_at"
+    )
+    trx.status = TransactionStatus.SUCCESS
+    trx.save(update_fields=["status"])
+
+    response = api_client.get(URL, {"since": watermark})
+    assert [(item["id"], item["status"]) for item in response.data["results"]] == [
+        (str(trx.uuid), TransactionStatus.SUCCESS)
+    ]
+
+    db_services.save_extra_field(trx, "key", "value")
+    response = api_client.get(URL, {"since": response.data["watermark"]})
+    assert [item["id"] for item in response.data["results"]] == [str(trx.uuid)]
+
+
+def test_changes_constant_number_of_queries(
+    api_client, merchant, django_assert_num_queries
+):
+    # Visibility horizon and transactions
+    with django_assert_num_queries(2):
+        response = api_client.get(URL)
+
+    assert len(response.data["results"]) == 5
+    assert "user_data" in response.data["results"][0]
+
+
+@contextmanager
+def _open_db_transaction() -> ty.Iterator[None]:
+    started = threading.Event()
+    release = threading.Event()
+
+    def _open_transaction() -> None:
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                started.set()
+                release.wait(timeout=30)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=_open_transaction)
+    thread.start()
+    assert started.wait(timeout=30)
+    try:
+        yield
+    finally:
+        release.set()
+        thread.join()
+
+
+def _horizon_lag() -> float:
+    return next(
+        sample.value
+        for m in metrics.TRANSACTION_CHANGES_HORIZON_LAG.collect()
+        for sample in m.samples
+    )
+
+
+def test_changes_wait_for_open_db_transactions(api_client, merchant):
+    trx = PaymentTransaction.objects.filter(merchant=merchant).earliest("updated_at")
+
+    with _open_db_transaction():
+        response = api_client.get(URL)
+        # Changed before the DB transaction started
+        assert len(response.data["results"]) == 5
+        watermark = response.data["watermark"]
+
+        trx.status = TransactionStatus.SUCCESS
+        trx.save(update_fields=["status"])
+
+        response = api_client.get(URL, {"since": watermark})
+        assert response.data["results"] == []
+        assert response.data["watermark"] == watermark
+
+    response = api_client.get(URL, {"since": watermark})
+    assert [item["id"] for item in response.data["results"]] == [str(trx.uuid)]
+
+
+def test_changes_horizon_lag(api_client, merchant, settings, caplog):
+    settings.TRANSACTION_CHANGES_HORIZON_LAG_WARNING_SECONDS = 0
+
+    with _open_db_transaction():
+        time.sleep(0.01)
+        response = api_client.get(URL)
+    assert response.status_code == 200
+
+    assert _horizon_lag() >= 0.01
+    assert "held back by long DB transaction" in caplog.text
+
+
+def test_changes_stream(api_client, merchant, monkeypatch):
+    monkeypatch.setattr(
+        "rozert_pay.payment.api_v1.transaction_changes.MAX_PAGE_SIZE", 2
+    )
+
+    response = api_client.get(STREAM_URL)
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = _read_stream(response)
+    assert [item["id"] for item in lines[:-1]] == _changed_ids(merchant)
+    assert lines[-1]["has_more"] is False
+
+    response = api_client.get(STREAM_URL, {"limit": 3})
+    lines = _read_stream(response)
+    assert [item["id"] for item in lines[:-1]] == _changed_ids(merchant)[:3]
+    assert lines[-1]["has_more"] is True
+
+    response = api_client.get(STREAM_URL, {"since": lines[-1]["watermark"]})
+    lines = _read_stream(response)
+    assert [item["id"] for item in lines[:-1]] == _changed_ids(merchant)[3:]
+
+
+def test_changes_invalid_watermark(api_client, merchant):
+    response = api_client.get(URL, {"since": "invalid"})
+    assert response.status_code == 400
+    assert "since" in response.data
@@ -0,0 +1,121 @@
+import pytest
+from django.urls import reverse
+from rozert_pay.common.const import TransactionStatus, TransactionType
+from rozert_pay.payment.models import (
+    CustomerCard,
+    CustomerExternalPaymentSystemAccount,
+    Merchant,
+    PaymentTransaction,
+)
+from tests.factories import (
+    CurrencyWalletFactory,
+    CustomerFactory,
+    PaymentTransactionFactory,
+)
+from tests.payment.api_v1.test_views import force_authenticate
+
+pytestmark = pytest.mark.django_db
+
+URL = reverse("transaction-list")
+
+
+@pytest.fixture
+def merchant(api_client) -> Merchant:
+    currency_wallet = CurrencyWalletFactory.create()
+    wallet = currency_wallet.wallet
+    for i in range(6):
+        customer = CustomerFactory.create()
+        PaymentTransactionFactory.create(
+            wallet=currency_wallet,
+            customer=customer,
+            customer_card=CustomerCard.objects.create(
+                unique_identity=f"card-{i}",
+                card_data={"card_num": "4111111111111111"},
+                customer=customer,
+            ),
+            customer_external_account=CustomerExternalPaymentSystemAccount.objects.create(
+                customer=customer,
+                wallet=wallet,
+                unique_account_number=f"account-{i}",
+                system_type=wallet.system.type,
+            ),
+            status=(TransactionStatus.SUCCESS if i % 2 else TransactionStatus.PENDING),
+        )
+
+    # Other merchant transaction
+    PaymentTransactionFactory.create()
+
+    force_authenticate(api_client, wallet.merchant)
+    return wallet.merchant
+
+
+def _fetch_all(api_client, url: str) -> list[str]:
+    ids = []
+    while url:
+        response = api_client.get(url)
+        assert response.status_code == 200, response.data
+        ids += [item["id"] for item in response.data["results"]]
+        url = response.data["next"]
+    return ids
+
+
+def test_pages_follow_created_at_and_id(api_client, merchant):
+    expected = [
+        str(uuid)
+        for uuid in PaymentTransaction.objects.filter(wallet__wallet__merchant=merchant)
+        .order_by("-created_at", "-id")
+        .values_list("uuid", flat=True)
+    ]
+    assert len(expected) == 6
+
+    assert _fetch_all(api_client, f"{URL}?page_size=4") == expected
+    assert _fetch_all(api_client, f"{URL}?page_size=2") == expected
+
+    response = api_client.get(f"{URL}?page_size=2")
+    assert response.data["previous"] is None
+    assert response.data["results"][0]["card_token"]
+    assert response.data["results"][0]["external_account_id"].startswith("account-")
+
+
+@pytest.mark.parametrize("page_size", [1, 6])
+def test_constant_number_of_queries_per_page(
+    api_client, merchant, page_size, django_assert_num_queries
+):
+    with django_assert_num_queries(1):
+        response = api_client.get(URL, {"page_size": page_size})
+
+    assert len(response.data["results"]) == page_size
+    item = response.data["results"][0]
+    customer = PaymentTransaction.objects.get(uuid=item["id"]).customer
+    assert customer
+    assert item["user_data"]["email"] == customer.email_encrypted.get_secret_value()
+
+
+def test_filters(api_client, merchant):
+    other_wallet = CurrencyWalletFactory.create(wallet__merchant=merchant)
+    trx = PaymentTransactionFactory.create(
+        wallet=other_wallet, type=TransactionType.WITHDRAWAL
+    )
+
+    response = api_client.get(URL, {"wallet_id": str(other_wallet.wallet.uuid)})
+    assert [item["id"] for item in response.data["results"]] == [str(trx.uuid)]
+
+    response = api_client.get(URL, {"type": TransactionType.WITHDRAWAL})
+    assert [item["id"] for item in response.data["results"]] == [str(trx.uuid)]
+
+    response = api_client.get(URL, {"status": TransactionStatus.SUCCESS})
+    assert len(response.data["results"]) == 3
+
+    response = api_client.get(URL, {"created_from": trx.created_at.isoformat()})
+    assert [item["id"] for item in response.data["results"]] == [str(trx.uuid)]
+
+    response = api_client.get(URL, {"created_to": trx.created_at.isoformat()})
+    assert len(response.data["results"]) == 6
+
+    response = api_client.get(URL, {"status": "unknown"})
+    assert response.status_code == 400
+
+
+def test_invalid_cursor(api_client, merchant):
+    response = api_client.get(URL, {"cursor": "invalid"})
+    assert response.status_code == 404
@@ -71,8 +71,8 @@ class TestTransactionViewSet:
         url = reverse("transaction-list")
         response = api_client.get(url)
         assert response.status_code == 200
-        assert len(response.data) == 1
-        assert list(response.data) == [
+        assert len(response.data["results"]) == 1
+        assert list(response.data["results"]) == [
             {
                 "id": mock.ANY,
                 "wallet_id": mock.ANY,
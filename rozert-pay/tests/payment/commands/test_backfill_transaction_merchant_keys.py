@@ -0,0 +1,41 @@
+import pytest
+from django.core.management import call_command
+from rozert_pay.payment.models import PaymentTransaction
+from tests.factories import PaymentTransactionFactory
+
+
+@pytest.mark.django_db
+class TestBackfillTransactionMerchantKeysCommand:
+    def test_keys_set_on_create(self) -> None:
+        transaction = PaymentTransactionFactory.create()
+
+        transaction.refresh_from_db()
+        assert transaction.merchant_wallet_id == transaction.wallet.wallet_id
+        assert transaction.merchant_id == transaction.wallet.wallet.merchant_id
+
+    def test_keys_set_on_save_with_update_fields(self) -> None:
+        transaction = PaymentTransactionFactory.create()
+        PaymentTransaction.objects.filter(id=transaction.id).update(
+            merchant_wallet=None, merchant=None
+        )
+        transaction.refresh_from_db()
+
+        transaction.save(update_fields=["status"])
+
+        transaction.refresh_from_db()
+        assert transaction.merchant_wallet_id == transaction.wallet.wallet_id
+        assert transaction.merchant_id == transaction.wallet.wallet.merchant_id
+
+    def test_backfills_transactions(self) -> None:
+        transactions = PaymentTransactionFactory.create_batch(3)
+        PaymentTransaction.objects.filter(
+            id__in=[trx.id for trx in transactions[:2]]
+        ).update(merchant_wallet=None, merchant=None)
+
+        call_command("backfill_transaction_merchant_keys", chunk_size=1)
+
+        for transaction in transactions:
+            transaction.refresh_from_db()
+            assert transaction.merchant_wallet_id == transaction.wallet.wallet_id
+            assert transaction.merchant_id == transaction.wallet.wallet.merchant_id
+        assert not PaymentTransaction.objects.filter(merchant__isnull=True).exists()
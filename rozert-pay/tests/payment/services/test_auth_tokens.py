@@ -0,0 +1,122 @@
+from datetime import timedelta
+from unittest.mock import Mock
+
+import pytest
+import requests
+import requests_mock
+from django.utils import timezone
+from freezegun import freeze_time
+from pydantic import BaseModel, SecretStr
+from rozert_pay.payment.services import auth_tokens
+
+
+class _Credentials(BaseModel):
+    client_id: str
+    secret: SecretStr
+
+
+@pytest.mark.usefixtures("clear_auth_tokens")
+class TestAuthTokens:
+    creds = _Credentials(client_id="client", secret=SecretStr("secret"))
+
+    def _fetch(self, *values: str) -> Mock:
+        return Mock(
+            side_effect=[
+                auth_tokens.AuthToken.from_expires_in(value, expires_in=600)
+                for value in values
+            ]
+        )
+
+    def test_token_is_cached(self):
+        fetch = self._fetch("token1", "token2")
+
+        for _ in range(3):
+            assert (
+                auth_tokens.get_token(
+                    provider="test", credentials=self.creds, fetch=fetch
+                )
+                == "token1"
+            )
+        assert fetch.call_count == 1
+
+        # Other process takes token from Redis
+        auth_tokens._tokens.clear()
+        assert (
+            auth_tokens.get_token(provider="test", credentials=self.creds, fetch=fetch)
+            == "token1"
+        )
+        assert fetch.call_count == 1
+
+        # Tokens of other credentials are not shared
+        other_creds = _Credentials(client_id="client", secret=SecretStr("other"))
+        assert (
+            auth_tokens.get_token(provider="test", credentials=other_creds, fetch=fetch)
+            == "token2"
+        )
+
+    def test_token_is_refreshed_before_expiry(self):
+        now = timezone.now()
+        fetch = self._fetch("token1", "token2")
+
+        with freeze_time(now):
+            auth_tokens.get_token(provider="test", credentials=self.creds, fetch=fetch)
+
+        with freeze_time(
+            now + timedelta(seconds=600) - auth_tokens.REFRESH_BEFORE_EXPIRY
+        ):
+            assert (
+                auth_tokens.get_token(
+                    provider="test", credentials=self.creds, fetch=fetch
+                )
+                == "token2"
+            )
+
+    def test_current_token_is_used_if_refresh_failed(self):
+        now = timezone.now()
+        fetch = Mock(
+            side_effect=[
+                auth_tokens.AuthToken.from_expires_in("token1", expires_in=600),
+                requests.ConnectionError(),
+            ]
+        )
+
+        with freeze_time(now):
+            auth_tokens.get_token(provider="test", credentials=self.creds, fetch=fetch)
+
+        with freeze_time(now + timedelta(seconds=590)):
+            assert (
+                auth_tokens.get_token(
+                    provider="test", credentials=self.creds, fetch=fetch
+                )
+                == "token1"
+            )
+
+    def test_request_is_retried_on_401(self):
+        fetch = self._fetch("token1", "token2")
+
+        with requests_mock.Mocker() as m:
+            m.get(
+                "http://provider/api",
+                [
+                    {"status_code": 401},
+                    {"status_code": 200, "json": {}},
+                ],
+            )
+            response = auth_tokens.request_with_token(
+                provider="test",
+                credentials=self.creds,
+                fetch=fetch,
+                send=lambda token: requests.get(
+                    "http://provider/api", headers={"Authorization": token}
+                ),
+            )
+
+        assert response.status_code == 200
+        assert [r.headers["Authorization"] for r in m.request_history] == [
+            "token1",
+            "token2",
+        ]
+        assert (
+            auth_tokens.get_token(provider="test", credentials=self.creds, fetch=fetch)
+            == "token2"
+        )
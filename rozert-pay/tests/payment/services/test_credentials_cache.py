@@ -0,0 +1,50 @@
+from unittest import mock
+
+import pytest
+from pydantic import BaseModel
+from rozert_pay.payment.models import Wallet
+from rozert_pay.payment.services import credentials_cache
+
+pytestmark = pytest.mark.django_db
+
+
+class _Creds(BaseModel):
+    key: str
+
+
+def test_credentials_parsed_once_per_wallet_version(wallet: Wallet):
+    wallet.credentials = {"key": "old"}
+    wallet.save()
+    parse = mock.Mock(side_effect=lambda data: _Creds(**data))
+
+    loaded = Wallet.objects.get(id=wallet.id)
+    assert credentials_cache.get_credentials(loaded, _Creds, parse).key == "old"
+    assert credentials_cache.get_credentials(loaded, _Creds, parse).key == "old"
+    assert parse.call_count == 1
+
+    # Deferred credentials are not loaded on cache hit
+    deferred = Wallet.objects.defer("credentials").get(id=wallet.id)
+    with mock.patch.object(Wallet, "refresh_from_db") as refresh:
+        assert credentials_cache.get_credentials(deferred, _Creds, parse).key == "old"
+    refresh.assert_not_called()
+
+    wallet.credentials = {"key": "new"}
+    wallet.save(update_fields=["credentials"])
+
+    loaded = Wallet.objects.get(id=wallet.id)
+    assert credentials_cache.get_credentials(loaded, _Creds, parse).key == "new"
+    assert parse.call_count == 2
+
+
+def test_credentials_updated_in_other_process(wallet: Wallet):
+    wallet.credentials = {"key": "old"}
+    wallet.save()
+    assert credentials_cache.get_credentials(wallet, _Creds).key == "old"
+
+    wallet.credentials = {"key": "new"}
+    with mock.patch.object(credentials_cache, "invalidate"):
+        wallet.save()
+
+    # New updated_at is the new version of credentials
+    loaded = Wallet.objects.get(id=wallet.id)
+    assert credentials_cache.get_credentials(loaded, _Creds).key == "new"
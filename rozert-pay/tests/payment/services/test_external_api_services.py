@@ -65,3 +65,24 @@ class TestExternalApiSession:
                 },
                 "response": None,
             }
+
+    def test_buffered_event_logs(self):
+        trx = PaymentTransactionFactory.create()
+        sess = external_api_services.get_external_api_session(trx_id=trx.id)
+
+        with requests_mock.Mocker() as m:
+            m.get("http://test", json={"status": "ok"})
+
+            with external_api_services.buffered_event_logs(max_size=2):
+                sess.get("http://test")
+                assert PaymentTransactionEventLog.objects.count() == 0
+                sess.get("http://test")
+                assert PaymentTransactionEventLog.objects.count() == 2
+                sess.get("http://test")
+
+            assert PaymentTransactionEventLog.objects.count() == 3
+            item = PaymentTransactionEventLog.objects.last()
+            assert item.extra["response"] == {
+                "status_code": 200,
+                "text": {"status": "ok"},
+            }
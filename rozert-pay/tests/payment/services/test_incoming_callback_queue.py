@@ -0,0 +1,124 @@
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rozert_pay.payment import tasks
+from rozert_pay.payment.models import IncomingCallback, PaymentSystem, Wallet
+from rozert_pay.payment.services import incoming_callback_queue
+from tests.payment.systems.d24_mercadopago.constants import (
+    D24_MERCADO_PAGO_DEPOSIT_CALLBACK,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def system(wallet_d24_mercadopago: Wallet) -> PaymentSystem:
+    system = wallet_d24_mercadopago.system
+    system.async_callbacks_enabled = True
+    system.save()
+    return system
+
+
+@pytest.fixture
+def mock_handle_incoming_callback():
+    with mock.patch.object(tasks, "handle_incoming_callback") as m:
+        yield m
+
+
+def _queued_callback(
+    system: PaymentSystem, queue_key: str = "trx-1", **kwargs
+) -> IncomingCallback:
+    return IncomingCallback.objects.create(
+        system=system,
+        body="{}",
+        get_params={},
+        ip="127.0.0.1",
+        queued_at=timezone.now(),
+        queue_key=queue_key,
+        **kwargs,
+    )
+
+
+class TestIncomingCallbackQueue:
+    def test_callback_acknowledged_and_processed_async(
+        self,
+        api_client: APIClient,
+        system: PaymentSystem,
+        mock_handle_incoming_callback,
+        django_capture_on_commit_callbacks,
+    ):
+        with django_capture_on_commit_callbacks() as callbacks:
+            response = api_client.post(
+                path=f"/api/payment/v1/callback/{system.slug}/",
+                data=D24_MERCADO_PAGO_DEPOSIT_CALLBACK,
+                format="json",
+            )
+        assert response.status_code == 200
+
+        cb = IncomingCallback.objects.get()
+        assert cb.queued_at
+        assert cb.queue_key
+        mock_handle_incoming_callback.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+
+        mock_handle_incoming_callback.assert_called_once_with(
+            cb.id, origin_checked=True
+        )
+        cb.refresh_from_db()
+        assert cb.queued_at is None
+
+    def test_callbacks_processed_in_order(
+        self, system: PaymentSystem, mock_handle_incoming_callback
+    ):
+        callbacks = [_queued_callback(system) for _ in range(3)]
+        other_transaction_cb = _queued_callback(system, queue_key="trx-2")
+        mock_handle_incoming_callback.side_effect = [None, Exception("error"), None]
+
+        tasks.process_queued_callbacks(system.id, "trx-1")
+
+        assert mock_handle_incoming_callback.call_args_list == [
+            mock.call(cb.id, origin_checked=True) for cb in callbacks
+        ]
+        assert list(
+            IncomingCallback.objects.filter(queued_at__isnull=False).values_list(
+                "id", flat=True
+            )
+        ) == [other_transaction_cb.id]
+
+    def test_callbacks_processed_by_other_worker(
+        self, system: PaymentSystem, mock_handle_incoming_callback
+    ):
+        _queued_callback(system)
+        other_transaction_cb = _queued_callback(system, queue_key="trx-2")
+
+        with incoming_callback_queue.processing_lock(system.id, "trx-1"):
+            tasks.process_queued_callbacks(system.id, "trx-1")
+            mock_handle_incoming_callback.assert_not_called()
+
+            # Callbacks of other transactions are not blocked
+            tasks.process_queued_callbacks(system.id, "trx-2")
+            mock_handle_incoming_callback.assert_called_once_with(
+                other_transaction_cb.id, origin_checked=True
+            )
+
+        mock_handle_incoming_callback.reset_mock()
+
+        tasks.dispatch_queued_callbacks()
+        mock_handle_incoming_callback.assert_called_once()
+
+    def test_duplicate_event_skipped(self, system: PaymentSystem):
+        _queued_callback(system, event_id="event-1")
+
+        cb = IncomingCallback(
+            system=system,
+            body="{}",
+            get_params={},
+            ip="127.0.0.1",
+            event_id="event-1",
+        )
+        assert not incoming_callback_queue.save_queued_callback(cb)
+        assert IncomingCallback.objects.count() == 1
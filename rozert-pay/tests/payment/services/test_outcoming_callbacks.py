@@ -1,14 +1,19 @@
+from contextlib import ExitStack
+from datetime import timedelta
 from unittest.mock import Mock, call
 
+import freezegun
 import pytest
 import requests_mock
+from django.utils import timezone
 from rozert_pay.common import const
 from rozert_pay.common.const import CallbackStatus
+from rozert_pay.common.helpers import cache
 from rozert_pay.payment import tasks
 from rozert_pay.payment.models import OutcomingCallback
-from rozert_pay.payment.services import outcoming_callbacks
+from rozert_pay.payment.services import callback_dispatcher, outcoming_callbacks
 from rozert_pay_shared.rozert_client import RozertClient
-from tests.factories import OutcomingCallbackFactory
+from tests.factories import OutcomingCallbackFactory, PaymentTransactionFactory
 
 verify_callback_signature = RozertClient.verify_callback_signature
 
@@ -114,3 +119,149 @@ class TestOutcomingCallbacks:
         assert cb.logs
         assert 'Response: 200 {"status": "success"}' in cb.logs
         assert cb.status == const.CallbackStatus.SUCCESS
+
+    def test_failed_attempt_schedules_retry(self):
+        cb: OutcomingCallback = OutcomingCallbackFactory.create(
+            target="http://example",
+            status=CallbackStatus.PENDING,
+            current_attempt=0,
+        )
+
+        with requests_mock.Mocker() as m:
+            m.post("http://example/", status_code=500)
+            tasks.send_callback(callback_id=str(cb.id))
+
+            cb.refresh_from_db()
+            assert cb.status == CallbackStatus.PENDING
+            assert cb.current_attempt == 1
+            assert cb.next_attempt_at == cb.last_attempt_at + timedelta(seconds=2)
+
+            # Retry is not due yet
+            tasks.send_callback(callback_id=str(cb.id))
+            assert m.call_count == 1
+
+        with freezegun.freeze_time(cb.next_attempt_at):
+            with requests_mock.Mocker() as m:
+                m.post("http://example/")
+                tasks.send_callback(callback_id=str(cb.id))
+
+        cb.refresh_from_db()
+        assert cb.status == CallbackStatus.SUCCESS
+        assert cb.next_attempt_at is None
+        assert cb.current_attempt == 2
+
+    def test_claim_due_callbacks(self):
+        slow_merchant_trx = PaymentTransactionFactory.create()
+        slow_merchant_callbacks = OutcomingCallbackFactory.create_batch(
+            5, transaction=slow_merchant_trx, status=CallbackStatus.PENDING
+        )
+        other_callback = OutcomingCallbackFactory.create(status=CallbackStatus.PENDING)
+        OutcomingCallbackFactory.create(
+            status=CallbackStatus.PENDING,
+            next_attempt_at=timezone.now() + timedelta(minutes=1),
+        )
+        OutcomingCallbackFactory.create(status=CallbackStatus.SUCCESS)
+
+        claimed = callback_dispatcher.claim_due_callbacks(limit_per_merchant=2)
+
+        assert {cb.id for cb in claimed} == {
+            slow_merchant_callbacks[0].id,
+            slow_merchant_callbacks[1].id,
+            other_callback.id,
+        }
+        assert callback_dispatcher.claim_due_callbacks(limit_per_merchant=2) == [
+            slow_merchant_callbacks[2],
+            slow_merchant_callbacks[3],
+        ]
+
+    def test_claim_lease_covers_lane(self):
+        trx = PaymentTransactionFactory.create()
+        OutcomingCallbackFactory.create_batch(
+            6, transaction=trx, status=CallbackStatus.PENDING
+        )
+        now = timezone.now()
+
+        with freezegun.freeze_time(now):
+            claimed = callback_dispatcher.claim_due_callbacks()
+
+        # 6 callbacks are sent by 4 lanes: 2, 2, 1, 1
+        leases = sorted(
+            OutcomingCallback.objects.filter(
+                id__in=[cb.id for cb in claimed]
+            ).values_list("next_attempt_at", flat=True)
+        )
+        assert (
+            leases
+            == [now + callback_dispatcher.get_claim_lease(1)] * 2
+            + [now + callback_dispatcher.get_claim_lease(2)] * 4
+        )
+        assert sorted(cb.next_attempt_at for cb in claimed) == leases
+
+    def test_result_not_saved_after_claim_expired(self):
+        cb: OutcomingCallback = OutcomingCallbackFactory.create(
+            target="http://example", status=CallbackStatus.PENDING
+        )
+        claimed = callback_dispatcher.claim_callback(cb.id)
+        assert claimed
+        # Claim expired and callback is claimed by other worker
+        OutcomingCallback.objects.filter(id=cb.id).update(
+            next_attempt_at=claimed.next_attempt_at + timedelta(seconds=1)
+        )
+
+        with requests_mock.Mocker() as m:
+            m.post("http://example/")
+            callback_dispatcher.send_claimed_callback(claimed)
+
+        cb.refresh_from_db()
+        assert cb.status == CallbackStatus.PENDING
+        assert cb.current_attempt == 0
+        assert cb.next_attempt_at == claimed.next_attempt_at + timedelta(seconds=1)
+
+    def test_busy_merchant_callback_postponed(self):
+        cb: OutcomingCallback = OutcomingCallbackFactory.create(
+            target="http://example", status=CallbackStatus.PENDING
+        )
+        key = cache.CacheKey(
+            f"outcoming_callbacks_sending:{cb.transaction.wallet.wallet.merchant_id}"
+        )
+        now = timezone.now()
+
+        with ExitStack() as stack:
+            # Requests of other workers in progress
+            for _ in range(callback_dispatcher.MAX_CONCURRENCY_PER_MERCHANT):
+                stack.enter_context(
+                    cache.redis_semaphore(
+                        key,
+                        limit=callback_dispatcher.MAX_CONCURRENCY_PER_MERCHANT,
+                        timeout=callback_dispatcher.CLAIM_LEASE,
+                    )
+                )
+
+            with requests_mock.Mocker() as m, freezegun.freeze_time(now):
+                m.post("http://example/")
+                tasks.send_callback(callback_id=str(cb.id))
+                assert m.call_count == 0
+
+        cb.refresh_from_db()
+        assert cb.status == CallbackStatus.PENDING
+        assert cb.current_attempt == 0
+        assert cb.next_attempt_at == now + callback_dispatcher.BUSY_MERCHANT_DELAY
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dispatch_due_callbacks():
+    callbacks = OutcomingCallbackFactory.create_batch(
+        6, target="http://example", status=CallbackStatus.PENDING
+    )
+
+    with requests_mock.Mocker() as m:
+        m.post("http://example/")
+        assert callback_dispatcher.dispatch_due_callbacks() == 6
+        assert m.call_count == 6
+
+    assert set(
+        OutcomingCallback.objects.filter(
+            id__in=[cb.id for cb in callbacks]
+        ).values_list("status", flat=True)
+    ) == {CallbackStatus.SUCCESS}
+    assert callback_dispatcher.dispatch_due_callbacks() == 0
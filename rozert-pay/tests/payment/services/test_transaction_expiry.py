@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from freezegun import freeze_time
+from rozert_pay.common import const
+from rozert_pay.common.const import CallbackStatus, TransactionStatus
+from rozert_pay.payment.models import OutcomingCallback, PaymentTransactionEventLog
+from rozert_pay.payment.services import transaction_expiry
+from tests.factories import CurrencyWalletFactory, PaymentTransactionFactory
+
+
+@pytest.mark.django_db
+class TestTransactionExpiry:
+    def test_fail_expired_deposits(
+        self, mock_send_callback, django_capture_on_commit_callbacks
+    ):
+        currency_wallet = CurrencyWalletFactory.create()
+        system = currency_wallet.wallet.system
+
+        with freeze_time(
+            timezone.now() - timedelta(seconds=system.deposit_allowed_ttl_seconds + 1)
+        ):
+            expired = PaymentTransactionFactory.create_batch(
+                3,
+                wallet=currency_wallet,
+                type=const.TransactionType.DEPOSIT,
+                status=TransactionStatus.PENDING,
+            )
+            withdrawal = PaymentTransactionFactory.create(
+                wallet=currency_wallet,
+                type=const.TransactionType.WITHDRAWAL,
+                status=TransactionStatus.PENDING,
+            )
+        not_expired = PaymentTransactionFactory.create(
+            wallet=currency_wallet,
+            type=const.TransactionType.DEPOSIT,
+            status=TransactionStatus.PENDING,
+        )
+        other_system_expired = PaymentTransactionFactory.create(
+            type=const.TransactionType.DEPOSIT,
+            status=TransactionStatus.PENDING,
+        )
+        other_system_expired.created_at = expired[0].created_at
+        other_system_expired.save()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert transaction_expiry.fail_expired_deposits(system, batch_size=2) == 3
+
+        for trx in expired:
+            trx.refresh_from_db()
+            assert trx.status == TransactionStatus.FAILED
+            assert trx.decline_code == "USER_HAS_NOT_FINISHED_FLOW"
+            assert trx.decline_reason == "Too long execution for transaction"
+            assert PaymentTransactionEventLog.objects.filter(
+                transaction=trx,
+                description__startswith="Fail transaction by ttl",
+            ).exists()
+
+        callbacks = OutcomingCallback.objects.filter(status=CallbackStatus.PENDING)
+        assert {cb.transaction_id for cb in callbacks} == {trx.id for trx in expired}
+        assert all(cb.body["status"] == "failed" for cb in callbacks)
+        assert callbacks.filter(next_attempt_at__lte=timezone.now()).count() == 3
+        # Sent by dispatch_outcoming_callbacks, not a task per callback
+        assert not mock_send_callback.apply_async.called
+
+        for trx in [withdrawal, not_expired, other_system_expired]:
+            trx.refresh_from_db()
+            assert trx.status == TransactionStatus.PENDING
+
+        assert transaction_expiry.fail_expired_deposits(system) == 0
@@ -9,6 +9,7 @@ from django.db import transaction
 from django.utils import timezone
 from freezegun import freeze_time
 from rozert_pay.common.const import (
+    PaymentSystemType,
     TransactionExtraFields,
     TransactionStatus,
     TransactionType,
@@ -26,106 +27,93 @@ pytestmark = pytest.mark.django_db
 
 
 class TestTransactionPeriodicCheckService:
-    def test_schedule(self):
-        now = datetime.datetime(2025, 8, 14)
+    def _claim(self, limit=100, limit_per_system=100, exclude_systems=()):
+        return [
+            trx_id
+            for trx_id, *_ in TransactionPeriodicCheckService.claim_due_transactions(
+                limit=limit,
+                limit_per_system=limit_per_system,
+                exclude_systems=exclude_systems,
+            )
+        ]
 
-        trx: PaymentTransaction = PaymentTransactionFactory.create()
+    def test_schedule(self):
+        now = timezone.make_aware(datetime.datetime(2025, 8, 14))
 
         with freeze_time(now):
-            assert (
-                TransactionPeriodicCheckService.should_schedule_check_task_immediately(
-                    trx.id, trx.extra
-                )
+            trx: PaymentTransaction = PaymentTransactionFactory.create(
+                check_status_until=now + timedelta(days=1),
             )
-            trx.refresh_from_db()
+            assert self._claim() == [trx.id]
+            assert self._claim() == []
 
-            assert not TransactionPeriodicCheckService.should_schedule_check_task_immediately(
-                trx.id, trx.extra
-            )
-            trx.refresh_from_db()
-
-        assert trx.extra == {
-            "count_status_checks_scheduled": 1,
-            "last_status_check_schedule": 1755129600.0,
-        }
+        trx.refresh_from_db()
+        assert trx.status_checks_count == 1
+        assert trx.next_status_check_at == now + timedelta(minutes=1)
 
         with freeze_time(now + timedelta(seconds=55)):
-            assert not TransactionPeriodicCheckService.should_schedule_check_task_immediately(
-                trx.id, trx.extra
-            )
-            trx.refresh_from_db()
-            assert trx.extra == {
-                "count_status_checks_scheduled": 1,
-                "last_status_check_schedule": 1755129600.0,
-            }
+            assert self._claim() == []
 
         with freeze_time(now + timedelta(minutes=1)):
-            assert (
-                TransactionPeriodicCheckService.should_schedule_check_task_immediately(
-                    trx.id, trx.extra
-                )
-            )
-            trx.refresh_from_db()
-            assert trx.extra == {
-                "count_status_checks_scheduled": 2,
-                "last_status_check_schedule": 1755129660.0,
-            }
+            assert self._claim() == [trx.id]
 
-        trx.extra[TransactionExtraFields.COUNT_STATUS_CHECKS_SCHEDULED] = 10
+        trx.refresh_from_db()
+        assert trx.status_checks_count == 2
+        assert trx.next_status_check_at == now + timedelta(minutes=2)
+
+        trx.status_checks_count = 10
         trx.save()
 
-        last_schedule = now + timedelta(minutes=1)
+        with freeze_time(now + timedelta(minutes=2)):
+            assert self._claim() == [trx.id]
 
-        with freeze_time(last_schedule + timedelta(minutes=4)):
-            assert not TransactionPeriodicCheckService.should_schedule_check_task_immediately(
-                trx.id, trx.extra
-            )
-            trx.refresh_from_db()
-            assert trx.extra == {
-                "count_status_checks_scheduled": 10,
-                "last_status_check_schedule": 1755129660.0,
-            }
-
-        with freeze_time(last_schedule + timedelta(minutes=5)):
-            assert (
-                TransactionPeriodicCheckService.should_schedule_check_task_immediately(
-                    trx.id, trx.extra
-                )
-            )
-            trx.refresh_from_db()
-            assert trx.extra == {
-                "count_status_checks_scheduled": 11,
-                "last_status_check_schedule": 1755129960.0,
-            }
+        trx.refresh_from_db()
+        assert trx.status_checks_count == 11
+        assert trx.next_status_check_at == now + timedelta(minutes=7)
 
-        trx.extra[TransactionExtraFields.COUNT_STATUS_CHECKS_SCHEDULED] = 50
+        trx.status_checks_count = 50
         trx.save()
 
-        last_schedule = timezone.make_aware(
-            datetime.datetime.fromtimestamp(1755129960.0)
+        with freeze_time(now + timedelta(minutes=7)):
+            assert self._claim() == [trx.id]
+
+        trx.refresh_from_db()
+        assert trx.status_checks_count == 51
+        assert trx.next_status_check_at == now + timedelta(minutes=67)
+
+    def test_claim_skips_not_monitored_transactions(self):
+        check_status_until = timezone.now() + timedelta(days=1)
+        trx = PaymentTransactionFactory.create(check_status_until=check_status_until)
+        PaymentTransactionFactory.create()
+        PaymentTransactionFactory.create(
+            check_status_until=check_status_until,
+            status=TransactionStatus.SUCCESS,
+        )
+        PaymentTransactionFactory.create(
+            check_status_until=check_status_until,
+            next_status_check_at=timezone.now() + timedelta(minutes=1),
         )
 
-        with freeze_time(last_schedule + timedelta(minutes=59)):
-            assert not TransactionPeriodicCheckService.should_schedule_check_task_immediately(
-                trx.id, trx.extra
-            )
-            trx.refresh_from_db()
-            assert trx.extra == {
-                "count_status_checks_scheduled": 50,
-                "last_status_check_schedule": 1755129960.0,
-            }
-
-        with freeze_time(last_schedule + timedelta(minutes=61)):
-            assert (
-                TransactionPeriodicCheckService.should_schedule_check_task_immediately(
-                    trx.id, trx.extra
-                )
-            )
-            trx.refresh_from_db()
-            assert trx.extra == {
-                "count_status_checks_scheduled": 51,
-                "last_status_check_schedule": 1755133620.0,
-            }
+        assert self._claim() == [trx.id]
+
+    def test_claim_limits(self):
+        check_status_until = timezone.now() + timedelta(days=1)
+        transactions = PaymentTransactionFactory.create_batch(
+            4, check_status_until=check_status_until
+        )
+        other_system_trx = PaymentTransactionFactory.create(
+            check_status_until=check_status_until,
+            system_type=PaymentSystemType.APPEX,
+        )
+        assert transactions[0].system_type != PaymentSystemType.APPEX
+
+        assert self._claim(limit_per_system=2) == [
+            transactions[0].id,
+            transactions[1].id,
+            other_system_trx.id,
+        ]
+        assert self._claim(limit=1) == [transactions[2].id]
+        assert self._claim(exclude_systems=[transactions[0].system_type]) == []
 
 
 @patch("rozert_pay.payment.services.transaction_processing.BalanceUpdateService")
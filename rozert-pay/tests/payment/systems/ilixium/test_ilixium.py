@@ -9,7 +9,9 @@ from rozert_pay.common.const import (
     PaymentSystemType,
     TransactionExtraFields,
     TransactionStatus,
+    TransactionType,
 )
+from rozert_pay.payment import tasks
 from rozert_pay.payment.models import PaymentTransaction, Wallet
 from rozert_pay.payment.systems.ilixium import ilixium_client
 from rozert_pay.payment.systems.ilixium.ilixium_client import IlixiumUtils
@@ -199,6 +201,37 @@ class TestIlixiumFlow:
 
             assert DBAuditItem.objects.count() == 2
 
+    def test_check_statuses_batch(self, wallet_ilixium, mock_send_callback):
+        currency_wallet = CurrencyWalletFactory.create(
+            wallet=wallet_ilixium, currency="CAD"
+        )
+        trx, not_found_trx = [
+            PaymentTransactionFactory.create(
+                id=trx_id,
+                wallet=currency_wallet,
+                system_type=PaymentSystemType.ILIXIUM,
+                type=TransactionType.DEPOSIT,
+                status=TransactionStatus.PENDING,
+                currency="CAD",
+            )
+            for trx_id in [525, 526]
+        ]
+
+        with requests_mock.Mocker() as m:
+            m.post(
+                "https://prprocessing.ilixium.com/platform/ili/history/operations",
+                text=fixtures.HISTORY_RESPONSE,
+            )
+            tasks.check_statuses([trx.id, not_found_trx.id])
+
+        # One history request for both transactions
+        assert m.call_count == 1
+
+        trx.refresh_from_db()
+        assert trx.status == TransactionStatus.SUCCESS
+        not_found_trx.refresh_from_db()
+        assert not_found_trx.status == TransactionStatus.PENDING
+
     def test_deposit_decline_on_auth(
         self, wallet_ilixium, merchant_client: APIClient, mock_send_callback
     ):
@@ -634,8 +634,6 @@ class TestBitsoSpeiFlow:
 
 @mark.django_db
 def test_callback_signature_validation_success(wallet_bitso_spei: Wallet) -> None:
-    BitsoSpeiController._get_public_key.cache_clear()
-
     private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
     public_key_pem = private_key.public_key().public_bytes(
         serialization.Encoding.PEM,
@@ -682,8 +680,6 @@ def test_callback_signature_validation_success(wallet_bitso_spei: Wallet) -> Non
 def test_callback_signature_validation_invalid_signature(
     wallet_bitso_spei: Wallet,
 ) -> None:
-    BitsoSpeiController._get_public_key.cache_clear()
-
     private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
     public_key_pem = private_key.public_key().public_bytes(
         serialization.Encoding.PEM,
@@ -721,6 +717,25 @@ def test_callback_signature_validation_invalid_signature(
     assert cb.error == "Bitso signature verification failed"
 
 
+@pytest.mark.parametrize("body", ["not json", "[]", '"string"'])
+def test_callback_keys_of_invalid_body(body: str) -> None:
+    cb = IncomingCallback(body=body, headers={}, get_params={}, ip="127.0.0.1")
+
+    assert bitso_spei_controller.get_callback_event_id(cb) is None
+    assert bitso_spei_controller.get_callback_queue_key(cb) is None
+
+
+def test_callback_queue_key() -> None:
+    cb = IncomingCallback(
+        body=json.dumps({"event": "funding", "payload": {"fid": "fid-1"}}),
+        headers={},
+        get_params={},
+        ip="127.0.0.1",
+    )
+
+    assert bitso_spei_controller.get_callback_queue_key(cb) == "funding:fid-1"
+
+
 @mark.django_db
 def test_credentials_change_action_updates_webhooks(wallet_bitso_spei: Wallet) -> None:
     old_creds = {**wallet_bitso_spei.credentials}
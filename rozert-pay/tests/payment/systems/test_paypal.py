@@ -317,6 +317,7 @@ class TestPaypalFlow:
         merchant_client,
         currency_wallet_paypal,
         mock_on_commit,
+        clear_auth_tokens,
     ):
         """
         Test  the successful withdrawal process using PayPal.
@@ -450,10 +451,6 @@ class TestPaypalFlow:
                     "description": "POST https://api-m.sandbox.paypal.com/v1/payments/payouts",
                     "event_type": "external_api_request",
                 },
-                {
-                    "description": "POST https://api-m.sandbox.paypal.com/v1/oauth2/token",
-                    "event_type": "external_api_request",
-                },
                 {
                     "description": "GET https://api-m.sandbox.paypal.com/v1/payments/payouts/123",
                     "event_type": "external_api_request",
@@ -668,7 +665,7 @@ class TestPaypalFlow:
                 "Credentials change action performed successfully", 25
             )
 
-    def test_setup_webhooks(self, wallet_paypal):
+    def test_setup_webhooks(self, wallet_paypal, clear_auth_tokens):
         creds = PaypalCredentials(
             base_url="https://api-m.sandbox.paypal.com",
             client_id="test_client_id",
@@ -701,9 +698,9 @@ class TestPaypalFlow:
                 url=webhook_url, creds=creds, logger=Mock(), wallet=wallet_paypal
             )
 
-            assert m.call_count == 4
+            assert m.call_count == 3
 
-            create_request = m.request_history[-3]
+            create_request = m.request_history[-2]
             assert create_request.method == "POST"
             assert (
                 create_request.url
@@ -0,0 +1,69 @@
+from unittest import mock
+
+from rozert_pay.common import const
+from rozert_pay.payment import controller_registry
+from rozert_pay.payment.controller_registry import PAYMENT_SYSTEMS
+from rozert_pay.payment.systems.base_controller import PaymentSystemController
+
+
+def test_controllers_loaded_on_first_use():
+    controller = PAYMENT_SYSTEMS[const.PaymentSystemType.PAYPAL]["controller"]
+
+    assert isinstance(controller, PaymentSystemController)
+    assert controller.payment_system == const.PaymentSystemType.PAYPAL
+    assert PAYMENT_SYSTEMS.is_loaded(const.PaymentSystemType.PAYPAL)
+
+
+def test_preload():
+    registry = controller_registry._LazyPaymentSystems(
+        {
+            const.PaymentSystemType.PAYPAL: (
+                "PayPal",
+                "rozert_pay.payment.systems.paypal.paypal_controller",
+            ),
+            const.PaymentSystemType.PAYCASH: (
+                "PayCash",
+                "rozert_pay.payment.systems.paycash.paycash_controller",
+            ),
+        }
+    )
+
+    registry.preload([])
+    assert not registry.is_loaded(const.PaymentSystemType.PAYPAL)
+
+    registry.preload([const.PaymentSystemType.PAYPAL.value])
+    assert registry.is_loaded(const.PaymentSystemType.PAYPAL)
+    assert not registry.is_loaded(const.PaymentSystemType.PAYCASH)
+
+    with mock.patch.object(
+        controller_registry, "import_string", wraps=controller_registry.import_string
+    ) as import_string:
+        registry.preload([controller_registry.PRELOAD_ALL])
+    import_string.assert_called_once_with(
+        "rozert_pay.payment.systems.paycash.paycash_controller"
+    )
+
+
+def test_controller_not_imported_until_lookup():
+    registry = controller_registry._LazyPaymentSystems(
+        {
+            const.PaymentSystemType.PAYPAL: (
+                "PayPal",
+                "rozert_pay.payment.systems.paypal.paypal_controller",
+            ),
+        }
+    )
+
+    with mock.patch.object(
+        controller_registry, "import_string", wraps=controller_registry.import_string
+    ) as import_string:
+        assert list(registry) == [const.PaymentSystemType.PAYPAL]
+        assert len(registry) == 1
+        import_string.assert_not_called()
+
+        controller = registry[const.PaymentSystemType.PAYPAL]["controller"]
+        assert registry[const.PaymentSystemType.PAYPAL]["controller"] is controller
+
+    import_string.assert_called_once_with(
+        "rozert_pay.payment.systems.paypal.paypal_controller"
+    )
@@ -0,0 +1,149 @@
+import random
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rozert_pay.risk_lists.const import (
+    ALLOWED_MATCH_FIELDS,
+    ListType,
+    MatchFieldKey,
+    OperationType,
+    Scope,
+)
+from rozert_pay.risk_lists.models import RiskListEntry
+from rozert_pay.risk_lists.services import matcher
+from rozert_pay.risk_lists.services.match_data import MatchData
+from tests.factories import CustomerFactory, PaymentTransactionFactory
+from tests.risk_lists.factories import GrayListEntryFactory, RiskListEntryFactory
+
+_VALUES = ["a", "B", " b ", "c"]
+_OWNER_IDS = [1, 2]
+
+
+def _random_entry(rnd: random.Random, entry_id: int) -> RiskListEntry:
+    scope = rnd.choice(list(Scope))
+    owner_id = rnd.choice(_OWNER_IDS)
+    customer_id = rnd.choice([None, *_OWNER_IDS]) if scope != Scope.GLOBAL else None
+    entry = RiskListEntryFactory.build(
+        id=entry_id,
+        list_type=rnd.choice(list(ListType)),
+        scope=scope,
+        customer=None,
+        customer_id=customer_id,
+        merchant_id=owner_id if scope == Scope.MERCHANT else None,
+        wallet_id=owner_id if scope == Scope.WALLET else None,
+        operation_type=rnd.choice(list(OperationType)),
+        match_fields=[
+            f.value for f in rnd.sample(ALLOWED_MATCH_FIELDS, rnd.randint(0, 3))
+        ],
+        expires_at=rnd.choice([None, timezone.now() - timedelta(minutes=1)]),
+    )
+    for f in ALLOWED_MATCH_FIELDS:
+        setattr(entry, f.value, rnd.choice([None, *_VALUES]))
+    return entry
+
+
+def _random_match_data(rnd: random.Random) -> MatchData:
+    return MatchData(
+        customer_id=rnd.choice([None, *_OWNER_IDS]),
+        **{f.value: rnd.choice([None, *_VALUES]) for f in ALLOWED_MATCH_FIELDS},
+    )
+
+
+class TestRiskListMatcher:
+    def test_matches_are_same_as_linear_scan(self):
+        rnd = random.Random(42)
+        now = timezone.now()
+        entries = [_random_entry(rnd, entry_id) for entry_id in range(1, 500)]
+        compiled = matcher.RiskListMatcher(entries, version=now)
+
+        for _ in range(300):
+            data = _random_match_data(rnd)
+            merchant_id = rnd.choice(_OWNER_IDS)
+            wallet_id = rnd.choice(_OWNER_IDS)
+            operation_type = rnd.choice(
+                [OperationType.DEPOSIT, OperationType.WITHDRAWAL]
+            )
+
+            expected = [
+                entry
+                for entry in sorted(entries, key=matcher._sort_key)
+                if (
+                    entry.scope == Scope.GLOBAL
+                    or (
+                        entry.scope == Scope.MERCHANT
+                        and entry.merchant_id == merchant_id
+                    )
+                    or (entry.scope == Scope.WALLET and entry.wallet_id == wallet_id)
+                )
+                and entry.operation_type in (OperationType.ALL, operation_type)
+                and (entry.expires_at is None or entry.expires_at > now)
+                and data.matches(entry)
+            ]
+
+            assert (
+                compiled.find_matches(
+                    data,
+                    merchant_id=merchant_id,
+                    wallet_id=wallet_id,
+                    operation_type=operation_type,
+                    now=now,
+                )
+                == expected
+            )
+
+    def test_global_entry_requires_all_fields(self):
+        entry = GrayListEntryFactory.build(
+            id=1,
+            scope=Scope.GLOBAL,
+            customer=None,
+            email="User@x.com",
+            phone="123",
+            match_fields=[MatchFieldKey.EMAIL.value, MatchFieldKey.PHONE.value],
+        )
+        compiled = matcher.RiskListMatcher([entry], version=timezone.now())
+        kwargs = dict(
+            merchant_id=None,
+            wallet_id=None,
+            operation_type=OperationType.DEPOSIT,
+            now=timezone.now(),
+        )
+
+        email_only = MatchData(
+            customer_id=None,
+            email="user@x.com ",
+            phone=None,
+            customer_name=None,
+            masked_pan=None,
+            customer_wallet_id=None,
+            ip=None,
+            provider_code=None,
+        )
+        assert compiled.find_matches(email_only, **kwargs) == []
+        assert compiled.find_matches(
+            email_only.model_copy(update={"phone": "123"}), **kwargs
+        ) == [entry]
+
+
+@pytest.mark.django_db
+class TestRiskListMatcherCache:
+    def test_matcher_is_invalidated_on_entry_changes(self):
+        trx = PaymentTransactionFactory.create(customer=CustomerFactory.create())
+        data = MatchData.from_transaction(trx)
+        kwargs = dict(
+            merchant_id=trx.wallet.wallet.merchant_id,
+            wallet_id=trx.wallet.wallet_id,
+            operation_type=OperationType(trx.type),
+            now=timezone.now(),
+        )
+        assert matcher.get_matcher().find_matches(data, **kwargs) == []
+
+        entry = GrayListEntryFactory.create(
+            scope=Scope.WALLET,
+            customer=trx.customer,
+            wallet=trx.wallet.wallet,
+        )
+        assert matcher.get_matcher().find_matches(data, **kwargs) == [entry]
+
+        entry.soft_delete(reason="test")
+        assert matcher.get_matcher().find_matches(data, **kwargs) == []
@@ -0,0 +1,123 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rozert_pay.limits.services import limits
+from rozert_pay.risk_lists.const import ListType, MatchFieldKey, Scope
+from rozert_pay.risk_lists.models import RiskListEntry
+from rozert_pay.risk_lists.services import checker, prefilter
+from rozert_pay.risk_lists.services.match_data import MatchData
+from tests.factories import (
+    CustomerFactory,
+    CustomerLimitFactory,
+    PaymentTransactionFactory,
+)
+from tests.risk_lists.factories import BlackListEntryFactory, GrayListEntryFactory
+
+
+def _match_data(**kwargs):
+    return MatchData(
+        **{
+            "customer_id": None,
+            "email": None,
+            "phone": None,
+            "customer_name": None,
+            "masked_pan": None,
+            "customer_wallet_id": None,
+            "ip": None,
+            "provider_code": None,
+            **kwargs,
+        }
+    )
+
+
+@pytest.mark.django_db
+class TestRiskListsPrefilter:
+    @pytest.fixture(autouse=True)
+    def rebuilt_prefilter(self):
+        # Drop keys left in Redis by previous tests
+        prefilter.rebuild_prefilter()
+
+    def test_saved_entry_is_added_to_prefilter(self):
+        data = _match_data(email=" Prefilter@Example.com")
+        assert not prefilter.may_match(data)
+
+        GrayListEntryFactory.create(
+            scope=Scope.GLOBAL,
+            customer=None,
+            email="prefilter@example.com",
+            phone="+100500",
+            match_fields=[MatchFieldKey.EMAIL.value, MatchFieldKey.PHONE.value],
+        )
+
+        assert prefilter.may_match(data)
+        assert not prefilter.may_match(_match_data(email="other@example.com"))
+
+    def test_rebuild_drops_deleted_entries_but_keeps_customer(self):
+        customer = CustomerFactory.create()
+        entry = BlackListEntryFactory.create(
+            scope=Scope.GLOBAL,
+            customer=customer,
+            phone="+200300",
+            match_fields=[MatchFieldKey.PHONE.value],
+        )
+        entry.soft_delete(reason="test")
+        phone_data = _match_data(phone="+200300")
+        assert prefilter.may_match(phone_data)
+        # Recently changed entries are added again after rebuild
+        RiskListEntry.objects.filter(id=entry.id).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+        prefilter.rebuild_prefilter()
+
+        assert not prefilter.may_match(phone_data)
+        # is_customer_in_list() sees deleted entries too
+        assert prefilter.may_contain_customer(customer.id, ListType.BLACK)
+        assert checker.is_customer_in_list(customer, ListType.BLACK)
+
+    def test_customer_not_in_list_skips_db(self, django_assert_num_queries):
+        customer = CustomerFactory.create()
+        GrayListEntryFactory.create(
+            scope=Scope.MERCHANT,
+            customer=customer,
+            merchant=PaymentTransactionFactory.create().wallet.wallet.merchant,
+        )
+        other_customer = CustomerFactory.create()
+        prefilter.may_contain_customer(customer.id, ListType.GRAY)
+
+        with django_assert_num_queries(0):
+            assert not checker.is_customer_in_list(other_customer, ListType.GRAY)
+            assert not checker.is_customer_in_list(customer, ListType.BLACK)
+        with django_assert_num_queries(1):
+            assert checker.is_customer_in_list(customer, ListType.GRAY)
+
+    @pytest.mark.usefixtures("disable_cache")
+    def test_benchmark_db_round_trips_per_transaction(self):
+        transactions = [
+            PaymentTransactionFactory.create(customer=CustomerFactory.create())
+            for _ in range(20)
+        ]
+        for trx in transactions:
+            CustomerLimitFactory.create(customer=trx.customer, decline_on_exceed=False)
+
+        def _count_queries() -> int:
+            with CaptureQueriesContext(connection) as ctx:
+                for trx in transactions:
+                    checker._process_transaction(trx)
+                    limits._process_transaction_limits(trx)
+            return len(ctx.captured_queries)
+
+        # Warm up relations cached on transaction instances
+        _count_queries()
+        with mock.patch.object(
+            prefilter, "may_match", return_value=True
+        ), mock.patch.object(prefilter, "may_contain_customer", return_value=True):
+            without_prefilter = _count_queries()
+        with_prefilter = _count_queries()
+
+        # Active entries scan and gray list lookup per transaction
+        assert without_prefilter - with_prefilter == 2 * len(transactions)
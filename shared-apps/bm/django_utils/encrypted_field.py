@@ -1,5 +1,6 @@
 import binascii
 import datetime
+import functools
 import hashlib
 import hmac
 import json
@@ -9,7 +10,7 @@ from enum import Enum, auto
 from typing import Any, Callable, NewType
 
 from bm.common.entities import StrEnum
-from bm.django_utils.encryption import SecretValue
+from bm.django_utils.encryption import LazySecretValue, SecretValue
 from bm.utils import BMJsonEncoder
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from django import forms
@@ -245,11 +246,21 @@ class BaseEncryptedTextField(models.TextField):
     def primary_encryption_key(self) -> EncryptionKey:
         return self.key_set.primary_key
 
+    @cached_property
+    def _ciphers(self) -> dict[EncryptionKeyId, AESGCM]:
+        return {}
+
+    def _get_cipher(self, key: EncryptionKey) -> AESGCM:
+        if (aesgcm := self._ciphers.get(key.key_id)) is None:
+            aesgcm = AESGCM(key.key_material.get_secret_value())
+            self._ciphers[key.key_id] = aesgcm
+        return aesgcm
+
     def encrypt(self, value: str) -> str:
         nonce = os.urandom(12)  # AESGCM requires "Nonce must be between 8 and 128 bytes", usually 12 bytes is used
         # use only primary key for encryption
         key_id = self.primary_encryption_key.key_id
-        aesgcm = AESGCM(self.primary_encryption_key.key_material.get_secret_value())
+        aesgcm = self._get_cipher(self.primary_encryption_key)
         ciphertext = aesgcm.encrypt(
             nonce=nonce,
             data=value.encode(),
@@ -277,7 +288,7 @@ class BaseEncryptedTextField(models.TextField):
         if key_used.status in [EncryptionKeyStatus.ROTATED, EncryptionKeyStatus.DESTROYED]:
             raise ValueError(f'Key with id {key_id} is not usable: status {key_used.status}')
 
-        aesgcm = AESGCM(key_used.key_material.get_secret_value())
+        aesgcm = self._get_cipher(key_used)
         return self.deserializer(
             aesgcm.decrypt(
                 nonce=bytes.fromhex(nonce_hex_str),
@@ -296,10 +307,10 @@ class BaseEncryptedTextField(models.TextField):
         return self.encrypt(self.serializer(v))
 
     def from_db_value(self, value, expression, connection):  # type: ignore[no-untyped-def]
-        """Called when reading from DB — decrypt here."""
+        """Called when reading from DB — value is decrypted on first read."""
         if value is None:
             return SecretValue(None)
-        return SecretValue(self.decrypt(value))
+        return LazySecretValue(functools.partial(self.decrypt, value))
 
     def to_python(self, value) -> SecretValue:  # type: ignore[no-untyped-def]
         """Ensure Python code always sees plaintext."""
@@ -315,7 +326,7 @@ class BaseEncryptedTextField(models.TextField):
         if not (isinstance(value, str) and value.startswith(self.encryption_version + self.DELIMITER) and value.count(self.DELIMITER) == 3):
             return SecretValue(value)
 
-        return SecretValue(self.decrypt(value))
+        return LazySecretValue(functools.partial(self.decrypt, value))
 
     def formfield(
         self,
@@ -1,6 +1,7 @@
 import base64
 import json
-from typing import Any, Generic, TypeVar
+from functools import lru_cache
+from typing import Any, Callable, Generic, TypeVar
 
 from bm.utils import BMJsonEncoder
 from cryptography.fernet import Fernet, MultiFernet
@@ -17,13 +18,25 @@ def get_key() -> str:
     return Fernet.generate_key().decode()
 
 
+@lru_cache(maxsize=32)
+def _get_fernet(keys: tuple[str, ...]) -> MultiFernet:
+    return MultiFernet([Fernet(key) for key in keys])
+
+
+def get_fernet(keys: list[SecretStr]) -> MultiFernet:
+    """
+    Returns MultiFernet of the keys, cached per keys.
+    """
+    return _get_fernet(tuple(key.get_secret_value() for key in keys))
+
+
 def encrypt(payload: str, keys: list[SecretStr]) -> str:
     """
     Encrypts payload using secret key.
     Uses MultiFernet to allow easy key's rotation.
     Returns base64 of encrypted payload with prefix
     """
-    f = MultiFernet([Fernet(key.get_secret_value()) for key in keys])
+    f = get_fernet(keys)
 
     encrypted = base64.b64encode(f.encrypt(payload.encode()))
     return f"{ENCRYPTION_VERSION}${encrypted.decode()}"
@@ -37,7 +50,7 @@ def decrypt(payload: str, keys: list[SecretStr]) -> str:
     if version != ENCRYPTION_VERSION:
         raise ValueError(f"Unsupported encryption version: {version}")
 
-    f = MultiFernet([Fernet(key.get_secret_value()) for key in keys])
+    f = get_fernet(keys)
     return f.decrypt(base64.b64decode(encrypted)).decode()
 
 
@@ -102,11 +115,37 @@ class SecretValue(Generic[T]):
 
     def __eq__(self, other: Any) -> bool:
         if isinstance(other, SecretValue):
-            return self._value == other._value
-        return self._value == other
+            return self.get_secret_value() == other.get_secret_value()
+        return self.get_secret_value() == other
 
     def __hash__(self) -> int:
-        return hash(self._value)
+        return hash(self.get_secret_value())
 
     def __bool__(self) -> bool:
-        return bool(self._value)
+        return bool(self.get_secret_value())
+
+
+_NOT_LOADED: Any = object()
+
+
+class LazySecretValue(SecretValue[T]):
+    """
+    SecretValue loaded on first get_secret_value() call,
+    e.g. decrypted only if it is actually read.
+    """
+
+    __slots__ = ('_load',)
+
+    def __init__(self, load: Callable[[], T]):
+        super().__init__(_NOT_LOADED)
+        self._load: Callable[[], T] | None = load
+
+    def get_secret_value(self) -> T:
+        if self._value is _NOT_LOADED:
+            assert self._load
+            self._value = self._load()
+            self._load = None
+        return self._value
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return SecretValue, (self.get_secret_value(),)